@@ -0,0 +1,356 @@
+# Build accelerator for BuildEngine (optional, off unless enabled).
+#  - compiler cache: ccache is put in front of the compiler when it's
+#    installed; otherwise object files are cached in-process, keyed like
+#    BuildCache keys whole builds (compiler identity, flags, source and the
+#    project headers it includes), so an unchanged unit is copied back
+#    instead of compiled.
+#  - precompiled SDK headers: the leading #include block of a unit that
+#    pulls in headers from include/ is compiled once into a .gch under
+#    build/<target>/pch/ and force-included with -include. The unit still
+#    includes the headers itself, so the prefix stops at the first project
+#    header without an include guard (#ifndef/#define or #pragma once):
+#    including that one twice would redefine what it declares. gcc falls
+#    back to the plain header if the .gch can't be used.
+# Per-unit timings are kept in .zenithcache/accel.json, so the terminal can
+# show the measured speedup against a plain compile of the same unit.
+import hashlib, json, os, re, shutil, subprocess, tempfile, threading, time
+
+from buildcache import CACHE_DIR, BuildCache, build_key, compiler_identity
+
+ACCEL_FILE = "accel.json"
+PCH_DIR = "pch"
+PCH_HEADER = "zenith_pch.h"
+INCLUDE_LINE_RE = re.compile(r'^#[ \t]*include[ \t]*([<"])([^>"]+)[>"]')
+GUARD_RE = re.compile(r"#[ \t]*(?:pragma[ \t]+once\b|ifndef[ \t]+(\w+)\s*#[ \t]*define[ \t]+(\w+))")
+CCACHE_SLOPPINESS = "pch_defines,time_macros,include_file_mtime,include_file_ctime"
+
+
+def find_ccache():
+    return shutil.which("ccache")
+
+
+def include_prefix(path):
+    # the #include lines at the top of a source, before any other code:
+    # [(quote, name)] where quote is '<' or '"'
+    out = []
+    in_comment = False
+    try:
+        with open(path, "r", encoding="utf-8", errors="ignore") as fh:
+            for line in fh:
+                line = line.strip()
+                if in_comment:
+                    if "*/" not in line:
+                        continue
+                    line = line.split("*/", 1)[1].strip()
+                    in_comment = False
+                if line.startswith("/*"):
+                    rest = line[2:]
+                    if "*/" not in rest:
+                        in_comment = True
+                        continue
+                    line = rest.split("*/", 1)[1].strip()
+                if not line or line.startswith("//"):
+                    continue
+                m = INCLUDE_LINE_RE.match(line)
+                if m is None:
+                    break
+                out.append((m.group(1), m.group(2)))
+    except OSError:
+        return []
+    return out
+
+
+def has_include_guard(path):
+    # True when the first directive of the header is #pragma once or an
+    # #ifndef X / #define X pair, i.e. including it again is harmless
+    try:
+        with open(path, "r", encoding="utf-8", errors="ignore") as fh:
+            text = fh.read()
+    except OSError:
+        return False
+    text = re.sub(r"/\*.*?\*/|//[^\n]*", " ", text, flags=re.S).lstrip()
+    m = GUARD_RE.match(text)
+    return m is not None and m.group(1) == m.group(2)
+
+
+class Accelerator:
+    def __init__(self, root=".", cache=True, pch=True, use_ccache=True, cache_dir=CACHE_DIR):
+        self.root = os.path.abspath(root)
+        self.ccache = find_ccache() if cache and use_ccache else None
+        self.object_cache = BuildCache(self.root) if cache and not self.ccache else None
+        self.pch = pch
+        self.times_path = os.path.join(self.root, cache_dir, ACCEL_FILE)
+        self._lock = threading.Lock()
+        self._pch_locks = {}
+        self._pch_for = {}   # src -> (mtime_ns, header or None)
+        self._times = None
+        self.reset()
+
+    def reset(self):
+        # per-build counters
+        self.hits = set()        # units restored from the object cache
+        self.pch_units = set()   # units compiled against a .gch
+        self.pch_built = []      # (header, seconds)
+        self.unit_seconds = {}   # src -> seconds this build
+        self.saved = {}          # src -> compile seconds of the cached object
+
+    @property
+    def enabled(self):
+        return bool(self.ccache or self.object_cache or self.pch)
+
+    def describe(self):
+        parts = []
+        if self.ccache:
+            parts.append(f"ccache ({self.ccache})")
+        elif self.object_cache is not None:
+            parts.append("object cache")
+        if self.pch:
+            parts.append("precompiled SDK headers")
+        return ", ".join(parts) or "off"
+
+    # --- timings ---
+    def _load_times(self):
+        if self._times is None:
+            try:
+                with open(self.times_path, "r", encoding="utf-8") as fh:
+                    self._times = json.load(fh)
+            except (OSError, ValueError):
+                self._times = {}
+        return self._times
+
+    def save_times(self):
+        with self._lock:
+            if self._times is None:
+                return
+            os.makedirs(os.path.dirname(self.times_path), exist_ok=True)
+            tmp = self.times_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump(self._times, fh, indent=1)
+            os.replace(tmp, self.times_path)
+
+    def _time_key(self, engine, src):
+        return f"{engine.target}:{src}"
+
+    def record_plain(self, engine, src, seconds):
+        with self._lock:
+            self._load_times()[self._time_key(engine, src)] = seconds
+
+    def plain_seconds(self, engine, src):
+        with self._lock:
+            return self._load_times().get(self._time_key(engine, src))
+
+    # --- precompiled headers ---
+    def pch_header(self, engine, src):
+        # header to force-include for src, or None
+        if not self.pch:
+            return None
+        path = os.path.join(engine.project.root, src)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._pch_for.get(src)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        header = None
+        prefix = include_prefix(path)
+        include_dirs = [os.path.join(engine.project.root, d) for d in engine.project.include_dirs]
+        lines, sdk = [], False
+        for quote, name in prefix:
+            resolved = None
+            bases = ([os.path.dirname(path)] if quote == '"' else []) + include_dirs
+            for base in bases:
+                cand = os.path.join(base, name)
+                if os.path.isfile(cand):
+                    resolved = os.path.abspath(cand)
+                    break
+            if resolved is not None:
+                if not has_include_guard(resolved):
+                    break  # the unit's own #include would define it a second time
+                sdk = True
+                lines.append(f'#include "{resolved}"')
+            elif quote == "<":
+                lines.append(f"#include <{name}>")
+            else:
+                break  # unresolvable local header, keep the prefix before it
+        if sdk:
+            h = hashlib.sha256()
+            h.update(compiler_identity(engine.compiler).encode())
+            h.update("\0".join(engine.cflags + engine.project.include_dirs + lines).encode())
+            pch_dir = os.path.join(engine.obj_dir, "..", PCH_DIR, h.hexdigest()[:16])
+            header = os.path.normpath(os.path.join(pch_dir, PCH_HEADER))
+            if not os.path.exists(header):
+                os.makedirs(pch_dir, exist_ok=True)
+                with open(header, "w", encoding="utf-8") as fh:
+                    fh.write("/* generated by Studio: SDK include prefix */\n" + "\n".join(lines) + "\n")
+        with self._lock:
+            self._pch_for[src] = (mtime, header)
+        return header
+
+    def ensure_pch(self, engine, header):
+        # (re)builds header.gch when its headers or flags changed
+        with self._lock:
+            lock = self._pch_locks.setdefault(header, threading.Lock())
+        with lock:
+            gch = header + ".gch"
+            cmd = [engine.compiler, "-x", "c-header", header, "-o", gch, "-MMD", "-MF", gch + ".d"]
+            cmd += ["-I" + d for d in engine.project.include_dirs]
+            cmd += engine.cflags
+            if not engine.needs_compile(header, gch, cmd):
+                return True
+            t0 = time.perf_counter()
+            code, out = engine._run(cmd)
+            if code != 0:
+                # units just compile without it
+                engine.emit(f"[accel] precompiling SDK headers failed, continuing without:\n{out.rstrip()}")
+                return False
+            with open(gch + ".cmd", "w", encoding="utf-8") as fh:
+                fh.write(engine.signature(cmd))
+            with self._lock:
+                self.pch_built.append((header, time.perf_counter() - t0))
+            return True
+
+    # --- hooks called by BuildEngine ---
+    def compile_command(self, engine, src, cmd):
+        header = self.pch_header(engine, src)
+        if header is not None:
+            cmd = cmd[:2] + ["-include", header, "-Winvalid-pch"] + cmd[2:]
+            if self.ccache:
+                cmd.append("-fpch-preprocess")
+        if self.ccache:
+            cmd = [self.ccache] + cmd
+        return cmd
+
+    def environment(self):
+        if not self.ccache:
+            return None
+        env = dict(os.environ)
+        env.setdefault("CCACHE_BASEDIR", self.root)
+        if self.pch:
+            env["CCACHE_SLOPPINESS"] = CCACHE_SLOPPINESS
+        return env
+
+    def _object_key(self, engine, src, obj, cmd):
+        # command without the output paths, include dirs made absolute
+        root = engine.project.root
+        args = []
+        for a in cmd[1:]:
+            if a.startswith(obj):
+                a = "<obj>" + a[len(obj):]
+            elif a.startswith("-I") and not os.path.isabs(a[2:]):
+                a = "-I" + os.path.join(root, a[2:])
+            args.append(a)
+        return build_key(engine.compiler, [os.path.join(root, src)], args, extra=("object",))
+
+    def before_compile(self, engine, src, obj, cmd):
+        # True when obj was restored from the object cache
+        key = None
+        if self.object_cache is not None:
+            try:
+                key = self._object_key(engine, src, obj, cmd)
+                with self._lock:
+                    hit = self.object_cache.restore(key, obj) and self.object_cache.restore(key + "-d", obj + ".d")
+                if hit:
+                    with self._lock:
+                        self.hits.add(src)
+                        self.saved[src] = self.object_cache.build_seconds(key)
+                    return True, key
+            except Exception:
+                key = None
+        header = self.pch_header(engine, src)
+        if header is not None and self.ensure_pch(engine, header):
+            with self._lock:
+                self.pch_units.add(src)
+        return False, key
+
+    def after_compile(self, engine, src, obj, key, seconds):
+        with self._lock:
+            self.unit_seconds[src] = seconds
+        if src not in self.pch_units and not self.ccache:
+            # a plain compile: the reference for later speedups
+            self.record_plain(engine, src, seconds)
+        if key is not None:
+            try:
+                with self._lock:
+                    self.object_cache.store(key, obj, seconds)
+                    self.object_cache.store(key + "-d", obj + ".d", seconds)
+            except OSError as e:
+                engine.emit(f"[accel] object cache store failed: {e}")
+
+    def report(self, engine):
+        # summary lines after a build
+        lines = []
+        for header, secs in self.pch_built:
+            lines.append(f"[accel] precompiled {os.path.relpath(header, engine.project.root)} in {secs:.2f}s")
+        for src in sorted(self.hits):
+            saved = self.saved.get(src) or 0.0
+            lines.append(f"[accel] {src}: from object cache (compile took {saved:.2f}s)")
+        for src in sorted(self.pch_units):
+            secs = self.unit_seconds.get(src)
+            plain = self.plain_seconds(engine, src)
+            if secs is None:
+                continue
+            if plain:
+                lines.append(f"[accel] {src}: {secs:.2f}s with PCH vs {plain:.2f}s plain ({plain / max(secs, 1e-6):.1f}x)")
+            else:
+                lines.append(f"[accel] {src}: {secs:.2f}s with PCH (no plain compile measured yet)")
+        try:
+            self.save_times()
+        except OSError:
+            pass
+        return lines
+
+    # --- explicit measurement ---
+    def measure(self, engine, limit=8):
+        # compiles each unit plain, then against its .gch, into a temp dir;
+        # returns report lines
+        units = [s for s in engine.project.sources() if s.endswith(".c")][:limit]
+        if not units:
+            return ["[accel] nothing to measure"]
+        lines = []
+        with tempfile.TemporaryDirectory(prefix="zenith-accel-") as tmp:
+            for src in units:
+                lines.extend(self._measure_unit(engine, src, tmp))
+        try:
+            self.save_times()
+        except OSError:
+            pass
+        return lines
+
+    def _measure_unit(self, engine, src, tmp):
+        obj = os.path.join(tmp, "unit.o")
+        base = [engine.compiler, "-c", src, "-o", obj] + ["-I" + d for d in engine.project.include_dirs] + engine.cflags
+
+        def timed(cmd):
+            t0 = time.perf_counter()
+            code = subprocess.run(cmd, cwd=engine.project.root, capture_output=True).returncode
+            return code, time.perf_counter() - t0
+
+        code, plain = timed(base)
+        if code != 0:
+            return [f"[accel] {src} does not compile, skipped"]
+        self.record_plain(engine, src, plain)
+        line = f"[accel] {src}: plain {plain:.3f}s"
+        header = self.pch_header(engine, src)
+        if header is None:
+            line += ", no SDK include block at the top (PCH doesn't apply)"
+        else:
+            t0 = time.perf_counter()
+            self.ensure_pch(engine, header)
+            gch = time.perf_counter() - t0
+            code, with_pch = timed(base[:2] + ["-include", header] + base[2:])
+            if code == 0:
+                line += f", with PCH {with_pch:.3f}s ({plain / max(with_pch, 1e-6):.1f}x"
+                line += f", .gch built in {gch:.3f}s)" if gch > 0.005 else ")"
+        if self.object_cache is not None:
+            cache = BuildCache(tmp)
+            cache.store("measure", obj, plain)
+            os.remove(obj)
+            t0 = time.perf_counter()
+            cache.restore("measure", obj)
+            hit = time.perf_counter() - t0
+            line += f", object cache hit {hit * 1000:.1f} ms"
+        elif self.ccache:
+            line += ", ccache hits: see `ccache -s`"
+        return [line]
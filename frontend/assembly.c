@@ -9,7 +9,24 @@ void print_header() {
     printf("\033[0m");
 }
 
-void compile_project() {
+// look for a Studio python tool: $ZENITH_SDK/frontend/<name>, then ./frontend/<name>
+int find_sdk_tool(const char *name, char *out, size_t len) {
+    const char *sdk = getenv("ZENITH_SDK");
+    if (sdk && *sdk) {
+        snprintf(out, len, "%s/frontend/%s", sdk, name);
+        if (access(out, R_OK) == 0) return 1;
+    }
+    snprintf(out, len, "frontend/%s", name);
+    if (access(out, R_OK) == 0) return 1;
+    return 0;
+}
+
+// the headless CLI shared with Studio and CI, if python3 and the SDK frontend are around
+int find_zenith(char *out, size_t len) {
+    return find_sdk_tool("zenith.py", out, len) && system("command -v python3 > /dev/null 2>&1") == 0;
+}
+
+int compile_project() {
     char flags[256];
     printf("Any other flags for gcc? Type 'no' if none: ");
     fgets(flags, sizeof(flags), stdin);
@@ -17,9 +34,13 @@ void compile_project() {
 
     printf("\033[1;36mCompiling source into executable...\033[0m\n");
 
-    char cmd[512];
-    if (strcmp(flags, "no") == 0 || strlen(flags) == 0) {
-        snprintf(cmd, sizeof(cmd), "gcc main.c -o app -I./include");
+    if (strcmp(flags, "no") == 0) flags[0] = 0;
+
+    char tool[512];
+    char cmd[1024];
+    if (find_zenith(tool, sizeof(tool))) {
+        // cached, per-unit build of zenith.json (or main.c), sapi.h link flags included
+        snprintf(cmd, sizeof(cmd), "python3 \"%s\" build %s", tool, flags);
     } else {
         snprintf(cmd, sizeof(cmd), "gcc main.c -o app -I./include %s", flags);
     }
@@ -30,6 +51,7 @@ void compile_project() {
     } else {
         printf("\033[1;31mCompilation failed!\033[0m\n");
     }
+    return ret;
 }
 
 void create_manifest() {
@@ -74,9 +96,23 @@ void create_manifest() {
 }
 
 void create_zapp() {
+    char tool[512];
+    char cmd[1024];
+    int ret;
+
     printf("\033[1;36mPackaging into project.zapp...\033[0m\n");
-    system("zip -q project.zapp app manifest.json");
-    printf("\033[1;32mproject.zapp created successfully!\033[0m\n");
+    // same packager as Studio (deterministic, incremental); plain zip as fallback
+    if (find_zenith(tool, sizeof(tool))) {
+        snprintf(cmd, sizeof(cmd), "python3 \"%s\" package --no-build -o project.zapp", tool);
+        ret = system(cmd);
+    } else {
+        ret = system("zip -q project.zapp app manifest.json");
+    }
+    if (ret == 0) {
+        printf("\033[1;32mproject.zapp created successfully!\033[0m\n");
+    } else {
+        printf("\033[1;31mPackaging failed!\033[0m\n");
+    }
 }
 
 void showversion() {
@@ -128,7 +164,7 @@ int main() {
         if (strcmp(cmd, "compile") == 0) {
             compile_project();
         } else if (strcmp(cmd, "czapp") == 0) {
-            compile_project();
+            if (compile_project() != 0) continue;
             create_manifest();
             create_zapp();
         } else if (strcmp(cmd, "exit") == 0) {
@@ -160,7 +196,14 @@ int main() {
             printf("  run     - run the app");
             
          } else if (strcmp(cmd, "clean") == 0) {
-    system("rm -f app manifest.json project.zapp");
+    char tool[512];
+    char cleancmd[1024];
+    if (find_zenith(tool, sizeof(tool))) {
+        snprintf(cleancmd, sizeof(cleancmd), "python3 \"%s\" clean -q", tool);
+        system(cleancmd);
+    } else {
+        system("rm -f app manifest.json project.zapp");
+    }
     printf("\033[1;32mCleaned up previous build files.\033[0m\n");
 
         } else {
@@ -0,0 +1,72 @@
+# Open/save time and peak RSS of the Studio editor for big files.
+# Every measurement runs in a fresh interpreter so ru_maxrss is per case.
+# Usage: QT_QPA_PLATFORM=offscreen python3 frontend/benchmarks/bench_editor.py [MB ...]
+import os, resource, subprocess, sys, tempfile, time
+
+FRONTEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, FRONTEND)
+
+LINE = 'static inline int zenith_probe_%08d(int fd) { return fd > 0 ? fd : -1; } /* generated */\n'
+
+
+def make_file(path, megabytes):
+    target = int(megabytes * 1024 * 1024)
+    written = 0
+    i = 0
+    with open(path, "w", encoding="utf-8") as fh:
+        while written < target:
+            chunk = "".join(LINE % (i + k) for k in range(1000))
+            fh.write(chunk)
+            written += len(chunk)
+            i += 1000
+
+
+def child(mode, path):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtWidgets import QApplication, QTextEdit
+    app = QApplication([])
+    t0 = time.perf_counter()
+    if mode == "legacy":
+        # what studio.py used to do
+        widget = QTextEdit()
+        with open(path, "r", encoding="utf-8", errors="ignore") as fh:
+            widget.setPlainText(fh.read())
+        t1 = time.perf_counter()
+        with open(path + ".out", "w", encoding="utf-8") as fh:
+            fh.write(widget.toPlainText())
+    else:
+        from editor import CodeEditor
+        widget = CodeEditor()
+        widget.load_file(path)
+        widget.finish_loading()
+        t1 = time.perf_counter()
+        widget.save_to(path + ".out")
+    t2 = time.perf_counter()
+    app.processEvents()
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{(t1 - t0) * 1000:.0f} {(t2 - t1) * 1000:.0f} {rss_mb:.0f}")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(sys.argv[2], sys.argv[3])
+        return
+    sizes = [float(a) for a in sys.argv[1:]] or [1, 10, 100]
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+    print(f"{'size':>8} {'mode':>8} {'open ms':>10} {'save ms':>10} {'peak RSS MB':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mb in sizes:
+            path = os.path.join(tmp, f"big_{mb:g}.h")
+            make_file(path, mb)
+            for mode in ("legacy", "editor"):
+                out = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", mode, path],
+                                     capture_output=True, text=True, env=env)
+                if out.returncode != 0:
+                    print(f"{mb:>6g}MB {mode:>8} failed: {out.stderr.strip().splitlines()[-1:]}")
+                    continue
+                open_ms, save_ms, rss = out.stdout.split()
+                print(f"{mb:>6g}MB {mode:>8} {open_ms:>10} {save_ms:>10} {rss:>12}")
+
+
+if __name__ == "__main__":
+    main()
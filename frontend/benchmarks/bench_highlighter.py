@@ -0,0 +1,73 @@
+# Micro-benchmark for the C lexer behind CSyntaxHighlighter.
+# Usage: python3 frontend/benchmarks/bench_highlighter.py [lines]
+import os, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from clexer import CLexer, STATE_NORMAL
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..")
+
+
+def make_source(n_lines):
+    # SDK headers repeated until we reach the requested size
+    lines = []
+    include_dir = os.path.join(ROOT, "include")
+    for fn in sorted(os.listdir(include_dir)):
+        if fn.endswith(".h"):
+            with open(os.path.join(include_dir, fn), "r", encoding="utf-8", errors="ignore") as fh:
+                lines.extend(fh.read().splitlines())
+    out = []
+    while len(out) < n_lines:
+        out.extend(lines)
+    return out[:n_lines]
+
+
+def bench_full(lexer, lines):
+    t0 = time.perf_counter()
+    lexer.lex(lines)
+    return time.perf_counter() - t0
+
+
+def bench_keystroke(lexer, lines, edits=2000):
+    # emulate QSyntaxHighlighter: re-lex the edited line and keep going
+    # only while the end state differs from what was stored
+    states = []
+    state = STATE_NORMAL
+    for line in lines:
+        _, state = lexer.lex_line(line, state)
+        states.append(state)
+    worst = 0.0
+    total = 0.0
+    step = max(1, len(lines) // edits)
+    for i in range(0, len(lines), step):
+        t0 = time.perf_counter()
+        prev = states[i - 1] if i else STATE_NORMAL
+        j = i
+        while j < len(lines):
+            _, st = lexer.lex_line(lines[j], prev)
+            if st == states[j] and j > i:
+                break
+            states[j] = st
+            prev = st
+            j += 1
+        dt = time.perf_counter() - t0
+        total += dt
+        worst = max(worst, dt)
+    count = len(range(0, len(lines), step))
+    return total / count, worst
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    lines = make_source(n)
+    lexer = CLexer()
+    full = bench_full(lexer, lines)
+    avg, worst = bench_keystroke(lexer, lines)
+    print(f"lines:            {n}")
+    print(f"full lex:         {full * 1000:.1f} ms ({n / full:,.0f} lines/sec)")
+    print(f"keystroke avg:    {avg * 1e6:.1f} us")
+    print(f"keystroke worst:  {worst * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
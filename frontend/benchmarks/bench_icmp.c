@@ -0,0 +1,124 @@
+/*
+ * Benchmark for icmp.h: the 16-bit checksum loop against checksum_wide(),
+ * then a ping sweep of 127.0.0.0/22 on loopback, old send_icmp_request()
+ * (a socket per host, no replies) against icmp_ping_sweep().
+ * Needs root or a ping_group_range that includes your group.
+ * Usage:
+ *   gcc -O2 -Iinclude frontend/benchmarks/bench_icmp.c -o bench_icmp && sudo ./bench_icmp [hosts] [count]
+ * (drop the _GNU_SOURCE define below to measure the sendto/recvfrom fallback)
+ */
+#define _GNU_SOURCE
+#include <fcntl.h>
+
+#include "icmp.h"
+
+static double now(void) {
+    return icmp_now_ns() / 1e9;
+}
+
+// checksum() as it was before checksum_wide()
+static unsigned short checksum16(void *b, int len) {
+    unsigned short *buf = b;
+    unsigned int sum = 0;
+
+    for (; len > 1; len -= 2)
+        sum += *buf++;
+    if (len == 1)
+        sum += *(unsigned char *)buf;
+    sum = (sum >> 16) + (sum & 0xFFFF);
+    sum += (sum >> 16);
+    return (unsigned short)~sum;
+}
+
+static void bench_checksum(void) {
+    static const int sizes[] = {8, 64, 256, 1500, 9000, 65535};
+    static unsigned char data[65536 + 8];
+    volatile unsigned short sink = 0;
+    size_t s;
+    int i, bad = 0;
+
+    for (i = 0; i < (int)sizeof(data); i++)
+        data[i] = (unsigned char)(i * 131 + 7);
+    // odd lengths and unaligned starts must agree with the 16-bit loop
+    for (i = 0; i < 2000; i++)
+        bad += checksum16(data + (i & 1), i) != checksum_wide(data + (i & 1), (size_t)i);
+    printf("checksum_wide vs 16-bit loop, lengths 0-1999: %d mismatches\n\n", bad);
+
+    printf("%8s %12s %12s %8s\n", "bytes", "16-bit MB/s", "wide MB/s", "speedup");
+    for (s = 0; s < sizeof(sizes) / sizeof(sizes[0]); s++) {
+        int len = sizes[s], iters = (int)(256e6 / len);
+        double t0, t16, twide;
+
+        t0 = now();
+        for (i = 0; i < iters; i++) {
+            data[0] = (unsigned char)i;
+            sink += checksum16(data, len);
+        }
+        t16 = now() - t0;
+        t0 = now();
+        for (i = 0; i < iters; i++) {
+            data[0] = (unsigned char)i;
+            sink += checksum_wide(data, (size_t)len);
+        }
+        twide = now() - t0;
+        printf("%8d %12.0f %12.0f %7.1fx\n", len, (double)len * iters / t16 / 1e6,
+               (double)len * iters / twide / 1e6, t16 / twide);
+    }
+    (void)sink;
+}
+
+int main(int argc, char **argv) {
+    int n = argc > 1 ? atoi(argv[1]) : 1022;
+    int count = argc > 2 ? atoi(argv[2]) : 5;
+    struct icmp_ping_target *targets = calloc(n, sizeof(*targets));
+    char (*ips)[INET_ADDRSTRLEN] = calloc(n, sizeof(*ips));
+    struct icmp_pinger pinger;
+    int i, alive, stdout_fd, old_ok = 0;
+    long sent = 0, received = 0;
+    double t0, t_old, t_new, worst = 0, avg = 0;
+
+    bench_checksum();
+
+    // 127.0.0.1 .. 127.0.3.254 for the default 1022
+    for (i = 0; i < n; i++) {
+        snprintf(ips[i], sizeof(ips[i]), "127.%d.%d.%d", (i + 1) >> 16 & 0xFF, (i + 1) >> 8 & 0xFF, (i + 1) & 0xFF);
+        targets[i].ip = ips[i];
+    }
+
+    fflush(stdout);
+    stdout_fd = dup(1);
+    i = open("/dev/null", O_WRONLY);
+    dup2(i, 1);
+    close(i);
+    t0 = now();
+    for (i = 0; i < n; i++)
+        old_ok += send_icmp_request(ips[i]) == 0;
+    t_old = now() - t0;
+    fflush(stdout);
+    dup2(stdout_fd, 1);
+    close(stdout_fd);
+
+    if (icmp_pinger_open(&pinger) < 0)
+        return 1;
+    t0 = now();
+    alive = icmp_ping_sweep(&pinger, targets, n, count, 0, 1000);
+    t_new = now() - t0;
+    icmp_pinger_close(&pinger);
+
+    for (i = 0; i < n; i++) {
+        sent += targets[i].sent;
+        received += targets[i].received;
+        avg += targets[i].avg_ms * targets[i].received;
+        if (targets[i].max_ms > worst)
+            worst = targets[i].max_ms;
+    }
+    printf("\n%d hosts, %s socket\n", n, pinger.raw ? "raw" : "ping");
+    printf("send_icmp_request loop:  %d sent in %.3f s = %.0f requests/sec, 0 replies read\n",
+           old_ok, t_old, old_ok / t_old);
+    printf("icmp_ping_sweep x%d:      %ld sent, %ld replies in %.3f s = %.0f pings/sec\n",
+           count, sent, received, t_new, sent / t_new);
+    printf("  %d/%d hosts alive, avg rtt %.3f ms, worst %.3f ms, loss %.2f%%\n", alive, n,
+           received ? avg / received : 0.0, worst, sent ? 100.0 * (sent - received) / sent : 0.0);
+    icmp_ping_report(targets, n < 3 ? n : 3);
+    return received == sent ? 0 : 1;
+}
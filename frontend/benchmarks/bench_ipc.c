@@ -0,0 +1,207 @@
+/*
+ * Loopback benchmark for the framed IPC layer in include/ipc.h.
+ * A forked server runs the epoll loop; the client measures round-trip
+ * latency (p50/p99) and one-way throughput for 64 B - 1 MB messages, over
+ * the socket and over the shared memory ring, then many clients at once.
+ * Usage:
+ *   gcc -O2 -Iinclude frontend/benchmarks/bench_ipc.c -o bench_ipc && ./bench_ipc [clients]
+ */
+#include <signal.h>
+#include <sys/wait.h>
+#include <time.h>
+
+#include "ipc.h"
+
+#define T_PING  1   // reply with an empty ACK
+#define T_DATA  2   // count, no reply
+#define T_SYNC  3   // reply with how many DATA messages arrived
+#define T_ACK   4
+
+static const uint32_t sizes[] = {64, 1024, 16 * 1024, 256 * 1024, 1024 * 1024};
+
+static uint64_t now_ns(void) {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return (uint64_t)ts.tv_sec * 1000000000ull + (uint64_t)ts.tv_nsec;
+}
+
+static int cmp_u64(const void *a, const void *b) {
+    uint64_t x = *(const uint64_t *)a, y = *(const uint64_t *)b;
+    return x < y ? -1 : x > y;
+}
+
+static int on_message(struct zenithos_ipc_server *srv, struct zenithos_ipc_client *client,
+                      const struct zenithos_ipc_msg *msg, const void *data) {
+    uint64_t *count = (uint64_t *)client->user;
+    (void)data;
+    if (count == NULL) {
+        count = client->user = calloc(1, sizeof(uint64_t));
+        if (count == NULL)
+            return -1;
+    }
+    switch (msg->type) {
+    case T_PING:
+        return zenithos_ipc_server_reply(srv, client, T_ACK, NULL, 0);
+    case T_DATA:
+        (*count)++;
+        return 0;
+    case T_SYNC:
+        if (zenithos_ipc_server_reply(srv, client, T_ACK, count, sizeof(*count)) < 0)
+            return -1;
+        *count = 0;
+        return 0;
+    }
+    return -1;
+}
+
+static void on_close(struct zenithos_ipc_server *srv, struct zenithos_ipc_client *client) {
+    (void)srv;
+    free(client->user);
+}
+
+static void serve(const char *path, int ready_fd) {
+    struct zenithos_ipc_server srv;
+    if (zenithos_ipc_server_init(&srv, path, on_message, NULL) == -1)
+        exit(1);
+    srv.on_close = on_close;
+    if (write(ready_fd, "", 1) != 1)
+        exit(1);
+    close(ready_fd);
+    zenithos_ipc_server_run(&srv);
+    zenithos_ipc_server_close(&srv);
+    exit(0);
+}
+
+static int wait_ack(int fd, uint64_t *value) {
+    struct zenithos_ipc_msg msg;
+    uint64_t v = 0;
+    if (zenithos_ipc_recv_msg(fd, &msg, &v, sizeof(v)) != 1 || msg.type != T_ACK)
+        return -1;
+    if (value != NULL)
+        *value = v;
+    return 0;
+}
+
+static int send_data(int fd, struct zenithos_ipc_ring *ring, uint16_t type, const void *buf, uint32_t size) {
+    if (ring != NULL)
+        return zenithos_ipc_send_large(fd, ring, type, buf, size);
+    return zenithos_ipc_send_msg(fd, type, buf, size);
+}
+
+static void run_size(int fd, struct zenithos_ipc_ring *ring, uint32_t size, const char *mode) {
+    // enough round trips for a stable p99, capped at ~256 MB moved per test
+    int i, iters = (int)((256u * 1024 * 1024) / size);
+    uint64_t *rtt, t0, elapsed, got = 0;
+    char *buf = malloc(size);
+
+    if (iters > 20000)
+        iters = 20000;
+    if (iters < 200)
+        iters = 200;
+    rtt = malloc(sizeof(uint64_t) * iters);
+    memset(buf, 'z', size);
+
+    for (i = 0; i < iters; i++) {
+        t0 = now_ns();
+        if (send_data(fd, ring, T_PING, buf, size) == -1 || wait_ack(fd, NULL) == -1) {
+            perror("ping");
+            exit(1);
+        }
+        rtt[i] = now_ns() - t0;
+    }
+    qsort(rtt, iters, sizeof(uint64_t), cmp_u64);
+
+    t0 = now_ns();
+    for (i = 0; i < iters; i++) {
+        if (send_data(fd, ring, T_DATA, buf, size) == -1) {
+            perror("send");
+            exit(1);
+        }
+    }
+    if (zenithos_ipc_send_msg(fd, T_SYNC, NULL, 0) == -1 || wait_ack(fd, &got) == -1) {
+        perror("sync");
+        exit(1);
+    }
+    elapsed = now_ns() - t0;
+
+    printf("%-7s %9u %12.0f %10.1f %10.1f %10.1f%s\n", mode, size,
+           iters / (elapsed / 1e9), (double)size * iters / (elapsed / 1e9) / (1024 * 1024),
+           rtt[iters / 2] / 1000.0, rtt[iters * 99 / 100] / 1000.0,
+           got == (uint64_t)iters ? "" : "  (lost messages!)");
+    free(rtt);
+    free(buf);
+}
+
+static void many_clients(const char *path, int clients) {
+    int c, iters = 20000, status;
+    uint64_t t0 = now_ns();
+    double secs;
+
+    for (c = 0; c < clients; c++) {
+        if (fork() == 0) {
+            char buf[64] = {0};
+            int i, fd = zenithos_ipc_connect(path);
+            if (fd == -1)
+                _exit(1);
+            for (i = 0; i < iters; i++) {
+                if (zenithos_ipc_send_msg(fd, T_PING, buf, sizeof(buf)) == -1 || wait_ack(fd, NULL) == -1)
+                    _exit(1);
+            }
+            _exit(0);
+        }
+    }
+    for (c = 0; c < clients; c++) {
+        if (wait(&status) == -1 || !WIFEXITED(status) || WEXITSTATUS(status) != 0)
+            fprintf(stderr, "client failed\n");
+    }
+    secs = (now_ns() - t0) / 1e9;
+    printf("%d clients x %d pings (64 B) on one server thread: %.0f msgs/sec\n",
+           clients, iters, clients * iters / secs);
+}
+
+int main(int argc, char **argv) {
+    char path[108];
+    int pipefd[2], fd, clients = argc > 1 ? atoi(argv[1]) : 16;
+    char c;
+    size_t i;
+    pid_t server;
+    struct zenithos_ipc_ring ring;
+
+    snprintf(path, sizeof(path), "/tmp/zenithos-bench-%ld.sock", (long)getpid());
+    if (pipe(pipefd) == -1)
+        return 1;
+    server = fork();
+    if (server == 0) {
+        close(pipefd[0]);
+        serve(path, pipefd[1]);
+    }
+    close(pipefd[1]);
+    if (read(pipefd[0], &c, 1) != 1) {
+        fprintf(stderr, "server failed to start\n");
+        return 1;
+    }
+
+    fd = zenithos_ipc_connect(path);
+    if (fd == -1)
+        return 1;
+    printf("%-7s %9s %12s %10s %10s %10s\n", "path", "bytes", "msgs/sec", "MB/s", "p50 us", "p99 us");
+    for (i = 0; i < sizeof(sizes) / sizeof(sizes[0]); i++)
+        run_size(fd, NULL, sizes[i], "socket");
+
+    // ring for every size, to show where it starts to pay off
+    if (zenithos_ipc_ring_create(&ring, 8u * 1024 * 1024) == 0 && zenithos_ipc_send_ring_setup(fd, &ring) == 0) {
+        ring.threshold = 0;
+        for (i = 0; i < sizeof(sizes) / sizeof(sizes[0]); i++)
+            run_size(fd, &ring, sizes[i], "ring");
+        zenithos_ipc_ring_close(&ring);
+    }
+    close(fd);
+
+    if (clients > 0)
+        many_clients(path, clients);
+
+    kill(server, SIGTERM);
+    waitpid(server, NULL, 0);
+    unlink(path);
+    return 0;
+}
@@ -0,0 +1,155 @@
+/*
+ * Benchmark for log.h: the old synchronous prlog (printf on the calling
+ * thread) against the ring-buffer logger, 1-16 threads logging into a file,
+ * then sapi_log with fopen/fclose per line against the kept-open handle.
+ * Usage:
+ *   gcc -O2 -Iinclude frontend/benchmarks/bench_log.c -o bench_log -pthread -lcrypto && ./bench_log [lines]
+ */
+#include <sys/stat.h>
+
+#include "log.h"
+#include "sapi.h"
+
+static FILE *old_out;
+
+// prlog as it was before the async backend, pointed at old_out instead of stdout
+#define prlog_old(level, fmt, ...) \
+    do { \
+        if (level >= LOG_LEVEL) { \
+            const char* level_str = ""; \
+            switch (level) { \
+                case LOG_INFO:    level_str = "INFO"; break; \
+                case LOG_WARNING: level_str = "WARNING"; break; \
+                case LOG_ERROR:   level_str = "ERROR"; break; \
+                case LOG_FATAL:   level_str = "FATAL"; break; \
+            } \
+            fprintf(old_out, "[%s] %s:%d: " fmt "\n", level_str, __FILE__, __LINE__, ##__VA_ARGS__); \
+        } \
+    } while (0)
+
+static void sapi_log_old(const char* msg) {
+    FILE* log = fopen("cert.log", "a");
+    if (log) {
+        time_t t = time(NULL);
+        fprintf(log, "[%ld] %s\n", t, msg);
+        fclose(log);
+    }
+}
+
+enum { OLD_TTY, OLD_FILE, ASYNC };
+
+struct job {
+    int mode;
+    int id;
+    int lines;
+};
+
+static double now(void) {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec + ts.tv_nsec / 1e9;
+}
+
+static void *worker(void *arg) {
+    struct job *job = arg;
+    int i;
+    for (i = 0; i < job->lines; i++) {
+        if (job->mode == ASYNC)
+            prlog_i("worker %d request %d served in %d us", job->id, i, i % 977);
+        else
+            prlog_old(LOG_INFO, "worker %d request %d served in %d us", job->id, i, i % 977);
+    }
+    return NULL;
+}
+
+static long count_lines(const char *path) {
+    FILE *fp = fopen(path, "r");
+    long lines = 0;
+    int c;
+    if (fp == NULL)
+        return -1;
+    while ((c = getc(fp)) != EOF)
+        lines += c == '\n';
+    fclose(fp);
+    return lines;
+}
+
+static double run(int mode, int threads, int lines, const char *path, long *written) {
+    pthread_t tid[16];
+    struct job jobs[16];
+    double t0, elapsed;
+    int i;
+
+    unlink(path);
+    if (mode == ASYNC) {
+        prlog_open(path);
+    } else {
+        // stdout is line buffered on a terminal, fully buffered into a file or pipe
+        old_out = fopen(path, "a");
+        if (old_out == NULL)
+            exit(1);
+        setvbuf(old_out, NULL, mode == OLD_TTY ? _IOLBF : _IOFBF, BUFSIZ);
+    }
+
+    t0 = now();
+    for (i = 0; i < threads; i++) {
+        jobs[i].mode = mode;
+        jobs[i].id = i;
+        jobs[i].lines = lines / threads;
+        pthread_create(&tid[i], NULL, worker, &jobs[i]);
+    }
+    for (i = 0; i < threads; i++)
+        pthread_join(tid[i], NULL);
+    if (mode == ASYNC)
+        prlog_flush();
+    else
+        fclose(old_out);
+    elapsed = now() - t0;
+    *written = count_lines(path);
+    return elapsed;
+}
+
+int main(int argc, char **argv) {
+    static const int thread_counts[] = {1, 2, 4, 8, 16};
+    static const char *names[] = {"old, line buffered", "old, fully buffered", "async ring"};
+    int lines = argc > 1 ? atoi(argv[1]) : 400000;
+    char path[64];
+    size_t t;
+    int mode, i, bad = 0;
+    double t0, t_old, t_new;
+
+    snprintf(path, sizeof(path), "/tmp/zenithos-log-%ld.log", (long)getpid());
+    printf("%-20s %8s %14s\n", "logger", "threads", "lines/sec");
+    for (mode = OLD_TTY; mode <= ASYNC; mode++) {
+        for (t = 0; t < sizeof(thread_counts) / sizeof(thread_counts[0]); t++) {
+            long written;
+            int threads = thread_counts[t];
+            int expected = lines / threads * threads;
+            double secs = run(mode, threads, lines, path, &written);
+            printf("%-20s %8d %14.0f%s\n", names[mode], threads, expected / secs,
+                   written == expected ? "" : "  (lines missing!)");
+            fflush(stdout);
+            bad += written != expected;
+        }
+    }
+    prlog_set_fd(STDOUT_FILENO);
+
+    if (chdir("/tmp") == 0) {
+        unlink("cert.log");
+        t0 = now();
+        for (i = 0; i < 100000; i++)
+            sapi_log_old("Certificate successfully written");
+        t_old = now() - t0;
+        unlink("cert.log");
+        t0 = now();
+        for (i = 0; i < 100000; i++)
+            sapi_log("Certificate successfully written");
+        sapi_log_flush();
+        t_new = now() - t0;
+        printf("\nsapi_log x100000: fopen/fclose per line %.0f lines/sec, kept open %.0f lines/sec (%ld lines)\n",
+               100000 / t_old, 100000 / t_new, count_lines("cert.log"));
+        unlink("cert.log");
+    }
+    unlink(path);
+    return bad ? 1 : 0;
+}
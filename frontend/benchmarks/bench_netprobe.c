@@ -0,0 +1,218 @@
+/*
+ * Benchmark for the netutils.h resolver cache and batch prober.
+ * 1000 endpoints on loopback: names come from a generated hosts file
+ * (stand-in for /etc/hosts), half the ports have listeners, a quarter are
+ * closed, and the rest sit behind a listener whose accept queue is full, so
+ * their SYNs are dropped and the probe has to time out. Compares the old
+ * one-at-a-time is_host_reachable() with netutils_probe_many().
+ * Usage:
+ *   gcc -O2 -Iinclude frontend/benchmarks/bench_netprobe.c -o bench_netprobe -lpthread && ./bench_netprobe [endpoints]
+ */
+#include <fcntl.h>
+#include <poll.h>
+#include <signal.h>
+#include <sys/wait.h>
+
+#include "netutils.h"
+
+#define LISTENERS 8
+#define TIMEOUT_MS 300
+#define SERIAL 40
+
+static double now(void) {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec + ts.tv_nsec / 1e9;
+}
+
+static int listen_on(uint16_t *port, int backlog) {
+    struct sockaddr_in addr;
+    socklen_t len = sizeof(addr);
+    int fd = socket(AF_INET, SOCK_STREAM, 0);
+    memset(&addr, 0, sizeof(addr));
+    addr.sin_family = AF_INET;
+    addr.sin_addr.s_addr = htonl(INADDR_ANY);
+    if (fd < 0 || bind(fd, (struct sockaddr *)&addr, sizeof(addr)) < 0 || listen(fd, backlog) < 0
+            || getsockname(fd, (struct sockaddr *)&addr, &len) < 0) {
+        perror("listener");
+        exit(1);
+    }
+    *port = ntohs(addr.sin_port);
+    return fd;
+}
+
+// accept and drop connections so the listeners' queues never fill
+static pid_t start_acceptor(int *fds, int n) {
+    pid_t pid = fork();
+    if (pid == 0) {
+        struct pollfd pfd[LISTENERS];
+        int i;
+        for (i = 0; i < n; i++) {
+            pfd[i].fd = fds[i];
+            pfd[i].events = POLLIN;
+        }
+        for (;;) {
+            if (poll(pfd, n, -1) < 0)
+                _exit(1);
+            for (i = 0; i < n; i++) {
+                if (pfd[i].revents & POLLIN) {
+                    int c = accept(fds[i], NULL, NULL);
+                    if (c >= 0)
+                        close(c);
+                }
+            }
+        }
+    }
+    return pid;
+}
+
+// a port that answers nothing: a listener with a full accept queue
+static int blackhole(uint16_t *port, int *fillers) {
+    struct sockaddr_in addr;
+    int i, fd = listen_on(port, 0);
+    memset(&addr, 0, sizeof(addr));
+    addr.sin_family = AF_INET;
+    addr.sin_addr.s_addr = htonl(INADDR_LOOPBACK);
+    addr.sin_port = htons(*port);
+    for (i = 0; i < 4; i++) {
+        fillers[i] = socket(AF_INET, SOCK_STREAM | SOCK_NONBLOCK, 0);
+        connect(fillers[i], (struct sockaddr *)&addr, sizeof(addr));
+    }
+    usleep(50000);
+    return fd;
+}
+
+static uint16_t closed_port(void) {
+    uint16_t port;
+    int fd = listen_on(&port, 1);
+    close(fd);
+    return port;
+}
+
+int main(int argc, char **argv) {
+    int n = argc > 1 ? atoi(argv[1]) : 1000;
+    int listeners[LISTENERS], fillers[4], hole_fd, i, j, old_n = 0, old_open = 0, stdout_fd;
+    uint16_t ports[LISTENERS], hole, closed = closed_port();
+    int expected[4] = {NETUTILS_PROBE_OPEN, NETUTILS_PROBE_OPEN, NETUTILS_PROBE_REFUSED, NETUTILS_PROBE_TIMEOUT};
+    int counts[6] = {0}, mismatches = 0;
+    struct netutils_probe *probes = calloc(n, sizeof(*probes));
+    struct netutils_probe *reachable = calloc(n, sizeof(*reachable));
+    char (*names)[64] = calloc(n, sizeof(*names));
+    const char **hosts = calloc(n, sizeof(*hosts));
+    struct netutils_addrs *addrs = calloc(n, sizeof(*addrs));
+    struct netutils_resolver resolver;
+    char hosts_path[64];
+    FILE *fp;
+    pid_t acceptor;
+    double t0, t_old, t_batch, t_serial, t_new;
+
+    signal(SIGPIPE, SIG_IGN);
+    for (i = 0; i < LISTENERS; i++)
+        listeners[i] = listen_on(&ports[i], SOMAXCONN);
+    acceptor = start_acceptor(listeners, LISTENERS);
+    hole_fd = blackhole(&hole, fillers);
+
+    // hosts file: dev-NNNN.zenith.test -> 127.0.x.y
+    snprintf(hosts_path, sizeof(hosts_path), "/tmp/zenithos-hosts-%ld", (long)getpid());
+    fp = fopen(hosts_path, "w");
+    for (i = 0; i < n; i++) {
+        snprintf(names[i], sizeof(names[i]), "dev-%04d.zenith.test", i);
+        fprintf(fp, "127.0.%d.%d %s\n", i / 250, i % 250 + 1, names[i]);
+        hosts[i] = names[i];
+        probes[i].host = names[i];
+        switch (i % 4) {
+        case 0: case 1: probes[i].port = ports[i % LISTENERS]; break;
+        case 2: probes[i].port = closed; break;
+        case 3: probes[i].port = hole; break;
+        }
+    }
+    fclose(fp);
+
+    netutils_resolver_init(&resolver, 8, 60);
+    printf("hosts file: %d names loaded\n", netutils_resolver_load_hosts(&resolver, hosts_path));
+
+    // resolver: plain getaddrinfo per call vs the cache
+    t0 = now();
+    for (i = 0; i < 1000; i++) {
+        struct netutils_addrs one;
+        netutils_lookup("localhost", AF_INET, &one);
+    }
+    printf("getaddrinfo('localhost') x1000:      %8.2f ms\n", (now() - t0) * 1e3);
+    t0 = now();
+    for (i = 0; i < 1000; i++) {
+        struct netutils_addrs one;
+        netutils_resolve(&resolver, "localhost", AF_INET, &one);
+    }
+    printf("cached resolve('localhost') x1000:   %8.2f ms (%lu miss)\n", (now() - t0) * 1e3, resolver.misses);
+    t0 = now();
+    i = netutils_resolve_many(&resolver, hosts, n, AF_INET, addrs);
+    printf("resolve_many(%d hosts-file names):  %8.2f ms (%d resolved)\n", n, (now() - t0) * 1e3, i);
+
+    // old: one blocking connect at a time, printing each; hosts whose SYNs are
+    // dropped are left out since each would block for the kernel's ~2 min
+    fflush(stdout);
+    stdout_fd = dup(1);
+    i = open("/dev/null", O_WRONLY);
+    dup2(i, 1);
+    close(i);
+    t0 = now();
+    for (i = 0; i < n; i++) {
+        char ip[INET6_ADDRSTRLEN];
+        if (i % 4 == 3)
+            continue;
+        netutils_addr_string(&addrs[i].addrs[0], ip, sizeof(ip));
+        old_open += is_host_reachable(ip, probes[i].port);
+        old_n++;
+    }
+    t_old = now() - t0;
+    fflush(stdout);
+    dup2(stdout_fd, 1);
+    close(stdout_fd);
+
+    // same 3/4 of the endpoints, all at once
+    for (i = 0, j = 0; i < n; i++) {
+        if (i % 4 != 3)
+            reachable[j++] = probes[i];
+    }
+    t0 = now();
+    netutils_probe_many(&resolver, reachable, old_n, TIMEOUT_MS, 256);
+    t_batch = now() - t0;
+
+    // one at a time with the same timeout, on a slice that includes dropped SYNs
+    t0 = now();
+    netutils_probe_many(&resolver, probes, SERIAL, TIMEOUT_MS, 1);
+    t_serial = now() - t0;
+
+    t0 = now();
+    netutils_probe_many(&resolver, probes, n, TIMEOUT_MS, 256);
+    t_new = now() - t0;
+
+    for (i = 0; i < n; i++) {
+        counts[probes[i].status]++;
+        mismatches += probes[i].status != expected[i % 4];
+    }
+    printf("\n%-34s %6s %9s %12s\n", "prober", "probes", "seconds", "probes/sec");
+    printf("%-34s %6d %9.3f %12.0f  (%d open)\n", "is_host_reachable, no timeouts", old_n, t_old, old_n / t_old, old_open);
+    printf("%-34s %6d %9.3f %12.0f\n", "probe_many, no timeouts", old_n, t_batch, old_n / t_batch);
+    printf("%-34s %6d %9.3f %12.0f\n", "probe_many, max_parallel=1", SERIAL, t_serial, SERIAL / t_serial);
+    printf("%-34s %6d %9.3f %12.0f\n", "probe_many, all endpoints", n, t_new, n / t_new);
+    printf("timeout %d ms: open %d, refused %d, timeout %d, unresolved %d, error %d; %d unexpected\n",
+           TIMEOUT_MS, counts[NETUTILS_PROBE_OPEN], counts[NETUTILS_PROBE_REFUSED], counts[NETUTILS_PROBE_TIMEOUT],
+           counts[NETUTILS_PROBE_UNRESOLVED], counts[NETUTILS_PROBE_ERROR], mismatches);
+    for (i = 0; i < n && mismatches > 0; i++) {
+        if (probes[i].status != expected[i % 4]) {
+            printf("  e.g. %s:%u -> %s (%s)\n", probes[i].host, probes[i].port,
+                   netutils_probe_status(probes[i].status), strerror(probes[i].error));
+            break;
+        }
+    }
+
+    netutils_resolver_destroy(&resolver);
+    kill(acceptor, SIGTERM);
+    waitpid(acceptor, NULL, 0);
+    for (i = 0; i < 4; i++)
+        close(fillers[i]);
+    close(hole_fd);
+    unlink(hosts_path);
+    return mismatches ? 1 : 0;
+}
@@ -0,0 +1,201 @@
+/*
+ * Echo-server benchmark for QRTR: the old fixed-size protocol (whole 1040
+ * byte struct each way, printf per message) against the v2 wire format,
+ * lockstep through the qrtr.h shim and qrtr2, and pipelined with qrtr2.
+ * Reports messages/sec, bytes on the wire and send() calls per message.
+ * Usage:
+ *   gcc -O2 -Iinclude frontend/benchmarks/bench_qrtr.c -o bench_qrtr && ./bench_qrtr [messages]
+ */
+#include <signal.h>
+#include <sys/wait.h>
+#include <time.h>
+
+#pragma GCC diagnostic ignored "-Wcpp"  // the shim is what's being measured
+#include "qrtr.h"
+
+#define SERVICE 42
+#define WINDOW 128
+
+static FILE *sink;  // the old per-message printf, minus the terminal
+
+static double now(void) {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec + ts.tv_nsec / 1e9;
+}
+
+// --- the protocol before v2 (full reads added so results can be checked) ---
+static int legacy_send(int fd, struct qrtr_message *msg) {
+    ssize_t sent = send(fd, msg, sizeof(*msg), MSG_NOSIGNAL);
+    if (sent < 0)
+        return -1;
+    fprintf(sink, "Message sent: %d bytes\n", (int)sent);
+    return 0;
+}
+
+static int legacy_recv(int fd, struct qrtr_message *msg) {
+    if (qrtr2_read_all(fd, msg, sizeof(*msg)) != 1)
+        return -1;
+    fprintf(sink, "Message received: %d bytes\n", (int)sizeof(*msg));
+    return 0;
+}
+
+// --- servers ---
+static void serve(int listen_fd, int legacy) {
+    int fd = accept(listen_fd, NULL, NULL);
+    close(listen_fd);
+    if (fd < 0)
+        _exit(1);
+    qrtr2_set_nodelay(fd);
+    if (legacy) {
+        struct qrtr_message msg;
+        while (legacy_recv(fd, &msg) == 0) {
+            msg.msg_type = QRTR_MSG_TYPE_RESPONSE;
+            if (legacy_send(fd, &msg) < 0)
+                break;
+        }
+    } else {
+        struct qrtr2_conn c;
+        struct qrtr2_msg msg;
+        qrtr2_init(&c, fd);
+        // responses are queued; qrtr2_recv() flushes them when it runs dry
+        while (qrtr2_recv(&c, &msg) == 1) {
+            if (qrtr2_respond(&c, &msg, msg.data, msg.length) < 0)
+                break;
+        }
+        qrtr2_free(&c);
+    }
+    close(fd);
+    _exit(0);
+}
+
+static pid_t start_server(int legacy, uint16_t *port) {
+    struct sockaddr_in addr;
+    socklen_t len = sizeof(addr);
+    int one = 1, fd = socket(AF_INET, SOCK_STREAM, 0);
+    pid_t pid;
+
+    setsockopt(fd, SOL_SOCKET, SO_REUSEADDR, &one, sizeof(one));
+    memset(&addr, 0, sizeof(addr));
+    addr.sin_family = AF_INET;
+    addr.sin_addr.s_addr = htonl(INADDR_LOOPBACK);
+    if (bind(fd, (struct sockaddr *)&addr, sizeof(addr)) < 0 || listen(fd, 16) < 0
+            || getsockname(fd, (struct sockaddr *)&addr, &len) < 0) {
+        perror("server");
+        exit(1);
+    }
+    *port = ntohs(addr.sin_port);
+    pid = fork();
+    if (pid == 0)
+        serve(fd, legacy);
+    close(fd);
+    return pid;
+}
+
+static void report(const char *mode, uint32_t size, int n, double secs, double wire, double writes) {
+    printf("%-22s %6u %12.0f %12.0f %10.2f\n", mode, size, n / secs, wire, writes);
+}
+
+// --- clients ---
+static void run_legacy(uint32_t size, int n) {
+    uint16_t port;
+    pid_t server = start_server(1, &port);
+    struct qrtr_message req, resp;
+    int i, fd = qrtr_create_socket("127.0.0.1", port);
+    double t0;
+
+    memset(&req, 0, sizeof(req));
+    req.msg_type = QRTR_MSG_TYPE_REQUEST;
+    req.service_id = SERVICE;
+    req.msg_length = size;
+    memset(req.data, 'q', size);
+    t0 = now();
+    for (i = 0; i < n; i++) {
+        if (legacy_send(fd, &req) < 0 || legacy_recv(fd, &resp) < 0) {
+            perror("legacy");
+            exit(1);
+        }
+    }
+    report("old (whole struct)", size, n, now() - t0, 2.0 * sizeof(req), 1.0);
+    close(fd);
+    waitpid(server, NULL, 0);
+}
+
+static void run_shim(uint32_t size, int n) {
+    uint16_t port;
+    pid_t server = start_server(0, &port);
+    struct qrtr_message req, resp;
+    int i, fd = qrtr_create_socket("127.0.0.1", port);
+    double t0;
+
+    qrtr2_set_nodelay(fd);
+    memset(&req, 0, sizeof(req));
+    req.msg_type = QRTR_MSG_TYPE_REQUEST;
+    req.service_id = SERVICE;
+    req.msg_length = size;
+    memset(req.data, 'q', size);
+    t0 = now();
+    for (i = 0; i < n; i++) {
+        if (qrtr_send_message(fd, &req) < 0 || qrtr_receive_message(fd, &resp) < 0
+                || resp.msg_length != size) {
+            fprintf(stderr, "shim failed\n");
+            exit(1);
+        }
+    }
+    report("qrtr.h shim, lockstep", size, n, now() - t0, 2.0 * (QRTR2_HEADER_SIZE + size), 1.0);
+    qrtr_close_socket(fd);
+    waitpid(server, NULL, 0);
+}
+
+static void run_v2(uint32_t size, int n, int window) {
+    uint16_t port;
+    pid_t server = start_server(0, &port);
+    struct qrtr2_conn c;
+    struct qrtr2_msg msg;
+    char payload[QRTR_MAX_MSG_SIZE];
+    int sent = 0, got = 0;
+    double t0;
+
+    memset(payload, 'q', size);
+    if (qrtr2_connect(&c, "127.0.0.1", port) < 0)
+        exit(1);
+    t0 = now();
+    while (got < n) {
+        while (sent < n && (int)c.in_flight < window) {
+            if (qrtr2_request(&c, SERVICE, payload, size) == 0) {
+                perror("request");
+                exit(1);
+            }
+            sent++;
+        }
+        if (qrtr2_recv(&c, &msg) != 1 || msg.length != size) {
+            fprintf(stderr, "v2 failed\n");
+            exit(1);
+        }
+        got++;
+    }
+    report(window > 1 ? "qrtr2, pipelined" : "qrtr2, lockstep", size, n, now() - t0,
+           (double)(c.bytes_out + c.bytes_in) / n, (double)c.writes / n);
+    qrtr2_close(&c);
+    waitpid(server, NULL, 0);
+}
+
+int main(int argc, char **argv) {
+    static const uint32_t sizes[] = {16, 256, 1024};
+    int n = argc > 1 ? atoi(argv[1]) : 50000;
+    size_t i;
+
+    signal(SIGPIPE, SIG_IGN);
+    sink = fopen("/dev/null", "w");
+    if (sink == NULL)
+        return 1;
+    printf("%-22s %6s %12s %12s %10s\n", "protocol", "bytes", "msgs/sec", "wire B/msg", "sends/msg");
+    for (i = 0; i < sizeof(sizes) / sizeof(sizes[0]); i++) {
+        run_legacy(sizes[i], n);
+        run_shim(sizes[i], n);
+        run_v2(sizes[i], n, 1);
+        run_v2(sizes[i], n, WINDOW);
+    }
+    fclose(sink);
+    return 0;
+}
@@ -0,0 +1,69 @@
+# Benchmark for the editor search engine on a multi-MB buffer.
+# Usage: python3 frontend/benchmarks/bench_search.py [megabytes]
+import os, re, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from search import SearchEngine
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..")
+
+
+def make_text(megabytes):
+    chunks = []
+    include_dir = os.path.join(ROOT, "include")
+    for fn in sorted(os.listdir(include_dir)):
+        if fn.endswith(".h"):
+            with open(os.path.join(include_dir, fn), "r", encoding="utf-8", errors="ignore") as fh:
+                chunks.append(fh.read())
+    base = "\n".join(chunks)
+    target = int(megabytes * 1024 * 1024)
+    return (base * (target // len(base) + 1))[:target]
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - t0) * 1000
+
+
+def main():
+    mb = float(sys.argv[1]) if len(sys.argv) > 1 else 8
+    text = make_text(mb)
+    print(f"buffer: {len(text) / 1024 / 1024:.1f} MB")
+
+    # the old highlight_search: finditer over the whole text per keystroke
+    rx = re.compile(re.escape("e"), re.IGNORECASE)
+    hits, ms = timed(lambda: sum(1 for _ in rx.finditer(text)))
+    print(f"old finditer 'e':          {ms:8.1f} ms  ({hits} hits, one selection each)")
+
+    engine = SearchEngine()
+    engine.set_text(text)
+    query = ""
+    for ch in "else":
+        query += ch
+        n, ms = timed(engine.search, query)
+        # a capped hit set can't be narrowed, so the next keystroke rescans
+        mode = "narrow" if engine.narrowed else "scan"
+        capped = f", capped at {engine.max_results}" if engine.truncated else ""
+        print(f"type {query!r:8} ({mode:6}):      {ms:8.1f} ms  ({n} hits{capped})")
+
+    fresh = SearchEngine()
+    fresh.set_text(text)
+    n, ms = timed(fresh.search, "else")
+    print(f"full rescan 'else':        {ms:8.1f} ms  ({n} hits)")
+
+    n, ms = timed(fresh.search, r"\bint\s+\w+", False, True)
+    print(f"regex r'\\bint\\s+\\w+':      {ms:8.1f} ms  ({n} hits)")
+
+    engine.search("e")
+    # stay inside the (possibly capped) hit set
+    mid = engine.starts[len(engine.starts) // 2]
+    visible, ms = timed(engine.in_range, mid, mid + 6000)
+    print(f"viewport hits (6 KB):      {ms:8.3f} ms  ({len(visible)} selections)")
+
+    _, ms = timed(engine.next, mid)
+    print(f"next match:                {ms:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
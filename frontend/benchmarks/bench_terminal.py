@@ -0,0 +1,95 @@
+# Stress test for the terminal pipeline: pipes N MB of ANSI-coloured output
+# from a child process through TerminalPipeline and reports GUI-thread stalls.
+# Usage: QT_QPA_PLATFORM=offscreen python3 frontend/benchmarks/bench_terminal.py [MB] [--legacy]
+import os, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+PRODUCER = r'''
+import sys
+line = "\033[1;35m[NETUTILS]\033[0m host 10.0.%d.%d is reachable! ✓ привет\n"
+out = sys.stdout.buffer
+total = int(sys.argv[1]) * 1024 * 1024
+sent = 0
+i = 0
+while sent < total:
+    chunk = "".join(line % ((i + k) // 256 % 256, (i + k) % 256) for k in range(2000)).encode()
+    out.write(chunk)
+    sent += len(chunk)
+    i += 2000
+out.flush()
+'''
+
+
+def main():
+    from PySide6.QtWidgets import QApplication, QPlainTextEdit
+    from PySide6.QtCore import QProcess, QTimer, QElapsedTimer
+    from terminal import TerminalPipeline
+
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    legacy = "--legacy" in sys.argv
+    mb = int(args[0]) if args else 100
+
+    app = QApplication([])
+    widget = QPlainTextEdit()
+    widget.setReadOnly(True)
+    widget.resize(900, 300)
+    widget.show()
+    pipeline = TerminalPipeline(widget)
+
+    stats = {"max_gap": 0.0, "gaps_over_50ms": 0, "bytes": 0, "handler": 0.0, "handler_max": 0.0}
+    clock = QElapsedTimer()
+    clock.start()
+    last = [clock.nsecsElapsed()]
+
+    # heartbeat: how late does a 5 ms timer fire while output is flowing
+    def beat():
+        now = clock.nsecsElapsed()
+        gap = (now - last[0]) / 1e6
+        last[0] = now
+        stats["max_gap"] = max(stats["max_gap"], gap)
+        if gap > 50:
+            stats["gaps_over_50ms"] += 1
+
+    heartbeat = QTimer()
+    heartbeat.timeout.connect(beat)
+    heartbeat.start(5)
+
+    proc = QProcess()
+    proc.setProcessChannelMode(QProcess.MergedChannels)
+
+    def on_output():
+        t0 = time.perf_counter()
+        data = proc.readAllStandardOutput().data()
+        stats["bytes"] += len(data)
+        if legacy:
+            # the old on_run_output path
+            widget.appendPlainText(data.decode(errors="ignore").rstrip("\n"))
+        else:
+            pipeline.feed(data, "run")
+        dt = time.perf_counter() - t0
+        stats["handler"] += dt
+        stats["handler_max"] = max(stats["handler_max"], dt)
+
+    def on_finished(*_):
+        pipeline.finish("run")
+        pipeline.flush_all()
+        app.quit()
+
+    proc.readyReadStandardOutput.connect(on_output)
+    proc.finished.connect(on_finished)
+    t0 = time.perf_counter()
+    proc.start(sys.executable, ["-c", PRODUCER, str(mb)])
+    app.exec()
+    total = time.perf_counter() - t0
+
+    print(f"mode:               {'legacy appendPlainText' if legacy else 'TerminalPipeline'}")
+    print(f"bytes piped:        {stats['bytes'] / 1024 / 1024:.1f} MB in {total:.2f} s")
+    print(f"blocks kept:        {widget.document().blockCount()}")
+    print(f"max event gap:      {stats['max_gap']:.1f} ms ({stats['gaps_over_50ms']} gaps > 50 ms)")
+    print(f"read handler time:  {stats['handler'] * 1000:.0f} ms total, {stats['handler_max'] * 1000:.1f} ms max")
+
+
+if __name__ == "__main__":
+    main()
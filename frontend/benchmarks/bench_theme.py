@@ -0,0 +1,61 @@
+# Theme switch cost: the old per-widget setStyleSheet sweep vs one cached
+# application stylesheet from ThemeEngine, on a window with N buttons.
+# Usage: QT_QPA_PLATFORM=offscreen python3 frontend/benchmarks/bench_theme.py [buttons]
+import os, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+def main():
+    from PySide6.QtWidgets import QApplication, QPushButton, QVBoxLayout, QWidget, QPlainTextEdit
+    from themes import ThemeEngine
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    app = QApplication([])
+    engine = ThemeEngine()
+    window = QWidget()
+    layout = QVBoxLayout(window)
+    for i in range(count):
+        btn = QPushButton(f"button {i}")
+        btn.setProperty("role", "menu" if i % 10 == 0 else "tool")
+        layout.addWidget(btn)
+    editor = QPlainTextEdit("int main(void) { return 0; }\n" * 2000)
+    editor.setObjectName("codeEditor")
+    layout.addWidget(editor)
+    window.show()
+    app.processEvents()
+
+    themes = engine.names()
+
+    def legacy(theme):
+        colors = engine.colors(theme)
+        window.setStyleSheet(f"background-color: {colors['window']}; color: white;")
+        editor.setStyleSheet(f"font-family: 'Courier New'; font-size: 14px; background-color: {colors['panel']};")
+        style = (f"QPushButton {{ background-color: {colors['button']}; color: white; border-radius: 12px; }}"
+                 f"QPushButton:hover {{ background-color: {colors['button_hover']}; }}")
+        for btn in window.findChildren(QPushButton):
+            btn.setStyleSheet(style)
+
+    def engine_switch(theme):
+        app.setStyleSheet(engine.stylesheet(theme))
+
+    for name, fn in (("legacy per-widget sweep", legacy), ("ThemeEngine app stylesheet", engine_switch)):
+        timings = []
+        for i in range(len(themes) * 3):
+            t0 = time.perf_counter()
+            fn(themes[i % len(themes)])
+            app.processEvents()
+            timings.append((time.perf_counter() - t0) * 1000)
+        if fn is legacy:
+            # drop the widget sheets again so they don't shadow the app sheet
+            window.setStyleSheet("")
+            editor.setStyleSheet("")
+            for btn in window.findChildren(QPushButton):
+                btn.setStyleSheet("")
+        timings.sort()
+        print(f"{name:<28} median {timings[len(timings) // 2]:7.1f} ms  max {timings[-1]:7.1f} ms  ({count} buttons)")
+
+
+if __name__ == "__main__":
+    main()
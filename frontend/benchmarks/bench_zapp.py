@@ -0,0 +1,90 @@
+# Packaging benchmark: thousands of assets, old zipfile path vs the ZAPP
+# packager (cold, unchanged inputs, one file changed) plus a determinism check.
+# Usage: python3 frontend/benchmarks/bench_zapp.py [assets]
+import os, shutil, sys, tempfile, time, zipfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from zapp import pack_project
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..")
+
+
+def make_project(path, assets):
+    shutil.copytree(os.path.join(ROOT, "include"), os.path.join(path, "include"))
+    with open(os.path.join(path, "main.c"), "w") as fh:
+        fh.write('#include <stdio.h>\nint main(){ printf("hi\\n"); return 0; }\n')
+    with open(os.path.join(path, "manifest.json"), "w") as fh:
+        fh.write('{"name": "bench", "binary": "app"}\n')
+    adir = os.path.join(path, "assets")
+    os.makedirs(adir)
+    text = open(os.path.join(ROOT, "include", "gui.h"), "rb").read()
+    for i in range(assets):
+        if i % 3 == 0:
+            # "images": incompressible
+            with open(os.path.join(adir, f"img_{i:05d}.png"), "wb") as fh:
+                fh.write(os.urandom(4096 + (i % 7) * 1024))
+        else:
+            with open(os.path.join(adir, f"data_{i:05d}.json"), "wb") as fh:
+                fh.write(text * (1 + i % 5))
+    # a couple of big entries for the parallel path
+    with open(os.path.join(adir, "big_level.json"), "wb") as fh:
+        fh.write(text * 4000)
+
+
+def legacy_pack(root, output):
+    # what compile_to_zapp did before: deflate everything, walk every time
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.write(os.path.join(root, "main.c"), arcname="main.c")
+        for sub in ("include", "assets"):
+            for dirpath, _, files in os.walk(os.path.join(root, sub)):
+                for f in files:
+                    full = os.path.join(dirpath, f)
+                    zf.write(full, arcname=os.path.relpath(full, root))
+        zf.write(os.path.join(root, "manifest.json"), arcname="manifest.json")
+
+
+def timed(fn, *args, **kw):
+    t0 = time.perf_counter()
+    result = fn(*args, **kw)
+    return result, (time.perf_counter() - t0) * 1000
+
+
+def main():
+    assets = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    with tempfile.TemporaryDirectory() as tmp:
+        make_project(tmp, assets)
+        out = os.path.join(tmp, "project.zapp")
+
+        _, ms = timed(legacy_pack, tmp, os.path.join(tmp, "legacy.zip"))
+        print(f"assets: {assets}")
+        print(f"legacy zipfile (deflate all):   {ms:8.1f} ms  {os.path.getsize(os.path.join(tmp, 'legacy.zip'))} bytes")
+
+        r, ms = timed(pack_project, tmp, out, incremental=False)
+        print(f"packager cold:                  {ms:8.1f} ms  {r.bytes_out} bytes ({r.compressed} deflated, {r.stored} stored)")
+        with open(out, "rb") as fh:
+            first = fh.read()
+
+        r, ms = timed(pack_project, tmp, out)
+        print(f"packager unchanged inputs:      {ms:8.1f} ms  ({r.reused} reused)")
+
+        with open(os.path.join(tmp, "assets", "data_00001.json"), "ab") as fh:
+            fh.write(b"\n// changed\n")
+        r, ms = timed(pack_project, tmp, out)
+        print(f"packager one asset changed:     {ms:8.1f} ms  ({r.reused} reused, {r.compressed} deflated)")
+
+        for jobs in (1, os.cpu_count() or 1):
+            _, ms = timed(pack_project, tmp, out, incremental=False, jobs=jobs)
+            print(f"packager cold, {jobs:2d} jobs:          {ms:8.1f} ms")
+
+        with open(os.path.join(tmp, "assets", "data_00001.json"), "rb+") as fh:
+            data = fh.read()
+            fh.seek(0)
+            fh.write(data[: -len(b"\n// changed\n")])
+            fh.truncate()
+        pack_project(tmp, out, incremental=False)
+        with open(out, "rb") as fh:
+            print(f"deterministic rebuild:          {'byte-identical' if fh.read() == first else 'DIFFERENT'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,557 @@
+# Headless benchmark suite for Studio's hot paths, with baseline tracking.
+# Drives the real ZenithOSApp on the offscreen Qt platform inside a generated
+# project: CSyntaxHighlighter on a large file, highlight_search with many
+# hits, update_project_tree on a big tree, compile_to_zapp (dialogs answered
+# automatically), append_terminal and apply_theme, plus the Qt-free lexer and
+# packager underneath. Every case is timed over several runs; the median is
+# compared with a stored baseline and the run fails when a case got slower
+# than --threshold (and by more than --min-delta-ms, so tiny cases don't flap).
+# Usage:
+#   python3 frontend/benchmarks/suite.py                      # run, compare with baseline.json
+#   python3 frontend/benchmarks/suite.py --save-baseline      # record a new baseline
+#   python3 frontend/benchmarks/suite.py --json results.json -k search -k theme
+# Exit status: 0 ok, 1 regression or failed case.
+# Baselines are only meaningful on the machine that recorded them.
+import argparse, json, os, platform, shutil, statistics, sys, tempfile, time, traceback
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+ROOT = os.path.join(HERE, "..", "..")
+RESULTS_VERSION = 1
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+
+ANSI_LINE = "\033[1;35m[NETUTILS]\033[0m host 10.0.{}.{} is \033[32mreachable\033[0m ({} ms)"
+
+
+class Bench:
+    # what a case's setup returns: the timed callable, an untimed reset run
+    # before each timing, a cleanup for whatever the case changed in the
+    # window, and the parameters that make results comparable
+    def __init__(self, run, reset=None, cleanup=None, **params):
+        self.run = run
+        self.reset = reset
+        self.cleanup = cleanup
+        self.params = params
+
+
+class Case:
+    def __init__(self, name, setup, qt, doc):
+        self.name = name
+        self.setup = setup
+        self.qt = qt
+        self.doc = doc
+
+
+CASES = []
+
+
+def case(name, qt=False):
+    def register(setup):
+        CASES.append(Case(name, setup, qt, (setup.__doc__ or "").strip()))
+        return setup
+    return register
+
+
+# --- fixtures ---
+def sdk_source(n_lines):
+    # SDK headers repeated until we reach the requested size
+    lines = []
+    include_dir = os.path.join(ROOT, "include")
+    for fn in sorted(os.listdir(include_dir)):
+        if fn.endswith(".h"):
+            with open(os.path.join(include_dir, fn), "r", encoding="utf-8", errors="ignore") as fh:
+                lines.extend(fh.read().splitlines())
+    out = []
+    while len(out) < n_lines:
+        out.extend(lines)
+    return out[:n_lines]
+
+
+def make_project(path, scale):
+    shutil.copytree(os.path.join(ROOT, "include"), os.path.join(path, "include"))
+    with open(os.path.join(path, "main.c"), "w", encoding="utf-8") as fh:
+        fh.write('#include <stdio.h>\nint main(){ printf("hi\\n"); return 0; }\n')
+    # background checks and autosave would land in the middle of timings
+    os.makedirs(os.path.join(path, "data"))
+    with open(os.path.join(path, "data", "settings.json"), "w", encoding="utf-8") as fh:
+        json.dump({"diagnostics_delay_ms": 0, "autosave_seconds": 0}, fh)
+    text = open(os.path.join(ROOT, "include", "gui.h"), "rb").read()
+    adir = os.path.join(path, "assets")
+    os.makedirs(adir)
+    for i in range(int(300 * scale)):
+        if i % 3 == 0:
+            with open(os.path.join(adir, f"img_{i:05d}.png"), "wb") as fh:
+                fh.write(os.urandom(4096))
+        else:
+            with open(os.path.join(adir, f"data_{i:05d}.json"), "wb") as fh:
+                fh.write(text * (1 + i % 3))
+    # a wide, nested tree for the project view (not part of the build or .zapp)
+    dirs = int(40 * scale)
+    for d in range(dirs):
+        sub = os.path.join(path, "docs", f"section_{d:03d}", "pages")
+        os.makedirs(sub)
+        for f in range(50):
+            open(os.path.join(os.path.dirname(sub), f"note_{f:03d}.md"), "w").close()
+            open(os.path.join(sub, f"page_{f:03d}.txt"), "w").close()
+    return dirs * 102
+
+
+class AutoDialogs:
+    # stands in for QInputDialog / QMessageBox so no modal dialog blocks a run
+    Yes, No, Ok, Cancel, Save, Discard = 1, 2, 4, 8, 16, 32
+    Information = Warning = Critical = Question = 0
+    answers = {"App name:": "bench", "Version:": "1.0", "Author:": "bench"}
+    errors = []
+
+    @classmethod
+    def getText(cls, parent, title, label, *args, **kwargs):
+        return cls.answers.get(label, ""), True
+
+    @classmethod
+    def getMultiLineText(cls, parent, title, label, *args, **kwargs):
+        return "benchmark project", True
+
+    @classmethod
+    def getItem(cls, parent, title, label, items, *args, **kwargs):
+        return items[0], True
+
+    @classmethod
+    def critical(cls, parent, title, text, *args, **kwargs):
+        cls.errors.append(f"{title}: {text}")
+        return cls.Ok
+
+    @classmethod
+    def information(cls, *args, **kwargs):
+        return cls.Ok
+
+    warning = information
+
+    @classmethod
+    def question(cls, *args, **kwargs):
+        return cls.Yes
+
+
+class Context:
+    def __init__(self, root, scale):
+        self.root = root
+        self.scale = scale
+        self.tree_entries = 0
+        self.keep = None  # objects a case needs alive while it runs
+        self._qt = None
+
+    def qt(self):
+        # (app, studio module, window), built on first use
+        if self._qt is None:
+            from PySide6.QtWidgets import QApplication
+            app = QApplication.instance() or QApplication([])
+            import studio
+            studio.QInputDialog = studio.QMessageBox = AutoDialogs
+            window = studio.ZenithOSApp()
+            window.create_new_project()
+            app.processEvents()
+            self._qt = (app, studio, window)
+        return self._qt
+
+    def wait(self, done, timeout=120):
+        app = self.qt()[0]
+        deadline = time.monotonic() + timeout
+        while not done():
+            if time.monotonic() > deadline:
+                raise TimeoutError("timed out waiting for the event loop")
+            app.processEvents()
+            time.sleep(0.001)
+
+
+# --- cases ---
+@case("lexer.full")
+def bench_lexer(ctx):
+    """CLexer over a large file (what the highlighter runs per block)"""
+    from clexer import CLexer
+    lines = sdk_source(int(20000 * ctx.scale))
+    lexer = CLexer()
+    return Bench(lambda: lexer.lex(lines), lines=len(lines))
+
+
+@case("highlighter.rehighlight", qt=True)
+def bench_rehighlight(ctx):
+    """CSyntaxHighlighter.rehighlight() of a large document"""
+    from PySide6.QtGui import QTextDocument
+    from PySide6.QtWidgets import QPlainTextDocumentLayout
+    _, studio, window = ctx.qt()
+    lines = sdk_source(int(20000 * ctx.scale))
+    doc = QTextDocument()
+    doc.setDocumentLayout(QPlainTextDocumentLayout(doc))
+    doc.setPlainText("\n".join(lines))
+    highlighter = studio.CSyntaxHighlighter(doc, window.lexer)
+    ctx.keep = (doc, highlighter)
+    return Bench(highlighter.rehighlight, lines=len(lines))
+
+
+@case("highlighter.keystroke", qt=True)
+def bench_keystroke(ctx):
+    """typing into a large highlighted document (incremental re-highlight)"""
+    from PySide6.QtGui import QTextCursor, QTextDocument
+    from PySide6.QtWidgets import QPlainTextDocumentLayout
+    _, studio, window = ctx.qt()
+    lines = sdk_source(int(20000 * ctx.scale))
+    doc = QTextDocument()
+    doc.setDocumentLayout(QPlainTextDocumentLayout(doc))
+    doc.setPlainText("\n".join(lines))
+    highlighter = studio.CSyntaxHighlighter(doc, window.lexer)
+    ctx.keep = (doc, highlighter)
+    edits = 200
+    step = max(1, doc.blockCount() // edits)
+
+    def run():
+        cursor = QTextCursor(doc)
+        for i in range(0, doc.blockCount(), step):
+            cursor.setPosition(doc.findBlockByNumber(i).position())
+            cursor.insertText("x")
+            cursor.deletePreviousChar()
+    return Bench(run, lines=len(lines), edits=len(range(0, doc.blockCount(), step)))
+
+
+def search_fixture(ctx):
+    _, _, window = ctx.qt()
+    text = "\n".join(sdk_source(int(60000 * ctx.scale)))
+    doc = window.text_edit.document()
+    original = doc.toPlainText()
+    doc.setPlainText(text)
+
+    def cleanup():
+        # later cases (compile_to_zapp saves first) must see the real main.c
+        set_query(window, "")
+        window.highlight_search()
+        doc.setPlainText(original)
+        doc.setModified(False)
+    return window, len(text), cleanup
+
+
+def set_query(window, query):
+    # no debounce timer; the case calls highlight_search itself
+    window.search_input.blockSignals(True)
+    window.search_input.setText(query)
+    window.search_input.blockSignals(False)
+
+
+@case("search.highlight", qt=True)
+def bench_search(ctx):
+    """highlight_search for a one-letter query on a multi-MB buffer"""
+    window, size, cleanup = search_fixture(ctx)
+    set_query(window, "e")
+
+    def run():
+        window.search_engine.invalidate()
+        window.highlight_search()
+        return {"hits": len(window.search_engine.starts)}
+    return Bench(run, cleanup=cleanup, chars=size, query="e")
+
+
+@case("search.typing", qt=True)
+def bench_search_typing(ctx):
+    """highlight_search per keystroke while typing 'else'"""
+    window, size, cleanup = search_fixture(ctx)
+
+    def reset():
+        set_query(window, "")
+        window.highlight_search()
+        window.search_engine.invalidate()
+
+    def run():
+        for i in range(1, 5):
+            set_query(window, "else"[:i])
+            window.highlight_search()
+    return Bench(run, reset, cleanup, chars=size, query="else")
+
+
+@case("tree.update", qt=True)
+def bench_tree(ctx):
+    """update_project_tree (full rebuild) on a big project"""
+    _, _, window = ctx.qt()
+    return Bench(window.update_project_tree, entries=ctx.tree_entries)
+
+
+@case("tree.expand_all", qt=True)
+def bench_tree_expand(ctx):
+    """update_project_tree, then expanding every directory"""
+    from PySide6.QtCore import Qt
+    _, _, window = ctx.qt()
+
+    def run():
+        window.update_project_tree()
+        pending = [window.tree_items["."]]
+        while pending:
+            item = pending.pop()
+            for i in range(item.childCount()):
+                child = item.child(i)
+                if child.data(0, Qt.UserRole) is not None:
+                    window.on_tree_item_expanded(child)
+                    pending.append(child)
+        return {"items": len(window.tree_items)}
+    return Bench(run, entries=ctx.tree_entries)
+
+
+@case("zapp.package")
+def bench_package(ctx):
+    """zenith.package of the project from scratch (no reuse)"""
+    from buildengine import Project
+    from zenith import package
+    project = Project.load(ctx.root)
+    output = os.path.join(ctx.root, "bench.zapp")
+    return Bench(lambda: package(project, output, binary="", incremental=False),
+                 assets=len(os.listdir(os.path.join(ctx.root, "assets"))))
+
+
+@case("zapp.compile_to_zapp", qt=True)
+def bench_compile_to_zapp(ctx):
+    """compile_to_zapp end to end: manifest, cached compile, packaging"""
+    _, _, window = ctx.qt()
+
+    def run():
+        del AutoDialogs.errors[:]
+        window.compile_to_zapp()
+        ctx.wait(lambda: window.zapp_stage is None)
+        if AutoDialogs.errors:
+            raise RuntimeError(AutoDialogs.errors[-1])
+    return Bench(run, assets=len(os.listdir(os.path.join(ctx.root, "assets"))),
+                 gcc=shutil.which("gcc") is not None)
+
+
+@case("terminal.append", qt=True)
+def bench_terminal(ctx):
+    """append_terminal of coloured status lines, painted to the widget"""
+    _, _, window = ctx.qt()
+    lines = [ANSI_LINE.format(i // 256 % 256, i % 256, i % 97) for i in range(int(5000 * ctx.scale))]
+
+    def run():
+        for line in lines:
+            window.append_terminal(line)
+        window.terminal.flush_all()
+    return Bench(run, window.clear_terminal, lines=len(lines))
+
+
+@case("theme.apply", qt=True)
+def bench_theme(ctx):
+    """apply_theme through every theme with the editor page up"""
+    app, _, window = ctx.qt()
+    themes = list(window.available_themes)
+
+    def run():
+        for theme in themes:
+            window.current_theme = theme
+            window.apply_theme()
+            app.processEvents()
+    return Bench(run, themes=len(themes))
+
+
+# --- running ---
+def qt_available():
+    try:
+        import PySide6.QtWidgets  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def run_case(c, ctx, repeat, warmup):
+    entry = {"doc": c.doc}
+    bench = c.setup(ctx)
+    entry["params"] = bench.params
+    timings = []
+    counters = None
+    try:
+        for i in range(warmup + repeat):
+            if bench.reset is not None:
+                bench.reset()
+            t0 = time.perf_counter()
+            counters = bench.run()
+            ms = (time.perf_counter() - t0) * 1000
+            if i >= warmup:
+                timings.append(ms)
+    finally:
+        if bench.cleanup is not None:
+            bench.cleanup()
+    entry.update({
+        "status": "ok",
+        "median_ms": statistics.median(timings),
+        "min_ms": min(timings),
+        "max_ms": max(timings),
+        "runs_ms": [round(t, 3) for t in timings],
+    })
+    if isinstance(counters, dict):
+        entry["counters"] = counters
+    return entry
+
+
+def environment(scale, repeat):
+    env = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "scale": scale,
+        "repeat": repeat,
+    }
+    try:
+        import PySide6
+        env["pyside6"] = PySide6.__version__
+    except ImportError:
+        env["pyside6"] = None
+    return env
+
+
+def run_suite(selected, scale=1.0, repeat=5, warmup=1, log=print):
+    has_qt = qt_available()
+    cwd = os.getcwd()
+    tmp = tempfile.mkdtemp(prefix="zenith-bench-")
+    results = {}
+    try:
+        ctx = Context(tmp, scale)
+        ctx.tree_entries = make_project(tmp, scale)
+        # Studio works on the current directory
+        os.chdir(tmp)
+        for c in selected:
+            if c.qt and not has_qt:
+                results[c.name] = {"doc": c.doc, "status": "skipped", "reason": "PySide6 not installed"}
+                log(f"{c.name:<26} skipped (PySide6 not installed)")
+                continue
+            try:
+                entry = run_case(c, ctx, repeat, warmup)
+            except Exception as e:
+                entry = {"doc": c.doc, "status": "failed", "reason": f"{type(e).__name__}: {e}"}
+                traceback.print_exc()
+            finally:
+                ctx.keep = None
+            results[c.name] = entry
+            if entry["status"] == "ok":
+                log(f"{c.name:<26} median {entry['median_ms']:9.2f} ms  min {entry['min_ms']:9.2f}"
+                    f"  max {entry['max_ms']:9.2f}")
+            else:
+                log(f"{c.name:<26} FAILED: {entry['reason']}")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp, ignore_errors=True)
+    return {"version": RESULTS_VERSION, "created": time.time(),
+            "environment": environment(scale, repeat), "results": results}
+
+
+def load_results(path):
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            js = json.load(fh)
+        if js.get("version") == RESULTS_VERSION:
+            return js
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def save_results(report, path):
+    if path == "-":
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+        return
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+    os.replace(tmp, path)
+
+
+def compare(report, baseline, threshold, min_delta_ms):
+    # [(name, base ms, now ms, change, verdict)]; verdict is "regressed",
+    # "improved", "ok" or why the case couldn't be compared
+    rows = []
+    base_results = baseline.get("results", {})
+    for name, entry in report["results"].items():
+        base = base_results.get(name)
+        if entry.get("status") != "ok":
+            continue
+        if base is None or base.get("status") != "ok":
+            rows.append((name, None, entry["median_ms"], None, "new"))
+            continue
+        if base.get("params") != entry.get("params"):
+            rows.append((name, base["median_ms"], entry["median_ms"], None, "params changed"))
+            continue
+        old, new = base["median_ms"], entry["median_ms"]
+        change = (new - old) / old if old > 0 else 0.0
+        verdict = "ok"
+        if change > threshold and new - old > min_delta_ms:
+            verdict = "regressed"
+        elif change < -threshold and old - new > min_delta_ms:
+            verdict = "improved"
+        rows.append((name, old, new, change, verdict))
+    for name, entry in report["results"].items():
+        if entry.get("status") == "ok" and name in base_results:
+            entry["baseline_ms"] = base_results[name].get("median_ms")
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="suite", description="Benchmark Studio's hot paths headlessly")
+    parser.add_argument("-k", dest="filters", action="append", default=[],
+                        help="only cases whose name contains this (repeatable)")
+    parser.add_argument("--list", action="store_true", help="list the cases and exit")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case (default 5)")
+    parser.add_argument("--warmup", type=int, default=1, help="untimed runs first (default 1)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply the input sizes")
+    parser.add_argument("--json", default=None, help="write the results here ('-' for stdout)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline file (default: %(default)s)")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.20,
+                        help="relative slowdown that counts as a regression (default 0.20)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0,
+                        help="ignore slowdowns smaller than this (default 1.0)")
+    args = parser.parse_args(argv)
+
+    selected = [c for c in CASES if not args.filters or any(f in c.name for f in args.filters)]
+    if args.list:
+        for c in CASES:
+            print(f"{c.name:<26} {'[Qt] ' if c.qt else ''}{c.doc}")
+        return 0
+    if not selected:
+        parser.error("no case matches " + ", ".join(args.filters))
+
+    # with --json - stdout carries only the JSON
+    out = sys.stderr if args.json == "-" else sys.stdout
+    log = lambda line: print(line, file=out, flush=True)
+    report = run_suite(selected, scale=args.scale, repeat=max(1, args.repeat),
+                       warmup=max(0, args.warmup), log=log)
+    failed = [n for n, e in report["results"].items() if e["status"] == "failed"]
+
+    regressed = []
+    baseline = load_results(args.baseline)
+    if baseline is not None and not args.save_baseline:
+        rows = compare(report, baseline, args.threshold, args.min_delta_ms)
+        log("")
+        log(f"vs baseline {os.path.relpath(args.baseline)} (threshold {args.threshold:.0%}):")
+        for name, old, new, change, verdict in rows:
+            base = f"{old:9.2f} ms" if old is not None else " " * 12
+            delta = f"{change:+7.1%}" if change is not None else " " * 7
+            log(f"  {name:<26} {base} -> {new:9.2f} ms {delta}  {verdict}")
+        regressed = [r[0] for r in rows if r[4] == "regressed"]
+        report["regressions"] = regressed
+    elif baseline is None and not args.save_baseline:
+        log(f"\nno baseline at {os.path.relpath(args.baseline)}; record one with --save-baseline")
+
+    if args.json:
+        save_results(report, args.json)
+    if args.save_baseline:
+        if failed:
+            log("not saving a baseline with failed cases")
+        else:
+            old = baseline if baseline is not None else {"results": {}}
+            # cases left out by -k keep their previous baseline
+            merged = dict(report, results=dict(old.get("results", {}), **report["results"]))
+            save_results(merged, args.baseline)
+            log(f"\nbaseline saved to {os.path.relpath(args.baseline)}")
+
+    if failed:
+        log(f"failed: {', '.join(failed)}")
+    if regressed:
+        log(f"regressed: {', '.join(regressed)}")
+    return 1 if failed or regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+# Build cache for Studio / zenith builds.
+# A build is keyed on the compiler (path + --version), the full command
+# flags and the content of every source plus the headers it transitively
+# includes from the project/include dirs. Outputs are kept in a small
+# content-addressed store under .zenithcache/ so a matching key restores
+# the artefact instead of running the compiler again.
+import hashlib, json, os, re, shutil, subprocess, time
+
+CACHE_DIR = ".zenithcache"
+INCLUDE_RE = re.compile(rb'^[ \t]*#[ \t]*include[ \t]*[<"]([^>"]+)[>"]', re.M)
+
+_file_hashes = {}    # path -> ((mtime_ns, size), sha256)
+_file_includes = {}  # path -> ((mtime_ns, size), [names])
+_compilers = {}      # path -> ((mtime_ns, size), identity)
+
+
+def _stat_key(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def file_hash(path):
+    key = _stat_key(path)
+    cached = _file_hashes.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    _file_hashes[path] = (key, digest)
+    return digest
+
+
+def _direct_includes(path):
+    key = _stat_key(path)
+    cached = _file_includes.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+    with open(path, "rb") as fh:
+        names = [m.decode(errors="ignore") for m in INCLUDE_RE.findall(fh.read())]
+    _file_includes[path] = (key, names)
+    return names
+
+
+def scan_includes(source, include_dirs):
+    # transitive project headers; system headers that don't resolve in
+    # include_dirs are covered by the compiler identity instead
+    seen = set()
+    stack = [os.path.abspath(source)]
+    deps = []
+    while stack:
+        path = stack.pop()
+        for name in _direct_includes(path):
+            for base in [os.path.dirname(path)] + list(include_dirs):
+                cand = os.path.abspath(os.path.join(base, name))
+                if cand in seen:
+                    break
+                if os.path.isfile(cand):
+                    seen.add(cand)
+                    deps.append(cand)
+                    stack.append(cand)
+                    break
+    return sorted(deps)
+
+
+def include_dirs_from_flags(flags):
+    dirs = []
+    it = iter(flags)
+    for f in it:
+        if f == "-I":
+            dirs.append(next(it, ""))
+        elif f.startswith("-I"):
+            dirs.append(f[2:])
+    return [d for d in dirs if d]
+
+
+def compiler_identity(compiler):
+    path = shutil.which(compiler) or compiler
+    try:
+        key = _stat_key(path)
+    except OSError:
+        return compiler
+    cached = _compilers.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+    try:
+        out = subprocess.run([path, "--version"], capture_output=True, text=True, timeout=10).stdout
+        version = out.splitlines()[0] if out else ""
+    except Exception:
+        version = ""
+    identity = f"{os.path.realpath(path)}|{version}"
+    _compilers[path] = (key, identity)
+    return identity
+
+
+def build_key(compiler, sources, args, extra=()):
+    # args: everything on the command line except the compiler and -o target
+    include_dirs = include_dirs_from_flags(args)
+    h = hashlib.sha256()
+    h.update(compiler_identity(compiler).encode())
+    h.update(b"\0".join(a.encode() for a in args))
+    for item in extra:
+        h.update(str(item).encode())
+    files = set()
+    for src in sources:
+        files.add(os.path.abspath(src))
+        files.update(scan_includes(src, include_dirs))
+    for path in sorted(files):
+        h.update(path.encode())
+        h.update(file_hash(path).encode())
+    return h.hexdigest()
+
+
+class BuildCache:
+    def __init__(self, root=".", cache_dir=CACHE_DIR):
+        self.root = os.path.abspath(root)
+        self.dir = os.path.join(self.root, cache_dir)
+        self.objects = os.path.join(self.dir, "objects")
+        self.state_path = os.path.join(self.dir, "outputs.json")
+        self._state = None
+
+    def _object_path(self, key):
+        return os.path.join(self.objects, key[:2], key)
+
+    def _load_state(self):
+        if self._state is None:
+            try:
+                with open(self.state_path, "r", encoding="utf-8") as fh:
+                    self._state = json.load(fh)
+            except (OSError, ValueError):
+                self._state = {}
+        return self._state
+
+    def _save_state(self):
+        os.makedirs(self.dir, exist_ok=True)
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(self._state, fh, indent=2)
+        os.replace(tmp, self.state_path)
+
+    def _remember(self, output, key):
+        st = os.stat(output)
+        self._load_state()[os.path.abspath(output)] = {
+            "key": key, "mtime_ns": st.st_mtime_ns, "size": st.st_size,
+        }
+        self._save_state()
+
+    def up_to_date(self, key, output):
+        # output already on disk and untouched since we produced it
+        entry = self._load_state().get(os.path.abspath(output))
+        if not entry or entry.get("key") != key:
+            return False
+        try:
+            st = os.stat(output)
+        except OSError:
+            return False
+        return st.st_mtime_ns == entry["mtime_ns"] and st.st_size == entry["size"]
+
+    def build_seconds(self, key):
+        try:
+            with open(self._object_path(key) + ".json", "r", encoding="utf-8") as fh:
+                return json.load(fh).get("build_seconds", 0.0)
+        except (OSError, ValueError):
+            return 0.0
+
+    def restore(self, key, output):
+        # returns True when output now holds the cached artefact
+        if self.up_to_date(key, output):
+            return True
+        obj = self._object_path(key)
+        if not os.path.exists(obj):
+            return False
+        tmp = output + ".zcache-tmp"
+        shutil.copy2(obj, tmp)
+        os.replace(tmp, output)
+        self._remember(output, key)
+        return True
+
+    def store(self, key, output, build_seconds=0.0):
+        obj = self._object_path(key)
+        os.makedirs(os.path.dirname(obj), exist_ok=True)
+        tmp = obj + ".tmp"
+        shutil.copy2(output, tmp)
+        os.replace(tmp, obj)
+        with open(obj + ".json", "w", encoding="utf-8") as fh:
+            json.dump({"build_seconds": build_seconds, "stored": time.time(),
+                       "output": os.path.basename(output)}, fh)
+        self._remember(output, key)
+
+    def clear(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+        self._state = None
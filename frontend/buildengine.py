@@ -0,0 +1,390 @@
+# Build engine for multi-file ZenithOS projects.
+# Each translation unit is compiled to its own object file on a thread
+# pool (the threads only wait on the compiler processes), objects whose
+# -MMD dependency set and command line are unchanged are skipped, and the
+# result is linked once at the end. No Qt in here: Studio runs it on a
+# worker thread and the command line uses it directly.
+import argparse, glob, hashlib, json, os, shutil, subprocess, sys, threading, time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+PROJECT_FILE = "zenith.json"
+BUILD_DIR = "build"
+LINK_PREFIXES = ("-l", "-L", "-Wl,")
+# code generation flags the link step needs as well (-pg pulls in gmon, ...)
+BOTH_PREFIXES = ("-pg", "-pthread", "-fsanitize=", "-flto", "-fprofile-", "--coverage", "-static")
+
+
+TOOLCHAIN_CANDIDATES = [
+    "gcc",
+    "arm-linux-gnueabi-gcc",
+    "arm-linux-gnueabihf-gcc",
+    "arm-none-eabi-gcc",
+    "aarch64-linux-gnu-gcc",
+]
+
+
+def detect_toolchains(candidates=TOOLCHAIN_CANDIDATES):
+    # [(target, compiler)] for every toolchain found in PATH
+    found = []
+    for c in candidates:
+        if shutil.which(c):
+            found.append((target_for_compiler(c), c))
+    return found
+
+
+def target_for_compiler(compiler):
+    # output directory name per toolchain: gcc -> native, arm-linux-gnueabihf-gcc -> arm-linux-gnueabihf
+    name = os.path.basename(compiler)
+    if name in ("gcc", "cc", "clang"):
+        return "native"
+    for suffix in ("-gcc", "-cc", "-clang"):
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def split_flags(flags):
+    # user flags: linker-only ones go to the link step, the rest to the
+    # compile step, code generation ones that need runtime support to both
+    cflags, ldflags = [], []
+    for f in flags:
+        if f.startswith(LINK_PREFIXES):
+            ldflags.append(f)
+        else:
+            cflags.append(f)
+            if f.startswith(BOTH_PREFIXES):
+                ldflags.append(f)
+    return cflags, ldflags
+
+
+def parse_depfile(path):
+    try:
+        with open(path, "r", encoding="utf-8", errors="ignore") as fh:
+            text = fh.read()
+    except OSError:
+        return None
+    text = text.replace("\\\n", " ")
+    _, _, deps = text.partition(":")
+    # only the first rule matters (-MP phony targets come after it)
+    deps = deps.split("\n", 1)[0]
+    out, cur, i = [], "", 0
+    while i < len(deps):
+        c = deps[i]
+        if c == "\\" and i + 1 < len(deps) and deps[i + 1] == " ":
+            cur += " "
+            i += 2
+            continue
+        if c in " \t":
+            if cur:
+                out.append(cur)
+                cur = ""
+        else:
+            cur += c
+        i += 1
+    if cur:
+        out.append(cur)
+    return out
+
+
+class Project:
+    def __init__(self, root=".", name="app", sources=None, include_dirs=None,
+                 cflags=None, ldflags=None, output="app", jobs=0, manifest=None):
+        self.root = os.path.abspath(root)
+        self.name = name
+        self.source_patterns = list(sources or ["main.c"])
+        self.include_dirs = list(include_dirs or ["include"])
+        self.cflags = list(cflags or [])
+        self.ldflags = list(ldflags or [])
+        self.output = output
+        self.jobs = jobs
+        # .zapp manifest fields (name, version, author, description)
+        self.manifest = dict(manifest or {})
+        self.path = os.path.join(self.root, PROJECT_FILE)
+
+    @classmethod
+    def load(cls, root="."):
+        path = os.path.join(root, PROJECT_FILE)
+        if not os.path.exists(path):
+            return cls(root)
+        with open(path, "r", encoding="utf-8") as fh:
+            js = json.load(fh)
+        return cls(
+            root,
+            name=js.get("name", "app"),
+            sources=js.get("sources"),
+            include_dirs=js.get("include_dirs"),
+            cflags=js.get("cflags"),
+            ldflags=js.get("ldflags"),
+            output=js.get("output", "app"),
+            jobs=js.get("jobs", 0),
+            manifest=js.get("manifest"),
+        )
+
+    def to_json(self):
+        return {
+            "name": self.name,
+            "sources": self.source_patterns,
+            "include_dirs": self.include_dirs,
+            "cflags": self.cflags,
+            "ldflags": self.ldflags,
+            "output": self.output,
+            "jobs": self.jobs,
+            "manifest": self.manifest,
+        }
+
+    def save(self):
+        with open(self.path, "w", encoding="utf-8") as fh:
+            json.dump(self.to_json(), fh, ensure_ascii=False, indent=2)
+            fh.write("\n")
+
+    def sources(self):
+        # relative paths, globs expanded, order kept, duplicates dropped
+        seen, out = set(), []
+        for pattern in self.source_patterns:
+            matches = sorted(glob.glob(os.path.join(self.root, pattern), recursive=True))
+            if not matches and not glob.has_magic(pattern):
+                matches = [os.path.join(self.root, pattern)]
+            for m in matches:
+                rel = os.path.relpath(m, self.root)
+                if rel not in seen:
+                    seen.add(rel)
+                    out.append(rel)
+        return out
+
+
+class BuildResult:
+    def __init__(self):
+        self.ok = False
+        self.cancelled = False
+        self.compiled = []
+        self.skipped = []
+        self.failed = []
+        self.linked = False
+        self.seconds = 0.0
+        self.output = None
+
+
+class BuildEngine:
+    def __init__(self, project, compiler="gcc", jobs=0, target="native",
+                 extra_flags=(), output=None, on_event=None, accel=None):
+        self.project = project
+        self.compiler = compiler
+        self.jobs = jobs or project.jobs or os.cpu_count() or 1
+        self.target = target
+        # zenith.json cflags like -pthread or -fsanitize= need the link step too
+        project_cflags, project_ldflags = split_flags(project.cflags)
+        cflags, ldflags = split_flags(list(extra_flags))
+        self.cflags = project_cflags + cflags
+        self.ldflags = project.ldflags + project_ldflags + ldflags
+        self.output = output or project.output
+        self.on_event = on_event
+        self.obj_dir = os.path.join(project.root, BUILD_DIR, target, "obj")
+        # optional accel.Accelerator: compiler cache + precompiled SDK headers
+        self.accel = accel if accel is not None and accel.enabled else None
+        self.env = accel.environment() if self.accel is not None else None
+        self._lock = threading.Lock()
+        self._procs = set()
+        self._cancelled = False
+
+    def emit(self, message):
+        if self.on_event is not None:
+            with self._lock:
+                self.on_event(message)
+
+    def cancel(self):
+        self._cancelled = True
+        with self._lock:
+            procs = list(self._procs)
+        for p in procs:
+            try:
+                p.kill()
+            except Exception:
+                pass
+
+    def _run(self, cmd):
+        if self._cancelled:
+            return -1, ""
+        proc = subprocess.Popen(cmd, cwd=self.project.root, env=self.env, stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT)
+        with self._lock:
+            self._procs.add(proc)
+        try:
+            out, _ = proc.communicate()
+        finally:
+            with self._lock:
+                self._procs.discard(proc)
+        return proc.returncode, out.decode(errors="replace")
+
+    # --- per translation unit ---
+    def object_path(self, src):
+        return os.path.join(self.obj_dir, src + ".o")
+
+    def compile_command(self, src, obj):
+        cmd = [self.compiler, "-c", src, "-o", obj, "-MMD", "-MF", obj + ".d"]
+        cmd += ["-I" + d for d in self.project.include_dirs]
+        cmd += self.cflags
+        if self.accel is not None:
+            cmd = self.accel.compile_command(self, src, cmd)
+        return cmd
+
+    @staticmethod
+    def signature(cmd):
+        return hashlib.sha256("\0".join(cmd).encode()).hexdigest()
+
+    def needs_compile(self, src, obj, cmd):
+        try:
+            obj_mtime = os.stat(obj).st_mtime_ns
+            with open(obj + ".cmd", "r", encoding="utf-8") as fh:
+                if fh.read().strip() != self.signature(cmd):
+                    return True
+        except OSError:
+            return True
+        deps = parse_depfile(obj + ".d")
+        if not deps:
+            return True
+        for dep in deps:
+            try:
+                if os.stat(os.path.join(self.project.root, dep)).st_mtime_ns > obj_mtime:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def compile_unit(self, src):
+        obj = self.object_path(src)
+        os.makedirs(os.path.dirname(obj), exist_ok=True)
+        cmd = self.compile_command(src, obj)
+        t0 = time.perf_counter()
+        key = None
+        if self.accel is not None:
+            restored, key = self.accel.before_compile(self, src, obj, cmd)
+            if restored:
+                code, out = 0, ""
+                key = None
+            else:
+                t0 = time.perf_counter()  # .gch build time is reported on its own
+                code, out = self._run(cmd)
+        else:
+            code, out = self._run(cmd)
+        secs = time.perf_counter() - t0
+        if code == 0:
+            with open(obj + ".cmd", "w", encoding="utf-8") as fh:
+                fh.write(self.signature(cmd))
+            if self.accel is not None and src not in self.accel.hits:
+                self.accel.after_compile(self, src, obj, key, secs)
+        return src, code, out, secs
+
+    # --- whole build ---
+    def build(self):
+        result = BuildResult()
+        t0 = time.perf_counter()
+        sources = [s for s in self.project.sources() if s.endswith((".c", ".cc", ".cpp", ".S", ".s"))]
+        if not sources:
+            self.emit("No sources to build.")
+            return result
+        pending, objects = [], []
+        for src in sources:
+            obj = self.object_path(src)
+            objects.append(obj)
+            if self.needs_compile(src, obj, self.compile_command(src, obj)):
+                pending.append(src)
+            else:
+                result.skipped.append(src)
+
+        total = len(pending)
+        if self.accel is not None:
+            self.accel.reset()
+        if total:
+            self.emit(f"Compiling {total} of {len(sources)} units with {self.jobs} jobs ({self.compiler}, {self.target})")
+            if self.accel is not None:
+                self.emit(f"[accel] {self.accel.describe()}")
+        else:
+            self.emit(f"All {len(sources)} units up to date.")
+        done = 0
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            futures = [pool.submit(self.compile_unit, src) for src in pending]
+            for fut in as_completed(futures):
+                if fut.cancelled():
+                    # never started after an earlier unit failed; not built
+                    continue
+                src, code, out, secs = fut.result()
+                done += 1
+                status = "CC" if code == 0 else "FAILED"
+                if code == 0 and self.accel is not None and src in self.accel.hits:
+                    status = "CACHED"
+                self.emit(f"[{done}/{total}] {status} {src} ({secs:.2f}s)")
+                if out.strip():
+                    self.emit(out.rstrip("\n"))
+                (result.compiled if code == 0 else result.failed).append(src)
+                if code != 0 and not self._cancelled:
+                    # let running units finish, don't start new ones
+                    for f in futures:
+                        f.cancel()
+
+        if self.accel is not None and total:
+            for line in self.accel.report(self):
+                self.emit(line)
+
+        if self._cancelled:
+            result.cancelled = True
+            self.emit("Build cancelled.")
+        elif result.failed or len(result.compiled) + len(result.skipped) != len(sources):
+            not_built = len(pending) - len(result.compiled) - len(result.failed)
+            extra = f", {not_built} not built" if not_built else ""
+            self.emit(f"{len(result.failed)} unit(s) failed{extra}, not linking.")
+        else:
+            result.ok = self.link(objects, bool(result.compiled), result)
+        result.seconds = time.perf_counter() - t0
+        return result
+
+    def link(self, objects, changed, result):
+        output = os.path.join(self.project.root, self.output)
+        cmd = [self.compiler] + objects + ["-o", output] + self.ldflags
+        sig_path = os.path.join(self.obj_dir, "..", "link.cmd")
+        sig = self.signature(cmd)
+        if not changed and os.path.exists(output):
+            try:
+                with open(sig_path, "r", encoding="utf-8") as fh:
+                    same = fh.read().strip() == sig
+                newest = max(os.stat(o).st_mtime_ns for o in objects)
+                if same and os.stat(output).st_mtime_ns >= newest:
+                    self.emit(f"{self.output} is up to date.")
+                    result.output = output
+                    return True
+            except OSError:
+                pass
+        self.emit(f"LINK {self.output}")
+        code, out = self._run(cmd)
+        if out.strip():
+            self.emit(out.rstrip("\n"))
+        if code != 0:
+            self.emit(f"Link failed with exit code {code}")
+            return False
+        with open(sig_path, "w", encoding="utf-8") as fh:
+            fh.write(sig)
+        result.linked = True
+        result.output = output
+        return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a ZenithOS project")
+    parser.add_argument("-C", "--directory", default=".", help="project root")
+    parser.add_argument("-j", "--jobs", type=int, default=0, help="parallel compile jobs (0 = all cores)")
+    parser.add_argument("--compiler", default="gcc")
+    parser.add_argument("--target", default="native")
+    parser.add_argument("-o", "--output", default=None)
+    parser.add_argument("flags", nargs="*", help="extra compiler/linker flags")
+    # anything unrecognised (-O2, -lm, ...) is passed through to gcc
+    args, extra = parser.parse_known_args(argv)
+    project = Project.load(args.directory)
+    engine = BuildEngine(project, compiler=args.compiler, jobs=args.jobs, target=args.target,
+                         extra_flags=args.flags + extra, output=args.output, on_event=print)
+    result = engine.build()
+    print(f"{'OK' if result.ok else 'FAILED'}: {len(result.compiled)} compiled, "
+          f"{len(result.skipped)} up to date in {result.seconds:.2f}s")
+    return 0 if result.ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+# C tokenizer used by the Studio highlighter.
+# Everything is matched by one combined regex and the lexer is resumable
+# line by line through a small integer state (block comment / continued
+# string), so QSyntaxHighlighter only has to re-lex the edited block and
+# the blocks whose incoming state actually changed.
+import re
+
+STATE_NORMAL = 0
+STATE_COMMENT = 1
+STATE_STRING = 2
+
+KEYWORDS = [
+    "int", "char", "float", "if", "else", "for", "while", "return", "void",
+    "struct", "typedef", "enum", "const", "static", "extern", "switch", "case",
+    "break", "continue", "goto", "sizeof", "long", "short", "unsigned", "signed",
+    "double", "do", "union", "volatile", "inline", "default", "register", "auto"
+]
+
+FUNCTIONS = [
+    "printf", "scanf", "malloc", "free", "strlen", "strcmp", "strcpy",
+    "fopen", "fclose", "fread", "fwrite", "exit", "perror", "system"
+]
+
+TOKEN_RE = re.compile(r"""
+      (?P<comment>//.*)
+    | (?P<block>/\*)
+    | (?P<string>"(?:[^"\\]|\\.)*(?:"|(?P<cont>\\)?$))
+    | (?P<char>'(?:[^'\\]|\\.)*')
+    | (?P<directive>^\s*\#\s*[A-Za-z_]\w*)
+    | (?P<number>\b(?:0[xX][0-9a-fA-F]+|\d+(?:\.\d*)?(?:[eE][+-]?\d+)?)[uUlLfF]*\b)
+    | (?P<ident>[A-Za-z_]\w*)(?P<call>[ \t]*\()?
+""", re.VERBOSE)
+
+STRING_TAIL_RE = re.compile(r'(?:[^"\\]|\\.)*(?:"|(?P<cont>\\)?$)')
+
+
+class CLexer:
+    def __init__(self):
+        self.keywords = set(KEYWORDS)
+        self.functions = set(FUNCTIONS)
+        # extra identifiers (e.g. SDK symbols) -> token kind
+        self.symbols = {}
+
+    def lex_line(self, text, state=STATE_NORMAL):
+        # returns ([(start, length, kind), ...], end_state)
+        spans = []
+        pos = 0
+        n = len(text)
+
+        if state == STATE_COMMENT:
+            end = text.find("*/")
+            if end < 0:
+                if n:
+                    spans.append((0, n, "comment"))
+                return spans, STATE_COMMENT
+            pos = end + 2
+            spans.append((0, pos, "comment"))
+        elif state == STATE_STRING:
+            m = STRING_TAIL_RE.match(text)
+            pos = m.end()
+            if pos:
+                spans.append((0, pos, "string"))
+            if m.group("cont") is not None:
+                return spans, STATE_STRING
+
+        keywords = self.keywords
+        functions = self.functions
+        symbols = self.symbols
+        search = TOKEN_RE.search
+        while pos < n:
+            m = search(text, pos)
+            if m is None:
+                break
+            kind = m.lastgroup
+            start = m.start()
+            if kind == "call" or kind == "ident":
+                word = m.group("ident")
+                wend = m.end("ident")
+                if word in keywords:
+                    spans.append((start, wend - start, "keyword"))
+                elif m.group("call") is not None and word in functions:
+                    spans.append((start, wend - start, "function"))
+                else:
+                    sym = symbols.get(word)
+                    if sym is not None:
+                        spans.append((start, wend - start, sym))
+                # leave "(" for the next match so call chains still lex
+                pos = wend
+                continue
+            if kind == "block":
+                end = text.find("*/", m.end())
+                if end < 0:
+                    spans.append((start, n - start, "comment"))
+                    return spans, STATE_COMMENT
+                spans.append((start, end + 2 - start, "comment"))
+                pos = end + 2
+                continue
+            end = m.end()
+            spans.append((start, end - start, kind))
+            if kind == "string" and m.group("cont") is not None:
+                return spans, STATE_STRING
+            pos = end
+        return spans, STATE_NORMAL
+
+    def lex(self, lines):
+        # lex a whole buffer, carrying state across lines
+        state = STATE_NORMAL
+        out = []
+        for line in lines:
+            spans, state = self.lex_line(line, state)
+            out.append(spans)
+        return out, state
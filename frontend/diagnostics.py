@@ -0,0 +1,122 @@
+# Compiler diagnostics for Studio.
+# One parser for gcc's classic "file:line:col: severity: message" output,
+# used both for build output and for the background syntax check. The check
+# pipes a snapshot of the editor buffer into `gcc -fsyntax-only` on stdin,
+# so nothing is written to disk; a newer check cancels the one in flight.
+import os, re, subprocess, threading
+
+# multi-target builds prefix each line with "[target] "
+DIAG_RE = re.compile(
+    r'^(?:\[[\w.+-]+\] )?(?P<file>[^:\n]+?):(?P<line>\d+):(?:(?P<col>\d+):)?\s*'
+    r'(?P<severity>fatal error|error|warning|note):\s*(?P<message>.*)$'
+)
+ANSI_RE = re.compile(r'\x1b\[[0-9;]*[A-Za-z]')
+STDIN_NAME = "<stdin>"
+MAX_DIAGNOSTICS = 500
+
+
+class Diagnostic:
+    __slots__ = ("file", "line", "col", "severity", "message")
+
+    def __init__(self, file, line, col, severity, message):
+        self.file = file
+        self.line = line          # 1-based
+        self.col = col            # 1-based, 0 when gcc didn't give one
+        self.severity = severity  # error, warning or note ("fatal error" -> error)
+        self.message = message
+
+    @property
+    def location(self):
+        return f"{self.file}:{self.line}:{self.col}" if self.col else f"{self.file}:{self.line}"
+
+    def __str__(self):
+        return f"{self.location}: {self.severity}: {self.message}"
+
+
+def parse_line(line):
+    m = DIAG_RE.match(ANSI_RE.sub("", line).rstrip("\r\n"))
+    if m is None:
+        return None
+    severity = m.group("severity")
+    if severity == "fatal error":
+        severity = "error"
+    return Diagnostic(m.group("file").strip(), int(m.group("line")), int(m.group("col") or 0),
+                      severity, m.group("message").strip())
+
+
+def parse_diagnostics(text, rename=None):
+    # rename: {reported file: file to show}, e.g. {"<stdin>": "main.c"}
+    out = []
+    for line in text.splitlines():
+        d = parse_line(line)
+        if d is None:
+            continue
+        if rename and d.file in rename:
+            d.file = rename[d.file]
+        out.append(d)
+        if len(out) >= MAX_DIAGNOSTICS:
+            break
+    return out
+
+
+class SyntaxChecker:
+    def __init__(self, compiler="gcc", include_dirs=("include",), flags=(), root="."):
+        self.compiler = compiler
+        self.include_dirs = list(include_dirs)
+        self.flags = list(flags)
+        self.root = os.path.abspath(root)
+        self._lock = threading.Lock()
+        self._proc = None
+        self._generation = 0
+
+    def command(self, filename):
+        # quoted includes resolve next to the real file, as in a normal build
+        cmd = [self.compiler, "-fsyntax-only", "-fno-diagnostics-color", "-x", "c"]
+        cmd += ["-iquote", os.path.dirname(os.path.join(self.root, filename)) or self.root]
+        cmd += ["-I" + d for d in self.include_dirs]
+        cmd += self.flags
+        cmd.append("-")
+        return cmd
+
+    def cancel(self):
+        with self._lock:
+            self._generation += 1
+            proc = self._proc
+        if proc is not None:
+            try:
+                proc.kill()
+            except Exception:
+                pass
+
+    def check(self, text, filename="main.c"):
+        # returns a list of Diagnostic, or None when cancelled by a newer check
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            old = self._proc
+        if old is not None:
+            try:
+                old.kill()
+            except Exception:
+                pass
+        try:
+            proc = subprocess.Popen(self.command(filename), cwd=self.root, stdin=subprocess.PIPE,
+                                    stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        except OSError:
+            return []
+        with self._lock:
+            if generation != self._generation:
+                proc.kill()
+                proc.wait()
+                return None
+            self._proc = proc
+        try:
+            out, _ = proc.communicate(text.encode("utf-8", errors="replace"))
+        except (OSError, ValueError):
+            out = b""
+        with self._lock:
+            if self._proc is proc:
+                self._proc = None
+            if generation != self._generation:
+                return None
+        return parse_diagnostics(out.decode(errors="replace"), {STDIN_NAME: filename})
@@ -0,0 +1,262 @@
+# Open documents for the Studio editor.
+# Every open file keeps its own QTextDocument (and syntax highlighter), and
+# the single CodeEditor is just pointed at whichever one is active, so
+# switching files doesn't re-read or re-highlight anything. Saves only touch
+# dirty documents and go through an atomic temp-file rename; autosave
+# snapshots dirty documents on the GUI thread and writes them from a worker.
+# Clean documents that haven't been used for a while are unloaded once more
+# than max_open files are open.
+import os, threading, time
+
+from PySide6.QtCore import QObject, QTimer, Signal
+from PySide6.QtGui import QTextDocument
+from PySide6.QtWidgets import QPlainTextDocumentLayout
+
+from editor import write_document, write_text
+
+MAX_OPEN = 16
+
+
+class Document:
+    def __init__(self, path, doc, highlighter):
+        self.path = path
+        self.doc = doc
+        self.highlighter = highlighter
+        self.large_file = False
+        self.last_used = time.monotonic()
+        self.cursor_pos = 0
+        self.scroll = 0
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+    @property
+    def dirty(self):
+        return self.doc.isModified()
+
+
+class DocumentManager(QObject):
+    # current document changed (path), dirty flag changed (path, dirty),
+    # autosave finished (paths)
+    currentChanged = Signal(str)
+    dirtyChanged = Signal(str, bool)
+    autosaved = Signal(list)
+    _autosave_done = Signal(list)
+
+    def __init__(self, editor, highlighter_factory, max_open=MAX_OPEN, autosave_seconds=30, parent=None):
+        super().__init__(parent)
+        self.editor = editor
+        self.highlighter_factory = highlighter_factory
+        self.max_open = max_open
+        self.docs = {}        # abs path -> Document, in open order
+        self.current = None
+        self.on_new_document = None  # callback(QTextDocument) for per-document signal wiring
+        self._blank = None
+        self._autosaving = False
+        # explicit saves and the autosave worker never interleave, and the
+        # worker won't overwrite a newer revision that was saved meanwhile
+        self._write_lock = threading.Lock()
+        self._written = {}    # path -> revision last written
+        self._autosave_done.connect(self._on_autosave_done)
+        self.autosave_timer = QTimer(self)
+        self.autosave_timer.timeout.connect(self.autosave)
+        self.set_autosave_interval(autosave_seconds)
+
+    # --- open / switch ---
+    def open(self, path):
+        path = os.path.abspath(path)
+        entry = self.docs.get(path)
+        if entry is None:
+            entry = self._load(path)
+        self._activate(entry)
+        return entry
+
+    def _load(self, path):
+        doc = QTextDocument(self)
+        doc.setDocumentLayout(QPlainTextDocumentLayout(doc))
+        doc.setDefaultFont(self.editor.font())
+        entry = Document(path, doc, self.highlighter_factory(doc))
+        doc.modificationChanged.connect(lambda dirty, p=path: self.dirtyChanged.emit(p, dirty))
+        if self.on_new_document is not None:
+            self.on_new_document(doc)
+        # load through the editor so large files keep the chunked, unhighlighted path;
+        # the entry is only registered once the file has been read
+        self._store_view_state()
+        self.editor.highlighter = entry.highlighter
+        self.editor.setDocument(doc)
+        try:
+            self.editor.load_file(path)
+        except Exception:
+            self._restore_view(entry)
+            raise
+        entry.large_file = self.editor.large_file
+        self.docs[path] = entry
+        self.current = entry
+        self._unload_stale()
+        return entry
+
+    def _restore_view(self, failed):
+        # point the editor back at the current document after a failed load
+        self.editor.cancel_loading()
+        self.editor.setReadOnly(False)
+        self.editor.setUndoRedoEnabled(True)
+        prev, self.current = self.current, None
+        if prev is not None and self.docs.get(prev.path) is prev:
+            self._activate(prev)
+        else:
+            self.editor.highlighter = None
+            self.editor.setDocument(self._blank_document())
+            self.editor.file_path = None
+            self.editor.large_file = False
+        failed.highlighter.setDocument(None)
+        failed.highlighter.deleteLater()
+        failed.doc.deleteLater()
+
+    def _store_view_state(self):
+        cur = self.current
+        if cur is None:
+            return
+        cur.cursor_pos = self.editor.textCursor().position()
+        cur.scroll = self.editor.verticalScrollBar().value()
+        if self.editor.is_loading():
+            # a partly loaded large file can't be kept around
+            self.editor.cancel_loading()
+            self._drop(cur)
+
+    def _activate(self, entry):
+        if self.current is not entry:
+            self._store_view_state()
+            self.current = entry
+            self.editor.highlighter = entry.highlighter
+            self.editor.setDocument(entry.doc)
+            self.editor.file_path = entry.path
+            self.editor.large_file = entry.large_file
+            cursor = self.editor.textCursor()
+            cursor.setPosition(min(entry.cursor_pos, entry.doc.characterCount() - 1))
+            self.editor.setTextCursor(cursor)
+            self.editor.verticalScrollBar().setValue(entry.scroll)
+        entry.last_used = time.monotonic()
+        self.currentChanged.emit(entry.path)
+
+    def _unload_stale(self):
+        if len(self.docs) <= self.max_open:
+            return
+        clean = sorted((e for e in self.docs.values() if e is not self.current and not e.dirty),
+                       key=lambda e: e.last_used)
+        for entry in clean[:len(self.docs) - self.max_open]:
+            self._drop(entry)
+
+    def _drop(self, entry):
+        if self.docs.get(entry.path) is not entry:
+            return
+        del self.docs[entry.path]
+        with self._write_lock:
+            self._written.pop(entry.path, None)
+        if self.current is entry:
+            self.current = None
+        entry.highlighter.setDocument(None)
+        entry.highlighter.deleteLater()
+        entry.doc.deleteLater()
+
+    def close(self, path):
+        # caller asks about unsaved changes first
+        entry = self.docs.get(os.path.abspath(path))
+        if entry is None:
+            return
+        was_current = entry is self.current
+        if was_current and self.editor.is_loading():
+            self.editor.cancel_loading()
+        # point the editor somewhere else before the document goes away;
+        # LRU-unloaded documents are simply reloaded by the next open()
+        if was_current:
+            others = sorted((e for e in self.docs.values() if e is not entry),
+                            key=lambda e: e.last_used, reverse=True)
+            if others:
+                self._activate(others[0])
+            else:
+                self.current = None
+                self.editor.highlighter = None
+                self.editor.setDocument(self._blank_document())
+                self.editor.file_path = None
+                self.editor.large_file = False
+        self._drop(entry)
+
+    def _blank_document(self):
+        if self._blank is None:
+            self._blank = QTextDocument(self)
+            self._blank.setDocumentLayout(QPlainTextDocumentLayout(self._blank))
+        return self._blank
+
+    # --- queries ---
+    def get(self, path):
+        return self.docs.get(os.path.abspath(path))
+
+    def dirty_documents(self):
+        return [e for e in self.docs.values() if e.dirty]
+
+    def highlighters(self):
+        return [e.highlighter for e in self.docs.values()]
+
+    # --- saving ---
+    def save(self, entry):
+        if entry is self.current:
+            self.editor.finish_loading()
+        with self._write_lock:
+            write_document(entry.doc, entry.path)
+            self._written[entry.path] = entry.doc.revision()
+        entry.doc.setModified(False)
+
+    def save_all(self):
+        # only dirty documents are written; returns the saved paths
+        saved = []
+        for entry in self.dirty_documents():
+            self.save(entry)
+            saved.append(entry.path)
+        return saved
+
+    def set_autosave_interval(self, seconds):
+        if seconds and seconds > 0:
+            self.autosave_timer.start(int(seconds * 1000))
+        else:
+            self.autosave_timer.stop()
+
+    def autosave(self):
+        if self._autosaving:
+            return
+        # snapshot on the GUI thread, write from a worker
+        jobs = []
+        for entry in self.dirty_documents():
+            if entry.large_file or (entry is self.current and self.editor.is_loading()):
+                continue  # big buffers are only saved explicitly
+            jobs.append((entry.path, entry.doc.toPlainText(), entry.doc.revision()))
+        if not jobs:
+            return
+        self._autosaving = True
+        threading.Thread(target=self._autosave_worker, args=(jobs,), daemon=True).start()
+
+    def _autosave_worker(self, jobs):
+        done = []
+        for path, text, revision in jobs:
+            try:
+                with self._write_lock:
+                    if self._written.get(path, -1) >= revision:
+                        continue
+                    write_text(text, path)
+                    self._written[path] = revision
+                done.append((path, revision))
+            except OSError as e:
+                print(f"[autosave] {path}: {e}")
+        self._autosave_done.emit(done)
+
+    def _on_autosave_done(self, done):
+        self._autosaving = False
+        saved = []
+        for path, revision in done:
+            entry = self.docs.get(path)
+            # only clean if nothing was typed since the snapshot
+            if entry is not None and entry.doc.revision() == revision:
+                entry.doc.setModified(False)
+                saved.append(path)
+        if saved:
+            self.autosaved.emit(saved)
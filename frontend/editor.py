@@ -0,0 +1,378 @@
+# Editor widget used by Studio.
+# QPlainTextEdit based, with a large-file mode: files above the threshold
+# are memory-mapped and appended to the document in chunks from the event
+# loop (so the window stays responsive), highlighting is switched off, and
+# saves stream the document block by block instead of building one string.
+# Completion and go-to-definition are driven from outside: Studio plugs in
+# a completion source (the symbol index) and listens for definitionRequested.
+# A narrow gutter on the left shows per-line markers (diagnostics).
+import codecs, mmap, os
+
+from PySide6.QtWidgets import QPlainTextEdit, QCompleter, QWidget, QToolTip
+from PySide6.QtGui import QTextCursor, QPainter, QColor
+from PySide6.QtCore import Qt, QTimer, Signal, QStringListModel, QSize, QEvent
+
+LARGE_FILE_THRESHOLD = 4 * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+SAVE_BATCH = 4096  # blocks per write() call
+COMPLETION_MIN_PREFIX = 3  # typed chars before the popup opens by itself
+MARKER_WIDTH = 12
+
+
+def _is_word_char(c):
+    return c.isalnum() or c == "_"
+
+
+class MarkerArea(QWidget):
+    def __init__(self, editor):
+        super().__init__(editor)
+        self.editor = editor
+
+    def sizeHint(self):
+        return QSize(MARKER_WIDTH, 0)
+
+    def paintEvent(self, event):
+        self.editor.paint_markers(self, event)
+
+    def event(self, event):
+        if event.type() == QEvent.ToolTip:
+            text = self.editor.marker_tooltip(event.pos().y())
+            if text:
+                QToolTip.showText(event.globalPos(), text, self)
+            else:
+                QToolTip.hideText()
+            return True
+        return super().event(event)
+
+
+class CodeEditor(QPlainTextEdit):
+    loadFinished = Signal(str)
+    definitionRequested = Signal(str)
+
+    def __init__(self, parent=None, large_file_threshold=LARGE_FILE_THRESHOLD):
+        super().__init__(parent)
+        self.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.large_file_threshold = large_file_threshold
+        self.file_path = None
+        self.large_file = False
+        self.highlighter = None
+        self._loader = None
+        self._load_timer = QTimer(self)
+        self._load_timer.setInterval(0)
+        self._load_timer.timeout.connect(self._load_next_chunk)
+        self.completion_source = None
+        self._completer = None
+        self.line_markers = {}  # line (1-based) -> (color, tooltip)
+        self._marker_area = MarkerArea(self)
+        self.updateRequest.connect(self._update_marker_area)
+        self.setViewportMargins(MARKER_WIDTH, 0, 0, 0)
+
+    def set_highlighter(self, highlighter):
+        self.highlighter = highlighter
+
+    def set_highlighting(self, enabled):
+        if self.highlighter is None:
+            return
+        doc = self.document() if enabled else None
+        if self.highlighter.document() is not doc:
+            self.highlighter.setDocument(doc)
+
+    # --- gutter markers ---
+    def set_line_markers(self, markers):
+        self.line_markers = markers
+        self._marker_area.update()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        cr = self.contentsRect()
+        self._marker_area.setGeometry(cr.left(), cr.top(), MARKER_WIDTH, cr.height())
+
+    def _update_marker_area(self, rect, dy):
+        if dy:
+            self._marker_area.scroll(0, dy)
+        else:
+            self._marker_area.update(0, rect.y(), MARKER_WIDTH, rect.height())
+
+    def _visible_blocks(self, bottom_limit):
+        # (block, top, bottom) for blocks painted in the viewport
+        block = self.firstVisibleBlock()
+        top = self.blockBoundingGeometry(block).translated(self.contentOffset()).top()
+        while block.isValid() and top <= bottom_limit:
+            bottom = top + self.blockBoundingRect(block).height()
+            if block.isVisible():
+                yield block, top, bottom
+            block = block.next()
+            top = bottom
+
+    def paint_markers(self, area, event):
+        if not self.line_markers:
+            return
+        painter = QPainter(area)
+        painter.setPen(Qt.NoPen)
+        size = MARKER_WIDTH - 4
+        for block, top, bottom in self._visible_blocks(event.rect().bottom()):
+            mark = self.line_markers.get(block.blockNumber() + 1)
+            if mark is not None:
+                painter.setBrush(QColor(mark[0]))
+                painter.drawEllipse(2, int(top + (bottom - top - size) / 2), size, size)
+        painter.end()
+
+    def marker_tooltip(self, y):
+        for block, top, bottom in self._visible_blocks(y):
+            if top <= y < bottom:
+                mark = self.line_markers.get(block.blockNumber() + 1)
+                return mark[1] if mark else ""
+        return ""
+
+    # --- completion / navigation ---
+    def set_completion_source(self, source):
+        # source(prefix) -> [names]
+        self.completion_source = source
+        if self._completer is None:
+            self._completer = QCompleter(self)
+            self._completer.setModel(QStringListModel(self._completer))
+            self._completer.setWidget(self)
+            self._completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+            self._completer.setCaseSensitivity(Qt.CaseSensitive)
+            self._completer.activated.connect(self._insert_completion)
+
+    def word_at(self, cursor):
+        text = cursor.block().text()
+        col = cursor.positionInBlock()
+        start = end = col
+        while start > 0 and _is_word_char(text[start - 1]):
+            start -= 1
+        while end < len(text) and _is_word_char(text[end]):
+            end += 1
+        return text[start:end]
+
+    def completion_prefix(self):
+        cursor = self.textCursor()
+        text = cursor.block().text()
+        col = cursor.positionInBlock()
+        start = col
+        while start > 0 and _is_word_char(text[start - 1]):
+            start -= 1
+        return text[start:col]
+
+    def show_completions(self, force=False):
+        if self._completer is None or self.completion_source is None:
+            return
+        popup = self._completer.popup()
+        prefix = self.completion_prefix()
+        if not force and len(prefix) < COMPLETION_MIN_PREFIX:
+            popup.hide()
+            return
+        names = self.completion_source(prefix)
+        if not names or names == [prefix]:
+            popup.hide()
+            return
+        model = self._completer.model()
+        model.setStringList(names)
+        rect = self.cursorRect()
+        rect.setWidth(popup.sizeHintForColumn(0) + popup.verticalScrollBar().sizeHint().width())
+        self._completer.complete(rect)
+        popup.setCurrentIndex(model.index(0, 0))
+
+    def _insert_completion(self, name):
+        prefix = self.completion_prefix()
+        cursor = self.textCursor()
+        cursor.movePosition(QTextCursor.Left, QTextCursor.KeepAnchor, len(prefix))
+        cursor.insertText(name)
+        self.setTextCursor(cursor)
+
+    def goto_line(self, line, col=0):
+        block = self.document().findBlockByNumber(max(0, line - 1))
+        if block.isValid():
+            cursor = QTextCursor(block)
+            if col > 1:
+                cursor.setPosition(block.position() + min(col - 1, block.length() - 1))
+            self.setTextCursor(cursor)
+            self.centerCursor()
+
+    def keyPressEvent(self, event):
+        key = event.key()
+        popup = self._completer.popup() if self._completer is not None else None
+        if popup is not None and popup.isVisible() and key in (
+                Qt.Key_Enter, Qt.Key_Return, Qt.Key_Tab, Qt.Key_Backtab, Qt.Key_Escape):
+            # the completer handles these
+            event.ignore()
+            return
+        if key == Qt.Key_Space and event.modifiers() & Qt.ControlModifier:
+            self.show_completions(force=True)
+            return
+        if key == Qt.Key_F12:
+            word = self.word_at(self.textCursor())
+            if word:
+                self.definitionRequested.emit(word)
+            return
+        super().keyPressEvent(event)
+        if popup is None or self.isReadOnly():
+            return
+        text = event.text()
+        if text and _is_word_char(text):
+            self.show_completions(force=popup.isVisible())
+        elif key == Qt.Key_Backspace and popup.isVisible():
+            self.show_completions(force=True)
+        elif popup.isVisible():
+            popup.hide()
+
+    def mouseReleaseEvent(self, event):
+        super().mouseReleaseEvent(event)
+        # Ctrl+click: go to definition
+        if event.button() == Qt.LeftButton and event.modifiers() & Qt.ControlModifier:
+            word = self.word_at(self.cursorForPosition(event.position().toPoint()))
+            if word:
+                self.definitionRequested.emit(word)
+
+    # --- loading ---
+    def load_file(self, path):
+        self.cancel_loading()
+        size = os.path.getsize(path)
+        self.file_path = path
+        self.large_file = size >= self.large_file_threshold
+        if not self.large_file:
+            with open(path, "r", encoding="utf-8", errors="ignore") as fh:
+                text = fh.read()
+            self.setReadOnly(False)
+            self.setUndoRedoEnabled(True)
+            self.set_highlighting(True)
+            self.setPlainText(text)
+            self.document().setModified(False)
+            self.loadFinished.emit(path)
+            return
+
+        # large file: no highlighter, no undo stack while filling
+        self.set_highlighting(False)
+        self.setUndoRedoEnabled(False)
+        self.clear()
+        self.setReadOnly(True)
+        fh = open(path, "rb")
+        try:
+            mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            fh.close()
+            raise
+        self._loader = {
+            "fh": fh,
+            "mm": mm,
+            "offset": 0,
+            "decoder": codecs.getincrementaldecoder("utf-8")(errors="ignore"),
+            "carry_cr": False,
+            "cursor": QTextCursor(self.document()),
+        }
+        # first chunk right away so the user sees something
+        self._load_next_chunk()
+        if self._loader is not None:
+            self._load_timer.start()
+
+    def is_loading(self):
+        return self._loader is not None
+
+    def _load_next_chunk(self):
+        ld = self._loader
+        if ld is None:
+            self._load_timer.stop()
+            return
+        mm = ld["mm"]
+        start = ld["offset"]
+        end = min(start + CHUNK_SIZE, len(mm))
+        final = end >= len(mm)
+        text = ld["decoder"].decode(mm[start:end], final)
+        ld["offset"] = end
+        # universal newlines, with "\r\n" possibly split across chunks
+        if ld["carry_cr"]:
+            text = "\r" + text
+            ld["carry_cr"] = False
+        if text.endswith("\r") and not final:
+            text = text[:-1]
+            ld["carry_cr"] = True
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+        if text:
+            cursor = ld["cursor"]
+            cursor.movePosition(QTextCursor.End)
+            cursor.insertText(text)
+        if final:
+            self._finish_loader()
+
+    def _finish_loader(self):
+        ld = self._loader
+        self._loader = None
+        self._load_timer.stop()
+        ld["mm"].close()
+        ld["fh"].close()
+        self.setReadOnly(False)
+        self.setUndoRedoEnabled(True)
+        self.document().setModified(False)
+        self.moveCursor(QTextCursor.Start)
+        self.loadFinished.emit(self.file_path or "")
+
+    def finish_loading(self):
+        # synchronously pull in whatever is left (e.g. before saving)
+        while self._loader is not None:
+            self._load_next_chunk()
+
+    def cancel_loading(self):
+        if self._loader is None:
+            return
+        ld = self._loader
+        self._loader = None
+        self._load_timer.stop()
+        ld["mm"].close()
+        ld["fh"].close()
+        self.setReadOnly(False)
+        self.setUndoRedoEnabled(True)
+
+    def set_text(self, text, path=None):
+        self.cancel_loading()
+        self.file_path = path
+        self.large_file = False
+        self.set_highlighting(True)
+        self.setPlainText(text)
+
+    # --- saving ---
+    def save_to(self, path):
+        self.finish_loading()
+        write_document(self.document(), path)
+        self.document().setModified(False)
+
+
+def _atomic_write(path, fill):
+    # fill(fh) writes path.tmp, which then replaces path in one rename, so a
+    # crash or a full disk never leaves a half-written source file behind
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fill(fh)
+            fh.flush()
+            os.fsync(fh.fileno())
+        if os.path.exists(path):
+            os.chmod(tmp, os.stat(path).st_mode & 0o7777)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def write_document(doc, path):
+    # streams the document block by block
+    def fill(fh):
+        block = doc.begin()
+        written = 0
+        batch = []
+        while block.isValid():
+            batch.append(block.text())
+            if len(batch) >= SAVE_BATCH:
+                fh.write(("\n" if written else "") + "\n".join(batch))
+                written += len(batch)
+                batch = []
+            block = block.next()
+        if batch:
+            fh.write(("\n" if written else "") + "\n".join(batch))
+    _atomic_write(path, fill)
+
+
+def write_text(text, path):
+    # an already captured snapshot (autosave writes these off the GUI thread)
+    _atomic_write(path, lambda fh: fh.write(text))
@@ -0,0 +1,280 @@
+# Plugin registry for the SDK headers in include/.
+# Every header gets a metadata record: size, content hash, exported symbols,
+# the system headers it pulls in, the libraries it needs at link time and
+# any #warning it carries (e.g. the qrtr.h deprecation). Records live in
+# .zenithcache/plugins.json keyed by mtime/size, so opening the Plugins
+# window or starting a build only stats the headers. Link flags for a build
+# come from the records of the headers the project actually includes.
+# A header can also name its libraries itself:
+#   // zenith-link: -lfoo -lbar
+import json, os, re, shutil
+
+from buildcache import CACHE_DIR, file_hash, scan_includes
+from symbolindex import HEADER_EXTENSIONS, parse_source
+
+INDEX_VERSION = 2
+INDEX_FILE = "plugins.json"
+EXPORT_KINDS = ("function", "macro", "struct", "union", "enum", "typedef")
+
+SYSTEM_INCLUDE_RE = re.compile(r'^[ \t]*#[ \t]*include[ \t]*<([^>]+)>', re.M)
+WARNING_RE = re.compile(r'^[ \t]*#[ \t]*(?:warning|pragma[ \t]+message)[ \t]*\(?[ \t]*"?([^"\n)]*)', re.M)
+LINK_DIRECTIVE_RE = re.compile(r'zenith-link:[ \t]*([^\n*]+)')
+
+# system header (or directory prefix) -> libraries to link
+SYSTEM_LIBS = [
+    ("openssl/", ["-lcrypto", "-lssl"]),
+    ("SDL2/SDL_ttf.h", ["-lSDL2_ttf"]),
+    ("SDL2/SDL_mixer.h", ["-lSDL2_mixer"]),
+    ("SDL2/SDL_image.h", ["-lSDL2_image"]),
+    ("SDL2/", ["-lSDL2"]),
+    ("libusb-1.0/", ["-lusb-1.0"]),
+    ("pthread.h", ["-pthread"]),  # compile and link, see buildengine.BOTH_PREFIXES
+    ("math.h", ["-lm"]),
+]
+
+
+def libs_for_includes(includes):
+    libs = []
+    for inc in includes:
+        for prefix, names in SYSTEM_LIBS:
+            if inc == prefix or (prefix.endswith("/") and inc.startswith(prefix)):
+                libs.extend(names)
+    return list(dict.fromkeys(libs))
+
+
+def scan_header(text, name=""):
+    # metadata that only depends on the header's content
+    includes = list(dict.fromkeys(SYSTEM_INCLUDE_RE.findall(text)))
+    libs = libs_for_includes(includes)
+    for m in LINK_DIRECTIVE_RE.finditer(text):
+        libs.extend(f for f in m.group(1).split() if f.startswith(("-l", "-L", "-Wl,", "-pthread")))
+    symbols = []
+    for sym in parse_source(text, name):
+        if sym.kind not in EXPORT_KINDS or sym.name in symbols:
+            continue
+        if sym.kind == "macro" and sym.name.endswith("_H") and not sym.signature:
+            continue  # include guard
+        symbols.append(sym.name)
+    warnings = [w.strip() for w in WARNING_RE.findall(text) if w.strip()]
+    return {
+        "includes": includes,
+        "libs": list(dict.fromkeys(libs)),
+        "symbols": symbols,
+        "warnings": warnings,
+    }
+
+
+class Plugin:
+    __slots__ = ("name", "mtime_ns", "size", "hash", "includes", "libs", "symbols", "warnings")
+
+    def __init__(self, name, mtime_ns, size, hash, includes=(), libs=(), symbols=(), warnings=()):
+        self.name = name          # path relative to the include dir
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.hash = hash
+        self.includes = list(includes)
+        self.libs = list(libs)
+        self.symbols = list(symbols)
+        self.warnings = list(warnings)
+
+    @property
+    def deprecated(self):
+        return any("deprecat" in w.lower() for w in self.warnings)
+
+    def to_json(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    @classmethod
+    def from_json(cls, js):
+        return cls(**{k: js[k] for k in cls.__slots__})
+
+
+class ImportResult:
+    def __init__(self):
+        self.copied = []      # names written to include/
+        self.same = []        # already there with identical content
+        self.conflicts = []   # (source, name): same name, different content, not overwritten
+        self.duplicates = []  # (name, existing): content already present under another name
+        self.failed = []      # (source, error)
+
+
+class PluginRegistry:
+    def __init__(self, root=".", include_dir="include", cache_dir=CACHE_DIR):
+        self.root = os.path.abspath(root)
+        self.include_dir = os.path.join(self.root, include_dir)
+        self.cache_path = os.path.join(self.root, cache_dir, INDEX_FILE)
+        self.plugins = {}     # name -> Plugin
+        self.parsed = 0       # headers scanned by the last refresh
+        self._loaded = False
+        self._dirty = False   # records changed since the last save
+
+    # --- persistence ---
+    def load(self):
+        self._loaded = True
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as fh:
+                js = json.load(fh)
+            if js.get("version") != INDEX_VERSION:
+                return
+            self.plugins = {p["name"]: Plugin.from_json(p) for p in js.get("plugins", [])}
+        except (OSError, ValueError, KeyError, TypeError):
+            self.plugins = {}
+
+    def save(self):
+        js = {"version": INDEX_VERSION, "plugins": [p.to_json() for p in self.plugins.values()]}
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp = self.cache_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(js, fh, separators=(",", ":"))
+        os.replace(tmp, self.cache_path)
+
+    # --- indexing ---
+    def header_names(self):
+        names = []
+        for dirpath, dirnames, filenames in os.walk(self.include_dir):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+            for f in sorted(filenames):
+                if f.endswith(HEADER_EXTENSIONS):
+                    names.append(os.path.relpath(os.path.join(dirpath, f), self.include_dir).replace(os.sep, "/"))
+        return names
+
+    def _index(self, name):
+        # returns True when the header had to be scanned
+        path = os.path.join(self.include_dir, name)
+        st = os.stat(path)
+        old = self.plugins.get(name)
+        if old and old.mtime_ns == st.st_mtime_ns and old.size == st.st_size:
+            return False
+        digest = file_hash(path)
+        if old and old.hash == digest:
+            old.mtime_ns, old.size = st.st_mtime_ns, st.st_size
+            self._dirty = True
+            return False
+        with open(path, "r", encoding="utf-8", errors="ignore") as fh:
+            meta = scan_header(fh.read(), name)
+        self.plugins[name] = Plugin(name, st.st_mtime_ns, st.st_size, digest, **meta)
+        self._dirty = True
+        return True
+
+    def refresh(self):
+        # stat every header, rescan the changed ones; returns True on changes
+        if not self._loaded:
+            self.load()
+        names = self.header_names()
+        changed = False
+        self.parsed = 0
+        for name in names:
+            try:
+                if self._index(name):
+                    self.parsed += 1
+                    changed = True
+            except OSError:
+                pass
+        for name in set(self.plugins) - set(names):
+            del self.plugins[name]
+            changed = self._dirty = True
+        # keep the on-disk order stable
+        self.plugins = {n: self.plugins[n] for n in names if n in self.plugins}
+        self._save_if_dirty()
+        return changed
+
+    def _save_if_dirty(self):
+        if self._dirty:
+            try:
+                self.save()
+                self._dirty = False
+            except OSError:
+                pass
+
+    # --- queries ---
+    def headers(self):
+        return list(self.plugins.values())
+
+    def get(self, name):
+        return self.plugins.get(name)
+
+    def find_hash(self, digest, exclude=None):
+        for p in self.plugins.values():
+            if p.hash == digest and p.name != exclude:
+                return p
+        return None
+
+    def duplicates(self):
+        # [[names]] of headers with identical content
+        groups = {}
+        for p in self.plugins.values():
+            groups.setdefault(p.hash, []).append(p.name)
+        return [names for names in groups.values() if len(names) > 1]
+
+    def used_by(self, sources):
+        # headers from include/ the given sources pull in, directly or not
+        used = set()
+        for src in sources:
+            try:
+                deps = scan_includes(src, [self.include_dir])
+            except OSError:
+                continue
+            for dep in deps:
+                rel = os.path.relpath(dep, self.include_dir)
+                if not rel.startswith(".."):
+                    used.add(rel.replace(os.sep, "/"))
+        return [n for n in self.plugins if n in used]
+
+    def link_flags(self, sources=None):
+        # (flags, [(header, libs)]) for the headers the sources use, or all of them
+        names = list(self.plugins) if sources is None else self.used_by(sources)
+        flags, reasons = [], []
+        for name in names:
+            libs = self.plugins[name].libs
+            if libs:
+                reasons.append((name, libs))
+                flags.extend(libs)
+        return list(dict.fromkeys(flags)), reasons
+
+    # --- import ---
+    def import_files(self, paths, overwrite=False, on_progress=None, cancelled=None):
+        # copies headers (or every header under a directory) into include/;
+        # files that would change an existing header are left for the caller
+        # to confirm and pass again with overwrite=True
+        if not self._loaded:
+            self.load()
+        sources = []
+        for path in paths:
+            if os.path.isdir(path):
+                for dirpath, dirnames, filenames in os.walk(path):
+                    dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+                    sources.extend(os.path.join(dirpath, f) for f in sorted(filenames) if f.endswith(HEADER_EXTENSIONS))
+            else:
+                sources.append(path)
+        result = ImportResult()
+        os.makedirs(self.include_dir, exist_ok=True)
+        for i, src in enumerate(sources):
+            if cancelled is not None and cancelled():
+                break
+            name = os.path.basename(src)
+            target = os.path.join(self.include_dir, name)
+            try:
+                digest = file_hash(os.path.abspath(src))
+                existing = self.plugins.get(name)
+                if existing is None and os.path.exists(target):
+                    self._index(name)
+                    existing = self.plugins.get(name)
+                if existing is not None and existing.hash == digest:
+                    result.same.append(name)
+                elif existing is not None and not overwrite:
+                    result.conflicts.append((src, name))
+                else:
+                    other = self.find_hash(digest, exclude=name)
+                    tmp = target + ".tmp"
+                    shutil.copy2(src, tmp)
+                    os.replace(tmp, target)
+                    self._index(name)
+                    result.copied.append(name)
+                    if other is not None:
+                        result.duplicates.append((name, other.name))
+            except OSError as e:
+                result.failed.append((src, str(e)))
+            if on_progress is not None:
+                on_progress(i + 1, len(sources))
+        self._save_if_dirty()
+        return result
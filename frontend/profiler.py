@@ -0,0 +1,458 @@
+# Run-time profiling for apps built with Studio / zenith.
+# Runs a binary N times (after some warmup runs) and records, per run, wall
+# time, user/system CPU, context switches and block I/O from the child's
+# rusage (os.wait4), and peak RSS sampled from /proc while it runs. Optionally the run is wrapped in `perf stat`
+# for hardware counters, or a -pg build is run under gprof for a flat
+# profile. Every report is stored in .zenithcache/profiles.json under the
+# sha256 of the profiled binary, so runs of different builds can be compared.
+# No Qt in here: Studio runs it on a worker thread.
+#   python3 profiler.py [-n 5] [-w 1] [--perf] [--gprof] [-- args for ./app]
+import argparse, json, math, os, shutil, statistics, subprocess, sys, tempfile, threading, time
+
+from buildcache import CACHE_DIR, file_hash
+
+PROFILES_FILE = "profiles.json"
+MAX_RECORDS = 200
+PERF_EVENTS = "task-clock,context-switches,cpu-migrations,page-faults,cycles,instructions,branch-misses"
+GPROF_OUTPUT = "app_prof"
+FLAT_ROWS = 25
+RSS_SAMPLE_INTERVAL = 0.01
+
+# metric -> (label, unit) in report order
+METRICS = {
+    "wall": ("wall", "s"),
+    "user": ("user CPU", "s"),
+    "sys": ("sys CPU", "s"),
+    "peak_rss_kb": ("peak RSS (sampled)", "KB"),
+    "vcsw": ("voluntary ctx switches", ""),
+    "ivcsw": ("involuntary ctx switches", ""),
+    "inblock": ("block reads", ""),
+    "oublock": ("block writes", ""),
+    "minflt": ("minor faults", ""),
+    "majflt": ("major faults", ""),
+}
+
+
+class ProfileCancelled(Exception):
+    pass
+
+
+def read_vm_hwm_kb(pid):
+    # VmHWM (peak resident set) of a live process, None once it has exited
+    try:
+        with open(f"/proc/{pid}/status", "rb") as fh:
+            for line in fh:
+                if line.startswith(b"VmHWM:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class RssSampler(threading.Thread):
+    # Peak RSS of the program itself. wait4's ru_maxrss can't be used: it
+    # also counts the mm the child was forked from, i.e. this Python process
+    # (Studio included). VmHWM is per mm and starts over at exec, so it's
+    # polled until the process exits; growth in the last interval is missed
+    # and runs shorter than one interval report nothing.
+    def __init__(self, pid, exe, follow_child=False, interval=RSS_SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.exe = exe                    # realpath of the program, None if unknown
+        self.follow_child = follow_child  # pid is a wrapper (perf stat); sample its child
+        self.interval = interval
+        self.peak_kb = None
+        self._done = threading.Event()
+
+    def target(self):
+        if not self.follow_child:
+            return self.pid
+        try:
+            with open(f"/proc/{self.pid}/task/{self.pid}/children", "r") as fh:
+                children = fh.read().split()
+        except OSError:
+            return None
+        return int(children[0]) if children else None
+
+    def exec_done(self, pid):
+        # before exec the child still runs (or shares) Python's mm
+        try:
+            exe = os.path.realpath(f"/proc/{pid}/exe")
+        except OSError:
+            return False
+        if self.exe is not None:
+            return exe == self.exe
+        return exe != os.path.realpath(sys.executable)
+
+    def sample(self):
+        pid = self.target()
+        if pid is None or not self.exec_done(pid):
+            return
+        kb = read_vm_hwm_kb(pid)
+        if kb is not None and (self.peak_kb is None or kb > self.peak_kb):
+            self.peak_kb = kb
+
+    def run(self):
+        self.sample()
+        while not self._done.wait(self.interval):
+            self.sample()
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        return self.peak_kb
+
+
+def program_path(cmd, cwd="."):
+    # (realpath of the program cmd runs, whether it's wrapped in perf stat)
+    wrapped = cmd[0] == "perf" and "--" in cmd
+    prog = cmd[cmd.index("--") + 1] if wrapped else cmd[0]
+    path = os.path.join(cwd, prog) if os.sep in prog else shutil.which(prog)
+    return (os.path.realpath(path) if path else None), wrapped
+
+
+def run_once(cmd, cwd=".", on_output=None, timeout=None, register=None):
+    # one run of cmd; returns (exit code, {metric: value})
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    if register is not None:
+        register(proc)
+    exe, wrapped = program_path(cmd, cwd)
+    sampler = RssSampler(proc.pid, exe, follow_child=wrapped)
+    sampler.start()
+
+    def drain():
+        for chunk in iter(lambda: proc.stdout.read1(65536), b""):
+            if on_output is not None:
+                on_output(chunk)
+
+    reader = threading.Thread(target=drain, daemon=True)
+    reader.start()
+    timer = None
+    if timeout:
+        timer = threading.Timer(timeout, proc.kill)
+        timer.start()
+    try:
+        # reap it ourselves so we get the child's rusage
+        _, status, ru = os.wait4(proc.pid, 0)
+    finally:
+        if timer is not None:
+            timer.cancel()
+        peak_kb = sampler.stop()
+    wall = time.perf_counter() - t0
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    reader.join()
+    proc.stdout.close()
+    sample = {
+        "wall": wall,
+        "user": ru.ru_utime,
+        "sys": ru.ru_stime,
+        "vcsw": ru.ru_nvcsw,
+        "ivcsw": ru.ru_nivcsw,
+        "inblock": ru.ru_inblock,
+        "oublock": ru.ru_oublock,
+        "minflt": ru.ru_minflt,
+        "majflt": ru.ru_majflt,
+    }
+    if peak_kb is not None:
+        sample["peak_rss_kb"] = peak_kb
+    return proc.returncode, sample
+
+
+def summarize(samples):
+    # {metric: {"mean", "median", "stdev", "min", "max"}}
+    out = {}
+    for metric in METRICS:
+        values = [s[metric] for s in samples if metric in s]
+        if not values:
+            continue
+        out[metric] = {
+            "mean": statistics.fmean(values),
+            "median": statistics.median(values),
+            "stdev": statistics.stdev(values) if len(values) > 1 else 0.0,
+            "min": min(values),
+            "max": max(values),
+        }
+    return out
+
+
+def perf_command(cmd, output):
+    return ["perf", "stat", "-x", ",", "-o", output, "-e", PERF_EVENTS, "--"] + cmd
+
+
+def parse_perf_stat(text):
+    # perf stat -x, lines: value,unit,event,... -> {event: value}
+    counters = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        parts = line.split(",")
+        if len(parts) < 3:
+            continue
+        try:
+            value = float(parts[0])
+        except ValueError:
+            continue  # <not supported> / <not counted>
+        counters[parts[2].split(":")[0]] = value
+    return counters
+
+
+def parse_gprof_flat(text, limit=FLAT_ROWS):
+    # rows of `gprof -b -p`: [{"name", "percent", "self_s", "calls"}]
+    rows = []
+    started = False
+    for line in text.splitlines():
+        if line.strip().startswith("time") and "name" in line:
+            started = True
+            continue
+        if not started or not line.strip():
+            continue
+        parts = line.split()
+        try:
+            percent, _, self_s = float(parts[0]), float(parts[1]), float(parts[2])
+        except (ValueError, IndexError):
+            continue
+        calls = int(parts[3]) if len(parts) > 4 and parts[3].isdigit() else None
+        rows.append({"name": parts[-1], "percent": percent, "self_s": self_s, "calls": calls})
+        if len(rows) >= limit:
+            break
+    return rows
+
+
+class Profiler:
+    def __init__(self, binary="./app", args=(), runs=5, warmup=1, perf=False, cwd=".",
+                 timeout=None, on_event=None, on_output=None, on_progress=None):
+        self.binary = binary
+        self.args = list(args)
+        self.runs = max(1, runs)
+        self.warmup = max(0, warmup)
+        self.perf = perf and shutil.which("perf") is not None
+        self.cwd = os.path.abspath(cwd)
+        self.timeout = timeout
+        self.on_event = on_event
+        self.on_output = on_output
+        self.on_progress = on_progress
+        self._proc = None
+        self._cancelled = False
+
+    def emit(self, message):
+        if self.on_event is not None:
+            self.on_event(message)
+
+    def cancel(self):
+        self._cancelled = True
+        proc = self._proc
+        if proc is not None:
+            try:
+                proc.kill()
+            except Exception:
+                pass
+
+    def _register(self, proc):
+        self._proc = proc
+
+    def command(self):
+        binary = self.binary if os.path.isabs(self.binary) or os.sep in self.binary else "./" + self.binary
+        return [binary] + self.args
+
+    def run(self, gprof_binary=None):
+        # returns the report dict (see ProfileStore)
+        binary_path = os.path.join(self.cwd, self.binary)
+        report = {
+            "binary": os.path.basename(self.binary),
+            "build": file_hash(binary_path),
+            "time": time.time(),
+            "args": self.args,
+            "runs": self.runs,
+            "warmup": self.warmup,
+            "exit_codes": [],
+            "samples": [],
+            "stats": {},
+            "perf": None,
+            "flat": None,
+        }
+        total = self.warmup + self.runs
+        cmd = self.command()
+        perf_out = None
+        if self.perf:
+            fd, perf_out = tempfile.mkstemp(prefix="zenith-perf-", suffix=".txt")
+            os.close(fd)
+        perf_runs = []
+        try:
+            for i in range(total):
+                if self._cancelled:
+                    raise ProfileCancelled()
+                warm = i < self.warmup
+                run_cmd = perf_command(cmd, perf_out) if self.perf and not warm else cmd
+                # only the first measured run is echoed, the rest would just repeat it
+                show = self.on_output if i == self.warmup else None
+                code, sample = run_once(run_cmd, self.cwd, show, self.timeout, self._register)
+                self._proc = None
+                if self._cancelled:
+                    raise ProfileCancelled()
+                label = f"warmup {i + 1}/{self.warmup}" if warm else f"run {i - self.warmup + 1}/{self.runs}"
+                self.emit(f"[profile] {label}: {sample['wall'] * 1000:.1f} ms wall, "
+                          f"{(sample['user'] + sample['sys']) * 1000:.1f} ms CPU, "
+                          f"{sample.get('peak_rss_kb', 'n/a')} KB peak RSS, exit {code}")
+                if not warm:
+                    report["exit_codes"].append(code)
+                    report["samples"].append(sample)
+                    if perf_out:
+                        with open(perf_out, "r", encoding="utf-8", errors="replace") as fh:
+                            perf_runs.append(parse_perf_stat(fh.read()))
+                if self.on_progress is not None:
+                    self.on_progress(i + 1, total)
+        finally:
+            if perf_out and os.path.exists(perf_out):
+                os.remove(perf_out)
+        report["stats"] = summarize(report["samples"])
+        if perf_runs:
+            events = {e for run in perf_runs for e in run}
+            report["perf"] = {e: statistics.median([r[e] for r in perf_runs if e in r]) for e in sorted(events)}
+        if gprof_binary is not None:
+            report["flat"] = self.flat_profile(gprof_binary)
+        return report
+
+    def flat_profile(self, prof_binary):
+        # one run of a -pg build, then gprof's flat profile
+        if shutil.which("gprof") is None:
+            self.emit("[profile] gprof not found, skipping the flat profile")
+            return None
+        gmon = os.path.join(self.cwd, "gmon.out")
+        if os.path.exists(gmon):
+            os.remove(gmon)
+        self.emit(f"[profile] gprof run of {os.path.basename(prof_binary)}")
+        code, _ = run_once([prof_binary] + self.args, self.cwd, None, self.timeout, self._register)
+        self._proc = None
+        if self._cancelled:
+            raise ProfileCancelled()
+        if not os.path.exists(gmon):
+            self.emit(f"[profile] no gmon.out (exit {code}); the app must exit normally for gprof")
+            return None
+        out = subprocess.run(["gprof", "-b", "-p", prof_binary, gmon], cwd=self.cwd,
+                             capture_output=True, text=True).stdout
+        os.remove(gmon)
+        return parse_gprof_flat(out)
+
+
+class ProfileStore:
+    def __init__(self, root=".", cache_dir=CACHE_DIR):
+        self.path = os.path.join(os.path.abspath(root), cache_dir, PROFILES_FILE)
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                records = json.load(fh)
+            return records if isinstance(records, list) else []
+        except (OSError, ValueError):
+            return []
+
+    def add(self, report):
+        records = self.load()
+        records.append(report)
+        records = records[-MAX_RECORDS:]
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(records, fh, separators=(",", ":"))
+        os.replace(tmp, self.path)
+
+    def history(self, binary=None):
+        return [r for r in self.load() if binary is None or r.get("binary") == binary]
+
+    def previous(self, report, same_build=False):
+        # latest earlier record of the same binary, from the same or another build
+        for r in reversed(self.history(report["binary"])):
+            if r["time"] >= report["time"]:
+                continue
+            if (r["build"] == report["build"]) == same_build:
+                return r
+        return None
+
+
+def compare(report, baseline):
+    # [(label, unit, old median, new median, change in %)]
+    rows = []
+    for metric, (label, unit) in METRICS.items():
+        new = report["stats"].get(metric)
+        old = baseline["stats"].get(metric)
+        if not new or not old:
+            continue
+        change = (new["median"] - old["median"]) / old["median"] * 100 if old["median"] else math.nan
+        rows.append((label, unit, old["median"], new["median"], change))
+    return rows
+
+
+def _fmt(value, unit):
+    if unit == "s":
+        return f"{value * 1000:.2f} ms"
+    return f"{value:.0f} {unit}".strip()
+
+
+def format_report(report, baseline=None):
+    lines = [f"Profile of {report['binary']} (build {report['build'][:12]}), "
+             f"{report['runs']} runs after {report['warmup']} warmup"]
+    bad = [c for c in report["exit_codes"] if c != 0]
+    if bad:
+        lines.append(f"warning: {len(bad)} run(s) exited non-zero ({sorted(set(bad))})")
+    lines.append(f"{'metric':<26} {'mean':>12} {'median':>12} {'stdev':>12} {'min':>12} {'max':>12}")
+    for metric, (label, unit) in METRICS.items():
+        st = report["stats"].get(metric)
+        if st:
+            lines.append(f"{label:<26} " + " ".join(f"{_fmt(st[k], unit):>12}"
+                                                    for k in ("mean", "median", "stdev", "min", "max")))
+    if report.get("perf"):
+        lines.append("perf stat (median per run):")
+        for event, value in report["perf"].items():
+            lines.append(f"  {event:<24} {value:>16,.0f}")
+    if report.get("flat"):
+        lines.append("flat profile (gprof):")
+        lines.append(f"  {'%time':>6} {'self s':>9} {'calls':>10}  name")
+        for row in report["flat"]:
+            calls = "" if row["calls"] is None else str(row["calls"])
+            lines.append(f"  {row['percent']:>6.2f} {row['self_s']:>9.2f} {calls:>10}  {row['name']}")
+    if baseline is not None:
+        same = baseline["build"] == report["build"]
+        lines.append(f"vs {'same build' if same else 'build ' + baseline['build'][:12]} "
+                     f"({time.strftime('%Y-%m-%d %H:%M', time.localtime(baseline['time']))}), medians:")
+        for label, unit, old, new, change in compare(report, baseline):
+            delta = "" if math.isnan(change) else f"{change:+.1f}%"
+            lines.append(f"  {label:<24} {_fmt(old, unit):>12} -> {_fmt(new, unit):>12}  {delta}")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile a ZenithOS app")
+    parser.add_argument("-C", "--directory", default=".", help="project root")
+    parser.add_argument("-b", "--binary", default="app")
+    parser.add_argument("-n", "--runs", type=int, default=5)
+    parser.add_argument("-w", "--warmup", type=int, default=1)
+    parser.add_argument("--perf", action="store_true", help="wrap the runs in perf stat")
+    parser.add_argument("--gprof", action="store_true", help="build with -pg and add gprof's flat profile")
+    parser.add_argument("--timeout", type=float, default=None, help="seconds per run")
+    parser.add_argument("args", nargs="*", help="arguments for the app (after --)")
+    args = parser.parse_args(argv)
+
+    prof_binary = None
+    if args.gprof:
+        from buildengine import Project
+        from zenith import CachedBuild
+        build = CachedBuild(Project.load(args.directory), output=GPROF_OUTPUT, flags=["-pg"],
+                            target="native-pg", on_event=print)
+        if not build.run().ok:
+            return 1
+        prof_binary = build.output
+    profiler = Profiler(args.binary, args.args, args.runs, args.warmup, args.perf, args.directory,
+                        args.timeout, on_event=print)
+    if args.perf and not profiler.perf:
+        print("perf not found, running without perf stat")
+    report = profiler.run(prof_binary)
+    store = ProfileStore(args.directory)
+    baseline = store.previous(report) or store.previous(report, same_build=True)
+    store.add(report)
+    print("\n".join(format_report(report, baseline)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
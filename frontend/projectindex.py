@@ -0,0 +1,118 @@
+# Project index used by the Studio project tree (and the build tools).
+# Directories are listed with os.scandir on demand and cached until the
+# file watcher says they changed; dot-dirs, build outputs and anything
+# matched by the project's .gitignore are pruned instead of walked.
+import fnmatch, os
+
+DEFAULT_IGNORES = [
+    "build", "buildout", "dist", "__pycache__", "node_modules", "venv", "env",
+]
+SOURCE_EXTENSIONS = (".c", ".h")
+
+
+class IgnoreRules:
+    def __init__(self, patterns=None):
+        self.names = set()
+        self.patterns = []  # (pattern, anchored, dir_only)
+        for p in patterns or []:
+            self.add(p)
+
+    def add(self, pattern):
+        pattern = pattern.strip()
+        # negations are rare in SDK checkouts; treat them as "don't ignore"
+        if not pattern or pattern.startswith("#") or pattern.startswith("!"):
+            return
+        dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        anchored = pattern.startswith("/") or "/" in pattern
+        pattern = pattern.lstrip("/")
+        if not anchored and not dir_only and not any(c in pattern for c in "*?["):
+            self.names.add(pattern)
+            return
+        self.patterns.append((pattern, anchored, dir_only))
+
+    def load_gitignore(self, path):
+        try:
+            with open(path, "r", encoding="utf-8", errors="ignore") as fh:
+                for line in fh:
+                    self.add(line)
+        except OSError:
+            pass
+
+    def match(self, rel_path, name, is_dir):
+        if name in self.names:
+            return True
+        for pattern, anchored, dir_only in self.patterns:
+            if dir_only and not is_dir:
+                continue
+            if fnmatch.fnmatchcase(rel_path if anchored else name, pattern):
+                return True
+        return False
+
+
+class ProjectIndex:
+    def __init__(self, root=".", extensions=SOURCE_EXTENSIONS, ignores=DEFAULT_IGNORES):
+        self.root = os.path.abspath(root)
+        self.extensions = tuple(extensions)
+        self.rules = IgnoreRules(ignores)
+        self.rules.load_gitignore(os.path.join(self.root, ".gitignore"))
+        self.cache = {}  # rel dir -> (dirs, files)
+
+    def abspath(self, rel):
+        return self.root if rel == "." else os.path.join(self.root, rel)
+
+    @staticmethod
+    def join(rel, name):
+        return name if rel == "." else rel + "/" + name
+
+    def list_dir(self, rel="."):
+        cached = self.cache.get(rel)
+        if cached is not None:
+            return cached
+        dirs, files = [], []
+        try:
+            with os.scandir(self.abspath(rel)) as it:
+                for entry in it:
+                    name = entry.name
+                    if name.startswith("."):
+                        continue
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if is_dir:
+                        if not self.rules.match(self.join(rel, name), name, True):
+                            dirs.append(name)
+                    elif name.endswith(self.extensions):
+                        if not self.rules.match(self.join(rel, name), name, False):
+                            files.append(name)
+        except OSError:
+            pass
+        dirs.sort()
+        files.sort()
+        result = (dirs, files)
+        self.cache[rel] = result
+        return result
+
+    def invalidate(self, rel="."):
+        self.cache.pop(rel, None)
+
+    def forget(self, rel):
+        # drop a directory and everything cached below it
+        prefix = rel + "/"
+        for key in [k for k in self.cache if k == rel or k.startswith(prefix)]:
+            del self.cache[key]
+
+    def clear(self):
+        self.cache.clear()
+
+    def iter_files(self, rel="."):
+        # full pruned walk, yields relative file paths
+        stack = [rel]
+        while stack:
+            cur = stack.pop()
+            dirs, files = self.list_dir(cur)
+            for f in files:
+                yield self.join(cur, f)
+            for d in reversed(dirs):
+                stack.append(self.join(cur, d))
@@ -0,0 +1,224 @@
+# Search engine behind the editor search bar.
+# Keeps one snapshot of the document (refreshed only when the document
+# changes, not per keystroke in the search box), stores hits as a compact
+# array of offsets and narrows the previous hit set when the query is just
+# extended. The GUI only turns the hits inside the viewport into selections.
+# Hits are stored as code point offsets into the snapshot; every position
+# going in or out of the public API is a QTextCursor position, which counts
+# UTF-16 units, so characters outside the BMP are mapped at the boundary.
+# Plain searches report overlapping hits ("aa" twice in "aaa"), regex
+# searches the non-overlapping matches of finditer.
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+
+MAX_RESULTS = 200000
+PAGE_SIZE = 500
+ASTRAL_RE = re.compile("[\U00010000-\U0010FFFF]")  # two UTF-16 units each
+
+
+class SearchEngine:
+    def __init__(self, max_results=MAX_RESULTS):
+        self.max_results = max_results
+        self.text = None
+        self.folded = None
+        self.query = ""
+        self.case_sensitive = False
+        self.regex_mode = False
+        self.starts = array("i")
+        self.ends = array("i")
+        self.truncated = False
+        self.narrowed = False  # the last search filtered the previous hits instead of scanning
+        self.current = -1
+        self.error = None
+        self.astral = array("i")    # code point offsets of non-BMP characters
+        self.astral16 = array("i")  # the same characters' UTF-16 offsets
+
+    # --- document snapshot ---
+    def set_text(self, text):
+        self.text = text
+        self.folded = None
+        self.astral = array("i")
+        if not text.isascii():
+            self.astral.extend(m.start() for m in ASTRAL_RE.finditer(text))
+        self.astral16 = array("i", (pos + i for i, pos in enumerate(self.astral)))
+        self.reset()
+
+    def _to_utf16(self, offset):
+        return offset + bisect_left(self.astral, offset) if self.astral else offset
+
+    def _from_utf16(self, position):
+        return position - bisect_left(self.astral16, position) if self.astral16 else position
+
+    def invalidate(self):
+        # document changed: drop the snapshot but keep the old hits around
+        # so the viewport doesn't flicker until the next (debounced) search
+        self.text = None
+        self.folded = None
+
+    def has_text(self):
+        return self.text is not None
+
+    def reset(self):
+        self.query = ""
+        self.starts = array("i")
+        self.ends = array("i")
+        self.truncated = False
+        self.narrowed = False
+        self.current = -1
+        self.error = None
+
+    def _haystack(self):
+        if self.case_sensitive:
+            return self.text
+        if self.folded is None:
+            # lower() keeps offsets for everything but a few exotic code points
+            self.folded = self.text.lower()
+            if len(self.folded) != len(self.text):
+                self.folded = None
+                return None
+        return self.folded
+
+    # --- searching ---
+    def search(self, query, case_sensitive=False, regex_mode=False):
+        if self.text is None:
+            raise RuntimeError("search engine has no document snapshot")
+        can_narrow = (
+            not regex_mode and not self.regex_mode
+            and case_sensitive == self.case_sensitive
+            and self.query and query.startswith(self.query)
+            and not self.truncated and self.error is None
+        )
+        old_query = self.query
+        self.case_sensitive = case_sensitive
+        self.regex_mode = regex_mode
+        self.error = None
+        if not query:
+            self.reset()
+            return 0
+        if can_narrow and query != old_query:
+            self._narrow(query)
+        elif not can_narrow:
+            self._scan(query)
+        self.narrowed = can_narrow
+        self.query = query
+        self.current = -1
+        return len(self.starts)
+
+    def _scan(self, query):
+        starts = array("i")
+        ends = array("i")
+        self.truncated = False
+        limit = self.max_results
+        if self.regex_mode:
+            try:
+                rx = re.compile(query, 0 if self.case_sensitive else re.IGNORECASE)
+            except re.error as e:
+                self.starts, self.ends = starts, ends
+                self.error = str(e)
+                return
+            for m in rx.finditer(self.text):
+                s, e = m.span()
+                if s == e:
+                    continue
+                starts.append(s)
+                ends.append(e)
+                if len(starts) >= limit:
+                    self.truncated = True
+                    break
+        else:
+            hay = self._haystack()
+            needle = query if self.case_sensitive else query.lower()
+            if hay is None:
+                # lower() changed lengths, fall back to a regex; the lookahead
+                # keeps overlapping hits like _find_all does
+                rx = re.compile("(?=(%s))" % re.escape(query), re.IGNORECASE)
+                spans = (m.span(1) for m in rx.finditer(self.text))
+            else:
+                spans = self._find_all(hay, needle)
+            for s, e in spans:
+                starts.append(s)
+                ends.append(e)
+                if len(starts) >= limit:
+                    self.truncated = True
+                    break
+        self.starts, self.ends = starts, ends
+
+    @staticmethod
+    def _find_all(hay, needle):
+        # str.find is much faster than finditer for plain substrings.
+        # Overlapping hits are kept so narrowing never misses a match
+        # hidden behind an earlier, shorter one ("aa" -> "aab" in "aaab").
+        n = len(needle)
+        find = hay.find
+        pos = find(needle)
+        while pos >= 0:
+            yield pos, pos + n
+            pos = find(needle, pos + 1)
+
+    def _narrow(self, query):
+        hay = self._haystack()
+        if hay is None:
+            self._scan(query)
+            return
+        needle = query if self.case_sensitive else query.lower()
+        n = len(needle)
+        starts = array("i")
+        ends = array("i")
+        startswith = hay.startswith
+        for s in self.starts:
+            if startswith(needle, s):
+                starts.append(s)
+                ends.append(s + n)
+        self.starts, self.ends = starts, ends
+
+    # --- results ---
+    def count(self):
+        return len(self.starts)
+
+    def span(self, index):
+        # QTextCursor positions of hit index
+        return self._to_utf16(self.starts[index]), self._to_utf16(self.ends[index])
+
+    def page(self, number, size=PAGE_SIZE):
+        lo = number * size
+        hi = min(lo + size, len(self.starts))
+        return [self.span(i) for i in range(lo, hi)]
+
+    def in_range(self, start, end):
+        # hits overlapping [start, end), used for the visible viewport
+        lo = bisect_right(self.ends, self._from_utf16(start))
+        hi = bisect_left(self.starts, self._from_utf16(end))
+        return [self.span(i) for i in range(lo, hi)]
+
+    # --- navigation ---
+    def next(self, position):
+        if not self.starts:
+            return None
+        idx = bisect_left(self.starts, self._from_utf16(position))
+        if idx >= len(self.starts):
+            idx = 0
+        self.current = idx
+        return self.span(idx)
+
+    def previous(self, position):
+        if not self.starts:
+            return None
+        idx = bisect_left(self.starts, self._from_utf16(position)) - 1
+        if idx < 0:
+            idx = len(self.starts) - 1
+        self.current = idx
+        return self.span(idx)
+
+    def status(self):
+        if self.error:
+            return "Invalid regex"
+        if not self.query:
+            return ""
+        total = len(self.starts)
+        suffix = "+" if self.truncated else ""
+        if total == 0:
+            return "No matches"
+        if self.current >= 0:
+            return f"{self.current + 1}/{total}{suffix}"
+        return f"{total}{suffix} matches"
@@ -1,61 +1,87 @@
+import sys, os, time, threading
+import json
+
+# everything above is cheap; Qt and the SDK modules are what --startup-profile calls "import"
+IMPORT_STARTED = time.perf_counter()
+
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QPushButton, QVBoxLayout,
     QLabel, QTextEdit, QMessageBox, QHBoxLayout, QStackedWidget,
     QDialog, QComboBox, QLineEdit, QCheckBox, QToolTip,
     QFileDialog, QListWidget, QListWidgetItem, QSplashScreen,
-    QTreeWidget, QTreeWidgetItem, QSplitter, QInputDialog, QPlainTextEdit
+    QTreeWidget, QTreeWidgetItem, QSplitter, QInputDialog, QPlainTextEdit, QSpinBox,
+    QProgressBar, QTabBar
 )
 from PySide6.QtGui import (
     QFont, QKeySequence, QAction, QColor, QTextCharFormat,
-    QSyntaxHighlighter, QTextCursor, QPixmap
+    QSyntaxHighlighter, QTextCursor, QPixmap, QPalette
 )
-from PySide6.QtCore import Qt, QPropertyAnimation, QEasingCurve, QEvent, QPoint, QTimer, QProcess
-import sys, os, subprocess, re, time, shutil, zipfile
-import json
+from PySide6.QtCore import (
+    Qt, QPropertyAnimation, QEasingCurve, QEvent, QPoint, QTimer, QProcess, QFileSystemWatcher,
+    QObject, Signal
+)
+# the editor/build modules (lexer, search, terminal, build engine, packager)
+# are imported where they are first used so the main menu comes up without them
+import shutil
+from themes import ThemeEngine
+
+DEFAULT_SETTINGS = {
+    "terminal_max_blocks": 5000,
+    "terminal_fps": 40,
+    "build_jobs": 0,  # 0 = one per core
+    "diagnostics_delay_ms": 600,  # idle time before the background syntax check, 0 = off
+    "autosave_seconds": 30,  # 0 = off
+    "compiler_cache": False,  # ccache when installed, else the built-in object cache
+    "precompiled_headers": False,  # .gch for the SDK headers at the top of each unit
+    "profile_runs": 5,
+    "profile_warmup": 1,
+}
 
 def log(message):
     timestamp = f"[{time.time():.2f}]"
     print(f"{timestamp} {message}")
 
 class CSyntaxHighlighter(QSyntaxHighlighter):
-    def __init__(self, document):
+    def __init__(self, document, lexer=None):
         super().__init__(document)
-        self.highlighting_rules = []
-        keyword_format = QTextCharFormat()
-        keyword_format.setForeground(QColor("#FF79C6"))
-        keyword_format.setFontWeight(QFont.Bold)
-        keywords = [
-            "int", "char", "float", "if", "else", "for", "while", "return", "void",
-            "struct", "typedef", "enum", "const", "static", "extern", "switch", "case",
-            "break", "continue", "goto", "sizeof", "long", "short", "unsigned", "signed"
-        ]
-        self.function_format = QTextCharFormat()
-        self.function_format.setForeground(QColor("#FFD700"))
-        self.function_format.setFontWeight(QFont.Bold)
-        self.functions = [
-            "printf", "scanf", "malloc", "free", "strlen", "strcmp", "strcpy",
-            "fopen", "fclose", "fread", "fwrite", "exit", "perror", "system"
-        ]
-        for word in keywords:
-            pattern = r'\b' + word + r'\b'
-            self.highlighting_rules.append((re.compile(pattern), keyword_format))
-        string_format = QTextCharFormat()
-        string_format.setForeground(QColor("#F1FA8C"))
-        self.highlighting_rules.append((re.compile(r'"[^"\\]*(\\.[^"\\]*)*"'), string_format))
-        number_format = QTextCharFormat()
-        number_format.setForeground(QColor("#BD93F9"))
-        self.highlighting_rules.append((re.compile(r'\b\d+\b'), number_format))
-        function_pattern = r'\b(' + '|'.join(self.functions) + r')\b\s*\('
-        self.highlighting_rules.append((re.compile(function_pattern), self.function_format))
-        directive_format = QTextCharFormat()
-        directive_format.setForeground(QColor("#8BE9FD"))
-        self.highlighting_rules.append((re.compile(r'#\s*(include|define)\b'), directive_format))
+        from clexer import CLexer
+        # one lexer can be shared by the highlighters of all open documents
+        self.lexer = lexer if lexer is not None else CLexer()
+        # kept for callers that extend the known function list
+        self.functions = self.lexer.functions
+        self.formats = {}
+        self.set_format("keyword", "#FF79C6", bold=True)
+        self.set_format("function", "#FFD700", bold=True)
+        self.set_format("string", "#F1FA8C")
+        self.set_format("char", "#F1FA8C")
+        self.set_format("number", "#BD93F9")
+        self.set_format("directive", "#8BE9FD")
+        self.set_format("comment", "#6272A4", italic=True)
+        # SDK / project symbols from the symbol index (lexer.symbols)
+        self.set_format("sdk_function", "#50FA7B")
+        self.set_format("sdk_type", "#66D9EF", italic=True)
+        self.set_format("sdk_constant", "#FFB86C")
+
+    def set_format(self, kind, color, bold=False, italic=False):
+        fmt = QTextCharFormat()
+        fmt.setForeground(QColor(color))
+        if bold:
+            fmt.setFontWeight(QFont.Bold)
+        if italic:
+            fmt.setFontItalic(True)
+        self.formats[kind] = fmt
 
     def highlightBlock(self, text):
-        for pattern, fmt in self.highlighting_rules:
-            for match in pattern.finditer(text):
-                start, end = match.span()
-                self.setFormat(start, end - start, fmt)
+        # previousBlockState() is -1 for the first block
+        state = self.previousBlockState()
+        spans, state = self.lexer.lex_line(text, state if state > 0 else 0)
+        formats = self.formats
+        for start, length, kind in spans:
+            fmt = formats.get(kind)
+            if fmt is not None:
+                self.setFormat(start, length, fmt)
+        # Qt re-highlights the next block only when this value changes
+        self.setCurrentBlockState(state)
 
 class LongPressButton(QPushButton):
     def __init__(self, text="", parent=None, long_press_ms=600):
@@ -98,21 +124,242 @@ class LongPressButton(QPushButton):
     def set_long_press(self, fn):
         self._long_press_callback = fn
 
+class BuildJob(QObject):
+    # runs a BuildEngine on a worker thread, reports back through signals
+    output = Signal(str)
+    finished = Signal(int)
+
+    def __init__(self, engine, parent=None, cached=None):
+        super().__init__(parent)
+        self.engine = engine
+        self.engine.on_event = self.output.emit
+        self.cached = cached  # zenith.CachedBuild to store the output into, if any
+        self.result = None
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        try:
+            self.result = self.engine.build()
+            code = 0 if self.result.ok else 1
+            if self.cached is not None:
+                self.cached.store(self.result.ok)
+        except Exception as e:
+            self.output.emit(f"Build error: {e}")
+            code = 1
+        self.finished.emit(code)
+
+    def kill(self):
+        self.engine.cancel()
+
+    def abandon(self):
+        # cancel and stop reporting: a newer job has taken this one's place
+        self.output.disconnect()
+        self.finished.disconnect()
+        self.kill()
+
+class SymbolJob(QObject):
+    # refreshes the symbol index (or one file of it) on a worker thread
+    finished = Signal(bool)
+
+    def __init__(self, index, path=None, parent=None):
+        super().__init__(parent)
+        self.index = index
+        self.path = path
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        try:
+            if self.path is not None:
+                changed = self.index.update_file(self.path)
+            else:
+                changed = self.index.refresh()
+        except Exception as e:
+            log(f"[symbols] indexing failed: {e}")
+            changed = False
+        self.finished.emit(changed)
+
+class DiagnosticsJob(QObject):
+    # one background `gcc -fsyntax-only` run over a buffer snapshot
+    finished = Signal(int, object)
+
+    def __init__(self, checker, text, filename, generation, parent=None):
+        super().__init__(parent)
+        self.checker = checker
+        self.text = text
+        self.filename = filename
+        self.generation = generation
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        try:
+            diags = self.checker.check(self.text, self.filename)
+        except Exception as e:
+            log(f"[diagnostics] check failed: {e}")
+            diags = None
+        self.finished.emit(self.generation, diags)
+
+class PackJob(QObject):
+    # packs the project into a .zapp on a worker thread
+    progress = Signal(int, int)
+    finished = Signal(bool, str)
+
+    def __init__(self, output="project.zapp", binary="app", parent=None):
+        super().__init__(parent)
+        self.output = output
+        self.binary = binary
+        self.result = None
+        self.thread = None
+        self._cancelled = False
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        from buildengine import Project
+        from zapp import PackCancelled
+        from zenith import package
+        try:
+            self.result = package(Project.load("."), self.output, binary=self.binary,
+                                  on_progress=self.progress.emit,
+                                  cancelled=lambda: self._cancelled)
+            self.finished.emit(True, "")
+        except PackCancelled:
+            self.finished.emit(False, "cancelled")
+        except Exception as e:
+            self.finished.emit(False, str(e))
+
+    def kill(self):
+        self._cancelled = True
+
+class ProfileJob(QObject):
+    # "Run with profiling": optional -pg build, then N measured runs on a worker thread
+    output = Signal(str)
+    app_output = Signal(bytes)
+    progress = Signal(int, int)
+    finished = Signal(object, str)
+
+    def __init__(self, runs, warmup, args, perf=False, gprof=False, parent=None):
+        super().__init__(parent)
+        from profiler import Profiler
+        self.gprof = gprof
+        self.build = None
+        self.profiler = Profiler("app", args, runs, warmup, perf,
+                                 on_event=self.output.emit, on_output=self.app_output.emit,
+                                 on_progress=self.progress.emit)
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        from buildengine import Project
+        from profiler import GPROF_OUTPUT, ProfileCancelled
+        from zenith import CachedBuild
+        try:
+            prof_binary = None
+            if self.gprof:
+                # separate -pg binary and object dir, so ./app stays a normal build
+                self.build = CachedBuild(Project.load("."), output=GPROF_OUTPUT, flags=["-pg"],
+                                         target="native-pg", on_event=self.output.emit)
+                if not self.build.run().ok:
+                    self.finished.emit(None, "gprof build failed")
+                    return
+                prof_binary = self.build.output
+            self.finished.emit(self.profiler.run(prof_binary), "")
+        except ProfileCancelled:
+            self.finished.emit(None, "cancelled")
+        except Exception as e:
+            self.finished.emit(None, str(e))
+
+    def kill(self):
+        if self.build is not None:
+            self.build.engine.cancel()
+        self.profiler.cancel()
+
+class AccelMeasureJob(QObject):
+    # plain vs accelerated compile of one unit, on a worker thread
+    output = Signal(str)
+    finished = Signal()
+
+    def __init__(self, accel, engine, parent=None):
+        super().__init__(parent)
+        self.accel = accel
+        self.engine = engine
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        try:
+            for line in self.accel.measure(self.engine):
+                self.output.emit(line)
+        except Exception as e:
+            self.output.emit(f"[accel] measuring failed: {e}")
+        self.finished.emit()
+
+class PluginImportJob(QObject):
+    # copies plugin headers into include/ on a worker thread
+    progress = Signal(int, int)
+    finished = Signal(object, bool)
+
+    def __init__(self, registry, paths, overwrite=False, parent=None):
+        super().__init__(parent)
+        self.registry = registry
+        self.paths = list(paths)
+        self.overwrite = overwrite
+        self.thread = None
+        self._cancelled = False
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        from plugins import ImportResult
+        try:
+            result = self.registry.import_files(self.paths, overwrite=self.overwrite,
+                                                on_progress=self.progress.emit,
+                                                cancelled=lambda: self._cancelled)
+        except Exception as e:
+            result = ImportResult()
+            result.failed.append(("", str(e)))
+        self.finished.emit(result, self.overwrite)
+
+    def kill(self):
+        self._cancelled = True
+
 class ZenithOSApp(QMainWindow):
+    firstPaint = Signal()
+
     def __init__(self):
         super().__init__()
         QToolTip.setFont(QFont("Arial", 10))
-        app = QApplication.instance()
-        if app is not None:
-            app.setStyleSheet("QToolTip { color: white; background-color: #2b2b2b; border: 1px solid #dddddd; padding: 5px; }")
 
         self.setWindowTitle("ZenithOS Studio")
         self.showMaximized()
-        self.setStyleSheet("background-color: #1F001F;")
         self.current_theme = "purple"
         self.stacked_widget = QStackedWidget()
         self.setCentralWidget(self.stacked_widget)
-        self.available_themes = ["purple", "dark", "deepblue"]
+        # built-in themes plus any JSON themes in data/themes/
+        self.theme_engine = ThemeEngine()
+        self.available_themes = self.theme_engine.names()
+        self.load_settings()
         # load saved theme state (if exists)
         try:
             self.load_theme_state()
@@ -122,16 +369,26 @@ class ZenithOSApp(QMainWindow):
 
         self.plugins_window = None
         self.plugins_list_widget = None
+        self.plugin_registry = None
+        self.plugin_job = None
 
         # processes
         self.build_process = None
         self.run_process = None
-
+        self.profile_job = None
+        self.run_after_build = False
+        self.target_builds = {}
+        # .zapp pipeline: None, "compile" or "pack"
+        self.zapp_stage = None
+        self.zapp_job = None
+
+        # only the main menu is built up front; the editor page (and its SDK
+        # settings tab) is created the first time it is opened
         self.main_menu = self.create_main_menu()
-        self.editor_page = self.create_editor_page()
+        self.editor_page = None
+        self.api_settings_panel = None
+        self.first_paint_done = False
         self.stacked_widget.addWidget(self.main_menu)
-        self.stacked_widget.addWidget(self.editor_page)
-        self.set_shortcuts()
         # apply theme to the freshly created UI
         try:
             self.apply_theme()
@@ -139,6 +396,22 @@ class ZenithOSApp(QMainWindow):
             pass
         log("Starting ZenithOS Studio..")
         
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.first_paint_done:
+            self.first_paint_done = True
+            self.firstPaint.emit()
+
+    def ensure_editor_page(self):
+        if self.editor_page is None:
+            t0 = time.perf_counter()
+            self.editor_page = self.create_editor_page()
+            self.stacked_widget.addWidget(self.editor_page)
+            self.set_shortcuts()
+            self.refresh_symbols()
+            log(f"Editor page built in {(time.perf_counter() - t0) * 1000:.0f} ms")
+        return self.editor_page
+
     def set_shortcuts(self):
         save_shortcut = QKeySequence(Qt.CTRL | Qt.Key_S)
         save_action = QAction(self)
@@ -158,6 +431,16 @@ class ZenithOSApp(QMainWindow):
         show_search_action.triggered.connect(self.show_search_bar)
         self.addAction(show_search_action)
 
+        next_match_action = QAction(self)
+        next_match_action.setShortcut(QKeySequence(Qt.Key_F3))
+        next_match_action.triggered.connect(self.find_next)
+        self.addAction(next_match_action)
+
+        prev_match_action = QAction(self)
+        prev_match_action.setShortcut(QKeySequence(Qt.SHIFT | Qt.Key_F3))
+        prev_match_action.triggered.connect(self.find_previous)
+        self.addAction(prev_match_action)
+
 
     # --- theme persistence and helpers ---
     def load_theme_state(self):
@@ -187,104 +470,46 @@ class ZenithOSApp(QMainWindow):
         except Exception as e:
             print("[themestate] save failed:", e)
 
-    def get_common_button_style(self):
-        # returns a simple, consistent QPushButton style for current theme
-        if self.current_theme == "dark":
-            bg = "#2f3136"        # graphite/dark gray
-            hover = "#444548"
-            text = "white"
-        elif self.current_theme == "deepblue":
-            bg = "#0f2b45"        # calm dark blue
-            hover = "#113a5f"
-            text = "white"
-        else:
-            # purple default
-            bg = "#6200EE"
-            hover = "#3700B3"
-            text = "white"
-        style = f"""
-            QPushButton {{
-                background-color: {bg};
-                color: {text};
-                font-size: 14px;
-                border: none;
-                padding: 8px 14px;
-                border-radius: 12px;
-            }}
-            QPushButton:hover {{
-                background-color: {hover};
-            }}
-        """
-        return style
-
-    def apply_theme(self):
-        # apply basic colors to main window and common widgets
-        if self.current_theme == "dark":
-            self.setStyleSheet("background-color: #121212; color: white;")
-            txt_bg = "#1E1E1E"
-            txt_color = "#C0C0C0"
-            tree_bg = "#1A1A1A"
-            terminal_bg = "#000000"
-            terminal_color = "#00FF00"
-            lineedit_bg = "#2a2a2a"
-            lineedit_border = "#444444"
-        elif self.current_theme == "deepblue":
-            self.setStyleSheet("background-color: #071029; color: white;")
-            txt_bg = "#07172b"
-            txt_color = "#DDE7F2"
-            tree_bg = "#071022"
-            terminal_bg = "#00101a"
-            terminal_color = "#7FE0FF"
-            lineedit_bg = "#082135"
-            lineedit_border = "#0b3a5f"
-        else:
-            # purple
-            self.setStyleSheet("background-color: #1F001F; color: white;")
-            txt_bg = "#2C0032"
-            txt_color = "#E0E0E0"
-            tree_bg = "#2C0032"
-            terminal_bg = "#000000"
-            terminal_color = "#00FF00"
-            lineedit_bg = "#6A0DAD"
-            lineedit_border = "#BB86FC"
-
-        # apply to editor if exists
+    def load_settings(self):
+        self.settings = dict(DEFAULT_SETTINGS)
         try:
-            self.text_edit.setStyleSheet(f"font-family: 'Courier New'; font-size: 14px; background-color: {txt_bg}; color: {txt_color}; padding: 5px;")
-        except Exception:
-            pass
-        try:
-            self.project_tree.setStyleSheet(f"background-color: {tree_bg}; color: {txt_color};")
-        except Exception:
-            pass
-        try:
-            self.terminal_output.setStyleSheet(f"background-color: {terminal_bg}; color: {terminal_color}; font-family: 'Courier New';")
-        except Exception:
-            pass
-        try:
-            self.search_input.setStyleSheet(f"""
-                QLineEdit {{
-                    background-color: {lineedit_bg};
-                    color: white;
-                    border-radius: 64px;
-                    padding: 8px 12px;
-                    font-size: 14px;
-                }}
-                QLineEdit:focus {{ border: 2px solid {lineedit_border}; }}
-            """)
-        except Exception:
-            pass
+            state_path = os.path.join(".", "data", "settings.json")
+            if os.path.exists(state_path):
+                with open(state_path, "r", encoding="utf-8") as fh:
+                    js = json.load(fh)
+                for key, value in js.items():
+                    if key in self.settings:
+                        self.settings[key] = value
+        except Exception as e:
+            print("[settings] load failed:", e)
 
-        # update button styles across the app
-        self.update_button_styles()
+    def save_settings(self):
+        try:
+            data_dir = os.path.join(".", "data")
+            if not os.path.exists(data_dir):
+                os.makedirs(data_dir, exist_ok=True)
+            with open(os.path.join(data_dir, "settings.json"), "w", encoding="utf-8") as fh:
+                json.dump(self.settings, fh, ensure_ascii=False, indent=2)
+        except Exception as e:
+            print("[settings] save failed:", e)
 
-    def update_button_styles(self):
-        style = self.get_common_button_style()
-        for btn in self.findChildren(QPushButton):
-            try:
-                btn.setStyleSheet(style)
-            except Exception:
-                pass
+    def apply_theme(self):
+        # one cached application stylesheet per theme; widgets select their
+        # rules by objectName / "role", so nothing is restyled one by one
+        app = QApplication.instance()
+        if app is None:
+            return
+        colors = self.theme_engine.colors(self.current_theme)
+        palette = QPalette()
+        palette.setColor(QPalette.Window, QColor(colors["window"]))
+        palette.setColor(QPalette.WindowText, QColor(colors["text"]))
+        palette.setColor(QPalette.Base, QColor(colors["panel"]))
+        palette.setColor(QPalette.Text, QColor(colors["editor_text"]))
+        palette.setColor(QPalette.Button, QColor(colors["button"]))
+        palette.setColor(QPalette.ButtonText, QColor(colors["button_text"]))
+        palette.setColor(QPalette.Highlight, QColor(colors["accent"]))
+        app.setPalette(palette)
+        app.setStyleSheet(self.theme_engine.stylesheet(self.current_theme))
 
     def create_main_menu(self):
         widget = QWidget()
@@ -292,48 +517,43 @@ class ZenithOSApp(QMainWindow):
         layout.setAlignment(Qt.AlignCenter)
         title = QLabel("ZenithOS Studio")
         title.setFont(QFont("Arial", 32))
-        title.setStyleSheet("color: white;")
+        title.setProperty("role", "title")
         layout.addWidget(title)
-        button_style = """
-            QPushButton {
-                background-color: #6200EE;
-                color: white;
-                font-size: 16px;
-                border: none;
-                padding: 10px 20px;
-                border-radius: 20px;
-            }
-            QPushButton:hover {
-                background-color: #3700B3;
-            }
-        """
         new_project_button = QPushButton("New Project")
-        new_project_button.setStyleSheet(button_style)
+        new_project_button.setProperty("role", "menu")
         new_project_button.clicked.connect(self.create_new_project)
         layout.addWidget(new_project_button)
 
         about_button = QPushButton("About")
-        about_button.setStyleSheet(button_style)
+        about_button.setProperty("role", "menu")
         about_button.clicked.connect(self.show_about)
         layout.addWidget(about_button)
 
         settings_button = QPushButton("Settings")
-        settings_button.setStyleSheet(button_style)
+        settings_button.setProperty("role", "menu")
         settings_button.clicked.connect(self.open_settings)
         layout.addWidget(settings_button)
 
         plugins_button = QPushButton("Plugins")
-        plugins_button.setStyleSheet(button_style)
+        plugins_button.setProperty("role", "menu")
         plugins_button.clicked.connect(self.open_plugins_window)
         layout.addWidget(plugins_button)
 
         exit_button = QPushButton("Exit")
-        exit_button.setStyleSheet(button_style)
+        exit_button.setProperty("role", "menu")
         exit_button.clicked.connect(self.close)
         layout.addWidget(exit_button)
         return widget
 
     def create_editor_page(self):
+        from clexer import CLexer
+        from documents import DocumentManager
+        from editor import CodeEditor
+        from projectindex import ProjectIndex
+        from search import SearchEngine
+        from symbolindex import SymbolIndex
+        from terminal import TerminalPipeline
+
         widget = QWidget()
         layout = QVBoxLayout(widget)
 
@@ -341,29 +561,12 @@ class ZenithOSApp(QMainWindow):
         tab_layout = QHBoxLayout()
         tab_layout.setSpacing(0)
         tab_layout.setContentsMargins(0, 0, 0, 0)
-        tab_button_style = """
-            QPushButton {
-                background-color: #6200EE;
-                color: white;
-                font-size: 16px;
-                border: none;
-                padding: 10px 20px;
-                border-top-left-radius: 20px;
-                border-top-right-radius: 20px;
-            }
-            QPushButton:hover {
-                background-color: #3700B3;
-            }
-            QPushButton:checked {
-                background-color: #3700B3;
-            }
-        """
         self.editor_tab_button = QPushButton("Editor")
         self.api_tab_button = QPushButton("SDK Settings")
         self.editor_tab_button.setCheckable(True)
         self.api_tab_button.setCheckable(True)
-        self.editor_tab_button.setStyleSheet(tab_button_style)
-        self.api_tab_button.setStyleSheet(tab_button_style)
+        self.editor_tab_button.setProperty("role", "tab")
+        self.api_tab_button.setProperty("role", "tab")
         self.editor_tab_button.clicked.connect(lambda: self.switch_editor_tab(0))
         self.api_tab_button.clicked.connect(lambda: self.switch_editor_tab(1))
         tab_layout.addWidget(self.editor_tab_button)
@@ -379,9 +582,15 @@ class ZenithOSApp(QMainWindow):
         # project tree (left) - hidden by default width 0
         self.project_tree = QTreeWidget()
         self.project_tree.setHeaderHidden(True)
-        self.project_tree.setStyleSheet("background-color: #2C0032; color: #E0E0E0;")
+        self.project_tree.setObjectName("projectTree")
         self.project_tree.setMaximumWidth(0)
         self.project_tree.itemDoubleClicked.connect(self.open_file_from_tree)
+        self.project_tree.itemExpanded.connect(self.on_tree_item_expanded)
+        self.project_index = ProjectIndex(".")
+        self.tree_items = {}
+        self.tree_populated = set()
+        self.tree_watcher = QFileSystemWatcher(self)
+        self.tree_watcher.directoryChanged.connect(self.on_project_dir_changed)
 
         # EDITOR PANEL (right)
         self.editor_content_panel = QWidget()
@@ -390,25 +599,14 @@ class ZenithOSApp(QMainWindow):
         # TOP TOOLS (RUN / COMPILE / COMPILE TO ZAPP / SAVE / TREE / SEARCH)
         tool_layout = QHBoxLayout()
         tool_layout.setContentsMargins(0, 0, 0, 0)
-        tool_button_style = """
-            QPushButton {
-                background-color: #6200EE;
-                color: white;
-                font-size: 14px;
-                border: none;
-                padding: 6px 12px;
-                border-radius: 12px;
-            }
-            QPushButton:hover { background-color: #3700B3; }
-        """
-        self.run_button = QPushButton("Run Project")
-        self.run_button.setStyleSheet(tool_button_style)
-        self.run_button.clicked.connect(self.run_project_in_terminal)
+        # short click -> run, long press -> run with profiling
+        self.run_button = LongPressButton("Run Project")
+        self.run_button.set_short_click(self.run_project_in_terminal)
+        self.run_button.set_long_press(self.show_profile_options)
         tool_layout.addWidget(self.run_button)
 
         # Use LongPressButton for compile
         self.compile_button = LongPressButton("Compile (gcc)")
-        self.compile_button.setStyleSheet(tool_button_style)
         # short click -> original compile (gcc)
         self.compile_button.set_short_click(lambda: self.compile_with_compiler("gcc", output_name="app"))
         # long press -> show options
@@ -416,22 +614,18 @@ class ZenithOSApp(QMainWindow):
         tool_layout.addWidget(self.compile_button)
 
         self.zapp_button = QPushButton("Compile to .ZAPP")
-        self.zapp_button.setStyleSheet(tool_button_style)
         self.zapp_button.clicked.connect(self.compile_to_zapp)
         tool_layout.addWidget(self.zapp_button)
 
         save_top_btn = QPushButton("Save")
-        save_top_btn.setStyleSheet(tool_button_style)
         save_top_btn.clicked.connect(self.save_project)
         tool_layout.addWidget(save_top_btn)
 
         toggle_tree_btn = QPushButton("Toggle Tree")
-        toggle_tree_btn.setStyleSheet(tool_button_style)
         toggle_tree_btn.clicked.connect(self.toggle_project_tree)
         tool_layout.addWidget(toggle_tree_btn)
 
         show_search_btn = QPushButton("Search")
-        show_search_btn.setStyleSheet(tool_button_style)
         show_search_btn.clicked.connect(self.show_search_bar)
         tool_layout.addWidget(show_search_btn)
 
@@ -443,49 +637,118 @@ class ZenithOSApp(QMainWindow):
         self.search_bar = QWidget()
         search_layout = QHBoxLayout(self.search_bar)
         self.search_input = QLineEdit()
-        self.search_input.setStyleSheet("""
-            QLineEdit {
-                background-color: #6A0DAD; 
-                color: white;              
-                border-radius: 64px;      
-                padding: 8px 12px;           
-                font-size: 14px;
-            }
-            QLineEdit:focus {
-                border: 2px solid #BB86FC; 
-            }
-        """)
-        self.search_input.textChanged.connect(self.highlight_search)
+        self.search_input.setObjectName("searchInput")
+        # debounce: only search once typing pauses
+        self.search_engine = SearchEngine()
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(self.highlight_search)
+        self.search_input.textChanged.connect(self.schedule_search)
+        self.search_input.returnPressed.connect(self.find_next)
         self.case_checkbox = QCheckBox("Case sensitive")
-        self.case_checkbox.setStyleSheet("color: white;")
+        self.case_checkbox.toggled.connect(self.schedule_search)
+        self.regex_checkbox = QCheckBox("Regex")
+        self.regex_checkbox.toggled.connect(self.schedule_search)
+        self.match_label = QLabel("")
+        self.match_label.setMinimumWidth(90)
+        prev_match_btn = QPushButton("Prev")
+        prev_match_btn.clicked.connect(self.find_previous)
+        next_match_btn = QPushButton("Next")
+        next_match_btn.clicked.connect(self.find_next)
         search_layout.addWidget(self.search_input)
         search_layout.addWidget(self.case_checkbox)
+        search_layout.addWidget(self.regex_checkbox)
+        search_layout.addWidget(self.match_label)
+        search_layout.addWidget(prev_match_btn)
+        search_layout.addWidget(next_match_btn)
         self.search_bar.setFixedHeight(0)
         editor_content_layout.addWidget(self.search_bar)
 
         # Text editor
-        self.text_edit = QTextEdit()
-        self.highlighter = CSyntaxHighlighter(self.text_edit.document())
-        self.text_edit.setStyleSheet("font-family: 'Courier New'; font-size: 14px; background-color: #2C0032; color: #E0E0E0; padding: 5px;")
+        # one tab per open file; each keeps its own document and highlighting
+        self.doc_tabs = QTabBar()
+        self.doc_tabs.setTabsClosable(True)
+        self.doc_tabs.setMovable(True)
+        self.doc_tabs.setExpanding(False)
+        self.doc_tabs.setDocumentMode(True)
+        self.doc_tabs.currentChanged.connect(self.on_doc_tab_changed)
+        self.doc_tabs.tabCloseRequested.connect(self.close_document_tab)
+        editor_content_layout.addWidget(self.doc_tabs)
+
+        self.text_edit = CodeEditor()
+        self.lexer = CLexer()
+        self.documents = DocumentManager(
+            self.text_edit,
+            lambda doc: CSyntaxHighlighter(doc, self.lexer),
+            autosave_seconds=self.settings["autosave_seconds"],
+            parent=self,
+        )
+        self.documents.on_new_document = lambda doc: doc.contentsChange.connect(self.on_editor_contents_change)
+        self.documents.currentChanged.connect(self.on_document_changed)
+        self.documents.dirtyChanged.connect(self.on_document_dirty)
+        self.documents.autosaved.connect(self.on_documents_autosaved)
+        # symbols from ./include and the project sources: completion, F12 / Ctrl+click, highlighting
+        self.symbol_index = SymbolIndex(".")
+        self.symbol_job = None
+        self.symbol_pending = None
+        self.text_edit.set_completion_source(self.symbol_index.complete)
+        self.text_edit.definitionRequested.connect(self.goto_definition)
+        self.text_edit.setObjectName("codeEditor")
+        # search selections are rebuilt for the viewport only
+        self.text_edit.verticalScrollBar().valueChanged.connect(self.refresh_search_selections)
+        self.text_edit.viewport().installEventFilter(self)
         editor_content_layout.addWidget(self.text_edit)
 
+        # background syntax check once edits settle; results go to the gutter,
+        # wavy underlines and the problems list (build errors land there too)
+        self.syntax_checker = None
+        self.diag_generation = 0
+        self.diag_job = None
+        self.diagnostics = {"check": [], "build": []}
+        self.diagnostic_selections = []
+        self.diag_timer = QTimer(self)
+        self.diag_timer.setSingleShot(True)
+        self.diag_timer.timeout.connect(self.run_diagnostics)
+        self.text_edit.loadFinished.connect(self.schedule_diagnostics)
+        self.problems_list = QListWidget()
+        self.problems_list.setObjectName("problems")
+        self.problems_list.setFixedHeight(110)
+        self.problems_list.itemActivated.connect(self.open_problem)
+        self.problems_list.itemClicked.connect(self.open_problem)
+        self.problems_list.hide()
+        editor_content_layout.addWidget(self.problems_list)
+
         # TERMINAL (integrated)
         self.terminal_output = QPlainTextEdit()
         self.terminal_output.setReadOnly(True)
         self.terminal_output.setFixedHeight(180)
-        self.terminal_output.setStyleSheet("background-color: black; color: #00FF00; font-family: 'Courier New';")
+        self.terminal_output.setObjectName("terminal")
+        # clicking a gcc error line jumps to it
+        self.terminal_output.viewport().installEventFilter(self)
+        # batched, rate-limited painting with a bounded scrollback
+        self.terminal = TerminalPipeline(
+            self.terminal_output,
+            fps=self.settings["terminal_fps"],
+            max_blocks=self.settings["terminal_max_blocks"],
+        )
         editor_content_layout.addWidget(self.terminal_output)
 
+        # .zapp packaging progress, only shown while packing
+        self.zapp_progress = QProgressBar()
+        self.zapp_progress.setFixedHeight(14)
+        self.zapp_progress.setTextVisible(True)
+        self.zapp_progress.hide()
+        editor_content_layout.addWidget(self.zapp_progress)
+
         # BOTTOM: only Assembly and Back
         bottom_button_layout = QHBoxLayout()
         bottom_button_layout.setContentsMargins(0, 0, 0, 0)
         assembly_button = QPushButton("Assembly")
-        assembly_button.setStyleSheet(tool_button_style)
         assembly_button.clicked.connect(self.compile_to_zapp)
         bottom_button_layout.addWidget(assembly_button)
 
         back_button = QPushButton("Back")
-        back_button.setStyleSheet(tool_button_style)
         back_button.clicked.connect(self.back_to_main)
         bottom_button_layout.addWidget(back_button)
 
@@ -500,13 +763,20 @@ class ZenithOSApp(QMainWindow):
         # add splitter to editor stack
         self.editor_stack.addWidget(self.splitter)
 
-        # API SETTINGS PANEL
+        # SDK settings tab is built on first switch (see switch_editor_tab)
+        self.editor_stack.addWidget(QWidget())
+
+        self.editor_tab_button.setChecked(True)
+        self.editor_stack.setCurrentIndex(0)
+        layout.addWidget(self.editor_stack)
+        return widget
+
+    def create_api_settings_panel(self):
         self.api_settings_panel = QWidget()
         api_layout = QVBoxLayout(self.api_settings_panel)
         api_layout.setAlignment(Qt.AlignTop)
         title_label = QLabel("API")
         title_label.setFont(QFont("Arial", 24))
-        title_label.setStyleSheet("color: white;")
         api_layout.addWidget(title_label)
 
         # VERSION LIST 
@@ -518,14 +788,9 @@ class ZenithOSApp(QMainWindow):
         target_layout = QHBoxLayout()
         target_label = QLabel("Target version of ZenithOS API:")
         target_label.setFont(QFont("Arial", 16))
-        target_label.setStyleSheet("color: white;")
         target_layout.addWidget(target_label)
         self.target_api_combo = QComboBox()
         self.target_api_combo.addItems(versions)
-        self.target_api_combo.setStyleSheet(
-            "QComboBox { background-color: #2C0032; color: #E0E0E0; padding: 5px; font-size: 16px; border: none; border-radius: 10px; }"
-            "QComboBox QAbstractItemView { background-color: #2C0032; color: #E0E0E0; }"
-        )
         self.target_api_combo.setMaxVisibleItems(15)
         target_layout.addWidget(self.target_api_combo)
         api_layout.addLayout(target_layout)
@@ -533,18 +798,38 @@ class ZenithOSApp(QMainWindow):
         min_layout = QHBoxLayout()
         min_label = QLabel("Minimal version of ZenithOS API:")
         min_label.setFont(QFont("Arial", 16))
-        min_label.setStyleSheet("color: white;")
         min_layout.addWidget(min_label)
         self.min_api_combo = QComboBox()
         self.min_api_combo.addItems(versions)
-        self.min_api_combo.setStyleSheet(
-            "QComboBox { background-color: #2C0032; color: #E0E0E0; padding: 5px; font-size: 16px; border: none; border-radius: 10px; }"
-            "QComboBox QAbstractItemView { background-color: #2C0032; color: #E0E0E0; }"
-        )
         self.min_api_combo.setMaxVisibleItems(15)
         min_layout.addWidget(self.min_api_combo)
         api_layout.addLayout(min_layout)
 
+        jobs_layout = QHBoxLayout()
+        jobs_label = QLabel("Parallel build jobs (0 = all cores):")
+        jobs_label.setFont(QFont("Arial", 16))
+        jobs_layout.addWidget(jobs_label)
+        self.build_jobs_spin = QSpinBox()
+        self.build_jobs_spin.setRange(0, 256)
+        self.build_jobs_spin.setValue(int(self.settings["build_jobs"]))
+        jobs_layout.addWidget(self.build_jobs_spin)
+        api_layout.addLayout(jobs_layout)
+
+        # build accelerator
+        self.compiler_cache_box = QCheckBox("Compiler cache (ccache if installed, otherwise built-in)")
+        self.compiler_cache_box.setFont(QFont("Arial", 14))
+        self.compiler_cache_box.setChecked(bool(self.settings["compiler_cache"]))
+        api_layout.addWidget(self.compiler_cache_box)
+        pch_layout = QHBoxLayout()
+        self.pch_box = QCheckBox("Precompiled SDK headers (./include)")
+        self.pch_box.setFont(QFont("Arial", 14))
+        self.pch_box.setChecked(bool(self.settings["precompiled_headers"]))
+        pch_layout.addWidget(self.pch_box)
+        self.accel_measure_button = QPushButton("Measure speedup")
+        self.accel_measure_button.clicked.connect(self.measure_build_accel)
+        pch_layout.addWidget(self.accel_measure_button)
+        api_layout.addLayout(pch_layout)
+
         self.version_hints = {
             "0.7 (Celestial Peak)": "A very old version. Press F1 For more",
             "1.0 (Celestial Peak)": "First official release. Press F1 For more",
@@ -565,16 +850,10 @@ class ZenithOSApp(QMainWindow):
         self.setup_version_hints(self.min_api_combo)
 
         save_button = QPushButton("Save")
-        save_button.setStyleSheet(tool_button_style)
         save_button.clicked.connect(self.save_api_settings)
         api_layout.addWidget(save_button)
 
-        self.editor_stack.addWidget(self.api_settings_panel)
-
-        self.editor_tab_button.setChecked(True)
-        self.editor_stack.setCurrentIndex(0)
-        layout.addWidget(self.editor_stack)
-        return widget
+        return self.api_settings_panel
 
     def setup_version_hints(self, combo: QComboBox):
         for i in range(combo.count()):
@@ -586,6 +865,16 @@ class ZenithOSApp(QMainWindow):
         combo.installEventFilter(self)
 
     def eventFilter(self, obj, event):
+        text_edit = getattr(self, "text_edit", None)
+        if text_edit is not None and obj is text_edit.viewport() and event.type() == QEvent.Resize:
+            self.refresh_search_selections()
+            return False
+        terminal_output = getattr(self, "terminal_output", None)
+        if (terminal_output is not None and obj is terminal_output.viewport()
+                and event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton
+                and not terminal_output.textCursor().hasSelection()):
+            self.open_terminal_location(terminal_output.cursorForPosition(event.position().toPoint()))
+            return False
         # handle events for version combos
         if obj in (getattr(self, "target_api_combo", None), getattr(self, "min_api_combo", None)):
             if event.type() == QEvent.KeyPress:
@@ -646,6 +935,7 @@ class ZenithOSApp(QMainWindow):
             self.plugins_list_widget.setStyleSheet("background-color: #1F001F; color: #E0E0E0; padding: 6px;")
             dlg_layout.addWidget(self.plugins_list_widget, 1)
 
+            add_row = QHBoxLayout()
             add_btn = QPushButton("Add my plugins")
             add_btn.setStyleSheet("""
                 QPushButton {
@@ -658,7 +948,19 @@ class ZenithOSApp(QMainWindow):
                 QPushButton:hover { background-color: #888888; }
             """)
             add_btn.clicked.connect(self.add_plugin_file)
-            dlg_layout.addWidget(add_btn)
+            add_row.addWidget(add_btn)
+            folder_btn = QPushButton("Import folder")
+            folder_btn.setStyleSheet(add_btn.styleSheet())
+            folder_btn.clicked.connect(self.add_plugin_folder)
+            add_row.addWidget(folder_btn)
+            dlg_layout.addLayout(add_row)
+            self.plugin_buttons = [add_btn, folder_btn]
+
+            self.plugin_progress = QProgressBar()
+            self.plugin_progress.setTextVisible(True)
+            self.plugin_progress.setFormat("Importing %v/%m")
+            self.plugin_progress.hide()
+            dlg_layout.addWidget(self.plugin_progress)
 
             note_label = QLabel("Before adding your .h file plugins, make sure they're written properly.")
             note_label.setFont(QFont("Arial", 10))
@@ -680,53 +982,131 @@ class ZenithOSApp(QMainWindow):
             dlg_layout.addWidget(close_btn)
 
             dlg.setLayout(dlg_layout)
-            dlg.setFixedSize(420, 420)
+            dlg.setFixedSize(520, 460)
             self.plugins_window = dlg
 
         self.update_plugins_list()
         self.plugins_window.exec()
 
+    def get_plugin_registry(self):
+        from plugins import PluginRegistry
+        if self.plugin_registry is None:
+            self.plugin_registry = PluginRegistry(".")
+        return self.plugin_registry
+
     def update_plugins_list(self):
-        include_dir = "./include"
-        if not os.path.exists(include_dir):
-            files = []
-        else:
-            files = [f for f in os.listdir(include_dir) if f.endswith(".h")]
         if self.plugins_list_widget is None:
             return
+        registry = self.get_plugin_registry()
+        if self.plugin_job is None:
+            # only stats the headers; changed ones are rescanned
+            registry.refresh()
+        plugins = registry.headers()
+        duplicate_of = {}
+        for names in registry.duplicates():
+            for name in names:
+                duplicate_of[name] = [n for n in names if n != name]
         self.plugins_list_widget.clear()
-        if not files:
+        if not plugins:
             item = QListWidgetItem("No plugins found.")
             item.setFlags(Qt.ItemIsEnabled)
             self.plugins_list_widget.addItem(item)
-        else:
-            for fn in sorted(files):
-                item = QListWidgetItem(fn)
-                self.plugins_list_widget.addItem(item)
+            return
+        for p in plugins:
+            text = f"{p.name}  ({len(p.symbols)} symbols, {p.size / 1024:.1f} KB)"
+            if p.libs:
+                text += "  links " + " ".join(p.libs)
+            if p.deprecated:
+                text += "  [deprecated]"
+            if p.name in duplicate_of:
+                text += "  = " + ", ".join(duplicate_of[p.name])
+            item = QListWidgetItem(text)
+            tip = [p.name, f"sha256 {p.hash[:16]}"]
+            tip += [f"warning: {w}" for w in p.warnings]
+            if p.name in duplicate_of:
+                tip.append("Same content as " + ", ".join(duplicate_of[p.name]))
+            if p.symbols:
+                more = f" (+{len(p.symbols) - 20} more)" if len(p.symbols) > 20 else ""
+                tip.append("Exports: " + ", ".join(p.symbols[:20]) + more)
+            item.setToolTip("\n".join(tip))
+            if p.deprecated:
+                item.setForeground(QColor("#FFB74D"))
+            elif p.name in duplicate_of:
+                item.setForeground(QColor("gray"))
+            self.plugins_list_widget.addItem(item)
 
     def add_plugin_file(self):
-        file_path, _ = QFileDialog.getOpenFileName(self, "Select Plugin Header File", "", "Header Files (*.h)")
-        if not file_path:
+        paths, _ = QFileDialog.getOpenFileNames(self, "Select Plugin Header Files", "", "Header Files (*.h)")
+        if paths:
+            self.import_plugins(paths)
+
+    def add_plugin_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Select a folder with plugin headers")
+        if folder:
+            self.import_plugins([folder])
+
+    def import_plugins(self, paths, overwrite=False):
+        if self.plugin_job is not None:
             return
-        file_name = os.path.basename(file_path)
-        target_path = os.path.join("./include", file_name)
-        try:
-            if not os.path.exists("./include"):
-                os.makedirs("./include")
-            if os.path.exists(target_path):
-                resp = QMessageBox.question(self, "Overwrite?",
-                    f"File {file_name} already exists in ./include. Overwrite?",
-                    QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
-                if resp != QMessageBox.Yes:
+        self.plugin_job = PluginImportJob(self.get_plugin_registry(), paths, overwrite, self)
+        self.plugin_job.progress.connect(self.on_plugin_import_progress)
+        self.plugin_job.finished.connect(self.on_plugins_imported)
+        for btn in getattr(self, "plugin_buttons", []):
+            btn.setEnabled(False)
+        if self.plugins_window is not None:
+            self.plugin_progress.setRange(0, 0)
+            self.plugin_progress.show()
+        self.plugin_job.start()
+
+    def on_plugin_import_progress(self, done, total):
+        if self.plugins_window is None:
+            return
+        if self.plugin_progress.maximum() != total:
+            self.plugin_progress.setRange(0, total)
+        self.plugin_progress.setValue(done)
+
+    def on_plugins_imported(self, result, overwrite):
+        self.plugin_job = None
+        for btn in getattr(self, "plugin_buttons", []):
+            btn.setEnabled(True)
+        if self.plugins_window is not None:
+            self.plugin_progress.hide()
+        # index the new headers: one file directly, several with a full pass
+        if len(result.copied) == 1:
+            self.refresh_symbols(os.path.join("include", result.copied[0]))
+        elif result.copied:
+            self.refresh_symbols()
+        self.update_plugins_list()
+
+        # one question for all headers that would change, instead of one per file
+        if result.conflicts and not overwrite:
+            names = ", ".join(name for _, name in result.conflicts)
+            resp = QMessageBox.question(self, "Overwrite?",
+                f"{len(result.conflicts)} header(s) already exist in ./include with different content:\n{names}\n\nOverwrite them?",
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+            if resp == QMessageBox.Yes:
+                self.import_plugins([src for src, _ in result.conflicts], overwrite=True)
+                if not result.copied:
                     return
-            shutil.copy2(file_path, target_path)
-            QMessageBox.information(self, "Added", f"{file_name} was added to ./include")
-            self.update_plugins_list()
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to add plugin:\n{str(e)}")
+
+        lines = []
+        if result.copied:
+            lines.append(f"Added {len(result.copied)}: " + ", ".join(result.copied))
+        if result.same:
+            lines.append("Already present: " + ", ".join(result.same))
+        for name, existing in result.duplicates:
+            lines.append(f"{name} has the same content as {existing}")
+        for src, error in result.failed:
+            lines.append(f"Failed {os.path.basename(src)}: {error}")
+        if result.failed:
+            QMessageBox.critical(self, "Error", "\n".join(lines))
+        elif lines:
+            QMessageBox.information(self, "Plugins", "\n".join(lines))
 
     def toggle_project_tree(self):
-        self.update_project_tree()
+        # the tree is built once and then kept current by the file watcher
+        if not self.tree_items:
+            self.update_project_tree()
         current_w = self.project_tree.width()
         target = 250 if current_w == 0 else 0
         anim = QPropertyAnimation(self.project_tree, b"maximumWidth")
@@ -738,36 +1118,82 @@ class ZenithOSApp(QMainWindow):
         self.anim_tree = anim
 
     def update_project_tree(self):
+        from projectindex import ProjectIndex
+        # full rebuild: drop cached listings, watches and items
         self.project_tree.clear()
+        self.project_index = ProjectIndex(".")
+        watched = self.tree_watcher.directories()
+        if watched:
+            self.tree_watcher.removePaths(watched)
+        self.tree_items = {}
+        self.tree_populated = set()
+
         root = QTreeWidgetItem(self.project_tree, ["My project >>"])
+        root.setData(0, Qt.UserRole, ".")
+        self.tree_items["."] = root
+        self.populate_tree_dir(".")
         root.setExpanded(True)
 
-        for dirpath, dirnames, filenames in os.walk("."):
-            parts = dirpath.split(os.sep)
-            if any(p.startswith(".") and p != "." for p in parts):
-                continue
-            rel_dir = os.path.relpath(dirpath, ".")
-            parent_item = root
-            if rel_dir != ".":
-                segments = rel_dir.split(os.sep)
-                cur = root
-                for seg in segments:
-                    found = None
-                    for i in range(cur.childCount()):
-                        if cur.child(i).text(0) == seg:
-                            found = cur.child(i)
-                            break
-                    if found is None:
-                        found = QTreeWidgetItem(cur, [seg])
-                        found.setExpanded(True)
-                    cur = found
-                parent_item = cur
-
-            for f in sorted(filenames):
-                if f.endswith(".c") or f.endswith(".h"):
-                    rel_path = os.path.relpath(os.path.join(dirpath, f), ".")
-                    item = QTreeWidgetItem(parent_item, [f])
-                    item.setToolTip(0, os.path.abspath(rel_path))
+    def make_tree_item(self, rel, name, is_dir):
+        item = QTreeWidgetItem([name])
+        self.tree_items[rel] = item
+        if is_dir:
+            item.setData(0, Qt.UserRole, rel)
+            # children are listed on first expand
+            item.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)
+        else:
+            item.setToolTip(0, self.project_index.abspath(rel))
+        return item
+
+    def populate_tree_dir(self, rel):
+        item = self.tree_items.get(rel)
+        if item is None:
+            return
+        dirs, files = self.project_index.list_dir(rel)
+        wanted = [(d, True) for d in dirs] + [(f, False) for f in files]
+        old = {}
+        for child in item.takeChildren():
+            old[(child.text(0), child.data(0, Qt.UserRole) is not None)] = child
+        children = []
+        for name, is_dir in wanted:
+            child = old.pop((name, is_dir), None)
+            if child is None:
+                child = self.make_tree_item(self.project_index.join(rel, name), name, is_dir)
+            children.append(child)
+        for (name, is_dir) in old:
+            self.forget_tree_path(self.project_index.join(rel, name))
+        item.addChildren(children)
+        item.setChildIndicatorPolicy(QTreeWidgetItem.DontShowIndicatorWhenChildless)
+        if rel not in self.tree_populated:
+            self.tree_populated.add(rel)
+            self.tree_watcher.addPath(self.project_index.abspath(rel))
+
+    def forget_tree_path(self, rel):
+        prefix = rel + "/"
+        for key in [k for k in self.tree_items if k == rel or k.startswith(prefix)]:
+            del self.tree_items[key]
+            if key in self.tree_populated:
+                self.tree_populated.discard(key)
+                self.tree_watcher.removePath(self.project_index.abspath(key))
+        self.project_index.forget(rel)
+
+    def on_tree_item_expanded(self, item):
+        rel = item.data(0, Qt.UserRole)
+        if rel is not None and rel not in self.tree_populated:
+            self.populate_tree_dir(rel)
+
+    def on_project_dir_changed(self, path):
+        # only the changed directory is re-listed and diffed
+        rel = os.path.relpath(path, self.project_index.root).replace(os.sep, "/")
+        self.project_index.invalidate(rel)
+        if rel in self.tree_populated:
+            if os.path.isdir(path):
+                self.populate_tree_dir(rel)
+            else:
+                parent = rel.rsplit("/", 1)[0] if "/" in rel else "."
+                self.project_index.invalidate(parent)
+                if parent in self.tree_populated:
+                    self.populate_tree_dir(parent)
 
     def open_file_from_tree(self, item, column):
         path = item.toolTip(0)
@@ -775,17 +1201,16 @@ class ZenithOSApp(QMainWindow):
             return
         if os.path.isdir(path):
             return
-        try:
-            with open(path, "r", encoding="utf-8", errors="ignore") as fh:
-                content = fh.read()
-            self.text_edit.setPlainText(content)
+        if self.open_document(path):
             self.stacked_widget.setCurrentWidget(self.editor_page)
-            self.editor_tab_button.setChecked(True)
-            self.setWindowTitle(f"ZenithOS SDK - {os.path.basename(path)}")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to open file:\n{e}")
+            self.switch_editor_tab(0)
 
     def switch_editor_tab(self, index):
+        if index == 1 and self.api_settings_panel is None:
+            placeholder = self.editor_stack.widget(1)
+            self.editor_stack.insertWidget(1, self.create_api_settings_panel())
+            self.editor_stack.removeWidget(placeholder)
+            placeholder.deleteLater()
         self.editor_stack.setCurrentIndex(index)
         self.editor_tab_button.setChecked(index == 0)
         self.api_tab_button.setChecked(index == 1)
@@ -794,17 +1219,260 @@ class ZenithOSApp(QMainWindow):
         if not os.path.exists("main.c"):
             with open("main.c", "w", encoding="utf-8") as f:
                 f.write("/* new ZenithOS project */\n#include <stdio.h>\nint main(){ printf(\"hi\\n\"); return 0; }\n")
-        self.stacked_widget.setCurrentWidget(self.editor_page)
+        self.stacked_widget.setCurrentWidget(self.ensure_editor_page())
         self.open_file_from_path("main.c")
 
     def open_file_from_path(self, relpath):
-        abs_path = os.path.abspath(relpath)
+        self.open_document(relpath)
+
+    # --- open documents / tabs ---
+    def open_document(self, path):
         try:
-            with open(abs_path, "r", encoding="utf-8", errors="ignore") as fh:
-                self.text_edit.setPlainText(fh.read())
-            self.setWindowTitle(f"ZenithOS SDK - {os.path.basename(relpath)}")
+            self.documents.open(path)
+            return True
         except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to open {relpath}:\n{e}")
+            QMessageBox.critical(self, "Error", f"Failed to open {path}:\n{e}")
+            return False
+
+    def find_doc_tab(self, path):
+        for i in range(self.doc_tabs.count()):
+            if self.doc_tabs.tabData(i) == path:
+                return i
+        return -1
+
+    def doc_tab_text(self, path):
+        entry = self.documents.get(path)
+        return os.path.basename(path) + (" *" if entry is not None and entry.dirty else "")
+
+    def on_document_changed(self, path):
+        index = self.find_doc_tab(path)
+        if index < 0:
+            index = self.doc_tabs.addTab(self.doc_tab_text(path))
+            self.doc_tabs.setTabData(index, path)
+            self.doc_tabs.setTabToolTip(index, path)
+        self.doc_tabs.blockSignals(True)
+        self.doc_tabs.setCurrentIndex(index)
+        self.doc_tabs.blockSignals(False)
+        self.update_editor_title(path)
+        # search hits, the search snapshot and diagnostics belong to the previous document
+        self.search_engine.reset()
+        self.search_engine.invalidate()
+        if self.search_input.text():
+            self.search_timer.start()
+        self.diagnostics["check"] = []
+        self.show_diagnostics()
+        self.schedule_diagnostics()
+
+    def on_document_dirty(self, path, dirty):
+        index = self.find_doc_tab(path)
+        if index >= 0:
+            self.doc_tabs.setTabText(index, self.doc_tab_text(path))
+
+    def on_doc_tab_changed(self, index):
+        path = self.doc_tabs.tabData(index) if index >= 0 else None
+        if path and not self.is_current_file(path):
+            # unloaded (LRU) documents are read back from disk here
+            if not self.open_document(path):
+                self.doc_tabs.removeTab(index)
+
+    def close_document_tab(self, index):
+        path = self.doc_tabs.tabData(index)
+        entry = self.documents.get(path)
+        if entry is not None and entry.dirty:
+            resp = QMessageBox.question(self, "Unsaved changes",
+                f"Save changes to {os.path.basename(path)}?",
+                QMessageBox.Save | QMessageBox.Discard | QMessageBox.Cancel, QMessageBox.Save)
+            if resp == QMessageBox.Cancel:
+                return
+            if resp == QMessageBox.Save:
+                try:
+                    self.documents.save(entry)
+                except Exception as e:
+                    QMessageBox.critical(self, "Error", f"Failed to save {path}:\n{e}")
+                    return
+        self.doc_tabs.blockSignals(True)
+        self.doc_tabs.removeTab(index)
+        self.doc_tabs.blockSignals(False)
+        self.documents.close(path)
+        if self.documents.current is None:
+            self.setWindowTitle("ZenithOS Studio")
+
+    def on_documents_autosaved(self, paths):
+        for path in paths:
+            self.refresh_symbols(path)
+        self.append_terminal("Autosaved " + ", ".join(os.path.relpath(p) for p in paths))
+
+    def closeEvent(self, event):
+        documents = getattr(self, "documents", None)
+        dirty = documents.dirty_documents() if documents is not None else []
+        if dirty:
+            names = ", ".join(e.name for e in dirty)
+            resp = QMessageBox.question(self, "Unsaved changes", f"Save changes to {names} before closing?",
+                QMessageBox.Save | QMessageBox.Discard | QMessageBox.Cancel, QMessageBox.Save)
+            if resp == QMessageBox.Cancel:
+                event.ignore()
+                return
+            if resp == QMessageBox.Save:
+                try:
+                    documents.save_all()
+                except Exception as e:
+                    QMessageBox.critical(self, "Error", f"Failed to save project:\n{e}")
+                    event.ignore()
+                    return
+        super().closeEvent(event)
+
+    def update_editor_title(self, path):
+        title = f"ZenithOS SDK - {os.path.basename(path)}"
+        if self.text_edit.large_file:
+            title += " (large file mode)"
+        self.setWindowTitle(title)
+
+    # --- symbol index ---
+    def refresh_symbols(self, path=None):
+        # one indexing job at a time; requests that come in meanwhile are merged
+        if getattr(self, "symbol_index", None) is None:
+            return
+        if self.symbol_job is not None:
+            if self.symbol_pending is None:
+                self.symbol_pending = path or "."
+            elif self.symbol_pending != path:
+                self.symbol_pending = "."  # several files: full refresh
+            return
+        self.symbol_job = SymbolJob(self.symbol_index, path, self)
+        self.symbol_job.finished.connect(self.on_symbols_ready)
+        self.symbol_job.start()
+
+    def on_symbols_ready(self, changed):
+        first = self.symbol_job is not None and not self.lexer.symbols
+        self.symbol_job = None
+        if changed or first:
+            self.lexer.symbols = self.symbol_index.kinds()
+            for highlighter in self.documents.highlighters():
+                if highlighter.document() is not None:
+                    highlighter.rehighlight()
+            log(f"[symbols] {len(self.symbol_index.names)} symbols indexed")
+        pending, self.symbol_pending = self.symbol_pending, None
+        if pending is not None:
+            self.refresh_symbols(None if pending == "." else pending)
+
+    def goto_definition(self, name):
+        sym = self.symbol_index.definition(name)
+        if sym is None:
+            self.append_terminal(f"No definition found for '{name}'")
+            return
+        if self.open_location(sym.file, sym.line):
+            self.append_terminal(f"{sym.kind} {name} -> {sym.file}:{sym.line}")
+
+    def is_current_file(self, path):
+        current = self.text_edit.file_path
+        return current is not None and os.path.abspath(current) == os.path.abspath(path)
+
+    def open_location(self, path, line, col=0):
+        # show path:line:col in the editor, loading the file if needed
+        if not self.is_current_file(path):
+            if not os.path.isfile(path):
+                self.append_terminal(f"Cannot open {path}")
+                return False
+            if not self.open_document(path):
+                return False
+        self.text_edit.goto_line(line, col)
+        self.text_edit.setFocus()
+        return True
+
+    # --- diagnostics ---
+    def schedule_diagnostics(self, *args):
+        delay = int(self.settings["diagnostics_delay_ms"])
+        if delay > 0:
+            # restarting the timer coalesces a burst of edits into one check
+            self.diag_timer.start(delay)
+
+    def run_diagnostics(self):
+        from buildengine import Project
+        from diagnostics import SyntaxChecker
+        editor = self.text_edit
+        path = editor.file_path or "main.c"
+        if editor.large_file or editor.is_loading() or not path.endswith((".c", ".h")):
+            return
+        if shutil.which("gcc") is None:
+            return
+        if self.syntax_checker is None:
+            project = Project.load(".")
+            self.syntax_checker = SyntaxChecker("gcc", project.include_dirs, project.cflags)
+        filename = os.path.relpath(os.path.abspath(path))
+        self.diag_generation += 1
+        self.diag_job = DiagnosticsJob(self.syntax_checker, editor.toPlainText(), filename,
+                                       self.diag_generation, self)
+        self.diag_job.finished.connect(self.on_diagnostics_ready)
+        self.diag_job.start()
+
+    def on_diagnostics_ready(self, generation, diags):
+        # results of an older snapshot are dropped
+        if generation != self.diag_generation or diags is None:
+            return
+        self.diag_job = None
+        self.diagnostics["check"] = diags
+        self.show_diagnostics()
+
+    def show_diagnostics(self):
+        check = self.diagnostics["check"]
+        # build errors for the current file duplicate the live check; keep the rest
+        seen = {str(d) for d in check}
+        shown = check + [d for d in self.diagnostics["build"] if str(d) not in seen]
+
+        colors = {"error": "#FF5555", "warning": "#F1FA8C", "note": "#8BE9FD"}
+        rank = {"error": 0, "warning": 1, "note": 2}
+        markers = {}
+        selections = []
+        doc = self.text_edit.document()
+        for d in shown:
+            if not self.is_current_file(d.file):
+                continue
+            color = colors.get(d.severity, "#FF5555")
+            # one gutter dot per line, coloured by its worst diagnostic
+            mark = markers.get(d.line)
+            if mark is None:
+                markers[d.line] = (color, d.message, rank.get(d.severity, 0))
+            else:
+                best = min(mark[2], rank.get(d.severity, 0))
+                markers[d.line] = (color if best < mark[2] else mark[0], mark[1] + "\n" + d.message, best)
+            block = doc.findBlockByNumber(d.line - 1)
+            if not block.isValid() or d.severity == "note":
+                continue
+            cursor = QTextCursor(block)
+            if d.col > 1:
+                cursor.setPosition(block.position() + min(d.col - 1, block.length() - 1))
+                cursor.movePosition(QTextCursor.EndOfWord, QTextCursor.KeepAnchor)
+                if not cursor.hasSelection():
+                    cursor.movePosition(QTextCursor.Right, QTextCursor.KeepAnchor)
+            else:
+                cursor.movePosition(QTextCursor.EndOfBlock, QTextCursor.KeepAnchor)
+            selection = QTextEdit.ExtraSelection()
+            selection.format.setUnderlineStyle(QTextCharFormat.WaveUnderline)
+            selection.format.setUnderlineColor(QColor(color))
+            selection.cursor = cursor
+            selections.append(selection)
+        self.text_edit.set_line_markers({line: m[:2] for line, m in markers.items()})
+        self.diagnostic_selections = selections
+        self.refresh_search_selections()
+
+        self.problems_list.clear()
+        for d in shown:
+            item = QListWidgetItem(f"{d.severity}: {d.location}: {d.message}")
+            item.setForeground(QColor(colors.get(d.severity, "#FF5555")))
+            item.setData(Qt.UserRole, (d.file, d.line, d.col))
+            self.problems_list.addItem(item)
+        self.problems_list.setVisible(bool(shown))
+
+    def open_problem(self, item):
+        location = item.data(Qt.UserRole)
+        if location:
+            self.open_location(*location)
+
+    def open_terminal_location(self, cursor):
+        from diagnostics import parse_line
+        d = parse_line(cursor.block().text())
+        if d is not None:
+            self.open_location(d.file, d.line, d.col)
 
     # --- Build / Run flows using QProcess to keep GUI responsive ---
     def detect_available_arm_compiler(self):
@@ -840,45 +1508,93 @@ class ZenithOSApp(QMainWindow):
             self.append_terminal("Compilation cancelled by user.")
             return
 
-        cmd = [compiler_cmd, "main.c", "-o", output_name, "-I./include"]
-        # auto add openssl flags if sapi.h detected
-        if os.path.exists("./include/sapi.h"):
-            self.append_terminal("Detected sapi.h -> adding OpenSSL flags automatically (-lcrypto -lssl)")
-            cmd.extend(["-lcrypto", "-lssl"])
-
-        if flags.strip():
-            cmd.extend(flags.split())
-
         if self.build_process is not None:
             try:
-                self.build_process.kill()
+                self.build_process.abandon()
             except:
                 pass
             self.build_process = None
 
-        self.build_process = QProcess(self)
-        self.build_process.setProgram(cmd[0])
-        self.build_process.setArguments(cmd[1:])
-        self.build_process.setProcessChannelMode(QProcess.MergedChannels)
-        self.build_process.readyReadStandardOutput.connect(self.on_build_output)
+        self.diagnostics["build"] = []
+        self.show_diagnostics()
+        build, hit = self.prepare_build(compiler_cmd, output_name, flags)
+        if hit:
+            self.on_build_finished(0, None)
+            return
+
+        # per-unit parallel build on a worker thread
+        self.build_process = BuildJob(build.engine, self, cached=build)
+        self.build_process.output.connect(self.on_build_output)
         self.build_process.finished.connect(self.on_build_finished)
         self.build_process.start()
 
-    def on_build_output(self):
-        if not self.build_process:
+    def prepare_build(self, compiler_cmd, output_name, flags):
+        from buildengine import Project
+        from zenith import CachedBuild
+        # same cached build as `zenith build`; returns (CachedBuild, cache_hit)
+        build = CachedBuild(
+            Project.load("."),
+            compiler=compiler_cmd,
+            output=output_name,
+            flags=flags.split(),
+            jobs=self.settings["build_jobs"],
+            on_event=self.append_terminal,
+            accel=self.make_accelerator(),
+        )
+        return build, build.restore()
+
+    def make_accelerator(self, cache=None, pch=None):
+        from accel import Accelerator
+        cache = self.settings["compiler_cache"] if cache is None else cache
+        pch = self.settings["precompiled_headers"] if pch is None else pch
+        if not cache and not pch:
+            return None
+        return Accelerator(".", cache=cache, pch=pch)
+
+    def measure_build_accel(self):
+        from buildengine import BuildEngine, Project
+        if getattr(self, "accel_job", None) is not None:
             return
-        data = self.build_process.readAllStandardOutput().data().decode(errors="ignore")
-        if data:
-            self.append_terminal(data.rstrip("\n"))
-
-    def on_build_finished(self, exit_code, exit_status):
+        cache, pch = self.compiler_cache_box.isChecked(), self.pch_box.isChecked()
+        if not cache and not pch:
+            cache = pch = True  # nothing ticked yet: measure both
+        accel = self.make_accelerator(cache=cache, pch=pch)
+        engine = BuildEngine(Project.load("."), jobs=1, target="native", accel=accel)
+        self.append_terminal(f"[accel] measuring ({accel.describe()})...")
+        self.accel_measure_button.setEnabled(False)
+        self.accel_job = AccelMeasureJob(accel, engine, self)
+        self.accel_job.output.connect(self.append_terminal)
+        self.accel_job.finished.connect(self.on_accel_measured)
+        self.accel_job.start()
+
+    def on_accel_measured(self):
+        self.accel_job = None
+        self.accel_measure_button.setEnabled(True)
+
+    def on_build_output(self, text):
+        from diagnostics import parse_diagnostics
+        self.append_terminal(text)
+        found = parse_diagnostics(text)
+        if found:
+            self.diagnostics["build"].extend(found)
+            self.show_diagnostics()
+
+    def on_build_finished(self, exit_code, exit_status=None):
+        job = self.sender()
+        if isinstance(job, BuildJob) and job is not self.build_process:
+            return  # a replaced job whose result was already queued
+        run_after, self.run_after_build = self.run_after_build, False
+        self.build_process = None
         if exit_code == 0:
             self.append_terminal("Build finished successfully.")
+            if run_after:
+                # compile-on-run: go straight on to running it
+                self.run_project_in_terminal()
+                return
             QMessageBox.information(self, "Build", "Compilation successful!")
         else:
             self.append_terminal(f"Build failed with exit code {exit_code}")
             QMessageBox.critical(self, "Build failed", "Compilation failed. Check terminal output.")
-        self.build_process = None
 
     def show_compile_options(self):
         # Show a small dialog with choices for x86 or ARM
@@ -901,18 +1617,114 @@ class ZenithOSApp(QMainWindow):
         btn_arm.clicked.connect(lambda: (dlg.accept(), self.compile_with_compiler(detected, output_name="app_arm")))
         layout.addWidget(btn_arm)
 
+        from buildengine import detect_toolchains
+        toolchains = detect_toolchains()
+        btn_all = QPushButton(f"Build all targets ({len(toolchains)} toolchains)")
+        btn_all.setEnabled(bool(toolchains))
+        btn_all.clicked.connect(lambda: (dlg.accept(), self.build_all_targets()))
+        layout.addWidget(btn_all)
+
         note = QLabel("Short click the Compile button -> normal gcc. Long-press -> options.")
         note.setStyleSheet("color: gray; font-size: 12px;")
         layout.addWidget(note)
 
         dlg.setLayout(layout)
-        dlg.setFixedSize(360, 160)
+        dlg.setFixedSize(360, 200)
         dlg.exec()
 
+    # --- multi-target builds: one BuildJob per detected toolchain, all at once ---
+    def build_all_targets(self):
+        from buildengine import BUILD_DIR, BuildEngine, Project, detect_toolchains
+        from zenith import auto_link_flags
+        toolchains = detect_toolchains()
+        if not toolchains:
+            QMessageBox.warning(self, "Missing Compiler", "No toolchains were found in PATH.")
+            return
+        if self.running_target_builds():
+            QMessageBox.warning(self, "Build", "A multi-target build is already running.")
+            return
+
+        self.save_project(silent=True)
+        self.clear_terminal()
+        flags, ok = QInputDialog.getText(self, "Compiler Flags", "Enter flags for all targets (leave empty for none):")
+        if not ok:
+            self.append_terminal("Compilation cancelled by user.")
+            return
+
+        project = Project.load(".")
+        extra_flags, note = auto_link_flags(project, flags.split())
+        if note:
+            self.append_terminal(note)
+        extra_flags.extend(flags.split())
+
+        # share the configured job count between the targets
+        total_jobs = int(self.settings["build_jobs"]) or os.cpu_count() or 1
+        per_target = max(1, total_jobs // len(toolchains))
+        names = ", ".join(t for t, _ in toolchains)
+        self.append_terminal(f"Building {len(toolchains)} targets in parallel ({per_target} jobs each): {names}")
+
+        self.target_builds = {}
+        for target, compiler in toolchains:
+            engine = BuildEngine(
+                project,
+                compiler=compiler,
+                jobs=per_target,
+                target=target,
+                extra_flags=extra_flags,
+                output=os.path.join(BUILD_DIR, target, project.output),
+                accel=self.make_accelerator(),
+            )
+            job = BuildJob(engine, self)
+            job.output.connect(lambda text, t=target: self.on_target_output(t, text))
+            job.finished.connect(lambda code, t=target: self.on_target_finished(t, code))
+            self.target_builds[target] = {
+                "job": job, "compiler": compiler, "started": time.perf_counter(),
+                "code": None, "seconds": 0.0,
+            }
+            job.start()
+
+    def running_target_builds(self):
+        return [t for t, b in getattr(self, "target_builds", {}).items() if b["code"] is None]
+
+    def on_target_output(self, target, text):
+        for line in text.splitlines():
+            self.append_terminal(f"[{target}] {line}")
+
+    def on_target_finished(self, target, exit_code):
+        build = self.target_builds.get(target)
+        if build is None:
+            return
+        build["code"] = exit_code
+        build["seconds"] = time.perf_counter() - build["started"]
+        if self.running_target_builds():
+            return
+
+        # summary matrix once every target is done
+        lines = [f"{'Target':<24} {'Compiler':<26} {'Result':<8} {'Units':>7} {'Time':>8}  Output"]
+        ok_count = 0
+        for t, b in self.target_builds.items():
+            result = b["job"].result
+            units = f"{len(result.compiled)}/{len(result.compiled) + len(result.skipped) + len(result.failed)}" if result else "-"
+            status = "OK" if b["code"] == 0 else "FAILED"
+            ok_count += b["code"] == 0
+            output = os.path.relpath(result.output) if result and result.output else "-"
+            lines.append(f"{t:<24} {b['compiler']:<26} {status:<8} {units:>7} {b['seconds']:>7.2f}s  {output}")
+        self.append_terminal("")
+        for line in lines:
+            self.append_terminal(line)
+        total = len(self.target_builds)
+        if ok_count == total:
+            QMessageBox.information(self, "Build", f"All {total} targets built successfully!")
+        else:
+            QMessageBox.critical(self, "Build failed", f"{total - ok_count} of {total} targets failed. Check terminal output.")
+
     def run_project_in_terminal(self):
         if not os.path.exists("app"):
-            QMessageBox.warning(self, "Run", "Binary ./app not found. Compiling first...")
+            self.append_terminal("Binary ./app not found. Compiling first...")
+            self.run_after_build = True
             self.compile_with_compiler("gcc", output_name="app")
+            if self.build_process is None:
+                self.run_after_build = False  # not started (cancelled) or already done
             return
 
         args_text, ok = QInputDialog.getText(self, "Run App", "Enter arguments (separated by spaces):")
@@ -945,18 +1757,119 @@ class ZenithOSApp(QMainWindow):
             QMessageBox.critical(self, "Error", f"Failed to start app:\n{e}")
             self.run_process = None
 
+    # --- run with profiling ---
+    def show_profile_options(self):
+        dlg = QDialog(self)
+        dlg.setWindowTitle("Run with profiling")
+        dlg.setStyleSheet("background-color: #2C0032; color: white; padding: 5px;")
+        layout = QVBoxLayout(dlg)
+
+        form = QHBoxLayout()
+        form.addWidget(QLabel("Runs:"))
+        runs_spin = QSpinBox()
+        runs_spin.setRange(1, 1000)
+        runs_spin.setValue(self.settings["profile_runs"])
+        form.addWidget(runs_spin)
+        form.addWidget(QLabel("Warmup:"))
+        warmup_spin = QSpinBox()
+        warmup_spin.setRange(0, 100)
+        warmup_spin.setValue(self.settings["profile_warmup"])
+        form.addWidget(warmup_spin)
+        layout.addLayout(form)
+
+        args_input = QLineEdit()
+        args_input.setPlaceholderText("Arguments (separated by spaces)")
+        layout.addWidget(args_input)
+
+        perf_box = QCheckBox("Hardware counters (perf stat)")
+        perf_box.setEnabled(shutil.which("perf") is not None)
+        if not perf_box.isEnabled():
+            perf_box.setToolTip("perf was not found in PATH")
+        layout.addWidget(perf_box)
+        gprof_box = QCheckBox("Flat profile (build with -pg, gprof)")
+        gprof_box.setEnabled(shutil.which("gprof") is not None)
+        layout.addWidget(gprof_box)
+
+        buttons = QHBoxLayout()
+        start_btn = QPushButton("Start")
+        start_btn.clicked.connect(lambda: (dlg.accept(), self.run_with_profiling(
+            runs_spin.value(), warmup_spin.value(), args_input.text().split(),
+            perf_box.isChecked(), gprof_box.isChecked())))
+        buttons.addWidget(start_btn)
+        history_btn = QPushButton("History")
+        history_btn.clicked.connect(lambda: (dlg.accept(), self.show_profile_history()))
+        buttons.addWidget(history_btn)
+        layout.addLayout(buttons)
+        dlg.exec()
+
+    def run_with_profiling(self, runs, warmup, args, perf=False, gprof=False):
+        if self.profile_job is not None:
+            QMessageBox.warning(self, "Profile", "A profiling run is already in progress.")
+            return
+        if not os.path.exists("app"):
+            QMessageBox.warning(self, "Run", "Binary ./app not found. Compiling first...")
+            self.compile_with_compiler("gcc", output_name="app")
+            return
+        self.settings["profile_runs"], self.settings["profile_warmup"] = runs, warmup
+        self.save_settings()
+        self.clear_terminal()
+        self.append_terminal(f"Profiling ./app: {runs} runs after {warmup} warmup...")
+        self.profile_job = ProfileJob(runs, warmup, args, perf, gprof, self)
+        self.profile_job.output.connect(self.append_terminal)
+        self.profile_job.app_output.connect(lambda data: self.terminal.feed(data, "run"))
+        self.profile_job.finished.connect(self.on_profile_finished)
+        self.profile_job.start()
+
+    def on_profile_finished(self, report, error):
+        from profiler import ProfileStore, format_report
+        self.profile_job = None
+        self.terminal.finish("run")
+        if report is None:
+            self.append_terminal(f"Profiling {'cancelled' if error == 'cancelled' else 'failed: ' + error}")
+            return
+        # results are kept per build hash; compare with the last different build
+        store = ProfileStore(".")
+        baseline = store.previous(report) or store.previous(report, same_build=True)
+        try:
+            store.add(report)
+        except OSError as e:
+            self.append_terminal(f"[profile] could not store results: {e}")
+        self.append_terminal("")
+        for line in format_report(report, baseline):
+            self.append_terminal(line)
+
+    def show_profile_history(self):
+        from profiler import ProfileStore
+        records = ProfileStore(".").history("app")
+        self.clear_terminal()
+        if not records:
+            self.append_terminal("No profiling runs recorded yet.")
+            return
+        self.append_terminal(f"{'When':<17} {'Build':<13} {'Runs':>5} {'Median wall':>12} {'Peak RSS':>10}  Args")
+        for r in records[-30:]:
+            wall = r["stats"].get("wall", {}).get("median", 0) * 1000
+            rss = r["stats"].get("peak_rss_kb", {}).get("median", 0)
+            when = time.strftime("%Y-%m-%d %H:%M", time.localtime(r["time"]))
+            self.append_terminal(f"{when:<17} {r['build'][:12]:<13} {r['runs']:>5} {wall:>9.2f} ms {rss:>7.0f} KB  {' '.join(r['args'])}")
+
     def on_run_output(self):
         if not self.run_process:
             return
-        data = self.run_process.readAllStandardOutput().data().decode(errors="ignore")
-        if data:
-            self.append_terminal(data.rstrip("\n"))
+        self.terminal.feed(self.run_process.readAllStandardOutput().data(), "run")
 
     def on_run_finished(self, exit_code, exit_status):
+        # output still buffered in the process object, then the decoder's tail
+        if self.run_process is not None:
+            self.terminal.feed(self.run_process.readAllStandardOutput().data(), "run")
+        self.terminal.finish("run")
         self.append_terminal(f"App finished with exit code {exit_code}")
         self.run_process = None
 
     def compile_to_zapp(self):
+        # second click while the pipeline runs cancels it
+        if self.zapp_stage is not None:
+            self.cancel_zapp()
+            return
         self.save_project(silent=True)
         self.clear_terminal()
         self.append_terminal("Compiling and packaging to .ZAPP...")
@@ -968,85 +1881,104 @@ class ZenithOSApp(QMainWindow):
         if not ok3: return
         description, ok4 = QInputDialog.getMultiLineText(self, "Manifest", "Description:")
         if not ok4: return
-        with open("manifest.json", "w", encoding="utf-8") as f:
-            f.write("{\n"
-                    f"    \"name\": \"{name}\",\n"
-                    f"    \"version\": \"{version}\",\n"
-                    f"    \"author\": \"{author}\",\n"
-                    f"    \"description\": \"{description}\",\n"
-                    f"    \"binary\": \"app\"\n"
-                    "}\n")
+        from zapp import write_manifest
+        write_manifest("manifest.json", name, version, author, description, binary="app")
         self.append_terminal("Manifest created: manifest.json")
 
-        gcc_path = shutil.which("gcc")
-        if gcc_path:
-            flags, ok = QInputDialog.getText(self, "GCC Flags", "Enter GCC flags (or leave empty for none):")
+        if shutil.which("gcc") is None:
+            self.append_terminal("gcc not found, skipping native compilation.")
+            self.start_zapp_packaging()
+            return
+        flags, ok = QInputDialog.getText(self, "GCC Flags", "Enter GCC flags (or leave empty for none):")
         if not ok:
             self.append_terminal("Compilation cancelled by user.")
             return
-        cmd = ["gcc", "main.c", "-o", "app", "-I./include"]
-        if flags.strip():
-            cmd.extend(flags.split())
-            proc = QProcess(self)
-            proc.setProgram(cmd[0])
-            proc.setArguments(cmd[1:])
-            proc.setProcessChannelMode(QProcess.MergedChannels)
-            proc.readyReadStandardOutput.connect(lambda: self.append_terminal(proc.readAllStandardOutput().data().decode(errors="ignore").rstrip("\n")))
-            proc.start()
-            proc.waitForFinished(-1)
-            if proc.exitCode() != 0:
-                self.append_terminal("Compilation failed, aborting .ZAPP packaging.")
-                QMessageBox.critical(self, "Error", "Compilation failed. See terminal.")
-                return
-            else:
-                self.append_terminal("Compilation OK.")
+        build, hit = self.prepare_build("gcc", "app", flags)
+        if hit:
+            self.start_zapp_packaging()
+            return
+        self.set_zapp_stage("compile")
+        self.zapp_job = BuildJob(build.engine, self, cached=build)
+        self.zapp_job.output.connect(self.on_build_output)
+        self.zapp_job.finished.connect(self.on_zapp_compiled)
+        self.zapp_job.start()
+
+    def set_zapp_stage(self, stage):
+        self.zapp_stage = stage
+        if stage is None:
+            self.zapp_button.setText("Compile to .ZAPP")
+            self.zapp_progress.hide()
         else:
-            self.append_terminal("gcc not found, skipping native compilation.")
-
-        try:
-            zapp_name = "project.zapp"
-            tmp_zip = "project_tmp.zip"
-            with zipfile.ZipFile(tmp_zip, "w", zipfile.ZIP_DEFLATED) as zf:
-                if os.path.exists("main.c"):
-                    zf.write("main.c", arcname="main.c")
-                if os.path.exists("include"):
-                    for root, _, files in os.walk("include"):
-                        for f in files:
-                            full = os.path.join(root, f)
-                            arc = os.path.relpath(full, ".")
-                            zf.write(full, arcname=arc)
-                if os.path.exists("manifest.json"):
-                    zf.write("manifest.json", arcname="manifest.json")
-            if os.path.exists(zapp_name):
-                os.remove(zapp_name)
-            os.rename(tmp_zip, zapp_name)
-            self.append_terminal(f"Packaged -> {zapp_name}")
-            QMessageBox.information(self, "ZAPP", f"Created {zapp_name}")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to create .ZAPP:\n{e}")
+            self.zapp_button.setText("Cancel .ZAPP")
+            self.zapp_progress.setRange(0, 0)  # busy until the packer knows the total
+            self.zapp_progress.setFormat("Compiling..." if stage == "compile" else "Packaging %v/%m")
+            self.zapp_progress.show()
+
+    def cancel_zapp(self):
+        if self.zapp_job is not None:
+            self.append_terminal("Cancelling .ZAPP build...")
+            self.zapp_job.kill()
+
+    def on_zapp_compiled(self, exit_code):
+        job, self.zapp_job = self.zapp_job, None
+        if job is not None and job.result is not None and job.result.cancelled:
+            self.append_terminal(".ZAPP packaging cancelled.")
+            self.set_zapp_stage(None)
+            return
+        if exit_code != 0:
+            self.append_terminal("Compilation failed, aborting .ZAPP packaging.")
+            self.set_zapp_stage(None)
+            QMessageBox.critical(self, "Error", "Compilation failed. See terminal.")
+            return
+        self.append_terminal("Compilation OK.")
+        self.start_zapp_packaging()
+
+    def start_zapp_packaging(self):
+        self.set_zapp_stage("pack")
+        self.zapp_job = PackJob("project.zapp", binary="app", parent=self)
+        self.zapp_job.progress.connect(self.on_zapp_progress)
+        self.zapp_job.finished.connect(self.on_zapp_packed)
+        self.zapp_job.start()
+
+    def on_zapp_progress(self, done, total):
+        if self.zapp_progress.maximum() != total:
+            self.zapp_progress.setRange(0, total)
+        self.zapp_progress.setValue(done)
+
+    def on_zapp_packed(self, ok, error):
+        job, self.zapp_job = self.zapp_job, None
+        self.set_zapp_stage(None)
+        if ok:
+            result = job.result
+            self.append_terminal(
+                f"Packaged -> {job.output}: {result.entries} entries ({result.reused} reused, "
+                f"{result.compressed} deflated, {result.stored} stored) in {result.seconds * 1000:.0f} ms"
+            )
+            QMessageBox.information(self, "ZAPP", f"Created {job.output}")
+        elif error == "cancelled":
+            self.append_terminal(".ZAPP packaging cancelled.")
+        else:
+            self.append_terminal(f"Failed to create .ZAPP: {error}")
+            QMessageBox.critical(self, "Error", f"Failed to create .ZAPP:\n{error}")
 
     def clear_terminal(self):
-        self.terminal_output.clear()
+        self.terminal.clear()
 
     def append_terminal(self, text):
-        self.terminal_output.appendPlainText(text)
+        self.terminal.write_line(text)
 
     def clean_project(self):
-        removed = []
-        for f in ["app", "app_arm", "project.zapp", "manifest.json"]:
-            if os.path.exists(f):
-                try:
-                    os.remove(f)
-                    removed.append(f)
-                except:
-                    pass
+        from zenith import clean
+        removed = clean(".")
         if removed:
             QMessageBox.information(self, "Clean", "Removed: " + ", ".join(removed))
         else:
             QMessageBox.information(self, "Clean", "Nothing to remove.")
 
     def back_to_main(self):
-        if self.build_process is not None or self.run_process is not None:
+        running_targets = self.running_target_builds()
+        if (self.build_process is not None or self.run_process is not None or running_targets
+                or self.zapp_job is not None or self.profile_job is not None):
             resp = QMessageBox.question(self, "Processes running",
                 "There are running processes. Stop them and go back?", QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
             if resp != QMessageBox.Yes:
@@ -1056,34 +1988,48 @@ class ZenithOSApp(QMainWindow):
                     self.build_process.kill()
                 if self.run_process is not None:
                     self.run_process.kill()
+                for t in running_targets:
+                    self.target_builds[t]["job"].kill()
+                if self.zapp_job is not None:
+                    self.zapp_job.kill()
+                if self.profile_job is not None:
+                    self.profile_job.kill()
             except:
                 pass
         self.stacked_widget.setCurrentWidget(self.main_menu)
 
     def save_project(self, silent=False):
+        # writes every modified open document to its own file
         try:
-            with open("main.c", "w", encoding="utf-8") as f:
-                f.write(self.text_edit.toPlainText())
-            if not silent:
-                msg = QMessageBox()
-                msg.setIcon(QMessageBox.Information)
-                msg.setText("Project saved successfully!")
-                msg.setWindowTitle("Save")
-                msg.setStyleSheet("""
-                    QMessageBox { background-color: #4B0082; color: white; }
-                    QPushButton { background-color: #6200EE; color: white; font-size: 16px; border: none; padding: 10px 20px; border-radius: 20px; }
-                    QPushButton:hover { background-color: #3700B3; }
-                """)
-                msg.exec()
-            else:
-                self.append_terminal("Saved main.c")
+            saved = self.documents.save_all()
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to save project:\n{e}")
+            return
+        for path in saved:
+            self.refresh_symbols(path)
+        names = ", ".join(os.path.relpath(p) for p in saved)
+        if not silent:
+            msg = QMessageBox()
+            msg.setIcon(QMessageBox.Information)
+            msg.setText(f"Project saved successfully!\n{names}" if saved else "Nothing to save.")
+            msg.setWindowTitle("Save")
+            msg.setStyleSheet("""
+                QMessageBox { background-color: #4B0082; color: white; }
+                QPushButton { background-color: #6200EE; color: white; font-size: 16px; border: none; padding: 10px 20px; border-radius: 20px; }
+                QPushButton:hover { background-color: #3700B3; }
+            """)
+            msg.exec()
+        elif saved:
+            self.append_terminal(f"Saved {names}")
 
     def save_api_settings(self):
         target_version = self.target_api_combo.currentText()
         min_version = self.min_api_combo.currentText()
-        QMessageBox.information(self, "Saved!", f"Target version: {target_version}\nMinimal version: {min_version}")
+        self.settings["build_jobs"] = self.build_jobs_spin.value()
+        self.settings["compiler_cache"] = self.compiler_cache_box.isChecked()
+        self.settings["precompiled_headers"] = self.pch_box.isChecked()
+        self.save_settings()
+        QMessageBox.information(self, "Saved!", f"Target version: {target_version}\nMinimal version: {min_version}\nBuild jobs: {self.settings['build_jobs'] or 'all cores'}")
 
     def show_about(self):
         about_window = QDialog(self)
@@ -1116,15 +2062,14 @@ class ZenithOSApp(QMainWindow):
         theme_label.setFont(QFont("Poppins", 16))
         layout.addWidget(theme_label)
         theme_combo = QComboBox()
-        theme_combo.addItems(["Purple (default)", "Dark (серо-графитовые кнопки)", "Deep Blue (темно-синий)"])
+        self.theme_engine.reload()
+        self.available_themes = self.theme_engine.names()
+        theme_combo.addItems([self.theme_engine.label(n) for n in self.available_themes])
         theme_combo.setStyleSheet("QComboBox { background-color: #2C0032; color: #E0E0E0; padding: 5px; font-size: 16px; border: none; border-radius: 10px; } QComboBox QAbstractItemView { background-color: #2C0032; color: #E0E0E0; }")
+        # set current index to saved theme (before connecting, so opening doesn't re-apply it)
+        if self.current_theme in self.available_themes:
+            theme_combo.setCurrentIndex(self.available_themes.index(self.current_theme))
         theme_combo.currentIndexChanged.connect(self.change_theme)
-        # set current index to saved theme
-        try:
-            idx_map = {"purple": 0, "dark": 1, "deepblue": 2}
-            theme_combo.setCurrentIndex(idx_map.get(self.current_theme, 0))
-        except Exception:
-            pass
         layout.addWidget(theme_combo)
         ok_button = QPushButton("OK")
         ok_button.setStyleSheet("QPushButton { background-color: #6200EE; color: white; font-size: 16px; border: none; padding: 10px 20px; border-radius: 20px; } QPushButton:hover { background-color: #3700B3; }")
@@ -1134,15 +2079,10 @@ class ZenithOSApp(QMainWindow):
         settings_dialog.exec()
 
     def change_theme(self, index):
-        # index: 0 -> purple, 1 -> dark, 2 -> deepblue
-        try:
-            if index == 1:
-                self.current_theme = "dark"
-            elif index == 2:
-                self.current_theme = "deepblue"
-            else:
-                self.current_theme = "purple"
-        except Exception:
+        # index into the settings combo, same order as available_themes
+        if 0 <= index < len(self.available_themes):
+            self.current_theme = self.available_themes[index]
+        else:
             self.current_theme = "purple"
         # apply and persist
         try:
@@ -1161,36 +2101,132 @@ class ZenithOSApp(QMainWindow):
         self.anim = anim
         self.search_input.setFocus()
 
+    def schedule_search(self, *args):
+        self.search_timer.start()
+
+    def on_editor_contents_change(self, position, removed, added):
+        self.schedule_diagnostics()
+        self.search_engine.invalidate()
+        if self.search_input.text():
+            self.search_timer.start(300)
+
     def highlight_search(self):
-        extra_selections = []
-        text = self.search_input.text()
-        if text:
-            pattern = re.escape(text)
-            if self.case_checkbox.isChecked():
-                regex = re.compile(pattern)
-            else:
-                regex = re.compile(pattern, re.IGNORECASE)
-            for match in regex.finditer(self.text_edit.toPlainText()):
-                selection = QTextEdit.ExtraSelection()
-                selection.format.setBackground(QColor("yellow"))
-                cursor = self.text_edit.textCursor()
-                cursor.setPosition(match.start())
-                cursor.setPosition(match.end(), QTextCursor.KeepAnchor)
-                selection.cursor = cursor
-                extra_selections.append(selection)
-        self.text_edit.setExtraSelections(extra_selections)
+        query = self.search_input.text()
+        engine = self.search_engine
+        if not query:
+            engine.reset()
+        else:
+            if not engine.has_text():
+                # one snapshot per document change, not per keystroke
+                engine.set_text(self.text_edit.toPlainText())
+            engine.search(query, self.case_checkbox.isChecked(), self.regex_checkbox.isChecked())
+        self.match_label.setText(engine.status())
+        self.refresh_search_selections()
+
+    def visible_text_range(self):
+        viewport = self.text_edit.viewport()
+        start = self.text_edit.cursorForPosition(QPoint(0, 0)).position()
+        end_cursor = self.text_edit.cursorForPosition(QPoint(viewport.width() - 1, viewport.height() - 1))
+        end_cursor.movePosition(QTextCursor.EndOfBlock)
+        return start, end_cursor.position() + 1
+
+    def refresh_search_selections(self, *args):
+        engine = self.search_engine
+        if not getattr(self, "search_input", None) or not engine.query:
+            self.text_edit.setExtraSelections(self.diagnostic_selections)
+            return
+        start, end = self.visible_text_range()
+        doc = self.text_edit.document()
+        doc_len = doc.characterCount() - 1
+        current = engine.span(engine.current) if engine.current >= 0 else None
+        selections = []
+        for s, e in engine.in_range(start, end):
+            if e > doc_len:
+                # stale hits past the end until the next search runs
+                break
+            selection = QTextEdit.ExtraSelection()
+            selection.format.setBackground(QColor("orange" if (s, e) == current else "yellow"))
+            cursor = QTextCursor(doc)
+            cursor.setPosition(s)
+            cursor.setPosition(e, QTextCursor.KeepAnchor)
+            selection.cursor = cursor
+            selections.append(selection)
+        self.text_edit.setExtraSelections(self.diagnostic_selections + selections)
+
+    def find_next(self):
+        self.jump_to_match(forward=True)
+
+    def find_previous(self):
+        self.jump_to_match(forward=False)
+
+    def jump_to_match(self, forward=True):
+        if self.search_timer.isActive():
+            self.search_timer.stop()
+            self.highlight_search()
+        engine = self.search_engine
+        cursor = self.text_edit.textCursor()
+        if forward:
+            span = engine.next(cursor.selectionStart() + 1 if cursor.hasSelection() else cursor.position())
+        else:
+            span = engine.previous(cursor.selectionStart())
+        if span is None:
+            return
+        cursor.setPosition(span[0])
+        cursor.setPosition(span[1], QTextCursor.KeepAnchor)
+        self.text_edit.setTextCursor(cursor)
+        self.text_edit.ensureCursorVisible()
+        self.match_label.setText(engine.status())
+        self.refresh_search_selections()
+
+class StartupProfile:
+    # --startup-profile: wall time of each startup phase, printed once the window is painted
+    def __init__(self, enabled, started):
+        self.enabled = enabled
+        self.started = started
+        self.last = started
+        self.phases = []
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def report(self):
+        if not self.enabled:
+            return
+        print("Startup profile:")
+        for phase, secs in self.phases:
+            print(f"  {phase:<22} {secs * 1000:8.1f} ms")
+        print(f"  {'total':<22} {(self.last - self.started) * 1000:8.1f} ms")
 
-if __name__ == "__main__":
-    app = QApplication(sys.argv)
 
+if __name__ == "__main__":
+    profile = StartupProfile("--startup-profile" in sys.argv, IMPORT_STARTED)
+    profile.mark("import")
+    app = QApplication([a for a in sys.argv if a != "--startup-profile"])
+    profile.mark("QApplication")
+
+    # the window is built while the splash is up; the splash goes away as
+    # soon as the window has painted instead of after a fixed delay
+    splash = None
     splash_path = "StudioAssets/studio.png"
     if os.path.exists(splash_path):
         splash = QSplashScreen(QPixmap(splash_path))
         splash.setWindowFlags(Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint)
         splash.show()
-        QTimer.singleShot(800, splash.close)
-        QTimer.singleShot(800, lambda: ZenithOSApp().show())
-    else:
-        ZenithOSApp().show()
+        app.processEvents()
+        profile.mark("splash")
+
+    window = ZenithOSApp()
+    profile.mark("window construction")
+
+    def on_first_paint():
+        profile.mark("first paint")
+        if splash is not None:
+            splash.close()
+        profile.report()
+
+    window.firstPaint.connect(on_first_paint)
+    window.show()
 
     sys.exit(app.exec())
@@ -0,0 +1,348 @@
+# Symbol index for the SDK headers and the project's sources.
+# Every header under include/ and every project .c file is scanned for
+# functions, macros, structs/unions/enums, enum constants, typedefs and
+# globals. Results are kept per file in .zenithcache/symbols.json keyed by
+# mtime/size (and content hash when those change), so a restart only
+# re-parses files that really changed. Lookups go through a sorted name
+# list, so completion is a bisect plus a short scan.
+import json, os, re
+from bisect import bisect_left
+
+from buildcache import CACHE_DIR, file_hash
+from buildengine import Project
+
+INDEX_VERSION = 1
+INDEX_FILE = "symbols.json"
+HEADER_EXTENSIONS = (".h", ".hh", ".hpp")
+
+# comments and string/char literals, blanked out before scanning
+NOISE_RE = re.compile(r'//[^\n]*|/\*.*?\*/|"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'', re.S)
+DIRECTIVE_RE = re.compile(r'^[ \t]*#(?:[^\n]*\\\n)*[^\n]*', re.M)
+DEFINE_RE = re.compile(r'^[ \t]*#[ \t]*define[ \t]+([A-Za-z_]\w*)(\()?([^\n]*)', re.M)
+BRACES_RE = re.compile(r'[{};]')
+IDENT_RE = re.compile(r'[A-Za-z_]\w*')
+NAME_BEFORE_RE = re.compile(r'([A-Za-z_]\w*)\s*$')
+FUNC_PTR_RE = re.compile(r'\(\s*\*\s*([A-Za-z_]\w*)\s*\)')
+TAG_RE = re.compile(r'\b(struct|union|enum)\s+([A-Za-z_]\w*)\s*$')
+SPACE_RE = re.compile(r'\s+')
+
+NOT_NAMES = {
+    "if", "for", "while", "switch", "return", "sizeof", "do", "else",
+    "struct", "union", "enum", "typedef", "const", "static", "extern",
+    "inline", "volatile", "unsigned", "signed", "int", "char", "void",
+    "long", "short", "float", "double",
+}
+
+
+class Symbol:
+    __slots__ = ("name", "kind", "file", "line", "signature", "definition")
+
+    def __init__(self, name, kind, file, line, signature="", definition=True):
+        self.name = name
+        self.kind = kind            # function, macro, struct, union, enum, constant, typedef, variable
+        self.file = file            # path relative to the project root
+        self.line = line            # 1-based
+        self.signature = signature
+        self.definition = definition
+
+    def to_json(self):
+        return [self.name, self.kind, self.line, self.signature, self.definition]
+
+    @classmethod
+    def from_json(cls, file, js):
+        name, kind, line, signature, definition = js
+        return cls(name, kind, file, line, signature, definition)
+
+
+def _call_name(text):
+    # name in front of the first top-level "(...)" group: "int f(void (*cb)(int))" -> f
+    depth = 0
+    for i, c in enumerate(text):
+        if c == "(":
+            if depth == 0:
+                m = NAME_BEFORE_RE.search(text, 0, i)
+                return m if m and text[i + 1:].lstrip()[:1] != "*" else None
+            depth += 1
+        elif c == ")":
+            depth -= 1
+    return None
+
+
+def _blank(m):
+    # keep newlines so offsets still map to the right line
+    return re.sub(r'[^\n]', " ", m.group(0))
+
+
+def parse_source(text, file=""):
+    symbols = []
+    newlines = [i for i, c in enumerate(text) if c == "\n"]
+
+    def line_of(offset):
+        return bisect_left(newlines, offset) + 1
+
+    def add(name, kind, offset, signature="", definition=True):
+        if name and name not in NOT_NAMES:
+            symbols.append(Symbol(name, kind, file, line_of(offset), signature, definition))
+
+    clean = NOISE_RE.sub(_blank, text)
+    for m in DEFINE_RE.finditer(clean):
+        name, params, body = m.group(1), m.group(2), m.group(3).strip()
+        # include guards (#define FOO_H with no value) aren't interesting
+        if not params and not body and name.endswith("_H"):
+            continue
+        sig = f"#define {name}" + ("(" + body.split(")", 1)[0] + ")" if params else "")
+        add(name, "macro", m.start(1), sig)
+    clean = DIRECTIVE_RE.sub(_blank, clean)
+
+    depth = 0
+    stmt_start = 0      # start of the current top-level statement
+    head = None         # (text, offset) before the outermost "{"
+    body_start = 0
+    pieces = []         # statement text with brace bodies cut out
+    for m in BRACES_RE.finditer(clean):
+        c, pos = m.group(0), m.start()
+        if c == "{":
+            if depth == 0:
+                head = (clean[stmt_start:pos], stmt_start)
+                body_start = pos + 1
+            depth += 1
+        elif c == "}":
+            if depth == 0:
+                continue
+            depth -= 1
+            if depth:
+                continue
+            text_head, head_off = head
+            stripped = text_head.rstrip()
+            name_m = _call_name(text_head) if stripped.endswith(")") else None
+            if name_m and "=" not in text_head and not pieces:
+                # function definition; nothing follows it up to a ";"
+                add(name_m.group(1), "function", head_off + name_m.start(1),
+                    SPACE_RE.sub(" ", stripped).strip())
+                stmt_start = pos + 1
+                continue
+            tag = TAG_RE.search(text_head)
+            if tag:
+                add(tag.group(2), tag.group(1), head_off + tag.start(2))
+            if tag and tag.group(1) == "enum" or re.search(r'\benum\s*$', text_head):
+                _enum_constants(clean, body_start, pos, add)
+            pieces.append((text_head, head_off))
+            stmt_start = pos + 1
+        elif depth == 0:
+            pieces.append((clean[stmt_start:pos], stmt_start))
+            _declaration(pieces, add)
+            pieces = []
+            stmt_start = pos + 1
+    return symbols
+
+
+def _enum_constants(clean, start, end, add):
+    for part_m in re.finditer(r'[^,]+', clean[start:end]):
+        ident = IDENT_RE.search(part_m.group(0))
+        if ident:
+            add(ident.group(0), "constant", start + part_m.start() + ident.start())
+
+
+def _declaration(pieces, add):
+    # a top-level statement ending in ";"; pieces skip any "{...}" bodies
+    text = " ".join(p for p, _ in pieces)
+    stripped = text.strip()
+    if not stripped:
+        return
+
+    def offset_of(idx):
+        # map an index in `text` back to the source offset
+        for piece, off in pieces:
+            if idx <= len(piece):
+                return off + idx
+            idx -= len(piece) + 1
+        return pieces[-1][1]
+
+    words = stripped.split()
+    if words[0] == "typedef":
+        fp = FUNC_PTR_RE.search(text)
+        if fp:
+            add(fp.group(1), "typedef", offset_of(fp.start(1)), SPACE_RE.sub(" ", stripped))
+            return
+        decl = text.split("[", 1)[0]
+        names = list(IDENT_RE.finditer(decl))
+        if names:
+            last = names[-1]
+            add(last.group(0), "typedef", offset_of(last.start()), SPACE_RE.sub(" ", stripped))
+        return
+    if len(pieces) > 1:
+        # "struct x {...} var;" -- the tag was recorded with the body;
+        # "int t[] = {...};" is still a variable
+        if "=" not in pieces[0][0]:
+            return
+        text = pieces[0][0]
+    elif "(" in text and "=" not in text.split("(", 1)[0]:
+        name_m = _call_name(text)
+        if name_m and len(words) > 1:
+            add(name_m.group(1), "function", offset_of(name_m.start(1)),
+                SPACE_RE.sub(" ", stripped), definition=False)
+        return
+    decl = text.split("=", 1)[0].split("[", 1)[0]
+    if re.match(r'\s*(struct|union|enum)\s+\w+\s*$', decl):
+        return  # forward declaration
+    names = list(IDENT_RE.finditer(decl))
+    if len(names) > 1:
+        last = names[-1]
+        add(last.group(0), "variable", offset_of(last.start()), SPACE_RE.sub(" ", stripped))
+
+
+class SymbolIndex:
+    def __init__(self, root=".", include_dirs=("include",), cache_dir=CACHE_DIR):
+        self.root = os.path.abspath(root)
+        self.include_dirs = list(include_dirs)
+        self.cache_path = os.path.join(self.root, cache_dir, INDEX_FILE)
+        self.files = {}     # rel -> {"mtime_ns", "size", "hash", "symbols": [Symbol]}
+        self.names = []     # sorted unique names
+        self.by_name = {}   # name -> [Symbol]
+        self.parsed = 0     # files parsed by the last refresh
+        self._loaded = False
+
+    # --- persistence ---
+    def load(self):
+        self._loaded = True
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as fh:
+                js = json.load(fh)
+        except (OSError, ValueError):
+            return
+        if js.get("version") != INDEX_VERSION:
+            return
+        files = {}
+        for rel, entry in js.get("files", {}).items():
+            files[rel] = {
+                "mtime_ns": entry["mtime_ns"], "size": entry["size"], "hash": entry["hash"],
+                "symbols": [Symbol.from_json(rel, s) for s in entry["symbols"]],
+            }
+        self.files = files
+        self._rebuild()
+
+    def save(self):
+        js = {"version": INDEX_VERSION, "files": {
+            rel: {"mtime_ns": e["mtime_ns"], "size": e["size"], "hash": e["hash"],
+                  "symbols": [s.to_json() for s in e["symbols"]]}
+            for rel, e in self.files.items()
+        }}
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp = self.cache_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(js, fh, separators=(",", ":"))
+        os.replace(tmp, self.cache_path)
+
+    # --- indexing ---
+    def source_files(self):
+        rels = []
+        for inc in self.include_dirs:
+            base = os.path.join(self.root, inc)
+            for dirpath, dirnames, filenames in os.walk(base):
+                dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+                for f in sorted(filenames):
+                    if f.endswith(HEADER_EXTENSIONS):
+                        rels.append(os.path.relpath(os.path.join(dirpath, f), self.root).replace(os.sep, "/"))
+        for src in Project.load(self.root).sources():
+            if src.endswith((".c", ".h")) and os.path.isfile(os.path.join(self.root, src)):
+                rels.append(src.replace(os.sep, "/"))
+        return list(dict.fromkeys(rels))
+
+    def _index_file(self, rel):
+        # returns True when the file had to be parsed
+        path = os.path.join(self.root, rel)
+        st = os.stat(path)
+        entry = self.files.get(rel)
+        if entry and entry["mtime_ns"] == st.st_mtime_ns and entry["size"] == st.st_size:
+            return False
+        digest = file_hash(path)
+        if entry and entry["hash"] == digest:
+            entry["mtime_ns"], entry["size"] = st.st_mtime_ns, st.st_size
+            return False
+        with open(path, "r", encoding="utf-8", errors="ignore") as fh:
+            symbols = parse_source(fh.read(), rel)
+        self.files[rel] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size,
+                           "hash": digest, "symbols": symbols}
+        return True
+
+    def refresh(self):
+        # full pass: parse new/changed files, drop deleted ones
+        if not self._loaded:
+            self.load()
+        wanted = self.source_files()
+        changed = False
+        self.parsed = 0
+        for rel in wanted:
+            try:
+                if self._index_file(rel):
+                    self.parsed += 1
+                    changed = True
+            except OSError:
+                pass
+        for rel in set(self.files) - set(wanted):
+            del self.files[rel]
+            changed = True
+        self._rebuild()
+        try:
+            self.save()
+        except OSError:
+            pass
+        return changed
+
+    def update_file(self, path):
+        # incremental: one file added or changed (e.g. a plugin header)
+        if not self._loaded:
+            self.load()
+        rel = os.path.relpath(os.path.abspath(path), self.root).replace(os.sep, "/")
+        if not os.path.isfile(path):
+            self.files.pop(rel, None)
+        elif not self._index_file(rel):
+            return False
+        self._rebuild()
+        try:
+            self.save()
+        except OSError:
+            pass
+        return True
+
+    def _rebuild(self):
+        # build new lookup tables, then swap them in one assignment each
+        by_name = {}
+        for entry in self.files.values():
+            for sym in entry["symbols"]:
+                by_name.setdefault(sym.name, []).append(sym)
+        self.by_name = by_name
+        self.names = sorted(by_name)
+
+    # --- queries ---
+    def complete(self, prefix, limit=50):
+        names = self.names
+        out = []
+        i = bisect_left(names, prefix)
+        while i < len(names) and len(out) < limit and names[i].startswith(prefix):
+            out.append(names[i])
+            i += 1
+        return out
+
+    def lookup(self, name):
+        return self.by_name.get(name, [])
+
+    def definition(self, name):
+        # bodies/definitions before prototypes, project files before headers
+        syms = self.by_name.get(name)
+        if not syms:
+            return None
+        return sorted(syms, key=lambda s: (not s.definition, s.file.endswith(HEADER_EXTENSIONS)))[0]
+
+    def kinds(self):
+        # name -> highlighter token kind
+        out = {}
+        for name, syms in self.by_name.items():
+            kind = syms[0].kind
+            if kind == "function":
+                out[name] = "sdk_function"
+            elif kind in ("macro", "constant"):
+                out[name] = "sdk_constant"
+            elif kind in ("struct", "union", "enum", "typedef"):
+                out[name] = "sdk_type"
+        return out
@@ -0,0 +1,237 @@
+# Output pipeline for the Studio terminal.
+# Process output is decoded incrementally (multibyte UTF-8 split across
+# reads stays intact), queued, and painted into the QPlainTextEdit from a
+# timer in batches. SGR colour codes (as printed by paint.h / log.h /
+# icmp.h) become char formats; other escape sequences are dropped. If a
+# process outruns the widget the oldest pending output is skipped, since
+# the block limit would throw it away right after painting anyway.
+import codecs, re
+
+from PySide6.QtCore import QObject, QTimer
+from PySide6.QtGui import QColor, QTextCharFormat, QTextCursor, QFont
+
+DEFAULT_FPS = 40
+DEFAULT_MAX_BLOCKS = 5000
+FLUSH_CHARS = 256 * 1024        # max chars painted per tick
+MAX_BACKLOG = 4 * 1024 * 1024   # pending chars kept before skipping
+MAX_PENDING_ESCAPE = 8 * 1024   # longest unfinished escape held for the next chunk
+
+ANSI_COLORS = [
+    "#000000", "#CD3131", "#0DBC79", "#E5E510", "#2472C8", "#BC3FBC", "#11A8CD", "#E5E5E5",
+]
+ANSI_BRIGHT = [
+    "#666666", "#F14C4C", "#23D18B", "#F5F543", "#3B8EEA", "#D670D6", "#29B8DB", "#FFFFFF",
+]
+
+# CSI sequences, OSC sequences and lone two-char escapes
+ESCAPE_RE = re.compile(r"\x1b(?:\[([0-9;?]*)([@-~])|\][^\x07\x1b]*(?:\x07|\x1b\\)|[@-Z\\-_])")
+# an escape cut off at the end of a chunk; an OSC counts as finished once its
+# BEL or ESC \ has arrived, so only a trailing lone ESC of the ST is partial
+PARTIAL_ESCAPE_RE = re.compile(r"\x1b(?:\[[0-9;?]*|\][^\x07\x1b]*\x1b?)?$")
+
+
+class AnsiParser:
+    # turns text with escape codes into [(text, (fg, bold)), ...]
+    def __init__(self):
+        self.fg = None
+        self.bold = False
+        self.pending = ""
+
+    def reset(self):
+        self.fg = None
+        self.bold = False
+        self.pending = ""
+
+    def feed(self, text, final=False):
+        # final: the stream ended, an unfinished escape is dropped, not kept
+        if self.pending:
+            text = self.pending + text
+            self.pending = ""
+        if "\x1b" not in text:
+            return [(text, (self.fg, self.bold))] if text else []
+        # keep an unfinished escape for the next chunk: an OSC (hyperlinks,
+        # titles) can start anywhere in the chunk, anything else at its last ESC
+        tail = None
+        for start in (text.rfind("\x1b]"), text.rfind("\x1b")):
+            tail = PARTIAL_ESCAPE_RE.match(text, start) if start >= 0 else None
+            if tail:
+                break
+        if tail:
+            if not final and len(text) - tail.start() <= MAX_PENDING_ESCAPE:
+                self.pending = text[tail.start():]
+            text = text[:tail.start()]
+        out = []
+        pos = 0
+        for m in ESCAPE_RE.finditer(text):
+            if m.start() > pos:
+                out.append((text[pos:m.start()], (self.fg, self.bold)))
+            pos = m.end()
+            if m.group(2) == "m":
+                self.apply_sgr(m.group(1))
+        if pos < len(text):
+            out.append((text[pos:], (self.fg, self.bold)))
+        return out
+
+    def apply_sgr(self, params):
+        codes = [int(p) if p.isdigit() else 0 for p in params.split(";")] if params else [0]
+        i = 0
+        while i < len(codes):
+            c = codes[i]
+            if c == 0:
+                self.fg = None
+                self.bold = False
+            elif c == 1:
+                self.bold = True
+            elif c == 22:
+                self.bold = False
+            elif 30 <= c <= 37:
+                self.fg = ANSI_COLORS[c - 30]
+            elif 90 <= c <= 97:
+                self.fg = ANSI_BRIGHT[c - 90]
+            elif c == 39:
+                self.fg = None
+            elif c == 38 and i + 2 < len(codes) and codes[i + 1] == 5:
+                n = codes[i + 2]
+                self.fg = (ANSI_COLORS + ANSI_BRIGHT)[n] if n < 16 else None
+                i += 2
+            i += 1
+
+
+class TerminalPipeline(QObject):
+    def __init__(self, widget, fps=DEFAULT_FPS, max_blocks=DEFAULT_MAX_BLOCKS, parent=None):
+        super().__init__(parent or widget)
+        self.widget = widget
+        self.parser = AnsiParser()
+        self.decoders = {}
+        self.queue = []
+        self.queued_chars = 0
+        self.skipped_chars = 0
+        self.at_line_start = True
+        self.stream_ended = False
+        self.formats = {}
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.flush)
+        self.set_fps(fps)
+        self.set_max_blocks(max_blocks)
+
+    def set_fps(self, fps):
+        self.timer.setInterval(max(1, int(1000 / max(1, fps))))
+
+    def set_max_blocks(self, max_blocks):
+        self.widget.setMaximumBlockCount(max(0, int(max_blocks)))
+
+    # --- input ---
+    def feed(self, data, source="default"):
+        # raw bytes from a process
+        dec = self.decoders.get(source)
+        if dec is None:
+            dec = self.decoders[source] = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.write(dec.decode(data))
+
+    def finish(self, source="default"):
+        # end of a stream: flush the decoder's held bytes and, once painted,
+        # drop an escape sequence the process never finished
+        dec = self.decoders.pop(source, None)
+        if dec is not None:
+            self.write(dec.decode(b"", True))
+        self.stream_ended = True
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def write(self, text):
+        if not text:
+            return
+        text = text.replace("\r\n", "\n")
+        self.queue.append(text)
+        self.queued_chars += len(text)
+        self.at_line_start = text.endswith("\n")
+        if self.queued_chars > MAX_BACKLOG:
+            self.drop_backlog()
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def write_line(self, text):
+        # status messages always start on their own line
+        prefix = "" if self.at_line_start else "\n"
+        self.write(prefix + text + "\n")
+
+    def drop_backlog(self):
+        keep = MAX_BACKLOG // 2
+        dropped = 0
+        while self.queue and self.queued_chars - len(self.queue[0]) >= keep:
+            chunk = self.queue.pop(0)
+            self.queued_chars -= len(chunk)
+            dropped += len(chunk)
+        self.skipped_chars += dropped
+
+    def clear(self):
+        self.queue = []
+        self.queued_chars = 0
+        self.skipped_chars = 0
+        self.at_line_start = True
+        self.stream_ended = False
+        self.parser.reset()
+        self.decoders = {}
+        self.timer.stop()
+        self.widget.clear()
+
+    # --- painting ---
+    def char_format(self, key):
+        fmt = self.formats.get(key)
+        if fmt is None:
+            fg, bold = key
+            fmt = QTextCharFormat()
+            if fg is not None:
+                fmt.setForeground(QColor(fg))
+            if bold:
+                fmt.setFontWeight(QFont.Bold)
+            self.formats[key] = fmt
+        return fmt
+
+    def flush(self):
+        if not self.queue:
+            if self.stream_ended:
+                self.stream_ended = False
+                self.parser.feed("", final=True)
+            self.timer.stop()
+            return
+        budget = FLUSH_CHARS
+        parts = []
+        while self.queue and budget > 0:
+            chunk = self.queue[0]
+            if len(chunk) > budget:
+                parts.append(chunk[:budget])
+                self.queue[0] = chunk[budget:]
+                self.queued_chars -= budget
+                budget = 0
+            else:
+                parts.append(chunk)
+                self.queue.pop(0)
+                self.queued_chars -= len(chunk)
+                budget -= len(chunk)
+        text = "".join(parts)
+        if self.skipped_chars:
+            text = f"\n[... {self.skipped_chars} characters of output skipped ...]\n" + text
+            self.skipped_chars = 0
+        final = self.stream_ended and not self.queue
+        if final:
+            self.stream_ended = False
+        segments = self.parser.feed(text, final)
+        if not segments:
+            return
+
+        bar = self.widget.verticalScrollBar()
+        follow = bar.value() >= bar.maximum() - 4
+        cursor = QTextCursor(self.widget.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.beginEditBlock()
+        for seg, key in segments:
+            cursor.insertText(seg.replace("\r", ""), self.char_format(key))
+        cursor.endEditBlock()
+        if follow:
+            bar.setValue(bar.maximum())
+
+    def flush_all(self):
+        while self.queue:
+            self.flush()
+        self.flush()
@@ -0,0 +1,57 @@
+# Regression tests for buildengine.py. Needs gcc in PATH.
+# Run: python3 -m unittest discover -s frontend/tests
+import os, shutil, sys, tempfile, unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import accel, buildengine
+
+
+@unittest.skipUnless(shutil.which("gcc"), "gcc not found")
+class BuildEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="zenith-build-")
+        self.addCleanup(shutil.rmtree, self.root, True)
+
+    def write(self, name, text):
+        with open(os.path.join(self.root, name), "w", encoding="utf-8") as fh:
+            fh.write(text)
+
+    def test_failed_unit_with_more_units_than_jobs(self):
+        # the failure cancels units still queued; they must not crash the build
+        self.write("main.c", "int main(void) { return 0; }\n")
+        for i in range(8):
+            self.write(f"u{i}.c", f"int u{i}(void) {{ return {i}; }}\n")
+        self.write("u0.c", "int u0(void) { return }\n")
+        project = buildengine.Project(self.root, sources=["main.c", "u*.c"])
+        events = []
+        result = buildengine.BuildEngine(project, jobs=1, on_event=events.append).build()
+        self.assertFalse(result.ok)
+        self.assertIn("u0.c", result.failed)
+        self.assertLess(len(result.compiled) + len(result.failed), 9)
+        self.assertTrue(any("not linking" in e for e in events))
+
+    def test_project_cflags_reach_link(self):
+        project = buildengine.Project(self.root, cflags=["-O2", "-pthread", "-lm"], ldflags=["-lrt"])
+        engine = buildengine.BuildEngine(project)
+        self.assertEqual(engine.cflags, ["-O2", "-pthread"])
+        self.assertEqual(engine.ldflags, ["-lrt", "-pthread", "-lm"])
+
+    def test_pch_prefix_stops_at_unguarded_header(self):
+        # the unit includes its prefix again after -include; an unguarded
+        # header in the .gch would be defined twice
+        os.mkdir(os.path.join(self.root, "include"))
+        self.write("include/guarded.h", "#ifndef GUARDED_H\n#define GUARDED_H\nstatic int g(void) { return 1; }\n#endif\n")
+        self.write("include/bare.h", "static int b(void) { return 2; }\n")
+        self.write("main.c", '#include "guarded.h"\n#include "bare.h"\nint main(void) { return g() + b() - 3; }\n')
+        project = buildengine.Project(self.root, sources=["main.c"], include_dirs=["include"])
+        acc = accel.Accelerator(self.root, cache=False, pch=True, use_ccache=False)
+        engine = buildengine.BuildEngine(project, jobs=1, accel=acc)
+        with open(acc.pch_header(engine, "main.c"), encoding="utf-8") as fh:
+            prefix = fh.read()
+        self.assertIn("guarded.h", prefix)
+        self.assertNotIn("bare.h", prefix)
+        self.assertTrue(engine.build().ok)
+
+
+if __name__ == "__main__":
+    unittest.main()
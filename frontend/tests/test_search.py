@@ -0,0 +1,36 @@
+# Regression tests for search.py.
+# Run: python3 -m unittest discover -s frontend/tests
+import os, sys, unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from search import SearchEngine
+
+
+def utf16_slice(text, start, end):
+    return text.encode("utf-16-le")[2 * start:2 * end].decode("utf-16-le")
+
+
+class SearchEngineTest(unittest.TestCase):
+    def test_positions_count_utf16_units(self):
+        # QTextCursor positions: each non-BMP character takes two
+        text = "ab\U0001F600cd x\U0001F600\U0001F600cd cd"
+        engine = SearchEngine()
+        engine.set_text(text)
+        self.assertEqual(engine.search("cd"), 3)
+        self.assertEqual(engine.page(0), [(4, 6), (12, 14), (15, 17)])
+        for start, end in engine.page(0):
+            self.assertEqual(utf16_slice(text, start, end), "cd")
+        self.assertEqual(engine.in_range(6, 13), [(12, 14)])
+        self.assertEqual(engine.next(5), (12, 14))
+        self.assertEqual(engine.previous(12), (4, 6))
+
+    def test_overlapping_hits_on_both_plain_paths(self):
+        # "İ".lower() is two code points, which forces the regex fallback
+        for text in ("x aaa", "İ aaa"):
+            engine = SearchEngine()
+            engine.set_text(text)
+            self.assertEqual(engine.search("aa"), 2, text)
+
+
+if __name__ == "__main__":
+    unittest.main()
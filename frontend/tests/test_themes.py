@@ -0,0 +1,33 @@
+# Regression tests for themes.py.
+# Run: python3 -m unittest discover -s frontend/tests
+import contextlib, io, os, shutil, sys, tempfile, unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import themes
+
+
+class ThemeEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp(prefix="zenith-themes-")
+        self.addCleanup(shutil.rmtree, self.root, True)
+
+    def write(self, name, text):
+        with open(os.path.join(self.root, name), "w", encoding="utf-8") as fh:
+            fh.write(text)
+
+    def test_badly_shaped_theme_files_are_skipped(self):
+        # one bad file in data/themes/ must not stop Studio from starting
+        self.write("list.json", "[1, 2]")
+        self.write("colors-list.json", '{"colors": [1]}')
+        self.write("colors-number.json", '{"colors": {"accent": 3}}')
+        self.write("good.json", '{"name": "Good", "colors": {"accent": "#123456"}}')
+        log = io.StringIO()
+        with contextlib.redirect_stdout(log):
+            engine = themes.ThemeEngine(self.root)
+        self.assertEqual(log.getvalue().count("[themes] skipping"), 3)
+        self.assertEqual(engine.colors("good")["accent"], "#123456")
+        self.assertNotIn("list", engine.names())
+
+
+if __name__ == "__main__":
+    unittest.main()
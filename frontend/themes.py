@@ -0,0 +1,215 @@
+# Theme engine for Studio.
+# A theme is a flat dict of colour roles. Each theme is rendered once into a
+# single application-wide stylesheet (widgets pick their rules through their
+# objectName or the "role" dynamic property) and the generated QSS is cached,
+# so switching themes is one QApplication.setStyleSheet call instead of a
+# setStyleSheet sweep over every widget.
+# Extra themes are plain JSON files in data/themes/, e.g.
+#   {"name": "solar", "label": "Solarized", "base": "dark",
+#    "colors": {"window": "#002b36", "button": "#268bd2"}}
+# Any role left out is taken from "base" (or purple).
+import json, os
+
+THEMES_DIR = os.path.join("data", "themes")
+DEFAULT_THEME = "purple"
+
+BUILTIN_THEMES = {
+    "purple": {
+        "label": "Purple (default)",
+        "colors": {
+            "window": "#1F001F",
+            "text": "white",
+            "muted": "gray",
+            "panel": "#2C0032",
+            "editor_text": "#E0E0E0",
+            "button": "#6200EE",
+            "button_hover": "#3700B3",
+            "button_text": "white",
+            "input": "#6A0DAD",
+            "input_border": "#BB86FC",
+            "terminal": "#000000",
+            "terminal_text": "#00FF00",
+            "accent": "#8A2BE2",
+            "tooltip": "#2b2b2b",
+            "tooltip_border": "#dddddd",
+        },
+    },
+    "dark": {
+        "label": "Dark (серо-графитовые кнопки)",
+        "base": "purple",
+        "colors": {
+            "window": "#121212",
+            "panel": "#1E1E1E",
+            "editor_text": "#C0C0C0",
+            "button": "#2f3136",
+            "button_hover": "#444548",
+            "input": "#2a2a2a",
+            "input_border": "#444444",
+            "accent": "#5a5d63",
+        },
+    },
+    "deepblue": {
+        "label": "Deep Blue (темно-синий)",
+        "base": "purple",
+        "colors": {
+            "window": "#071029",
+            "panel": "#07172b",
+            "editor_text": "#DDE7F2",
+            "button": "#0f2b45",
+            "button_hover": "#113a5f",
+            "input": "#082135",
+            "input_border": "#0b3a5f",
+            "terminal": "#00101a",
+            "terminal_text": "#7FE0FF",
+            "accent": "#1d5d8f",
+        },
+    },
+}
+
+QSS_TEMPLATE = """
+QMainWindow, QDialog {{ background-color: {window}; color: {text}; }}
+QLabel, QCheckBox {{ color: {text}; }}
+QLabel[role="title"] {{ color: {text}; }}
+QLabel[role="hint"] {{ color: {muted}; }}
+QToolTip {{ color: white; background-color: {tooltip}; border: 1px solid {tooltip_border}; padding: 5px; }}
+
+QPushButton {{
+    background-color: {button};
+    color: {button_text};
+    font-size: 14px;
+    border: none;
+    padding: 6px 12px;
+    border-radius: 12px;
+}}
+QPushButton:hover {{ background-color: {button_hover}; }}
+QPushButton:disabled {{ color: {muted}; }}
+QPushButton[role="menu"] {{ font-size: 16px; padding: 10px 20px; border-radius: 20px; }}
+QPushButton[role="tab"] {{
+    font-size: 16px;
+    padding: 10px 20px;
+    border-radius: 0px;
+    border-top-left-radius: 20px;
+    border-top-right-radius: 20px;
+}}
+QPushButton[role="tab"]:checked {{ background-color: {button_hover}; }}
+
+QPlainTextEdit#codeEditor {{
+    font-family: 'Courier New';
+    font-size: 14px;
+    background-color: {panel};
+    color: {editor_text};
+    padding: 5px;
+}}
+QPlainTextEdit#terminal {{
+    font-family: 'Courier New';
+    background-color: {terminal};
+    color: {terminal_text};
+}}
+QTabBar::tab {{ background-color: {window}; color: {muted}; padding: 4px 10px; border: none; }}
+QTabBar::tab:selected {{ background-color: {panel}; color: {editor_text}; }}
+QTabBar::tab:hover {{ color: {text}; }}
+QTreeWidget#projectTree, QListWidget {{ background-color: {panel}; color: {editor_text}; }}
+QLineEdit#searchInput {{
+    background-color: {input};
+    color: white;
+    border-radius: 64px;
+    padding: 8px 12px;
+    font-size: 14px;
+}}
+QLineEdit#searchInput:focus {{ border: 2px solid {input_border}; }}
+QComboBox, QSpinBox {{
+    background-color: {panel};
+    color: {editor_text};
+    padding: 5px;
+    font-size: 16px;
+    border: none;
+    border-radius: 10px;
+}}
+QComboBox QAbstractItemView {{ background-color: {panel}; color: {editor_text}; }}
+QProgressBar {{ background-color: {panel}; color: {text}; border: none; }}
+QProgressBar::chunk {{ background-color: {accent}; }}
+"""
+
+
+def _read_user_themes(themes_dir):
+    themes = {}
+    try:
+        names = sorted(os.listdir(themes_dir))
+    except OSError:
+        return themes
+    for fn in names:
+        if not fn.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(themes_dir, fn), "r", encoding="utf-8") as fh:
+                js = json.load(fh)
+            name, theme = _parse_theme(js, os.path.splitext(fn)[0])
+        except (OSError, ValueError) as e:
+            print(f"[themes] skipping {fn}: {e}")
+            continue
+        themes[name] = theme
+    return themes
+
+
+def _parse_theme(js, default_name):
+    # (name, theme) from a theme file's JSON; ValueError when it has the wrong shape
+    if not isinstance(js, dict):
+        raise ValueError("expected a JSON object")
+    colors = js.get("colors", {})
+    if not isinstance(colors, dict) or not all(isinstance(v, str) for v in colors.values()):
+        raise ValueError('"colors" must map names to colour strings')
+    name = str(js.get("name") or default_name).lower()
+    return name, {
+        "label": str(js.get("label", name)),
+        "base": str(js.get("base", DEFAULT_THEME)).lower(),
+        "colors": dict(colors),
+    }
+
+
+class ThemeEngine:
+    def __init__(self, themes_dir=THEMES_DIR):
+        self.themes_dir = themes_dir
+        self.themes = {}
+        self._colors = {}
+        self._qss = {}
+        self.reload()
+
+    def reload(self):
+        self.themes = dict(BUILTIN_THEMES)
+        self.themes.update(_read_user_themes(self.themes_dir))
+        self._colors.clear()
+        self._qss.clear()
+
+    def names(self):
+        # built-in themes first, then user themes in file order
+        return list(self.themes)
+
+    def label(self, name):
+        return self.themes.get(name, {}).get("label", name)
+
+    def resolve(self, name):
+        return name if name in self.themes else DEFAULT_THEME
+
+    def colors(self, name):
+        # theme colours with "base" chains resolved
+        name = self.resolve(name)
+        cached = self._colors.get(name)
+        if cached is not None:
+            return cached
+        chain, cur = [], name
+        while cur in self.themes and cur not in chain:
+            chain.append(cur)
+            cur = self.themes[cur].get("base")
+        colors = dict(BUILTIN_THEMES[DEFAULT_THEME]["colors"])
+        for theme in reversed(chain):
+            colors.update(self.themes[theme].get("colors", {}))
+        self._colors[name] = colors
+        return colors
+
+    def stylesheet(self, name):
+        name = self.resolve(name)
+        qss = self._qss.get(name)
+        if qss is None:
+            qss = QSS_TEMPLATE.format(**self.colors(name))
+            self._qss[name] = qss
+        return qss
@@ -0,0 +1,327 @@
+# ZAPP packager shared by Studio, assembly and CI.
+# A .zapp is a plain ZIP, but written by hand here so that:
+#  - entries are sorted and carry fixed timestamps/attributes, so the same
+#    inputs always give a byte-identical archive (and can be cached),
+#  - already-compressed assets are stored and text is deflated,
+#  - deflate runs on a thread pool (zlib releases the GIL) while entries are
+#    still streamed to disk in order,
+#  - members whose content didn't change are copied raw out of the previous
+#    archive instead of being compressed again.
+import argparse, json, os, struct, sys, time, zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from buildengine import Project
+
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+DEFLATE_LEVEL = 6
+# 1980-01-01 00:00:00, the earliest DOS timestamp
+DOS_DATE = (1 << 5) | 1
+DOS_TIME = 0
+FLAG_UTF8 = 0x0800
+READ_CHUNK = 1 << 20
+
+STORE_EXTENSIONS = {
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".ico", ".mp3", ".ogg", ".opus",
+    ".flac", ".mp4", ".webm", ".zip", ".zapp", ".gz", ".bz2", ".xz", ".zst",
+    ".7z", ".jar", ".woff", ".woff2",
+}
+DEFAULT_IGNORES = {".git", ".zenithcache", "build", "buildout", "__pycache__", "data"}
+
+
+def compression_for(arcname):
+    ext = os.path.splitext(arcname)[1].lower()
+    return ZIP_STORED if ext in STORE_EXTENSIONS else ZIP_DEFLATED
+
+
+def write_manifest(path, name, version, author, description, binary="app"):
+    manifest = {
+        "name": name,
+        "version": version,
+        "author": author,
+        "description": description,
+        "binary": binary,
+    }
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, ensure_ascii=False, indent=4)
+        fh.write("\n")
+    return manifest
+
+
+class Entry:
+    def __init__(self, arcname, path, method=None):
+        self.arcname = arcname.replace(os.sep, "/")
+        self.path = path
+        self.method = compression_for(self.arcname) if method is None else method
+        st = os.stat(path)
+        self.size = st.st_size
+        self.mtime_ns = st.st_mtime_ns
+        self.executable = bool(st.st_mode & 0o111)
+        self.crc = None
+        self.data = None          # compressed bytes when freshly packed
+        self.reuse = None         # (offset, compress_size) in the old archive
+
+    @property
+    def external_attr(self):
+        mode = 0o100755 if self.executable else 0o100644
+        return mode << 16
+
+
+def collect_project(root=".", binary="app", sources=None, extra=()):
+    # default layout: manifest, binary, sources, include/ and assets/
+    root = os.path.abspath(root)
+    files = {}
+
+    def add(rel):
+        full = os.path.join(root, rel)
+        if os.path.isfile(full):
+            files[rel.replace(os.sep, "/")] = full
+
+    def add_tree(rel):
+        base = os.path.join(root, rel)
+        if os.path.isfile(base):
+            add(rel)
+            return
+        for dirpath, dirnames, filenames in os.walk(base):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".") and d not in DEFAULT_IGNORES]
+            for f in filenames:
+                add(os.path.relpath(os.path.join(dirpath, f), root))
+
+    add("manifest.json")
+    if binary:
+        add(binary)
+    for src in sources or ["main.c"]:
+        add(src)
+    for tree in ["include", "assets"] + list(extra):
+        add_tree(tree)
+    return files
+
+
+def read_old_members(path):
+    # central directory of a previous archive: arcname -> member info
+    members = {}
+    try:
+        with open(path, "rb") as fh:
+            fh.seek(0, os.SEEK_END)
+            size = fh.tell()
+            tail = min(size, 22 + 65535)
+            fh.seek(size - tail)
+            buf = fh.read(tail)
+            pos = buf.rfind(b"PK\x05\x06")
+            if pos < 0:
+                return {}
+            _, _, _, _, count, cd_size, cd_offset, _ = struct.unpack("<4s4H2LH", buf[pos:pos + 22])
+            fh.seek(cd_offset)
+            cd = fh.read(cd_size)
+            off = 0
+            for _ in range(count):
+                (sig, _, _, flags, method, _, _, crc, csize, usize, nlen, xlen, clen,
+                 _, _, _, hoff) = struct.unpack("<4s6H3L5H2L", cd[off:off + 46])
+                if sig != b"PK\x01\x02":
+                    return {}
+                name = cd[off + 46:off + 46 + nlen].decode("utf-8" if flags & FLAG_UTF8 else "cp437")
+                members[name] = {"method": method, "crc": crc, "csize": csize,
+                                 "usize": usize, "offset": hoff}
+                off += 46 + nlen + xlen + clen
+    except (OSError, struct.error):
+        return {}
+    return members
+
+
+def _file_crc(path):
+    crc = 0
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(READ_CHUNK), b""):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def _compress(entry, level):
+    crc = 0
+    out = []
+    comp = zlib.compressobj(level, zlib.DEFLATED, -15) if entry.method == ZIP_DEFLATED else None
+    with open(entry.path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(READ_CHUNK), b""):
+            crc = zlib.crc32(chunk, crc)
+            out.append(comp.compress(chunk) if comp else chunk)
+    if comp:
+        out.append(comp.flush())
+    entry.crc = crc
+    entry.data = b"".join(out)
+    return entry
+
+
+class PackCancelled(Exception):
+    pass
+
+
+class PackResult:
+    def __init__(self):
+        self.output = None
+        self.entries = 0
+        self.reused = 0
+        self.compressed = 0
+        self.stored = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.seconds = 0.0
+
+
+def _local_header(entry, csize):
+    name = entry.arcname.encode("utf-8")
+    return struct.pack("<4s5H3L2H", b"PK\x03\x04", 20, FLAG_UTF8, entry.method,
+                       DOS_TIME, DOS_DATE, entry.crc, csize, entry.size,
+                       len(name), 0) + name
+
+
+def _central_header(entry, csize, offset):
+    name = entry.arcname.encode("utf-8")
+    return struct.pack("<4s6H3L5H2L", b"PK\x01\x02", (3 << 8) | 20, 20, FLAG_UTF8,
+                       entry.method, DOS_TIME, DOS_DATE, entry.crc, csize, entry.size,
+                       len(name), 0, 0, 0, 0, entry.external_attr, offset) + name
+
+
+def pack(files, output, jobs=0, level=DEFLATE_LEVEL, incremental=True, on_event=None,
+         on_progress=None, cancelled=None):
+    # files: {arcname: path}; writes output atomically, returns PackResult.
+    # on_progress(done, total) after each entry; cancelled() -> True aborts.
+    t0 = time.perf_counter()
+    result = PackResult()
+    entries = [Entry(arc, files[arc]) for arc in sorted(files)]
+    for e in entries:
+        if e.size > 0xFFFFFFFF:
+            raise ValueError(f"{e.arcname} is too large for a .zapp (no ZIP64 support)")
+    if len(entries) > 0xFFFF:
+        raise ValueError(f"{len(entries)} files are too many for a .zapp (at most 65535, no ZIP64 support)")
+    old = read_old_members(output) if incremental and os.path.exists(output) else {}
+    old_fh = open(output, "rb") if old else None
+    tmp = output + ".tmp"
+    jobs = jobs or os.cpu_count() or 1
+    try:
+        # members we can copy raw from the previous archive
+        for e in entries:
+            m = old.get(e.arcname)
+            if m and m["usize"] == e.size and m["method"] == e.method:
+                crc = _file_crc(e.path)
+                if crc == m["crc"]:
+                    e.crc = crc
+                    e.reuse = (m["offset"], m["csize"])
+
+        central = []
+        with open(tmp, "wb") as out, ThreadPoolExecutor(max_workers=jobs) as pool:
+            window = deque()
+
+            def write_entry(e):
+                if cancelled is not None and cancelled():
+                    raise PackCancelled()
+                offset = out.tell()
+                if offset > 0xFFFFFFFF:
+                    raise ValueError(f"{e.arcname} would start past 4 GiB in the .zapp (no ZIP64 support)")
+                if e.reuse is not None:
+                    hoff, csize = e.reuse
+                    old_fh.seek(hoff)
+                    hdr = old_fh.read(30)
+                    nlen, xlen = struct.unpack("<2H", hdr[26:30])
+                    old_fh.seek(hoff + 30 + nlen + xlen)
+                    out.write(_local_header(e, csize))
+                    remaining = csize
+                    while remaining:
+                        chunk = old_fh.read(min(READ_CHUNK, remaining))
+                        if not chunk:
+                            raise IOError(f"previous archive truncated at {e.arcname}")
+                        out.write(chunk)
+                        remaining -= len(chunk)
+                    result.reused += 1
+                else:
+                    csize = len(e.data)
+                    out.write(_local_header(e, csize))
+                    out.write(e.data)
+                    e.data = None
+                    if e.method == ZIP_DEFLATED:
+                        result.compressed += 1
+                    else:
+                        result.stored += 1
+                central.append(_central_header(e, csize, offset))
+                result.bytes_in += e.size
+                if on_event is not None:
+                    on_event(f"{'reuse' if e.reuse else 'add  '} {e.arcname}")
+                if on_progress is not None:
+                    on_progress(len(central), len(entries))
+
+            # keep entries in order but let compression run ahead
+            for e in entries:
+                if e.reuse is None:
+                    window.append(pool.submit(_compress, e, level))
+                else:
+                    window.append(e)
+                while len(window) > jobs * 4:
+                    item = window.popleft()
+                    write_entry(item.result() if hasattr(item, "result") else item)
+            while window:
+                item = window.popleft()
+                write_entry(item.result() if hasattr(item, "result") else item)
+
+            cd_offset = out.tell()
+            cd_size = sum(len(h) for h in central)
+            if cd_offset + cd_size > 0xFFFFFFFF:
+                raise ValueError(".zapp central directory would end past 4 GiB (no ZIP64 support)")
+            for h in central:
+                out.write(h)
+            out.write(struct.pack("<4s4H2LH", b"PK\x05\x06", 0, 0, len(central), len(central),
+                                  cd_size, cd_offset, 0))
+            result.bytes_out = out.tell()
+    except BaseException:
+        if old_fh:
+            old_fh.close()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    if old_fh:
+        old_fh.close()
+    os.replace(tmp, output)
+    result.output = output
+    result.entries = len(entries)
+    result.seconds = time.perf_counter() - t0
+    return result
+
+
+def pack_project(root=".", output="project.zapp", binary="app", sources=None, extra=(),
+                 jobs=0, incremental=True, on_event=None, on_progress=None, cancelled=None):
+    files = collect_project(root, binary=binary, sources=sources, extra=extra)
+    if not os.path.isabs(output):
+        output = os.path.join(os.path.abspath(root), output)
+    return pack(files, output, jobs=jobs, incremental=incremental, on_event=on_event,
+                on_progress=on_progress, cancelled=cancelled)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Package a ZenithOS project into a .zapp")
+    parser.add_argument("-C", "--directory", default=".", help="project root")
+    parser.add_argument("-o", "--output", default="project.zapp")
+    parser.add_argument("-j", "--jobs", type=int, default=0, help="compression threads (0 = all cores)")
+    parser.add_argument("--binary", default="app", help="binary to include ('' for none)")
+    parser.add_argument("--full", action="store_true", help="don't reuse members of the previous archive")
+    parser.add_argument("--name")
+    parser.add_argument("--version")
+    parser.add_argument("--author")
+    parser.add_argument("--description")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    parser.add_argument("extra", nargs="*", help="extra files or directories to include")
+    args = parser.parse_args(argv)
+
+    if args.name is not None:
+        write_manifest(os.path.join(args.directory, "manifest.json"), args.name, args.version or "",
+                       args.author or "", args.description or "", args.binary or "app")
+    sources = Project.load(args.directory).sources()
+    result = pack_project(args.directory, args.output, binary=args.binary, sources=sources, extra=args.extra,
+                          jobs=args.jobs, incremental=not args.full,
+                          on_event=print if args.verbose else None)
+    print(f"Packaged -> {os.path.relpath(result.output)}: {result.entries} entries "
+          f"({result.reused} reused, {result.compressed} deflated, {result.stored} stored), "
+          f"{result.bytes_in} -> {result.bytes_out} bytes in {result.seconds * 1000:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,278 @@
+# Headless build / package / clean for ZenithOS projects.
+# The same steps Studio runs behind its buttons (cached build, manifest,
+# .zapp packaging, clean), with no prompts and no Qt, so CI can drive them:
+#   python3 zenith.py build   [-C DIR ...] [-j N] [--compiler CC] [flags...]
+#   python3 zenith.py package [-C DIR ...] [--name N --version V ...] [flags...]
+#   python3 zenith.py clean   [-C DIR ...]
+# -C can be given many times; the projects are processed concurrently (the
+# threads only wait on gcc and zlib) and share one process, so the compiler
+# identity and file hashes are only computed once per run.
+# Manifest fields come from the "manifest" section of zenith.json unless
+# given on the command line.
+import argparse, os, shutil, sys, threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+from buildcache import BuildCache, build_key
+from buildengine import BUILD_DIR, BuildEngine, BuildResult, Project, target_for_compiler
+
+MANIFEST_FIELDS = ("name", "version", "author", "description")
+CLEAN_FILES = ("app", "app_arm", "app_prof", "project.zapp", "manifest.json")
+
+
+def auto_link_flags(project, flags=()):
+    # libraries needed by the SDK headers the project includes (plugin metadata);
+    # returns (extra flags, note for the log)
+    from plugins import PluginRegistry
+    registry = PluginRegistry(project.root, project.include_dirs[0] if project.include_dirs else "include")
+    registry.refresh()
+    wanted, reasons = registry.link_flags([os.path.join(project.root, s) for s in project.sources()])
+    extra = [f for f in wanted if f not in flags]
+    if not extra:
+        return [], None
+    why = ", ".join(f"{name}: {' '.join(libs)}" for name, libs in reasons)
+    return extra, f"Link flags from plugin metadata: {' '.join(extra)} ({why})"
+
+
+class CachedBuild:
+    # a BuildEngine plus the build cache lookup/store around it
+    def __init__(self, project, compiler="gcc", output=None, flags=(), jobs=0, target=None,
+                 use_cache=True, on_event=None, accel=None):
+        self.project = project
+        self.on_event = on_event
+        extra, note = auto_link_flags(project, flags)
+        if note:
+            self.emit(note)
+        self.engine = BuildEngine(project, compiler=compiler, jobs=jobs,
+                                  target=target or target_for_compiler(compiler),
+                                  extra_flags=extra + list(flags), output=output, on_event=on_event,
+                                  accel=accel)
+        self.output = os.path.join(project.root, self.engine.output)
+        self.cache = BuildCache(project.root) if use_cache else None
+        self.key = None
+        self.started = None
+
+    def emit(self, message):
+        if self.on_event is not None:
+            self.on_event(message)
+
+    def restore(self):
+        # True when the output was restored from the cache
+        if self.cache is None:
+            return False
+        engine, root = self.engine, self.project.root
+        try:
+            t0 = time.perf_counter()
+            key_args = (["-o", engine.output] + ["-I" + os.path.join(root, d) for d in self.project.include_dirs]
+                        + engine.cflags + engine.ldflags)
+            self.key = build_key(engine.compiler, [os.path.join(root, s) for s in self.project.sources()], key_args)
+            if self.cache.restore(self.key, self.output):
+                ms = (time.perf_counter() - t0) * 1000
+                saved = self.cache.build_seconds(self.key)
+                self.emit(f"[cache] hit {self.key[:12]} -> {engine.output} in {ms:.0f} ms (saved ~{saved:.2f} s)")
+                return True
+            self.emit(f"[cache] miss {self.key[:12]}, compiling...")
+        except Exception as e:
+            self.key = None
+            self.emit(f"[cache] skipped: {e}")
+        self.started = time.perf_counter()
+        return False
+
+    def store(self, ok):
+        key, self.key = self.key, None
+        if not ok or key is None or not os.path.exists(self.output):
+            return
+        try:
+            self.cache.store(key, self.output, time.perf_counter() - (self.started or time.perf_counter()))
+        except Exception as e:
+            self.emit(f"[cache] store failed: {e}")
+
+    def run(self):
+        if self.restore():
+            result = BuildResult()
+            result.ok = True
+            result.output = self.output
+            return result
+        result = self.engine.build()
+        self.store(result.ok)
+        return result
+
+
+def manifest_fields(project, overrides=None):
+    # zenith.json "manifest" section, command line values win
+    fields = {k: str(project.manifest.get(k, "")) for k in MANIFEST_FIELDS}
+    fields["name"] = fields["name"] or project.name
+    for k, v in (overrides or {}).items():
+        if v is not None:
+            fields[k] = v
+    return fields
+
+
+def package(project, output="project.zapp", binary="app", manifest=None, jobs=0,
+            incremental=True, on_event=None, on_progress=None, cancelled=None):
+    # writes manifest.json (when fields are given) and packs the project
+    from zapp import pack_project, write_manifest
+    if manifest is not None:
+        write_manifest(os.path.join(project.root, "manifest.json"), manifest["name"], manifest["version"],
+                       manifest["author"], manifest["description"], binary=binary or "app")
+    return pack_project(project.root, output, binary=binary, sources=project.sources(), jobs=jobs,
+                        incremental=incremental, on_event=on_event, on_progress=on_progress,
+                        cancelled=cancelled)
+
+
+def clean(root=".", outputs=()):
+    # removes build outputs; returns what was removed
+    removed = []
+    for f in list(CLEAN_FILES) + [o for o in outputs if o not in CLEAN_FILES]:
+        path = os.path.join(root, f)
+        if os.path.isfile(path):
+            try:
+                os.remove(path)
+                removed.append(f)
+            except OSError:
+                pass
+    # object files from the per-unit build
+    build_dir = os.path.join(root, BUILD_DIR)
+    if os.path.isdir(build_dir):
+        shutil.rmtree(build_dir, ignore_errors=True)
+        removed.append(BUILD_DIR + "/")
+    return removed
+
+
+# --- command line ---
+class Printer:
+    # serialises output of concurrent projects, prefixed with the project
+    def __init__(self, prefix, quiet):
+        self.prefix = prefix
+        self.quiet = quiet
+        self.lock = threading.Lock()
+
+    def __call__(self, label, message, summary=False):
+        if self.quiet and not summary:
+            return
+        with self.lock:
+            for line in str(message).splitlines() or [""]:
+                print(f"[{label}] {line}" if self.prefix else line)
+            sys.stdout.flush()
+
+
+def run_project(args, root, jobs, printer):
+    t0 = time.perf_counter()
+    label = os.path.relpath(root)
+    say = lambda message: printer(label, message)
+    try:
+        project = Project.load(root)
+    except (OSError, ValueError) as e:
+        printer(label, f"FAILED: bad project file: {e}", summary=True)
+        return False
+
+    if args.command == "clean":
+        removed = clean(project.root, [project.output])
+        printer(label, "Removed: " + ", ".join(removed) if removed else "Nothing to remove.", summary=True)
+        return True
+
+    ok, built = True, None
+    if args.command == "build" or not args.no_build:
+        if shutil.which(args.compiler) is None:
+            printer(label, f"FAILED: compiler not found: {args.compiler}", summary=True)
+            return False
+        accel = None
+        if args.object_cache or args.pch:
+            from accel import Accelerator
+            accel = Accelerator(project.root, cache=args.object_cache, pch=args.pch)
+        build = CachedBuild(project, compiler=args.compiler, output=args.output if args.command == "build" else None,
+                            flags=args.flags, jobs=jobs, target=args.target,
+                            use_cache=not args.no_cache, on_event=say, accel=accel)
+        built = build.run()
+        ok = built.ok
+    if not ok:
+        printer(label, f"FAILED: build ({len(built.failed)} unit(s) failed) in {time.perf_counter() - t0:.2f}s",
+                summary=True)
+        return False
+    if args.command == "build":
+        printer(label, f"OK: {len(built.compiled)} compiled, {len(built.skipped)} up to date"
+                       f"{' (cache hit)' if not built.compiled and not built.skipped else ''}"
+                       f" in {time.perf_counter() - t0:.2f}s", summary=True)
+        return True
+
+    overrides = {k: getattr(args, k) for k in MANIFEST_FIELDS}
+    manifest = manifest_fields(project, overrides)
+    if (not project.manifest and all(v is None for v in overrides.values())
+            and os.path.exists(os.path.join(project.root, "manifest.json"))):
+        manifest = None  # keep a hand-written manifest.json
+    try:
+        result = package(project, args.output or "project.zapp", binary=project.output if built else args.binary,
+                         manifest=manifest, jobs=jobs, incremental=not args.full,
+                         on_event=say if args.verbose else None)
+    except Exception as e:
+        printer(label, f"FAILED: packaging: {e}", summary=True)
+        return False
+    printer(label, f"OK: {os.path.relpath(result.output)} {result.entries} entries ({result.reused} reused, "
+                   f"{result.compressed} deflated, {result.stored} stored) in {time.perf_counter() - t0:.2f}s",
+            summary=True)
+    return True
+
+
+def make_parser():
+    parser = argparse.ArgumentParser(prog="zenith", description="Build and package ZenithOS projects")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, text in (("build", "compile the project (cached)"),
+                       ("package", "build and package into a .zapp"),
+                       ("clean", "remove build outputs")):
+        p = sub.add_parser(name, help=text)
+        p.add_argument("-C", "--directory", action="append", dest="directories",
+                       help="project root; repeat for several projects (default: .)")
+        p.add_argument("-P", "--parallel", type=int, default=0,
+                       help="projects processed at once (0 = all cores)")
+        p.add_argument("-q", "--quiet", action="store_true", help="only print one summary line per project")
+        if name == "clean":
+            continue
+        p.add_argument("-j", "--jobs", type=int, default=0,
+                       help="compile/compression jobs per project (0 = cores shared between projects)")
+        p.add_argument("--compiler", default="gcc")
+        p.add_argument("--target", default=None, help="object directory name (default: from the compiler)")
+        p.add_argument("--no-cache", action="store_true", help="don't use the .zenithcache build cache")
+        p.add_argument("--object-cache", action="store_true",
+                       help="cache object files (through ccache when installed)")
+        p.add_argument("--pch", action="store_true", help="precompile the SDK headers each unit starts with")
+        p.add_argument("-o", "--output", default=None,
+                       help="binary (build) or archive (package, default project.zapp)")
+        p.add_argument("flags", nargs="*", help="extra compiler/linker flags")
+        if name == "package":
+            p.add_argument("--no-build", action="store_true", help="package the existing binary as is")
+            p.add_argument("--binary", default="app", help="binary to include with --no-build ('' for none)")
+            p.add_argument("--full", action="store_true", help="don't reuse members of the previous archive")
+            p.add_argument("-v", "--verbose", action="store_true", help="list archive members")
+            for field in MANIFEST_FIELDS:
+                p.add_argument("--" + field, default=None, help=f"manifest {field} (default: zenith.json)")
+    return parser
+
+
+def main(argv=None):
+    parser = make_parser()
+    # anything unrecognised (-O2, -lm, ...) is passed through to gcc
+    args, extra = parser.parse_known_args(argv)
+    if extra and args.command == "clean":
+        parser.error("unrecognized arguments: " + " ".join(extra))
+    if args.command != "clean":
+        args.flags = args.flags + extra
+    roots = [os.path.abspath(d) for d in (args.directories or ["."])]
+    cores = os.cpu_count() or 1
+    parallel = max(1, min(args.parallel or cores, len(roots)))
+    # share the cores between the projects running at once
+    jobs = getattr(args, "jobs", 0) or max(1, cores // parallel)
+    printer = Printer(len(roots) > 1, args.quiet)
+
+    t0 = time.perf_counter()
+    if parallel == 1:
+        results = [run_project(args, r, jobs, printer) for r in roots]
+    else:
+        with ThreadPoolExecutor(max_workers=parallel) as pool:
+            results = list(pool.map(lambda r: run_project(args, r, jobs, printer), roots))
+    if len(roots) > 1:
+        failed = results.count(False)
+        print(f"{len(roots) - failed}/{len(roots)} projects OK in {time.perf_counter() - t0:.2f}s")
+    return 0 if all(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
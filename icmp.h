@@ -27,6 +27,13 @@
 #include <netdb.h>
 #include <errno.h>
 #include <time.h>
+#include <sys/time.h>
+#include <poll.h>
+#include <stdint.h>
+
+#if defined(__linux__) && defined(_GNU_SOURCE)
+#define ICMP_HAVE_MMSG 1  // sendmmsg/recvmmsg are GNU extensions; otherwise one syscall per packet
+#endif
 
 #define PURPLE "\033[1;35m"
 #define RESET  "\033[0m"
@@ -43,11 +50,57 @@ struct icmp_packet {
     char data[ICMP_DATA_LEN];
 };
 
+#define ICMP_CHECKSUM_WIDE_MIN 64  // shorter buffers aren't worth the setup
+
+// same one's complement sum, 8 bytes per add. Folding the 64-bit sum down
+// gives the 16-bit result because 2^16 - 1 divides 2^64 - 1
+unsigned short checksum_wide(const void *b, size_t len) {
+    const unsigned char *p = b;
+    uint64_t sum = 0, w;
+
+    for (; len >= 8; p += 8, len -= 8) {
+        memcpy(&w, p, 8);
+        sum += w;
+        sum += sum < w;  // end-around carry
+    }
+    if (len >= 4) {
+        uint32_t v;
+        memcpy(&v, p, 4);
+        sum += v;
+        sum += sum < v;
+        p += 4;
+        len -= 4;
+    }
+    if (len >= 2) {
+        uint16_t v;
+        memcpy(&v, p, 2);
+        sum += v;
+        sum += sum < v;
+        p += 2;
+        len -= 2;
+    }
+    if (len == 1) {
+        uint16_t v = 0;
+        memcpy(&v, p, 1);  // pad the odd byte with zero
+        sum += v;
+        sum += sum < v;
+    }
+
+    sum = (sum >> 32) + (sum & 0xFFFFFFFF);
+    sum = (sum >> 32) + (sum & 0xFFFFFFFF);
+    sum = (sum >> 16) + (sum & 0xFFFF);
+    sum = (sum >> 16) + (sum & 0xFFFF);
+    return (unsigned short)~sum;
+}
+
 unsigned short checksum(void *b, int len) {
     unsigned short *buf = b;
     unsigned int sum = 0;
     unsigned short result;
 
+    if (len >= ICMP_CHECKSUM_WIDE_MIN)
+        return checksum_wide(b, (size_t)len);
+
     for (; len > 1; len -= 2)
         sum += *buf++;
     if (len == 1)
@@ -114,5 +167,363 @@ char* get_hostname_from_ip(const char *ip) {
     return hostname;
 }
 
+/*
+ * Ping engine: one socket for every target, echo requests sent in batches
+ * and replies matched back by id/sequence, so a sweep over a subnet costs a
+ * handful of syscalls per batch instead of a socket per host.
+ * An unprivileged ping socket (SOCK_DGRAM, allowed by net.ipv4.ping_group_range)
+ * is tried first, then a raw socket.
+ */
+#define ICMP_PING_BATCH  64
+#define ICMP_PING_RCVBUF (4 * 1024 * 1024)
+#define ICMP_PING_BUFLEN 256   // IP header + echo reply
+#define ICMP_RAW_FILTER  1     // ICMP_FILTER from <linux/icmp.h>
+
+struct icmp_pinger {
+    int fd;
+    int raw;        // 1 = SOCK_RAW, 0 = ping socket (the kernel picks the id)
+    uint16_t id;    // first echo id; each 65536 requests move to the next one
+    uint32_t tag;   // marks our payloads, changes every sweep
+};
+
+struct icmp_ping_target {
+    const char *ip;
+    int sent;
+    int received;
+    double min_ms;
+    double avg_ms;
+    double max_ms;
+    double loss;    // percent
+};
+
+// carried in the echo data; ping sockets rewrite the id, so the request
+// number travels here too
+struct icmp_ping_payload {
+    uint32_t tag;
+    uint32_t counter;   // round * targets + target index
+    uint64_t sent_ns;
+};
+
+// strict -std=c99/c11 without _POSIX_C_SOURCE has no clock_gettime; the
+// wall clock is good enough for round trip times there
+uint64_t icmp_now_ns(void) {
+#ifdef CLOCK_MONOTONIC
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return (uint64_t)ts.tv_sec * 1000000000ull + (uint64_t)ts.tv_nsec;
+#else
+    struct timeval tv;
+    gettimeofday(&tv, NULL);
+    return (uint64_t)tv.tv_sec * 1000000000ull + (uint64_t)tv.tv_usec * 1000u;
+#endif
+}
+
+int icmp_pinger_open(struct icmp_pinger *p) {
+    int size = ICMP_PING_RCVBUF;
+
+    memset(p, 0, sizeof(*p));
+    p->fd = socket(AF_INET, SOCK_DGRAM | SOCK_CLOEXEC, IPPROTO_ICMP);
+    if (p->fd < 0) {
+        p->fd = socket(AF_INET, SOCK_RAW | SOCK_CLOEXEC, IPPROTO_ICMP);
+        p->raw = 1;
+    }
+    if (p->fd < 0) {
+        perror(PURPLE "[ICMPv2]" RESET " Socket creation failed");
+        return -1;
+    }
+#ifdef __linux__
+    if (p->raw) {
+        // raw sockets see every ICMP packet, our own requests on lo included
+        uint32_t filter = ~(1u << ICMP_ECHO_REPLY);
+        setsockopt(p->fd, SOL_RAW, ICMP_RAW_FILTER, &filter, sizeof(filter));
+    }
+#endif
+    setsockopt(p->fd, SOL_SOCKET, SO_RCVBUF, &size, sizeof(size));
+    p->id = getpid() & 0xFFFF;
+    p->tag = (uint32_t)icmp_now_ns() ^ ((uint32_t)getpid() << 16);
+    return 0;
+}
+
+void icmp_pinger_close(struct icmp_pinger *p) {
+    if (p->fd >= 0)
+        close(p->fd);
+    p->fd = -1;
+}
+
+void icmp_ping_build(const struct icmp_pinger *p, struct icmp_packet *packet, uint32_t counter) {
+    struct icmp_ping_payload payload;
+
+    memset(packet, 0, sizeof(*packet));
+    packet->header.type = ICMP_ECHO_REQUEST;
+    packet->header.un.echo.id = htons((uint16_t)(p->id + (counter >> 16)));
+    packet->header.un.echo.sequence = htons((uint16_t)counter);
+    payload.tag = p->tag;
+    payload.counter = counter;
+    payload.sent_ns = icmp_now_ns();
+    memcpy(packet->data, &payload, sizeof(payload));
+    packet->header.checksum = checksum(packet, sizeof(*packet));
+}
+
+// match one received packet to its request; returns 1 if it was a new reply
+int icmp_ping_handle(const struct icmp_pinger *p, struct icmp_ping_target *targets,
+                     const struct sockaddr_in *addrs, int n, uint32_t total, unsigned char *seen,
+                     const unsigned char *buf, size_t len, const struct sockaddr_in *from, int timeout_ms) {
+    struct icmphdr header;
+    struct icmp_ping_payload payload;
+    struct icmp_ping_target *t;
+    uint32_t counter;
+    double rtt;
+    int idx;
+
+    if (p->raw) {
+        size_t ihl;
+        if (len < sizeof(struct iphdr))
+            return 0;
+        ihl = (size_t)(buf[0] & 0x0F) * 4;
+        if (len < ihl)
+            return 0;
+        buf += ihl;
+        len -= ihl;
+    }
+    if (len < sizeof(header) + sizeof(payload))
+        return 0;
+    memcpy(&header, buf, sizeof(header));
+    memcpy(&payload, buf + sizeof(header), sizeof(payload));
+    if (header.type != ICMP_ECHO_REPLY || payload.tag != p->tag || payload.counter >= total)
+        return 0;
+    counter = payload.counter;
+    if (ntohs(header.un.echo.sequence) != (uint16_t)counter)
+        return 0;
+    if (p->raw && ntohs(header.un.echo.id) != (uint16_t)(p->id + (counter >> 16)))
+        return 0;
+    idx = (int)(counter % (uint32_t)n);
+    if (from->sin_addr.s_addr != addrs[idx].sin_addr.s_addr)
+        return 0;
+    if (seen[counter >> 3] & (1u << (counter & 7)))
+        return 0;  // duplicate
+    seen[counter >> 3] |= (unsigned char)(1u << (counter & 7));
+
+    rtt = (icmp_now_ns() - payload.sent_ns) / 1e6;
+    if (rtt > timeout_ms)
+        return 0;  // too late, counts as lost
+    t = &targets[idx];
+    t->received++;
+    if (t->received == 1 || rtt < t->min_ms)
+        t->min_ms = rtt;
+    if (rtt > t->max_ms)
+        t->max_ms = rtt;
+    t->avg_ms += (rtt - t->avg_ms) / t->received;
+    return 1;
+}
+
+// read everything already queued; returns how many new replies matched
+int icmp_ping_drain(const struct icmp_pinger *p, struct icmp_ping_target *targets,
+                    const struct sockaddr_in *addrs, int n, uint32_t total, unsigned char *seen, int timeout_ms) {
+    unsigned char bufs[ICMP_PING_BATCH][ICMP_PING_BUFLEN];
+    struct sockaddr_in from[ICMP_PING_BATCH];
+    int matched = 0;
+
+#ifdef ICMP_HAVE_MMSG
+    struct mmsghdr msgs[ICMP_PING_BATCH];
+    struct iovec iov[ICMP_PING_BATCH];
+    int i, got;
+
+    for (;;) {
+        memset(msgs, 0, sizeof(msgs));
+        for (i = 0; i < ICMP_PING_BATCH; i++) {
+            iov[i].iov_base = bufs[i];
+            iov[i].iov_len = ICMP_PING_BUFLEN;
+            msgs[i].msg_hdr.msg_iov = &iov[i];
+            msgs[i].msg_hdr.msg_iovlen = 1;
+            msgs[i].msg_hdr.msg_name = &from[i];
+            msgs[i].msg_hdr.msg_namelen = sizeof(from[i]);
+        }
+        got = recvmmsg(p->fd, msgs, ICMP_PING_BATCH, MSG_DONTWAIT, NULL);
+        if (got <= 0)
+            break;
+        for (i = 0; i < got; i++)
+            matched += icmp_ping_handle(p, targets, addrs, n, total, seen, bufs[i], msgs[i].msg_len,
+                                        &from[i], timeout_ms);
+        if (got < ICMP_PING_BATCH)
+            break;
+    }
+#else
+    for (;;) {
+        socklen_t from_len = sizeof(from[0]);
+        ssize_t len = recvfrom(p->fd, bufs[0], ICMP_PING_BUFLEN, MSG_DONTWAIT,
+                               (struct sockaddr *)&from[0], &from_len);
+        if (len < 0)
+            break;
+        matched += icmp_ping_handle(p, targets, addrs, n, total, seen, bufs[0], (size_t)len, &from[0], timeout_ms);
+    }
+#endif
+    return matched;
+}
+
+// send requests first .. first + count - 1; returns how many went out
+int icmp_ping_send_batch(const struct icmp_pinger *p, struct icmp_ping_target *targets,
+                         const struct sockaddr_in *addrs, int n, uint32_t first, int count) {
+    struct icmp_packet packets[ICMP_PING_BATCH];
+    int idx[ICMP_PING_BATCH];
+    int i, ready = 0, done = 0;
+
+    for (i = 0; i < count; i++) {
+        int t = (int)((first + (uint32_t)i) % (uint32_t)n);
+        if (addrs[t].sin_family != AF_INET)
+            continue;  // bad address, never sent
+        icmp_ping_build(p, &packets[ready], first + (uint32_t)i);
+        idx[ready++] = t;
+    }
+
+#ifdef ICMP_HAVE_MMSG
+    {
+        struct mmsghdr msgs[ICMP_PING_BATCH];
+        struct iovec iov[ICMP_PING_BATCH];
+
+        memset(msgs, 0, sizeof(msgs));
+        for (i = 0; i < ready; i++) {
+            iov[i].iov_base = &packets[i];
+            iov[i].iov_len = sizeof(packets[i]);
+            msgs[i].msg_hdr.msg_iov = &iov[i];
+            msgs[i].msg_hdr.msg_iovlen = 1;
+            msgs[i].msg_hdr.msg_name = (void *)&addrs[idx[i]];
+            msgs[i].msg_hdr.msg_namelen = sizeof(addrs[idx[i]]);
+        }
+        i = 0;
+        while (i < ready) {
+            int sent = sendmmsg(p->fd, msgs + i, ready - i, 0);
+            if (sent < 0) {
+                if (errno == EINTR)
+                    continue;
+                if (errno == ENOBUFS || errno == EAGAIN) {
+                    poll(NULL, 0, 1);
+                    continue;
+                }
+                i++;  // this one failed (e.g. no route); carry on with the rest
+                continue;
+            }
+            for (; sent > 0; sent--, i++) {
+                targets[idx[i]].sent++;
+                done++;
+            }
+        }
+    }
+#else
+    i = 0;
+    while (i < ready) {
+        if (sendto(p->fd, &packets[i], sizeof(packets[i]), 0,
+                   (const struct sockaddr *)&addrs[idx[i]], sizeof(addrs[idx[i]])) < 0) {
+            if (errno == EINTR)
+                continue;
+            if (errno == ENOBUFS || errno == EAGAIN) {
+                poll(NULL, 0, 1);
+                continue;
+            }
+        } else {
+            targets[idx[i]].sent++;
+            done++;
+        }
+        i++;
+    }
+#endif
+    return done;
+}
+
+// wait for replies until deadline_ns, or until nothing is outstanding
+void icmp_ping_wait(const struct icmp_pinger *p, struct icmp_ping_target *targets,
+                    const struct sockaddr_in *addrs, int n, uint32_t total, unsigned char *seen,
+                    int timeout_ms, uint64_t deadline_ns, long *outstanding, int stop_when_done) {
+    struct pollfd pfd;
+    uint64_t now;
+
+    pfd.fd = p->fd;
+    pfd.events = POLLIN;
+    while ((now = icmp_now_ns()) < deadline_ns) {
+        int wait_ms;
+        if (stop_when_done && *outstanding <= 0)
+            break;
+        wait_ms = (int)((deadline_ns - now + 999999) / 1000000);
+        if (poll(&pfd, 1, wait_ms) < 0 && errno != EINTR)
+            break;
+        *outstanding -= icmp_ping_drain(p, targets, addrs, n, total, seen, timeout_ms);
+    }
+}
+
+/*
+ * Ping every target count times, interval_ms apart; replies slower than
+ * timeout_ms count as lost. Fills in each target's stats and returns how
+ * many targets answered at least once, or -1.
+ */
+int icmp_ping_sweep(struct icmp_pinger *p, struct icmp_ping_target *targets, int n,
+                    int count, int interval_ms, int timeout_ms) {
+    struct sockaddr_in *addrs;
+    unsigned char *seen;
+    uint32_t total, round_first;
+    long outstanding = 0;
+    int i, round, alive = 0;
+
+    if (n <= 0 || count <= 0 || (uint64_t)n * (uint64_t)count > UINT32_MAX) {
+        fprintf(stderr, PURPLE "[ICMPv2]" RESET " Bad sweep size!\n");
+        return -1;
+    }
+    total = (uint32_t)n * (uint32_t)count;
+    addrs = calloc((size_t)n, sizeof(*addrs));
+    seen = calloc(total / 8 + 1, 1);
+    if (addrs == NULL || seen == NULL) {
+        free(addrs);
+        free(seen);
+        return -1;
+    }
+    for (i = 0; i < n; i++) {
+        struct icmp_ping_target *t = &targets[i];
+        t->sent = t->received = 0;
+        t->min_ms = t->avg_ms = t->max_ms = 0;
+        t->loss = 100.0;
+        if (inet_pton(AF_INET, t->ip, &addrs[i].sin_addr) == 1)
+            addrs[i].sin_family = AF_INET;
+        else
+            fprintf(stderr, PURPLE "[ICMPv2]" RESET " Invalid address %s!\n", t->ip);
+    }
+    p->tag++;  // late replies from an earlier sweep won't match
+
+    for (round = 0; round < count; round++) {
+        uint64_t round_start = icmp_now_ns();
+        round_first = (uint32_t)round * (uint32_t)n;
+        for (i = 0; i < n; i += ICMP_PING_BATCH) {
+            int batch = n - i < ICMP_PING_BATCH ? n - i : ICMP_PING_BATCH;
+            outstanding += icmp_ping_send_batch(p, targets, addrs, n, round_first + (uint32_t)i, batch);
+            // keep the receive queue short on big sweeps
+            outstanding -= icmp_ping_drain(p, targets, addrs, n, total, seen, timeout_ms);
+        }
+        if (round + 1 < count)
+            icmp_ping_wait(p, targets, addrs, n, total, seen, timeout_ms,
+                           round_start + (uint64_t)interval_ms * 1000000ull, &outstanding, 0);
+    }
+    icmp_ping_wait(p, targets, addrs, n, total, seen, timeout_ms,
+                   icmp_now_ns() + (uint64_t)timeout_ms * 1000000ull, &outstanding, 1);
+
+    for (i = 0; i < n; i++) {
+        struct icmp_ping_target *t = &targets[i];
+        if (t->sent > 0)
+            t->loss = 100.0 * (t->sent - t->received) / t->sent;
+        alive += t->received > 0;
+    }
+    free(addrs);
+    free(seen);
+    return alive;
+}
+
+void icmp_ping_report(const struct icmp_ping_target *targets, int n) {
+    int i;
+    for (i = 0; i < n; i++) {
+        const struct icmp_ping_target *t = &targets[i];
+        if (t->received > 0)
+            printf(PURPLE "[ICMPv2]" RESET " %s: %d/%d replies, %.1f%% loss, rtt min/avg/max = %.3f/%.3f/%.3f ms\n",
+                   t->ip, t->received, t->sent, t->loss, t->min_ms, t->avg_ms, t->max_ms);
+        else
+            printf(PURPLE "[ICMPv2]" RESET " %s: no reply (%d sent)\n", t->ip, t->sent);
+    }
+}
+
 #endif // ICMP_H
 
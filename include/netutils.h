@@ -21,6 +21,13 @@
 #include <sys/socket.h>
 #include <unistd.h>
 #include <netdb.h>
+#include <errno.h>
+#include <pthread.h>
+#include <stdint.h>
+#include <strings.h>
+#include <time.h>
+#include <sys/epoll.h>
+#include <sys/resource.h>
 
 #define PURPLE "\033[1;35m"
 #define RESET  "\033[0m"
@@ -38,22 +45,25 @@ static inline int is_valid_ip(const char *ip) {
 }
 
 static inline char* hostname_to_ip(const char *hostname, char *ip_buffer, size_t buf_len) {
-    struct hostent *he;
-    struct in_addr **addr_list;
+    struct addrinfo hints, *res;
+    int err;
 
-    if((he = gethostbyname(hostname)) == NULL) {
-        perror(PURPLE "[NETUTILS]" RESET " Failed to resolve hostname");
+    // getaddrinfo() is thread-safe, unlike gethostbyname()/inet_ntoa()
+    memset(&hints, 0, sizeof(hints));
+    hints.ai_family = AF_INET;
+    hints.ai_socktype = SOCK_STREAM;
+    if((err = getaddrinfo(hostname, NULL, &hints, &res)) != 0) {
+        fprintf(stderr, PURPLE "[NETUTILS]" RESET " Failed to resolve hostname: %s\n", gai_strerror(err));
         return NULL;
     }
 
-    addr_list = (struct in_addr **)he->h_addr_list;
-    if(addr_list[0] != NULL) {
-        strncpy(ip_buffer, inet_ntoa(*addr_list[0]), buf_len);
-        ip_buffer[buf_len-1] = '\0';
+    if(inet_ntop(AF_INET, &((struct sockaddr_in *)res->ai_addr)->sin_addr, ip_buffer, buf_len) != NULL) {
+        freeaddrinfo(res);
         printf(PURPLE "[NETUTILS]" RESET " %s resolved to %s\n", hostname, ip_buffer);
         return ip_buffer;
     }
 
+    freeaddrinfo(res);
     return NULL;
 }
 
@@ -88,24 +98,26 @@ static inline int is_host_reachable(const char *ip, uint16_t port) {
 
 // IPv4 version
 static inline int hostname_to_all_ips(const char *hostname, char ip_list[][INET_ADDRSTRLEN], int max_ips) {
-    struct hostent *he;
-    struct in_addr **addr_list;
+    struct addrinfo hints, *res, *p;
+    int count, err;
+
+    memset(&hints, 0, sizeof(hints));
+    hints.ai_family = AF_INET;
+    hints.ai_socktype = SOCK_STREAM;
+    count = 0;
 
-    if((he = gethostbyname(hostname)) == NULL) {
-        perror(PURPLE "[NETUTILS]" RESET " Failed to resolve hostname");
+    if((err = getaddrinfo(hostname, NULL, &hints, &res)) != 0) {
+        fprintf(stderr, PURPLE "[NETUTILS]" RESET " Failed to resolve hostname: %s\n", gai_strerror(err));
         return 0;
     }
 
-    addr_list = (struct in_addr **)he->h_addr_list;
-    int count = 0;
-
-    for(int i = 0; addr_list[i] != NULL && count < max_ips; i++) {
-        strncpy(ip_list[count], inet_ntoa(*addr_list[i]), INET_ADDRSTRLEN);
-        ip_list[count][INET_ADDRSTRLEN-1] = '\0';
+    for(p = res; p != NULL && count < max_ips; p = p->ai_next) {
+        inet_ntop(AF_INET, &((struct sockaddr_in *)p->ai_addr)->sin_addr, ip_list[count], INET_ADDRSTRLEN);
         printf(PURPLE "[NETUTILS]" RESET " %s resolved to %s\n", hostname, ip_list[count]);
         count++;
     }
 
+    freeaddrinfo(res);
     return count;
 }
 
@@ -135,5 +147,598 @@ static inline int hostname_to_all_ips6(const char *hostname, char ip_list[][INET
     return count;
 }
 
+/*
+ * Caching resolver
+ *
+ * getaddrinfo() runs on a small pool of worker threads, so many names are
+ * looked up at once and nobody calls the non-reentrant gethostbyname().
+ * Answers are kept for ttl seconds (failures for a few seconds) and
+ * concurrent lookups of the same name share one query. A hosts file loaded
+ * with netutils_resolver_load_hosts() overrides DNS and never expires.
+ * Nothing here prints; link with -lpthread.
+ */
+
+#define NETUTILS_MAX_ADDRS 8
+#define NETUTILS_DNS_BUCKETS 1024
+#define NETUTILS_DNS_TTL 60           // seconds
+#define NETUTILS_DNS_NEG_TTL_MS 5000  // failed lookups are retried after this
+#define NETUTILS_DNS_MAX_ENTRIES 8192
+#define NETUTILS_DNS_MAX_WORKERS 32
+
+struct netutils_addrs {
+    int count;
+    int error;  // getaddrinfo() error (EAI_*), 0 when resolved
+    struct sockaddr_storage addrs[NETUTILS_MAX_ADDRS];
+};
+
+struct netutils_dns_entry {
+    struct netutils_dns_entry *next;   // hash chain
+    struct netutils_dns_entry *qnext;  // work queue
+    char *host;
+    int family;
+    int pending;    // a worker is looking it up
+    int pinned;     // from a hosts file
+    int refs;       // callers between submit and wait
+    long long expires_ms;
+    struct netutils_addrs result;
+};
+
+struct netutils_resolver {
+    pthread_mutex_t lock;
+    pthread_cond_t work;
+    pthread_cond_t done;
+    struct netutils_dns_entry *buckets[NETUTILS_DNS_BUCKETS];
+    struct netutils_dns_entry *qhead, *qtail;
+    pthread_t workers[NETUTILS_DNS_MAX_WORKERS];
+    int nworkers;
+    int stop;
+    int entries;
+    long long ttl_ms;
+    unsigned long hits, misses;
+};
+
+static inline long long netutils_now_ms(void) {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return (long long)ts.tv_sec * 1000 + ts.tv_nsec / 1000000;
+}
+
+static inline socklen_t netutils_sockaddr_len(const struct sockaddr_storage *ss) {
+    return ss->ss_family == AF_INET6 ? sizeof(struct sockaddr_in6) : sizeof(struct sockaddr_in);
+}
+
+static inline const char *netutils_addr_string(const struct sockaddr_storage *ss, char *buf, size_t len) {
+    if (ss->ss_family == AF_INET6)
+        return inet_ntop(AF_INET6, &((const struct sockaddr_in6 *)ss)->sin6_addr, buf, len);
+    return inet_ntop(AF_INET, &((const struct sockaddr_in *)ss)->sin_addr, buf, len);
+}
+
+static inline void netutils_set_port(struct sockaddr_storage *ss, uint16_t port) {
+    if (ss->ss_family == AF_INET6)
+        ((struct sockaddr_in6 *)ss)->sin6_port = htons(port);
+    else
+        ((struct sockaddr_in *)ss)->sin_port = htons(port);
+}
+
+// literal addresses don't need a lookup
+static inline int netutils_parse_numeric(const char *host, int family, struct sockaddr_storage *out) {
+    memset(out, 0, sizeof(*out));
+    if (family != AF_INET6 && inet_pton(AF_INET, host, &((struct sockaddr_in *)out)->sin_addr) == 1) {
+        out->ss_family = AF_INET;
+        return 1;
+    }
+    if (family != AF_INET && inet_pton(AF_INET6, host, &((struct sockaddr_in6 *)out)->sin6_addr) == 1) {
+        out->ss_family = AF_INET6;
+        return 1;
+    }
+    return 0;
+}
+
+static inline void netutils_lookup(const char *host, int family, struct netutils_addrs *out) {
+    struct addrinfo hints, *res, *p;
+
+    memset(out, 0, sizeof(*out));
+    memset(&hints, 0, sizeof(hints));
+    hints.ai_family = family;
+    hints.ai_socktype = SOCK_STREAM;
+    out->error = getaddrinfo(host, NULL, &hints, &res);
+    if (out->error != 0)
+        return;
+    for (p = res; p != NULL && out->count < NETUTILS_MAX_ADDRS; p = p->ai_next) {
+        if (p->ai_addrlen <= sizeof(struct sockaddr_storage))
+            memcpy(&out->addrs[out->count++], p->ai_addr, p->ai_addrlen);
+    }
+    freeaddrinfo(res);
+}
+
+static inline unsigned netutils_dns_hash(const char *host, int family) {
+    unsigned h = 2166136261u ^ (unsigned)family;
+    for (; *host; host++)
+        h = (h ^ (unsigned char)(*host | 0x20)) * 16777619u;  // names are case-insensitive
+    return h % NETUTILS_DNS_BUCKETS;
+}
+
+static inline void *netutils_resolver_worker(void *arg) {
+    struct netutils_resolver *r = (struct netutils_resolver *)arg;
+    pthread_mutex_lock(&r->lock);
+    for (;;) {
+        struct netutils_dns_entry *e;
+        struct netutils_addrs result;
+        while (!r->stop && r->qhead == NULL)
+            pthread_cond_wait(&r->work, &r->lock);
+        if (r->stop)
+            break;
+        e = r->qhead;
+        r->qhead = e->qnext;
+        if (r->qhead == NULL)
+            r->qtail = NULL;
+        pthread_mutex_unlock(&r->lock);
+
+        netutils_lookup(e->host, e->family, &result);
+
+        pthread_mutex_lock(&r->lock);
+        e->result = result;
+        e->pending = 0;
+        e->expires_ms = netutils_now_ms() + (result.count > 0 ? r->ttl_ms : NETUTILS_DNS_NEG_TTL_MS);
+        pthread_cond_broadcast(&r->done);
+    }
+    pthread_mutex_unlock(&r->lock);
+    return NULL;
+}
+
+// workers: lookups that can run at once (0 = 8); ttl in seconds (0 = default)
+static inline int netutils_resolver_init(struct netutils_resolver *r, int workers, int ttl_seconds) {
+    int i;
+    memset(r, 0, sizeof(*r));
+    if (workers <= 0)
+        workers = 8;
+    if (workers > NETUTILS_DNS_MAX_WORKERS)
+        workers = NETUTILS_DNS_MAX_WORKERS;
+    r->ttl_ms = (long long)(ttl_seconds > 0 ? ttl_seconds : NETUTILS_DNS_TTL) * 1000;
+    pthread_mutex_init(&r->lock, NULL);
+    pthread_cond_init(&r->work, NULL);
+    pthread_cond_init(&r->done, NULL);
+    for (i = 0; i < workers; i++) {
+        if (pthread_create(&r->workers[i], NULL, netutils_resolver_worker, r) != 0)
+            break;
+        r->nworkers++;
+    }
+    if (r->nworkers == 0) {
+        perror(PURPLE "[NETUTILS]" RESET " Failed to start resolver threads");
+        return -1;
+    }
+    return 0;
+}
+
+static inline void netutils_resolver_destroy(struct netutils_resolver *r) {
+    int i;
+    pthread_mutex_lock(&r->lock);
+    r->stop = 1;
+    pthread_cond_broadcast(&r->work);
+    pthread_mutex_unlock(&r->lock);
+    for (i = 0; i < r->nworkers; i++)
+        pthread_join(r->workers[i], NULL);
+    for (i = 0; i < NETUTILS_DNS_BUCKETS; i++) {
+        struct netutils_dns_entry *e = r->buckets[i];
+        while (e != NULL) {
+            struct netutils_dns_entry *next = e->next;
+            free(e->host);
+            free(e);
+            e = next;
+        }
+    }
+    pthread_cond_destroy(&r->done);
+    pthread_cond_destroy(&r->work);
+    pthread_mutex_destroy(&r->lock);
+}
+
+// locked
+static inline struct netutils_dns_entry *netutils_resolver_find(struct netutils_resolver *r, const char *host,
+                                                                int family, int pinned) {
+    struct netutils_dns_entry *e = r->buckets[netutils_dns_hash(host, family)];
+    for (; e != NULL; e = e->next) {
+        if (e->family == family && e->pinned == pinned && strcasecmp(e->host, host) == 0)
+            return e;
+    }
+    return NULL;
+}
+
+// locked: drop expired answers nobody is waiting for
+static inline void netutils_resolver_sweep(struct netutils_resolver *r) {
+    long long now = netutils_now_ms();
+    int i;
+    for (i = 0; i < NETUTILS_DNS_BUCKETS; i++) {
+        struct netutils_dns_entry **link = &r->buckets[i];
+        while (*link != NULL) {
+            struct netutils_dns_entry *e = *link;
+            if (!e->pinned && !e->pending && e->refs == 0 && e->expires_ms <= now) {
+                *link = e->next;
+                free(e->host);
+                free(e);
+                r->entries--;
+            } else {
+                link = &e->next;
+            }
+        }
+    }
+}
+
+// locked
+static inline struct netutils_dns_entry *netutils_resolver_insert(struct netutils_resolver *r, const char *host,
+                                                                  int family, int pinned) {
+    unsigned h = netutils_dns_hash(host, family);
+    struct netutils_dns_entry *e;
+
+    if (r->entries >= NETUTILS_DNS_MAX_ENTRIES)
+        netutils_resolver_sweep(r);
+    e = (struct netutils_dns_entry *)calloc(1, sizeof(*e));
+    if (e == NULL)
+        return NULL;
+    e->host = strdup(host);
+    if (e->host == NULL) {
+        free(e);
+        return NULL;
+    }
+    e->family = family;
+    e->pinned = pinned;
+    e->next = r->buckets[h];
+    r->buckets[h] = e;
+    r->entries++;
+    return e;
+}
+
+// start a lookup (or reuse the cached / in-flight one) without waiting for it;
+// pass the entry to netutils_resolver_wait() exactly once
+static inline struct netutils_dns_entry *netutils_resolver_submit(struct netutils_resolver *r, const char *host,
+                                                                  int family) {
+    struct netutils_dns_entry *e;
+
+    pthread_mutex_lock(&r->lock);
+    e = netutils_resolver_find(r, host, AF_UNSPEC, 1);
+    if (e == NULL)
+        e = netutils_resolver_find(r, host, family, 0);
+    if (e == NULL) {
+        e = netutils_resolver_insert(r, host, family, 0);
+        if (e == NULL) {
+            pthread_mutex_unlock(&r->lock);
+            return NULL;
+        }
+        e->expires_ms = 0;
+    }
+    if (e->pinned || e->pending || e->expires_ms > netutils_now_ms()) {
+        r->hits++;
+    } else {
+        r->misses++;
+        e->pending = 1;
+        e->qnext = NULL;
+        if (r->qtail != NULL)
+            r->qtail->qnext = e;
+        else
+            r->qhead = e;
+        r->qtail = e;
+        pthread_cond_signal(&r->work);
+    }
+    e->refs++;
+    pthread_mutex_unlock(&r->lock);
+    return e;
+}
+
+// wait for a submitted lookup; number of addresses of the wanted family
+static inline int netutils_resolver_wait(struct netutils_resolver *r, struct netutils_dns_entry *e, int family,
+                                         struct netutils_addrs *out) {
+    int i;
+    pthread_mutex_lock(&r->lock);
+    while (e->pending)
+        pthread_cond_wait(&r->done, &r->lock);
+    memset(out, 0, sizeof(*out));
+    out->error = e->result.error;
+    for (i = 0; i < e->result.count; i++) {
+        if (family == AF_UNSPEC || e->result.addrs[i].ss_family == family)
+            out->addrs[out->count++] = e->result.addrs[i];
+    }
+    if (out->count == 0 && out->error == 0)
+        out->error = EAI_NONAME;
+    e->refs--;
+    pthread_mutex_unlock(&r->lock);
+    return out->count;
+}
+
+// resolve one name (AF_INET, AF_INET6 or AF_UNSPEC); number of addresses
+static inline int netutils_resolve(struct netutils_resolver *r, const char *host, int family,
+                                   struct netutils_addrs *out) {
+    struct netutils_dns_entry *e;
+    if (netutils_parse_numeric(host, family, &out->addrs[0])) {
+        out->count = 1;
+        out->error = 0;
+        return 1;
+    }
+    e = netutils_resolver_submit(r, host, family);
+    if (e == NULL) {
+        memset(out, 0, sizeof(*out));
+        out->error = EAI_MEMORY;
+        return 0;
+    }
+    return netutils_resolver_wait(r, e, family, out);
+}
+
+// resolve n names concurrently; number of names that resolved
+static inline int netutils_resolve_many(struct netutils_resolver *r, const char **hosts, int n, int family,
+                                        struct netutils_addrs *out) {
+    struct netutils_dns_entry **entries;
+    int i, ok = 0;
+
+    entries = (struct netutils_dns_entry **)calloc(n > 0 ? n : 1, sizeof(*entries));
+    if (entries == NULL)
+        return -1;
+    for (i = 0; i < n; i++) {
+        memset(&out[i], 0, sizeof(out[i]));
+        if (netutils_parse_numeric(hosts[i], family, &out[i].addrs[0])) {
+            out[i].count = 1;
+            out[i].error = 0;
+        } else {
+            entries[i] = netutils_resolver_submit(r, hosts[i], family);
+        }
+    }
+    for (i = 0; i < n; i++) {
+        if (entries[i] != NULL)
+            netutils_resolver_wait(r, entries[i], family, &out[i]);
+        else if (out[i].count != 1)
+            out[i].error = EAI_MEMORY;
+        ok += out[i].count > 0;
+    }
+    free(entries);
+    return ok;
+}
+
+// "address name [aliases...]" lines like /etc/hosts; these names are never
+// sent to DNS. Returns the number of names loaded, -1 if the file can't be read
+static inline int netutils_resolver_load_hosts(struct netutils_resolver *r, const char *path) {
+    char line[1024];
+    int loaded = 0;
+    FILE *fp = fopen(path, "r");
+
+    if (fp == NULL) {
+        perror(PURPLE "[NETUTILS]" RESET " Failed to open hosts file");
+        return -1;
+    }
+    pthread_mutex_lock(&r->lock);
+    while (fgets(line, sizeof(line), fp) != NULL) {
+        struct sockaddr_storage addr;
+        char *save = NULL, *ip, *name;
+        char *hash = strchr(line, '#');
+        if (hash != NULL)
+            *hash = '\0';
+        ip = strtok_r(line, " \t\r\n", &save);
+        if (ip == NULL || !netutils_parse_numeric(ip, AF_UNSPEC, &addr))
+            continue;
+        while ((name = strtok_r(NULL, " \t\r\n", &save)) != NULL) {
+            struct netutils_dns_entry *e = netutils_resolver_find(r, name, AF_UNSPEC, 1);
+            if (e == NULL) {
+                e = netutils_resolver_insert(r, name, AF_UNSPEC, 1);
+                if (e == NULL)
+                    break;
+                loaded++;
+            }
+            if (e->result.count < NETUTILS_MAX_ADDRS)
+                e->result.addrs[e->result.count++] = addr;
+        }
+    }
+    pthread_mutex_unlock(&r->lock);
+    fclose(fp);
+    return loaded;
+}
+
+/*
+ * Batch reachability prober
+ *
+ * Resolves every host through the resolver (concurrently), then keeps up to
+ * max_parallel non-blocking connects in flight on one epoll set, each with
+ * its own timeout. Probes are started in array order with the same timeout,
+ * so the oldest running probe always has the nearest deadline.
+ */
+
+#define NETUTILS_PROBE_OPEN       1  // connect() succeeded
+#define NETUTILS_PROBE_REFUSED    2  // host up, port closed
+#define NETUTILS_PROBE_TIMEOUT    3
+#define NETUTILS_PROBE_UNRESOLVED 4
+#define NETUTILS_PROBE_ERROR      5  // see error (errno)
+
+struct netutils_probe {
+    const char *host;      // name or literal address
+    uint16_t port;
+    int status;            // NETUTILS_PROBE_*
+    int error;             // errno / EAI_* for errors
+    double rtt_ms;         // connect time
+    char ip[INET6_ADDRSTRLEN];
+};
+
+static inline const char *netutils_probe_status(int status) {
+    switch (status) {
+    case NETUTILS_PROBE_OPEN:       return "open";
+    case NETUTILS_PROBE_REFUSED:    return "refused";
+    case NETUTILS_PROBE_TIMEOUT:    return "timeout";
+    case NETUTILS_PROBE_UNRESOLVED: return "unresolved";
+    case NETUTILS_PROBE_ERROR:      return "error";
+    }
+    return "pending";
+}
+
+static inline double netutils_elapsed_ms(const struct timespec *since) {
+    struct timespec now;
+    clock_gettime(CLOCK_MONOTONIC, &now);
+    return (now.tv_sec - since->tv_sec) * 1e3 + (now.tv_nsec - since->tv_nsec) / 1e6;
+}
+
+static inline void netutils_probe_finish(struct netutils_probe *p, int err, const struct timespec *started) {
+    p->rtt_ms = netutils_elapsed_ms(started);
+    p->error = err;
+    if (err == 0)
+        p->status = NETUTILS_PROBE_OPEN;
+    else if (err == ECONNREFUSED)
+        p->status = NETUTILS_PROBE_REFUSED;
+    else if (err == ETIMEDOUT)
+        p->status = NETUTILS_PROBE_TIMEOUT;
+    else
+        p->status = NETUTILS_PROBE_ERROR;
+}
+
+// probe n host:port pairs; r may be NULL for literal addresses only.
+// max_parallel 0 = 256 (capped by the fd limit). Returns how many are open
+static inline int netutils_probe_many(struct netutils_resolver *r, struct netutils_probe *probes, int n,
+                                      int timeout_ms, int max_parallel) {
+    struct sockaddr_storage *addrs;
+    struct timespec *started;
+    struct epoll_event events[64];
+    struct rlimit lim;
+    int *fds;
+    int i, ep, next = 0, head = 0, active = 0, open_count = 0;
+
+    if (n <= 0)
+        return 0;
+    if (max_parallel <= 0)
+        max_parallel = 256;
+    if (getrlimit(RLIMIT_NOFILE, &lim) == 0 && lim.rlim_cur != RLIM_INFINITY
+            && (rlim_t)max_parallel + 64 > lim.rlim_cur)
+        max_parallel = lim.rlim_cur > 96 ? (int)lim.rlim_cur - 64 : 32;
+
+    addrs = (struct sockaddr_storage *)calloc(n, sizeof(*addrs));
+    started = (struct timespec *)calloc(n, sizeof(*started));
+    fds = (int *)malloc(n * sizeof(int));
+    ep = epoll_create1(EPOLL_CLOEXEC);
+    if (addrs == NULL || started == NULL || fds == NULL || ep < 0) {
+        perror(PURPLE "[NETUTILS]" RESET " Probe setup failed");
+        if (ep >= 0)
+            close(ep);
+        free(addrs);
+        free(started);
+        free(fds);
+        return -1;
+    }
+
+    // resolve everything first; the lookups run in parallel on the pool
+    {
+        struct netutils_dns_entry **entries = (struct netutils_dns_entry **)calloc(n, sizeof(*entries));
+        for (i = 0; i < n; i++) {
+            struct netutils_probe *p = &probes[i];
+            fds[i] = -1;
+            p->status = 0;
+            p->error = 0;
+            p->rtt_ms = 0;
+            p->ip[0] = '\0';
+            if (netutils_parse_numeric(p->host, AF_UNSPEC, &addrs[i]))
+                continue;
+            if (r != NULL && entries != NULL)
+                entries[i] = netutils_resolver_submit(r, p->host, AF_UNSPEC);
+            if (entries == NULL || entries[i] == NULL) {
+                p->status = NETUTILS_PROBE_UNRESOLVED;
+                p->error = EAI_NONAME;
+            }
+        }
+        for (i = 0; i < n; i++) {
+            struct netutils_addrs res;
+            if (entries == NULL || entries[i] == NULL)
+                continue;
+            if (netutils_resolver_wait(r, entries[i], AF_UNSPEC, &res) > 0) {
+                addrs[i] = res.addrs[0];
+            } else {
+                probes[i].status = NETUTILS_PROBE_UNRESOLVED;
+                probes[i].error = res.error;
+            }
+        }
+        free(entries);
+    }
+
+    while (next < n || active > 0) {
+        int ready, wait_ms = -1;
+
+        // keep the window full
+        while (next < n && active < max_parallel) {
+            struct netutils_probe *p = &probes[next];
+            struct epoll_event ev;
+            int fd;
+            i = next++;
+            if (p->status != 0)
+                continue;
+            netutils_addr_string(&addrs[i], p->ip, sizeof(p->ip));
+            netutils_set_port(&addrs[i], p->port);
+            clock_gettime(CLOCK_MONOTONIC, &started[i]);
+            fd = socket(addrs[i].ss_family, SOCK_STREAM | SOCK_NONBLOCK | SOCK_CLOEXEC, 0);
+            if (fd < 0) {
+                netutils_probe_finish(p, errno, &started[i]);
+                continue;
+            }
+            if (connect(fd, (struct sockaddr *)&addrs[i], netutils_sockaddr_len(&addrs[i])) == 0) {
+                netutils_probe_finish(p, 0, &started[i]);
+                close(fd);
+                continue;
+            }
+            if (errno != EINPROGRESS) {
+                netutils_probe_finish(p, errno, &started[i]);
+                close(fd);
+                continue;
+            }
+            memset(&ev, 0, sizeof(ev));
+            ev.events = EPOLLOUT;
+            ev.data.u32 = (uint32_t)i;
+            if (epoll_ctl(ep, EPOLL_CTL_ADD, fd, &ev) < 0) {
+                netutils_probe_finish(p, errno, &started[i]);
+                close(fd);
+                continue;
+            }
+            fds[i] = fd;
+            active++;
+        }
+        if (active == 0)
+            continue;
+
+        // the oldest running probe has the nearest deadline
+        while (head < next && fds[head] == -1)
+            head++;
+        if (head < next) {
+            double left = timeout_ms - netutils_elapsed_ms(&started[head]);
+            wait_ms = left > 0 ? (int)left + 1 : 0;
+        }
+
+        ready = epoll_wait(ep, events, 64, wait_ms);
+        if (ready < 0 && errno != EINTR) {
+            perror(PURPLE "[NETUTILS]" RESET " epoll_wait failed");
+            break;
+        }
+        for (i = 0; i < ready; i++) {
+            int idx = (int)events[i].data.u32, err = 0;
+            socklen_t len = sizeof(err);
+            if (getsockopt(fds[idx], SOL_SOCKET, SO_ERROR, &err, &len) < 0)
+                err = errno;
+            netutils_probe_finish(&probes[idx], err, &started[idx]);
+            close(fds[idx]);
+            fds[idx] = -1;
+            active--;
+        }
+
+        for (i = head; i < next; i++) {
+            if (fds[i] == -1)
+                continue;
+            if (netutils_elapsed_ms(&started[i]) < timeout_ms)
+                break;
+            netutils_probe_finish(&probes[i], ETIMEDOUT, &started[i]);
+            close(fds[i]);
+            fds[i] = -1;
+            active--;
+        }
+    }
+
+    for (i = 0; i < n; i++) {
+        if (fds[i] != -1) {
+            close(fds[i]);
+            probes[i].status = NETUTILS_PROBE_ERROR;
+        }
+        open_count += probes[i].status == NETUTILS_PROBE_OPEN;
+    }
+    close(ep);
+    free(addrs);
+    free(started);
+    free(fds);
+    return open_count;
+}
 
 #endif // NETUTILS_H
@@ -13,7 +13,7 @@
 #define QRTR_H
 
 #if defined(__GNUC__) || defined(__clang__)
-#  warning "qrtr.h is soon DEPRECATED! Avoid using it in new code."
+#  warning "qrtr.h is soon DEPRECATED! Use qrtr2.h in new code."
 #endif
 
 #include <stdio.h>
@@ -25,6 +25,9 @@
 #include <netdb.h>
 #include <errno.h>
 
+// the wire format lives in qrtr2.h; this header keeps the old struct API
+#include "qrtr2.h"
+
 // QRTR message types
 #define QRTR_MSG_TYPE_REQUEST 0x01
 #define QRTR_MSG_TYPE_RESPONSE 0x02
@@ -78,33 +81,98 @@ int qrtr_create_socket(const char *server_ip, uint16_t port) {
 }
 
 // Function to send a message over QRTR
+// Only the header and msg_length bytes go on the wire (QRTR v2 format);
+// define QRTR_LEGACY_WIRE to talk to peers that expect the whole struct
 int qrtr_send_message(int sockfd, struct qrtr_message *msg) {
-    ssize_t sent_bytes = send(sockfd, msg, sizeof(*msg), 0);
-    if (sent_bytes < 0) {
+    struct iovec iov[2];
+    int iovcnt;
+#ifdef QRTR_LEGACY_WIRE
+    iov[0].iov_base = msg;
+    iov[0].iov_len = sizeof(*msg);
+    iovcnt = 1;
+#else
+    unsigned char hdr[QRTR2_HEADER_SIZE];
+    if (msg->msg_length > QRTR_MAX_MSG_SIZE || msg->msg_type > 0xFF) {
+        errno = EINVAL;
+        perror("Error sending message");
+        return -1;
+    }
+    qrtr2_pack_header(hdr, (uint8_t)msg->msg_type, 0, 0, msg->client_id, msg->service_id, msg->msg_length);
+    iov[0].iov_base = hdr;
+    iov[0].iov_len = sizeof(hdr);
+    iov[1].iov_base = msg->data;
+    iov[1].iov_len = msg->msg_length;
+    iovcnt = 2;
+#endif
+    if (qrtr2_write_all(sockfd, iov, iovcnt) < 0) {
         perror("Error sending message");
         return -1;
     }
 
-    printf("Message sent: %d bytes\n", (int)sent_bytes);
+#if QRTR_DEBUG
+    printf("Message sent: %d bytes\n", (int)(iov[0].iov_len + (iovcnt > 1 ? iov[1].iov_len : 0)));
+#endif
     return 0;
 }
 
 // Function to receive a message over QRTR
+// Waits for the whole message; the peer closing the connection is an error
 int qrtr_receive_message(int sockfd, struct qrtr_message *msg) {
-    ssize_t recv_bytes = recv(sockfd, msg, sizeof(*msg), 0);
-    if (recv_bytes < 0) {
+#ifdef QRTR_LEGACY_WIRE
+    int r = qrtr2_read_all(sockfd, msg, sizeof(*msg));
+    size_t received = sizeof(*msg);
+#else
+    unsigned char hdr[QRTR2_HEADER_SIZE];
+    struct qrtr2_msg head;
+    size_t received = 0;
+    int r = qrtr2_read_all(sockfd, hdr, sizeof(hdr));
+    if (r == 1) {
+        if (qrtr2_unpack_header(hdr, &head) < 0) {
+            perror("Error receiving message");
+            return -1;
+        }
+        if (head.length > QRTR_MAX_MSG_SIZE) {
+            // drop the payload so the stream stays in sync
+            char scratch[QRTR_MAX_MSG_SIZE];
+            uint32_t left = head.length;
+            while (left > 0 && r == 1) {
+                uint32_t chunk = left < sizeof(scratch) ? left : (uint32_t)sizeof(scratch);
+                r = qrtr2_read_all(sockfd, scratch, chunk);
+                left -= chunk;
+            }
+            errno = EMSGSIZE;
+            perror("Error receiving message");
+            return -1;
+        }
+        msg->msg_type = head.type;
+        msg->client_id = head.client_id;
+        msg->service_id = head.service_id;
+        msg->msg_length = head.length;
+        r = head.length ? qrtr2_read_all(sockfd, msg->data, head.length) : 1;
+        received = sizeof(hdr) + head.length;
+    }
+#endif
+    if (r != 1) {
+        if (r == 0)
+            errno = ECONNRESET;
         perror("Error receiving message");
         return -1;
     }
 
-    printf("Message received: %d bytes\n", (int)recv_bytes);
+#if QRTR_DEBUG
+    printf("Message received: %d bytes\n", (int)received);
+#else
+    (void)received;
+#endif
     return 0;
 }
 
 // Function to close QRTR socket
 void qrtr_close_socket(int sockfd) {
     close(sockfd);
+#if QRTR_DEBUG
     printf("Socket closed\n");
+#endif
 }
 
 #endif // QRTR_H
@@ -0,0 +1,514 @@
+/*
+ * ZenithOS SDK - Header File
+ *
+ * Copyright (C) 2025 ne5link
+ *
+ * Licensed under the GNU General Public License v3.0 (GPLv3).
+ * See <https://www.gnu.org/licenses/> for details.
+ *
+ * Made by ne5link <3
+ */
+
+/*
+ * QRTR v2 wire protocol
+ *
+ * Each message is a 20 byte header in network byte order followed by exactly
+ * `length` payload bytes (the old protocol always sent the whole 1040 byte
+ * struct). Requests carry an id and responses echo it, so a connection can
+ * have many requests in flight. Small messages are collected in a write
+ * buffer and go out in one send() once batch_size bytes are queued, on
+ * qrtr2_flush(), or when qrtr2_recv() is about to wait for the peer; reads
+ * pull in as much as the socket has and hand out messages from that buffer.
+ *
+ * A write that would block reads whatever the peer has sent meanwhile into a
+ * spill buffer, so queueing any number of requests before the first
+ * qrtr2_recv() can't deadlock against a peer that is itself blocked writing
+ * responses. The spill buffer holds every response to requests already
+ * written, so keep in_flight bounded if memory matters.
+ *
+ *   struct qrtr2_conn c;
+ *   qrtr2_connect(&c, "127.0.0.1", 5555);
+ *   for (i = 0; i < n; i++)
+ *       qrtr2_request(&c, SERVICE_ID, data, len);   // queued, sent in batches
+ *   while (c.in_flight > 0 && qrtr2_recv(&c, &msg) == 1)
+ *       handle(msg.request_id, msg.data, msg.length);
+ *   qrtr2_close(&c);
+ *
+ * Nothing is printed per message unless QRTR_DEBUG is defined to 1 (or
+ * conn->debug is set).
+ */
+
+#ifndef QRTR2_H
+#define QRTR2_H
+
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <stdint.h>
+#include <unistd.h>
+#include <errno.h>
+#include <poll.h>
+#include <sys/socket.h>
+#include <sys/uio.h>
+#include <netinet/in.h>
+#include <netinet/tcp.h>
+#include <arpa/inet.h>
+
+#ifndef QRTR_DEBUG
+#define QRTR_DEBUG 0
+#endif
+
+// QRTR message types (same values as qrtr.h)
+#ifndef QRTR_MSG_TYPE_REQUEST
+#define QRTR_MSG_TYPE_REQUEST 0x01
+#define QRTR_MSG_TYPE_RESPONSE 0x02
+#define QRTR_MSG_TYPE_NOTIFICATION 0x03
+#endif
+
+#define QRTR2_VERSION 2
+#define QRTR2_HEADER_SIZE 20
+#define QRTR2_MAX_MSG_SIZE (16u * 1024 * 1024)
+#define QRTR2_BATCH_SIZE (16 * 1024)  // queued bytes that trigger a write
+#define QRTR2_READ_SIZE (64 * 1024)   // bytes asked for per recv()
+
+// A received message; data points into the connection's read buffer and
+// stays valid until the next qrtr2_recv() (sending doesn't move it)
+struct qrtr2_msg {
+    uint8_t type;
+    uint16_t flags;
+    uint32_t request_id;
+    uint32_t client_id;
+    uint32_t service_id;
+    uint32_t length;
+    const void *data;
+};
+
+// One connection with its write (batching) and read buffers
+struct qrtr2_conn {
+    int fd;
+    uint32_t client_id;        // sent in every header
+    uint32_t next_id;          // next request id
+    uint32_t in_flight;        // requests sent without a response yet
+    size_t batch_size;         // flush once this much is queued
+    unsigned char *wbuf;
+    size_t wlen, wcap;
+    unsigned char *rbuf;
+    size_t rstart, rlen, rcap;
+    unsigned char *sbuf;       // read while a write was blocked, follows rbuf
+    size_t slen, scap;
+    int debug;
+    // counters
+    uint64_t bytes_out, bytes_in, writes, reads, msgs_out, msgs_in;
+};
+
+// Function to write a header in network byte order
+void qrtr2_pack_header(unsigned char *out, uint8_t type, uint16_t flags, uint32_t request_id,
+                       uint32_t client_id, uint32_t service_id, uint32_t length) {
+    uint16_t f = htons(flags);
+    uint32_t v;
+    out[0] = QRTR2_VERSION;
+    out[1] = type;
+    memcpy(out + 2, &f, 2);
+    v = htonl(request_id); memcpy(out + 4, &v, 4);
+    v = htonl(client_id);  memcpy(out + 8, &v, 4);
+    v = htonl(service_id); memcpy(out + 12, &v, 4);
+    v = htonl(length);     memcpy(out + 16, &v, 4);
+}
+
+// Function to read a header; -1 (EPROTO) for a foreign version or bad length
+int qrtr2_unpack_header(const unsigned char *in, struct qrtr2_msg *msg) {
+    uint16_t f;
+    uint32_t v;
+    if (in[0] != QRTR2_VERSION) {
+        errno = EPROTO;
+        return -1;
+    }
+    msg->type = in[1];
+    memcpy(&f, in + 2, 2); msg->flags = ntohs(f);
+    memcpy(&v, in + 4, 4); msg->request_id = ntohl(v);
+    memcpy(&v, in + 8, 4); msg->client_id = ntohl(v);
+    memcpy(&v, in + 12, 4); msg->service_id = ntohl(v);
+    memcpy(&v, in + 16, 4); msg->length = ntohl(v);
+    if (msg->length > QRTR2_MAX_MSG_SIZE) {
+        errno = EPROTO;
+        return -1;
+    }
+    msg->data = NULL;
+    return 0;
+}
+
+// Function to write every iovec, retrying short writes
+int qrtr2_write_all(int sockfd, struct iovec *iov, int iovcnt) {
+    struct msghdr mh;
+    memset(&mh, 0, sizeof(mh));
+    while (iovcnt > 0 && iov->iov_len == 0) {
+        iov++;
+        iovcnt--;
+    }
+    while (iovcnt > 0) {
+        ssize_t n;
+        mh.msg_iov = iov;
+        mh.msg_iovlen = iovcnt;
+        n = sendmsg(sockfd, &mh, MSG_NOSIGNAL);
+        if (n < 0) {
+            if (errno == EINTR)
+                continue;
+            return -1;
+        }
+        while (iovcnt > 0 && (size_t)n >= iov->iov_len) {
+            n -= (ssize_t)iov->iov_len;
+            iov++;
+            iovcnt--;
+        }
+        if (iovcnt > 0) {
+            iov->iov_base = (char *)iov->iov_base + n;
+            iov->iov_len -= (size_t)n;
+        }
+    }
+    return 0;
+}
+
+// Function to read exactly len bytes; 1 done, 0 EOF before the first byte
+int qrtr2_read_all(int sockfd, void *buf, size_t len) {
+    size_t got = 0;
+    while (got < len) {
+        ssize_t n = recv(sockfd, (char *)buf + got, len - got, 0);
+        if (n == 0) {
+            if (got == 0)
+                return 0;
+            errno = ECONNRESET;
+            return -1;
+        }
+        if (n < 0) {
+            if (errno == EINTR)
+                continue;
+            return -1;
+        }
+        got += (size_t)n;
+    }
+    return 1;
+}
+
+// Function to turn off Nagle: batching is done here, not by the kernel
+void qrtr2_set_nodelay(int sockfd) {
+    int one = 1;
+    setsockopt(sockfd, IPPROTO_TCP, TCP_NODELAY, &one, sizeof(one));
+}
+
+// Function to wrap a connected socket
+void qrtr2_init(struct qrtr2_conn *c, int sockfd) {
+    memset(c, 0, sizeof(*c));
+    c->fd = sockfd;
+    c->next_id = 1;
+    c->batch_size = QRTR2_BATCH_SIZE;
+    c->debug = QRTR_DEBUG;
+}
+
+// Function to connect to a QRTR v2 server
+int qrtr2_connect(struct qrtr2_conn *c, const char *server_ip, uint16_t port) {
+    int sockfd;
+    struct sockaddr_in server_addr;
+
+    sockfd = socket(AF_INET, SOCK_STREAM, 0);
+    if (sockfd < 0) {
+        perror("Error creating socket");
+        return -1;
+    }
+
+    memset(&server_addr, 0, sizeof(server_addr));
+    server_addr.sin_family = AF_INET;
+    server_addr.sin_port = htons(port);
+    if (inet_pton(AF_INET, server_ip, &server_addr.sin_addr) <= 0) {
+        fprintf(stderr, "Invalid server IP: %s\n", server_ip);
+        close(sockfd);
+        return -1;
+    }
+
+    if (connect(sockfd, (struct sockaddr *)&server_addr, sizeof(server_addr)) < 0) {
+        perror("Connection failed");
+        close(sockfd);
+        return -1;
+    }
+
+    qrtr2_set_nodelay(sockfd);
+    qrtr2_init(c, sockfd);
+    return 0;
+}
+
+// Function to wait until the socket takes more data, moving anything the
+// peer sent meanwhile into the spill buffer; *reading drops to 0 at EOF
+int qrtr2_wait_writable(struct qrtr2_conn *c, int *reading) {
+    struct pollfd pfd;
+    ssize_t n;
+
+    pfd.fd = c->fd;
+    pfd.events = POLLOUT | (*reading ? POLLIN : 0);
+    while (poll(&pfd, 1, -1) < 0) {
+        if (errno != EINTR)
+            return -1;
+    }
+    if (!(pfd.revents & POLLIN))
+        return 0;
+    if (c->scap - c->slen < QRTR2_READ_SIZE) {
+        size_t cap = c->scap ? c->scap * 2 : QRTR2_READ_SIZE;
+        unsigned char *grown = (unsigned char *)realloc(c->sbuf, cap);
+        if (grown == NULL) {
+            errno = ENOMEM;
+            return -1;
+        }
+        c->sbuf = grown;
+        c->scap = cap;
+    }
+    n = recv(c->fd, c->sbuf + c->slen, c->scap - c->slen, MSG_DONTWAIT);
+    if (n < 0)
+        return errno == EINTR || errno == EAGAIN || errno == EWOULDBLOCK ? 0 : -1;
+    if (n == 0) {
+        *reading = 0;  // qrtr2_recv() sees the EOF again once the spill is used up
+        return 0;
+    }
+    c->slen += (size_t)n;
+    c->bytes_in += (uint64_t)n;
+    c->reads++;
+    return 0;
+}
+
+// Function to write every iovec on the connection without ever blocking
+// while the peer has data for us
+int qrtr2_send_iov(struct qrtr2_conn *c, struct iovec *iov, int iovcnt) {
+    struct msghdr mh;
+    int reading = 1;
+    memset(&mh, 0, sizeof(mh));
+    while (iovcnt > 0 && iov->iov_len == 0) {
+        iov++;
+        iovcnt--;
+    }
+    while (iovcnt > 0) {
+        ssize_t n;
+        mh.msg_iov = iov;
+        mh.msg_iovlen = iovcnt;
+        n = sendmsg(c->fd, &mh, MSG_NOSIGNAL | MSG_DONTWAIT);
+        if (n < 0) {
+            if (errno == EINTR)
+                continue;
+            if (errno != EAGAIN && errno != EWOULDBLOCK)
+                return -1;
+            if (qrtr2_wait_writable(c, &reading) < 0)
+                return -1;
+            continue;
+        }
+        while (iovcnt > 0 && (size_t)n >= iov->iov_len) {
+            n -= (ssize_t)iov->iov_len;
+            iov++;
+            iovcnt--;
+        }
+        if (iovcnt > 0) {
+            iov->iov_base = (char *)iov->iov_base + n;
+            iov->iov_len -= (size_t)n;
+        }
+    }
+    return 0;
+}
+
+// Function to send everything queued
+int qrtr2_flush(struct qrtr2_conn *c) {
+    struct iovec iov;
+    if (c->wlen == 0)
+        return 0;
+    iov.iov_base = c->wbuf;
+    iov.iov_len = c->wlen;
+    if (qrtr2_send_iov(c, &iov, 1) < 0)
+        return -1;
+    c->bytes_out += c->wlen;
+    c->writes++;
+    c->wlen = 0;
+    return 0;
+}
+
+// Function to queue one message; written once batch_size bytes are queued.
+// Payloads of batch_size or more go out straight away without being copied
+int qrtr2_queue(struct qrtr2_conn *c, uint8_t type, uint32_t request_id, uint32_t service_id,
+                const void *data, uint32_t length) {
+    size_t need = QRTR2_HEADER_SIZE + (size_t)length;
+
+    if (length > QRTR2_MAX_MSG_SIZE) {
+        errno = EMSGSIZE;
+        return -1;
+    }
+    if (c->debug)
+        printf("[QRTR] queue type %u id %u service %u: %u bytes\n", type, request_id, service_id, length);
+    c->msgs_out++;
+
+    if (length >= c->batch_size) {
+        unsigned char hdr[QRTR2_HEADER_SIZE];
+        struct iovec iov[3];
+        qrtr2_pack_header(hdr, type, 0, request_id, c->client_id, service_id, length);
+        iov[0].iov_base = c->wbuf;
+        iov[0].iov_len = c->wlen;
+        iov[1].iov_base = hdr;
+        iov[1].iov_len = sizeof(hdr);
+        iov[2].iov_base = (void *)data;
+        iov[2].iov_len = length;
+        if (qrtr2_send_iov(c, iov, 3) < 0)
+            return -1;
+        c->bytes_out += c->wlen + need;
+        c->writes++;
+        c->wlen = 0;
+        return 0;
+    }
+
+    if (c->wlen + need > c->wcap) {
+        size_t cap = c->wcap ? c->wcap : c->batch_size * 2;
+        unsigned char *grown;
+        while (cap < c->wlen + need)
+            cap *= 2;
+        grown = (unsigned char *)realloc(c->wbuf, cap);
+        if (grown == NULL) {
+            errno = ENOMEM;
+            return -1;
+        }
+        c->wbuf = grown;
+        c->wcap = cap;
+    }
+    qrtr2_pack_header(c->wbuf + c->wlen, type, 0, request_id, c->client_id, service_id, length);
+    if (length > 0)
+        memcpy(c->wbuf + c->wlen + QRTR2_HEADER_SIZE, data, length);
+    c->wlen += need;
+    if (c->wlen >= c->batch_size)
+        return qrtr2_flush(c);
+    return 0;
+}
+
+// Function to queue a request; returns its id (0 on error)
+uint32_t qrtr2_request(struct qrtr2_conn *c, uint32_t service_id, const void *data, uint32_t length) {
+    uint32_t id = c->next_id++;
+    if (id == 0)
+        id = c->next_id++;
+    if (qrtr2_queue(c, QRTR_MSG_TYPE_REQUEST, id, service_id, data, length) < 0)
+        return 0;
+    c->in_flight++;
+    return id;
+}
+
+// Function to queue the response to a request
+int qrtr2_respond(struct qrtr2_conn *c, const struct qrtr2_msg *req, const void *data, uint32_t length) {
+    return qrtr2_queue(c, QRTR_MSG_TYPE_RESPONSE, req->request_id, req->service_id, data, length);
+}
+
+// Function to queue a notification
+int qrtr2_notify(struct qrtr2_conn *c, uint32_t service_id, const void *data, uint32_t length) {
+    return qrtr2_queue(c, QRTR_MSG_TYPE_NOTIFICATION, 0, service_id, data, length);
+}
+
+// Function to tell whether a whole message is already buffered
+// (qrtr2_recv() won't block then)
+int qrtr2_buffered(const struct qrtr2_conn *c) {
+    struct qrtr2_msg msg;
+    unsigned char hdr[QRTR2_HEADER_SIZE];
+    size_t avail = c->rlen - c->rstart;
+    size_t head = avail < QRTR2_HEADER_SIZE ? avail : QRTR2_HEADER_SIZE;
+    if (avail + c->slen < QRTR2_HEADER_SIZE)
+        return 0;
+    // the header may straddle the read and spill buffers
+    memcpy(hdr, c->rbuf + c->rstart, head);
+    memcpy(hdr + head, c->sbuf, QRTR2_HEADER_SIZE - head);
+    if (qrtr2_unpack_header(hdr, &msg) < 0)
+        return 1;  // let qrtr2_recv() report the error
+    return avail + c->slen - QRTR2_HEADER_SIZE >= msg.length;
+}
+
+// Function to receive the next message: 1 message, 0 peer closed, -1 error.
+// Queued messages are flushed before waiting for the peer
+int qrtr2_recv(struct qrtr2_conn *c, struct qrtr2_msg *msg) {
+    for (;;) {
+        size_t avail = c->rlen - c->rstart;
+        size_t want = QRTR2_READ_SIZE;
+        ssize_t n;
+
+        if (avail >= QRTR2_HEADER_SIZE) {
+            if (qrtr2_unpack_header(c->rbuf + c->rstart, msg) < 0)
+                return -1;
+            if (avail - QRTR2_HEADER_SIZE >= msg->length) {
+                msg->data = c->rbuf + c->rstart + QRTR2_HEADER_SIZE;
+                c->rstart += QRTR2_HEADER_SIZE + msg->length;
+                c->msgs_in++;
+                if (msg->type == QRTR_MSG_TYPE_RESPONSE && c->in_flight > 0)
+                    c->in_flight--;
+                if (c->debug)
+                    printf("[QRTR] received type %u id %u service %u: %u bytes\n",
+                           msg->type, msg->request_id, msg->service_id, msg->length);
+                return 1;
+            }
+            // make room for the whole message
+            if (QRTR2_HEADER_SIZE + msg->length - avail > want)
+                want = QRTR2_HEADER_SIZE + msg->length - avail;
+        }
+
+        // the peer may be waiting for what we queued
+        if (qrtr2_flush(c) < 0)
+            return -1;
+        if (c->slen > want)
+            want = c->slen;  // spilled during this or an earlier write
+
+        if (c->rstart > 0) {
+            memmove(c->rbuf, c->rbuf + c->rstart, avail);
+            c->rstart = 0;
+            c->rlen = avail;
+        }
+        if (c->rcap - c->rlen < want) {
+            size_t cap = c->rcap ? c->rcap : QRTR2_READ_SIZE;
+            unsigned char *grown;
+            while (cap - c->rlen < want)
+                cap *= 2;
+            grown = (unsigned char *)realloc(c->rbuf, cap);
+            if (grown == NULL) {
+                errno = ENOMEM;
+                return -1;
+            }
+            c->rbuf = grown;
+            c->rcap = cap;
+        }
+        if (c->slen > 0) {
+            // what arrived during earlier writes comes before the socket
+            memcpy(c->rbuf + c->rlen, c->sbuf, c->slen);
+            c->rlen += c->slen;
+            c->slen = 0;
+            continue;
+        }
+        n = recv(c->fd, c->rbuf + c->rlen, c->rcap - c->rlen, 0);
+        if (n < 0) {
+            if (errno == EINTR)
+                continue;
+            return -1;
+        }
+        if (n == 0) {
+            if (c->rlen == 0)
+                return 0;
+            errno = ECONNRESET;
+            return -1;
+        }
+        c->rlen += (size_t)n;
+        c->bytes_in += (uint64_t)n;
+        c->reads++;
+    }
+}
+
+// Function to free the buffers (the socket stays open)
+void qrtr2_free(struct qrtr2_conn *c) {
+    free(c->wbuf);
+    free(c->rbuf);
+    free(c->sbuf);
+    c->wbuf = c->rbuf = c->sbuf = NULL;
+    c->wlen = c->wcap = c->rstart = c->rlen = c->rcap = c->slen = c->scap = 0;
+}
+
+// Function to flush, free and close the connection
+void qrtr2_close(struct qrtr2_conn *c) {
+    qrtr2_flush(c);
+    qrtr2_free(c);
+    close(c->fd);
+    c->fd = -1;
+    if (c->debug)
+        printf("[QRTR] socket closed\n");
+}
+
+#endif // QRTR2_H
@@ -15,10 +15,33 @@
 #include <stdio.h>
 #include <stdlib.h>
 #include <string.h>
+#include <errno.h>
+#include <fcntl.h>
+#include <stdint.h>
+#include <sys/epoll.h>
+#include <sys/mman.h>
 #include <sys/socket.h>
+#include <sys/stat.h>
+#include <sys/syscall.h>
+#include <sys/uio.h>
 #include <sys/un.h>
 #include <unistd.h>
 
+#define ZENITHOS_IPC_BACKLOG SOMAXCONN
+
+// strict -std=c99/c11 without feature macros declares neither syscall() nor
+// ftruncate()/shm_open(); the ring then lives in an unlinked /dev/shm file
+#if defined(SYS_memfd_create) && (defined(_DEFAULT_SOURCE) || defined(_GNU_SOURCE) || defined(_BSD_SOURCE))
+#define ZENITHOS_IPC_HAVE_MEMFD 1
+#else
+#define ZENITHOS_IPC_HAVE_MEMFD 0
+#endif
+#if defined(_POSIX_C_SOURCE) && _POSIX_C_SOURCE >= 200112L
+#define ZENITHOS_IPC_HAVE_POSIX 1
+#else
+#define ZENITHOS_IPC_HAVE_POSIX 0
+#endif
+
 int zenithos_ipc_create_socket(const char *socket_path) {
     int socket_fd;
     struct sockaddr_un addr;
@@ -46,7 +69,7 @@ int zenithos_ipc_create_socket(const char *socket_path) {
 
 // listen connections
 int zenithos_ipc_listen(int socket_fd) {
-    if (listen(socket_fd, 1) == -1) {
+    if (listen(socket_fd, ZENITHOS_IPC_BACKLOG) == -1) {
         perror("listen");
         return -1;
     }
@@ -63,12 +86,19 @@ int zenithos_ipc_accept(int socket_fd) {
     return client_fd;
 }
 
-// send through socket
+// send through socket (all of it: short writes are retried)
 int zenithos_ipc_send(int socket_fd, const void *data, size_t size) {
-    ssize_t bytes_sent = send(socket_fd, data, size, 0);
-    if (bytes_sent == -1) {
-        perror("send");
-        return -1;
+    const char *p = (const char *)data;
+    while (size > 0) {
+        ssize_t bytes_sent = send(socket_fd, p, size, MSG_NOSIGNAL);
+        if (bytes_sent == -1) {
+            if (errno == EINTR)
+                continue;
+            perror("send");
+            return -1;
+        }
+        p += bytes_sent;
+        size -= (size_t)bytes_sent;
     }
     return 0;
 }
@@ -92,4 +122,1020 @@ int zenithos_ipc_close(int socket_fd) {
     return 0;
 }
 
+// connect to a unix socket
+int zenithos_ipc_connect(const char *socket_path) {
+    int socket_fd;
+    struct sockaddr_un addr;
+
+    socket_fd = socket(AF_UNIX, SOCK_STREAM | SOCK_CLOEXEC, 0);
+    if (socket_fd == -1) {
+        perror("socket");
+        return -1;
+    }
+
+    memset(&addr, 0, sizeof(struct sockaddr_un));
+    addr.sun_family = AF_UNIX;
+    strncpy(addr.sun_path, socket_path, sizeof(addr.sun_path) - 1);
+
+    if (connect(socket_fd, (struct sockaddr *)&addr, sizeof(struct sockaddr_un)) == -1) {
+        perror("connect");
+        close(socket_fd);
+        return -1;
+    }
+
+    return socket_fd;
+}
+
+/*
+ * Framed messages
+ *
+ * Every message is an 8 byte header (payload length, type, flags) followed
+ * by the payload, so a receiver always gets whole messages no matter how the
+ * stream was split. Headers and payload parts go out in one sendmsg()
+ * (scatter/gather), nothing is copied into a staging buffer. Headers are in
+ * host byte order: these sockets never leave the machine.
+ *
+ * The data path doesn't print anything; functions return -1 with errno set.
+ */
+
+#define ZENITHOS_IPC_MAX_MSG   (64u * 1024 * 1024)  // largest payload accepted
+#define ZENITHOS_IPC_MAX_FDS   8                     // fds per message (SCM_RIGHTS)
+#define ZENITHOS_IPC_MAX_PARTS 16                    // payload parts per message
+
+#define ZENITHOS_IPC_F_FDS  0x0001  // file descriptors travel with the header
+#define ZENITHOS_IPC_F_RING 0x0002  // payload is a zenithos_ipc_ring_ref into the shared ring
+
+#define ZENITHOS_IPC_T_RING 0xFFFF  // ring setup: carries the ring's memfd
+
+struct zenithos_ipc_header {
+    uint32_t length;
+    uint16_t type;
+    uint16_t flags;
+};
+
+struct zenithos_ipc_msg {
+    uint32_t length;
+    uint16_t type;
+    uint16_t flags;
+    int fds[ZENITHOS_IPC_MAX_FDS];  // received descriptors, owned by the caller
+    int nfds;
+};
+
+#ifdef MSG_CMSG_CLOEXEC
+#define ZENITHOS_IPC_RECV_FLAGS MSG_CMSG_CLOEXEC  // received fds don't leak into exec'd children
+#else
+#define ZENITHOS_IPC_RECV_FLAGS 0
+#endif
+
+typedef union {
+    char buf[CMSG_SPACE(sizeof(int) * ZENITHOS_IPC_MAX_FDS)];
+    struct cmsghdr align;
+} zenithos_ipc_cmsg_buf;
+
+// read exactly size bytes; 1 when done, 0 on EOF before the first byte
+int zenithos_ipc_read_full(int fd, void *buffer, size_t size) {
+    char *p = (char *)buffer;
+    size_t got = 0;
+    while (got < size) {
+        ssize_t n = recv(fd, p + got, size - got, 0);
+        if (n == 0) {
+            if (got == 0)
+                return 0;
+            errno = ECONNRESET;
+            return -1;
+        }
+        if (n < 0) {
+            if (errno == EINTR)
+                continue;
+            return -1;
+        }
+        got += (size_t)n;
+    }
+    return 1;
+}
+
+// keep sending until every iovec is out; iov is consumed (modified).
+// fds, if any, go with the first byte
+int zenithos_ipc_sendv_full(int fd, struct iovec *iov, int iovcnt, const int *fds, int nfds) {
+    struct msghdr mh;
+    zenithos_ipc_cmsg_buf ctl;
+
+    if (nfds < 0 || nfds > ZENITHOS_IPC_MAX_FDS) {
+        errno = EINVAL;
+        return -1;
+    }
+    memset(&mh, 0, sizeof(mh));
+    if (nfds > 0) {
+        struct cmsghdr *cm;
+        memset(&ctl, 0, sizeof(ctl));
+        mh.msg_control = ctl.buf;
+        mh.msg_controllen = CMSG_SPACE(sizeof(int) * nfds);
+        cm = CMSG_FIRSTHDR(&mh);
+        cm->cmsg_level = SOL_SOCKET;
+        cm->cmsg_type = SCM_RIGHTS;
+        cm->cmsg_len = CMSG_LEN(sizeof(int) * nfds);
+        memcpy(CMSG_DATA(cm), fds, sizeof(int) * nfds);
+    }
+    while (iovcnt > 0 && iov->iov_len == 0) {
+        iov++;
+        iovcnt--;
+    }
+    while (iovcnt > 0) {
+        ssize_t n;
+        mh.msg_iov = iov;
+        mh.msg_iovlen = iovcnt;
+        n = sendmsg(fd, &mh, MSG_NOSIGNAL);
+        if (n < 0) {
+            if (errno == EINTR)
+                continue;
+            return -1;
+        }
+        mh.msg_control = NULL;
+        mh.msg_controllen = 0;
+        while (iovcnt > 0 && (size_t)n >= iov->iov_len) {
+            n -= (ssize_t)iov->iov_len;
+            iov++;
+            iovcnt--;
+        }
+        if (iovcnt > 0) {
+            iov->iov_base = (char *)iov->iov_base + n;
+            iov->iov_len -= (size_t)n;
+        }
+    }
+    return 0;
+}
+
+// header + payload parts as one frame; builds the iovec list, doesn't copy data
+int zenithos_ipc_frame(struct iovec *iov, struct zenithos_ipc_header *hdr, uint16_t type, uint16_t flags,
+                       const struct iovec *parts, int nparts) {
+    uint64_t total = 0;
+    int i, n = 1;
+
+    if (nparts < 0 || nparts > ZENITHOS_IPC_MAX_PARTS) {
+        errno = EINVAL;
+        return -1;
+    }
+    for (i = 0; i < nparts; i++) {
+        total += parts[i].iov_len;
+        if (parts[i].iov_len > 0)
+            iov[n++] = parts[i];
+    }
+    if (total > ZENITHOS_IPC_MAX_MSG) {
+        errno = EMSGSIZE;
+        return -1;
+    }
+    hdr->length = (uint32_t)total;
+    hdr->type = type;
+    hdr->flags = flags;
+    iov[0].iov_base = hdr;
+    iov[0].iov_len = sizeof(*hdr);
+    return n;
+}
+
+int zenithos_ipc_send_frame(int fd, uint16_t type, uint16_t flags, const struct iovec *parts, int nparts,
+                            const int *fds, int nfds) {
+    struct zenithos_ipc_header hdr;
+    struct iovec iov[ZENITHOS_IPC_MAX_PARTS + 1];
+    int n;
+
+    if (nfds > 0)
+        flags |= ZENITHOS_IPC_F_FDS;
+    n = zenithos_ipc_frame(iov, &hdr, type, flags, parts, nparts);
+    if (n < 0)
+        return -1;
+    return zenithos_ipc_sendv_full(fd, iov, n, fds, nfds);
+}
+
+// one message from a single buffer
+int zenithos_ipc_send_msg(int fd, uint16_t type, const void *data, uint32_t size) {
+    struct iovec part;
+    part.iov_base = (void *)data;
+    part.iov_len = size;
+    return zenithos_ipc_send_frame(fd, type, 0, &part, 1, NULL, 0);
+}
+
+// one message gathered from several buffers (e.g. a struct and its body)
+int zenithos_ipc_send_msgv(int fd, uint16_t type, const struct iovec *parts, int nparts) {
+    return zenithos_ipc_send_frame(fd, type, 0, parts, nparts, NULL, 0);
+}
+
+// one message carrying open file descriptors to the peer
+int zenithos_ipc_send_fds(int fd, uint16_t type, const void *data, uint32_t size, const int *fds, int nfds) {
+    struct iovec part;
+    part.iov_base = (void *)data;
+    part.iov_len = size;
+    return zenithos_ipc_send_frame(fd, type, 0, &part, 1, fds, nfds);
+}
+
+// collect SCM_RIGHTS descriptors from a received msghdr
+void zenithos_ipc_take_fds(struct msghdr *mh, int *fds, int *nfds) {
+    struct cmsghdr *cm;
+    for (cm = CMSG_FIRSTHDR(mh); cm != NULL; cm = CMSG_NXTHDR(mh, cm)) {
+        int i, count;
+        if (cm->cmsg_level != SOL_SOCKET || cm->cmsg_type != SCM_RIGHTS)
+            continue;
+        count = (int)((cm->cmsg_len - CMSG_LEN(0)) / sizeof(int));
+        for (i = 0; i < count; i++) {
+            int got;
+            memcpy(&got, CMSG_DATA(cm) + i * sizeof(int), sizeof(int));
+            if (*nfds < ZENITHOS_IPC_MAX_FDS)
+                fds[(*nfds)++] = got;
+            else
+                close(got);
+        }
+    }
+}
+
+// close the descriptors a message brought along, keeping errno
+void zenithos_ipc_close_fds(struct zenithos_ipc_msg *msg) {
+    int i, saved = errno;
+    for (i = 0; i < msg->nfds; i++)
+        close(msg->fds[i]);
+    msg->nfds = 0;
+    errno = saved;
+}
+
+// blocking: read the next header (and any fds sent with it).
+// 1 for a message, 0 when the peer closed the connection; on -1 no
+// received fds are left open
+int zenithos_ipc_recv_header(int fd, struct zenithos_ipc_msg *msg) {
+    struct zenithos_ipc_header hdr;
+    size_t got = 0;
+
+    msg->nfds = 0;
+    while (got < sizeof(hdr)) {
+        struct msghdr mh;
+        struct iovec iov;
+        zenithos_ipc_cmsg_buf ctl;
+        ssize_t n;
+
+        memset(&mh, 0, sizeof(mh));
+        iov.iov_base = (char *)&hdr + got;
+        iov.iov_len = sizeof(hdr) - got;
+        mh.msg_iov = &iov;
+        mh.msg_iovlen = 1;
+        mh.msg_control = ctl.buf;
+        mh.msg_controllen = sizeof(ctl.buf);
+        n = recvmsg(fd, &mh, ZENITHOS_IPC_RECV_FLAGS);
+        if (n < 0) {
+            if (errno == EINTR)
+                continue;
+            zenithos_ipc_close_fds(msg);
+            return -1;
+        }
+        zenithos_ipc_take_fds(&mh, msg->fds, &msg->nfds);
+        if (n == 0) {
+            if (got == 0 && msg->nfds == 0)
+                return 0;
+            zenithos_ipc_close_fds(msg);
+            errno = ECONNRESET;
+            return -1;
+        }
+        got += (size_t)n;
+    }
+    if (hdr.length > ZENITHOS_IPC_MAX_MSG) {
+        zenithos_ipc_close_fds(msg);
+        errno = EPROTO;
+        return -1;
+    }
+    msg->length = hdr.length;
+    msg->type = hdr.type;
+    msg->flags = hdr.flags;
+    return 1;
+}
+
+// read and drop a payload so the stream stays in sync
+int zenithos_ipc_skip(int fd, uint32_t size) {
+    char scratch[4096];
+    while (size > 0) {
+        uint32_t chunk = size < sizeof(scratch) ? size : (uint32_t)sizeof(scratch);
+        if (zenithos_ipc_read_full(fd, scratch, chunk) != 1)
+            return -1;
+        size -= chunk;
+    }
+    return 0;
+}
+
+// blocking: next whole message into buffer. 1 = message (msg->length bytes
+// in buffer), 0 = peer closed, -1 = error; a payload bigger than the buffer
+// is skipped with errno EMSGSIZE. Received fds are closed on -1
+int zenithos_ipc_recv_msg(int fd, struct zenithos_ipc_msg *msg, void *buffer, size_t buffer_size) {
+    int r = zenithos_ipc_recv_header(fd, msg);
+    if (r != 1)
+        return r;
+    if (msg->length > buffer_size) {
+        if (zenithos_ipc_skip(fd, msg->length) == 0)
+            errno = EMSGSIZE;
+        zenithos_ipc_close_fds(msg);
+        return -1;
+    }
+    if (msg->length > 0 && (r = zenithos_ipc_read_full(fd, buffer, msg->length)) != 1) {
+        if (r == 0)
+            errno = ECONNRESET;  // closed between header and payload
+        zenithos_ipc_close_fds(msg);
+        return -1;
+    }
+    return 1;
+}
+
+// blocking: next whole message in a malloc'd buffer (free() it); NULL on
+// close (errno 0) or error
+void *zenithos_ipc_recv_msg_alloc(int fd, struct zenithos_ipc_msg *msg) {
+    void *buffer;
+    int r = zenithos_ipc_recv_header(fd, msg);
+    if (r != 1) {
+        if (r == 0)
+            errno = 0;
+        return NULL;
+    }
+    buffer = malloc(msg->length ? msg->length : 1);
+    if (buffer == NULL) {
+        zenithos_ipc_skip(fd, msg->length);
+        zenithos_ipc_close_fds(msg);
+        errno = ENOMEM;
+        return NULL;
+    }
+    if (msg->length > 0 && (r = zenithos_ipc_read_full(fd, buffer, msg->length)) != 1) {
+        if (r == 0)
+            errno = ECONNRESET;
+        free(buffer);
+        zenithos_ipc_close_fds(msg);
+        return NULL;
+    }
+    return buffer;
+}
+
+/*
+ * Shared memory ring
+ *
+ * Large payloads between local processes don't have to be pushed through
+ * the socket: the sender copies them once into a memfd ring that both sides
+ * have mapped and only sends a small ZENITHOS_IPC_F_RING frame pointing at
+ * it. The receiver reads the data in place and releases it. A ring has one
+ * writer and one reader (use one ring per direction), entries never wrap:
+ * the writer skips the tail end of the buffer instead. The memfd is handed
+ * over once with zenithos_ipc_send_ring_setup().
+ */
+
+#define ZENITHOS_IPC_RING_THRESHOLD (64 * 1024)  // smaller payloads go through the socket
+#define ZENITHOS_IPC_RING_CTL       4096
+
+struct zenithos_ipc_ring_ctl {
+    uint64_t head;          // written by the producer
+    char pad0[56];
+    uint64_t tail;          // written by the consumer
+    char pad1[56];
+    uint64_t size;
+};
+
+struct zenithos_ipc_ring {
+    int fd;
+    size_t map_size;
+    struct zenithos_ipc_ring_ctl *ctl;
+    unsigned char *data;
+    uint64_t size;
+    uint32_t threshold;     // payloads below this use the socket
+};
+
+struct zenithos_ipc_ring_ref {
+    uint64_t pos;
+    uint32_t length;
+    uint32_t reserved;
+};
+
+int zenithos_ipc_ring_map(struct zenithos_ipc_ring *ring, int fd, size_t map_size) {
+    void *base = mmap(NULL, map_size, PROT_READ | PROT_WRITE, MAP_SHARED, fd, 0);
+    if (base == MAP_FAILED) {
+        perror("mmap");
+        return -1;
+    }
+    ring->fd = fd;
+    ring->map_size = map_size;
+    ring->ctl = (struct zenithos_ipc_ring_ctl *)base;
+    ring->data = (unsigned char *)base + ZENITHOS_IPC_RING_CTL;
+    ring->threshold = ZENITHOS_IPC_RING_THRESHOLD;
+    return 0;
+}
+
+// new ring with size bytes of data space
+int zenithos_ipc_ring_create(struct zenithos_ipc_ring *ring, size_t size) {
+    int fd;
+    size_t map_size = ZENITHOS_IPC_RING_CTL + size;
+
+    memset(ring, 0, sizeof(*ring));
+#if ZENITHOS_IPC_HAVE_MEMFD
+    fd = (int)syscall(SYS_memfd_create, "zenithos-ipc-ring", 1u /* MFD_CLOEXEC */);
+#else
+    {
+        char name[64];
+#if ZENITHOS_IPC_HAVE_POSIX
+        snprintf(name, sizeof(name), "/zenithos-ipc-%ld-%p", (long)getpid(), (void *)ring);
+        fd = shm_open(name, O_RDWR | O_CREAT | O_EXCL, 0600);
+        if (fd != -1)
+            shm_unlink(name);
+#else
+        snprintf(name, sizeof(name), "/dev/shm/zenithos-ipc-%ld-%p", (long)getpid(), (void *)ring);
+        fd = open(name, O_RDWR | O_CREAT | O_EXCL, 0600);
+        if (fd != -1)
+            unlink(name);
+#endif
+        if (fd != -1)
+            fcntl(fd, F_SETFD, FD_CLOEXEC);
+    }
+#endif
+    if (fd == -1) {
+        perror("memfd_create");
+        return -1;
+    }
+#if ZENITHOS_IPC_HAVE_POSIX
+    if (ftruncate(fd, (off_t)map_size) == -1) {
+#else
+    if (lseek(fd, (off_t)map_size - 1, SEEK_SET) == -1 || write(fd, "", 1) != 1) {
+#endif
+        perror("ftruncate");
+        close(fd);
+        return -1;
+    }
+    if (zenithos_ipc_ring_map(ring, fd, map_size) == -1) {
+        close(fd);
+        return -1;
+    }
+    ring->size = size;
+    ring->ctl->size = size;
+    return 0;
+}
+
+// map a ring received from the peer (takes ownership of fd)
+int zenithos_ipc_ring_attach(struct zenithos_ipc_ring *ring, int fd) {
+    struct stat st;
+
+    memset(ring, 0, sizeof(*ring));
+    if (fstat(fd, &st) == -1 || st.st_size <= ZENITHOS_IPC_RING_CTL) {
+        fprintf(stderr, "zenithos_ipc_ring_attach: not a ring\n");
+        close(fd);
+        return -1;
+    }
+    if (zenithos_ipc_ring_map(ring, fd, (size_t)st.st_size) == -1) {
+        close(fd);
+        return -1;
+    }
+    ring->size = __atomic_load_n(&ring->ctl->size, __ATOMIC_ACQUIRE);
+    if (ring->size != (uint64_t)st.st_size - ZENITHOS_IPC_RING_CTL) {
+        fprintf(stderr, "zenithos_ipc_ring_attach: size mismatch\n");
+        munmap(ring->ctl, ring->map_size);
+        close(fd);
+        ring->ctl = NULL;
+        return -1;
+    }
+    return 0;
+}
+
+void zenithos_ipc_ring_close(struct zenithos_ipc_ring *ring) {
+    if (ring->ctl != NULL) {
+        munmap(ring->ctl, ring->map_size);
+        close(ring->fd);
+    }
+    memset(ring, 0, sizeof(*ring));
+    ring->fd = -1;
+}
+
+// producer: copy data into the ring; -1 with EAGAIN when it doesn't fit yet
+int zenithos_ipc_ring_write(struct zenithos_ipc_ring *ring, const void *data, uint32_t size,
+                            struct zenithos_ipc_ring_ref *ref) {
+    uint64_t head = ring->ctl->head;
+    uint64_t tail = __atomic_load_n(&ring->ctl->tail, __ATOMIC_ACQUIRE);
+    uint64_t room = ring->size - head % ring->size;
+    uint64_t skip = room < size ? room : 0;
+
+    if (size > ring->size || head + skip + size - tail > ring->size) {
+        errno = EAGAIN;
+        return -1;
+    }
+    memcpy(ring->data + (head + skip) % ring->size, data, size);
+    ref->pos = head + skip;
+    ref->length = size;
+    ref->reserved = 0;
+    __atomic_store_n(&ring->ctl->head, head + skip + size, __ATOMIC_RELEASE);
+    return 0;
+}
+
+// consumer: the data a ref points at, NULL when the ref is bogus
+const void *zenithos_ipc_ring_data(struct zenithos_ipc_ring *ring, const struct zenithos_ipc_ring_ref *ref) {
+    uint64_t head = __atomic_load_n(&ring->ctl->head, __ATOMIC_ACQUIRE);
+    uint64_t tail = ring->ctl->tail;
+    if (ring->size == 0 || ref->pos < tail || ref->pos + ref->length > head
+            || ref->pos % ring->size + ref->length > ring->size)
+        return NULL;
+    return ring->data + ref->pos % ring->size;
+}
+
+// consumer: done with a ref (and everything before it)
+void zenithos_ipc_ring_release(struct zenithos_ipc_ring *ring, const struct zenithos_ipc_ring_ref *ref) {
+    __atomic_store_n(&ring->ctl->tail, ref->pos + ref->length, __ATOMIC_RELEASE);
+}
+
+// hand the ring to the peer; the peer reads what this side writes
+int zenithos_ipc_send_ring_setup(int fd, const struct zenithos_ipc_ring *ring) {
+    return zenithos_ipc_send_frame(fd, ZENITHOS_IPC_T_RING, 0, NULL, 0, &ring->fd, 1);
+}
+
+// send through the ring when it's worth it, through the socket otherwise
+// (no ring, small payload, or the ring is full)
+int zenithos_ipc_send_large(int fd, struct zenithos_ipc_ring *ring, uint16_t type, const void *data, uint32_t size) {
+    struct zenithos_ipc_ring_ref ref;
+    struct iovec part;
+
+    if (ring == NULL || ring->ctl == NULL || size < ring->threshold
+            || zenithos_ipc_ring_write(ring, data, size, &ref) == -1)
+        return zenithos_ipc_send_msg(fd, type, data, size);
+    part.iov_base = &ref;
+    part.iov_len = sizeof(ref);
+    return zenithos_ipc_send_frame(fd, type, ZENITHOS_IPC_F_RING, &part, 1, NULL, 0);
+}
+
+// payload of a received message: in place in the ring for F_RING messages,
+// the received bytes otherwise. Call zenithos_ipc_msg_done() when finished
+const void *zenithos_ipc_msg_data(struct zenithos_ipc_ring *ring, const struct zenithos_ipc_msg *msg,
+                                  const void *payload, uint32_t *size) {
+    const struct zenithos_ipc_ring_ref *ref = (const struct zenithos_ipc_ring_ref *)payload;
+    const void *data;
+
+    if (!(msg->flags & ZENITHOS_IPC_F_RING)) {
+        *size = msg->length;
+        return payload;
+    }
+    if (ring == NULL || ring->ctl == NULL || msg->length != sizeof(*ref)) {
+        errno = EPROTO;
+        return NULL;
+    }
+    data = zenithos_ipc_ring_data(ring, ref);
+    if (data == NULL) {
+        errno = EPROTO;
+        return NULL;
+    }
+    *size = ref->length;
+    return data;
+}
+
+void zenithos_ipc_msg_done(struct zenithos_ipc_ring *ring, const struct zenithos_ipc_msg *msg, const void *payload) {
+    if ((msg->flags & ZENITHOS_IPC_F_RING) && ring != NULL && ring->ctl != NULL)
+        zenithos_ipc_ring_release(ring, (const struct zenithos_ipc_ring_ref *)payload);
+}
+
+/*
+ * Event-driven server
+ *
+ * One thread serves any number of clients: non-blocking sockets on an epoll
+ * set, partial reads are buffered until a whole frame is in, replies that
+ * don't fit in the socket buffer are queued and flushed on EPOLLOUT. Ring
+ * setup frames are handled here; the callback only sees the application's
+ * messages, with ring payloads already resolved.
+ *
+ *   struct zenithos_ipc_server srv;
+ *   zenithos_ipc_server_init(&srv, "/tmp/app.sock", on_message, NULL);
+ *   zenithos_ipc_server_run(&srv);
+ *   zenithos_ipc_server_close(&srv);
+ */
+
+#define ZENITHOS_IPC_MAX_EVENTS 64
+#define ZENITHOS_IPC_READ_CHUNK (64 * 1024)
+#define ZENITHOS_IPC_MAX_QUEUED (64u * 1024 * 1024)  // unsent reply bytes per client
+
+struct zenithos_ipc_server;
+
+struct zenithos_ipc_client {
+    int fd;
+    unsigned char *in;
+    size_t in_len, in_cap;
+    unsigned char *out;
+    size_t out_len, out_off, out_cap;
+    int fds[ZENITHOS_IPC_MAX_FDS];  // received, not yet handed to a message
+    int nfds;
+    struct zenithos_ipc_ring ring;  // the client's ring, once set up
+    void *user;
+};
+
+// return -1 to drop the client. fds in msg belong to the callback
+typedef int (*zenithos_ipc_handler)(struct zenithos_ipc_server *srv, struct zenithos_ipc_client *client,
+                                    const struct zenithos_ipc_msg *msg, const void *data);
+
+struct zenithos_ipc_server {
+    int listen_fd;
+    int epoll_fd;
+    struct zenithos_ipc_client **clients;  // indexed by fd
+    int clients_cap;
+    int nclients;
+    int running;
+    zenithos_ipc_handler on_message;
+    void (*on_connect)(struct zenithos_ipc_server *srv, struct zenithos_ipc_client *client);
+    void (*on_close)(struct zenithos_ipc_server *srv, struct zenithos_ipc_client *client);
+    void *user;
+};
+
+int zenithos_ipc_set_nonblocking(int fd) {
+    int flags = fcntl(fd, F_GETFL, 0);
+    if (flags == -1 || fcntl(fd, F_SETFL, flags | O_NONBLOCK) == -1) {
+        perror("fcntl");
+        return -1;
+    }
+    return 0;
+}
+
+int zenithos_ipc_server_init(struct zenithos_ipc_server *srv, const char *socket_path,
+                             zenithos_ipc_handler on_message, void *user) {
+    struct epoll_event ev;
+
+    memset(srv, 0, sizeof(*srv));
+    srv->listen_fd = -1;
+    srv->epoll_fd = -1;
+    srv->on_message = on_message;
+    srv->user = user;
+
+    srv->listen_fd = zenithos_ipc_create_socket(socket_path);
+    if (srv->listen_fd == -1)
+        return -1;
+    if (zenithos_ipc_set_nonblocking(srv->listen_fd) == -1 || zenithos_ipc_listen(srv->listen_fd) == -1)
+        goto fail;
+    srv->epoll_fd = epoll_create1(EPOLL_CLOEXEC);
+    if (srv->epoll_fd == -1) {
+        perror("epoll_create1");
+        goto fail;
+    }
+    memset(&ev, 0, sizeof(ev));
+    ev.events = EPOLLIN;
+    ev.data.fd = srv->listen_fd;
+    if (epoll_ctl(srv->epoll_fd, EPOLL_CTL_ADD, srv->listen_fd, &ev) == -1) {
+        perror("epoll_ctl");
+        goto fail;
+    }
+    return 0;
+
+fail:
+    if (srv->epoll_fd != -1)
+        close(srv->epoll_fd);
+    close(srv->listen_fd);
+    srv->listen_fd = srv->epoll_fd = -1;
+    return -1;
+}
+
+void zenithos_ipc_server_drop(struct zenithos_ipc_server *srv, struct zenithos_ipc_client *client) {
+    int i;
+    if (srv->on_close != NULL)
+        srv->on_close(srv, client);
+    epoll_ctl(srv->epoll_fd, EPOLL_CTL_DEL, client->fd, NULL);
+    srv->clients[client->fd] = NULL;
+    srv->nclients--;
+    close(client->fd);
+    for (i = 0; i < client->nfds; i++)
+        close(client->fds[i]);
+    zenithos_ipc_ring_close(&client->ring);
+    free(client->in);
+    free(client->out);
+    free(client);
+}
+
+void zenithos_ipc_server_accept(struct zenithos_ipc_server *srv) {
+    for (;;) {
+        struct zenithos_ipc_client *client;
+        struct epoll_event ev;
+        int fd = accept(srv->listen_fd, NULL, NULL);
+        if (fd == -1) {
+            if (errno == EINTR)
+                continue;
+            if (errno != EAGAIN && errno != EWOULDBLOCK)
+                perror("accept");
+            return;
+        }
+        fcntl(fd, F_SETFD, FD_CLOEXEC);
+        if (zenithos_ipc_set_nonblocking(fd) == -1) {
+            close(fd);
+            continue;
+        }
+        if (fd >= srv->clients_cap) {
+            int cap = srv->clients_cap ? srv->clients_cap : 64;
+            struct zenithos_ipc_client **grown;
+            while (cap <= fd)
+                cap *= 2;
+            grown = (struct zenithos_ipc_client **)realloc(srv->clients, cap * sizeof(*grown));
+            if (grown == NULL) {
+                close(fd);
+                continue;
+            }
+            memset(grown + srv->clients_cap, 0, (cap - srv->clients_cap) * sizeof(*grown));
+            srv->clients = grown;
+            srv->clients_cap = cap;
+        }
+        client = (struct zenithos_ipc_client *)calloc(1, sizeof(*client));
+        if (client == NULL) {
+            close(fd);
+            continue;
+        }
+        client->fd = fd;
+        client->ring.fd = -1;
+        memset(&ev, 0, sizeof(ev));
+        ev.events = EPOLLIN | EPOLLRDHUP;
+        ev.data.fd = fd;
+        if (epoll_ctl(srv->epoll_fd, EPOLL_CTL_ADD, fd, &ev) == -1) {
+            perror("epoll_ctl");
+            close(fd);
+            free(client);
+            continue;
+        }
+        srv->clients[fd] = client;
+        srv->nclients++;
+        if (srv->on_connect != NULL)
+            srv->on_connect(srv, client);
+    }
+}
+
+int zenithos_ipc_server_want_write(struct zenithos_ipc_server *srv, struct zenithos_ipc_client *client, int on) {
+    struct epoll_event ev;
+    memset(&ev, 0, sizeof(ev));
+    ev.events = EPOLLIN | EPOLLRDHUP | (on ? EPOLLOUT : 0);
+    ev.data.fd = client->fd;
+    return epoll_ctl(srv->epoll_fd, EPOLL_CTL_MOD, client->fd, &ev);
+}
+
+// write queued reply bytes; 0 when the queue is empty or the socket is full
+int zenithos_ipc_server_flush(struct zenithos_ipc_server *srv, struct zenithos_ipc_client *client) {
+    while (client->out_off < client->out_len) {
+        ssize_t n = send(client->fd, client->out + client->out_off, client->out_len - client->out_off,
+                         MSG_NOSIGNAL);
+        if (n < 0) {
+            if (errno == EINTR)
+                continue;
+            if (errno == EAGAIN || errno == EWOULDBLOCK)
+                return 0;
+            return -1;
+        }
+        client->out_off += (size_t)n;
+    }
+    client->out_off = client->out_len = 0;
+    return zenithos_ipc_server_want_write(srv, client, 0);
+}
+
+// queue what the socket didn't take
+int zenithos_ipc_server_queue(struct zenithos_ipc_server *srv, struct zenithos_ipc_client *client,
+                              const struct iovec *iov, int iovcnt) {
+    size_t need = 0;
+    int i, was_empty = client->out_len == client->out_off;
+
+    for (i = 0; i < iovcnt; i++)
+        need += iov[i].iov_len;
+    if (client->out_off > 0 && client->out_len + need > client->out_cap) {
+        memmove(client->out, client->out + client->out_off, client->out_len - client->out_off);
+        client->out_len -= client->out_off;
+        client->out_off = 0;
+    }
+    if (client->out_len + need > ZENITHOS_IPC_MAX_QUEUED) {
+        errno = ENOBUFS;
+        return -1;
+    }
+    if (client->out_len + need > client->out_cap) {
+        size_t cap = client->out_cap ? client->out_cap : ZENITHOS_IPC_READ_CHUNK;
+        unsigned char *grown;
+        while (cap < client->out_len + need)
+            cap *= 2;
+        grown = (unsigned char *)realloc(client->out, cap);
+        if (grown == NULL) {
+            errno = ENOMEM;
+            return -1;
+        }
+        client->out = grown;
+        client->out_cap = cap;
+    }
+    for (i = 0; i < iovcnt; i++) {
+        memcpy(client->out + client->out_len, iov[i].iov_base, iov[i].iov_len);
+        client->out_len += iov[i].iov_len;
+    }
+    return was_empty ? zenithos_ipc_server_want_write(srv, client, 1) : 0;
+}
+
+// reply without blocking: written straight away when the socket takes it,
+// queued (and flushed by the loop) otherwise
+int zenithos_ipc_server_replyv(struct zenithos_ipc_server *srv, struct zenithos_ipc_client *client, uint16_t type,
+                               const struct iovec *parts, int nparts) {
+    struct zenithos_ipc_header hdr;
+    struct iovec iov[ZENITHOS_IPC_MAX_PARTS + 1];
+    struct iovec *p = iov;
+    int n = zenithos_ipc_frame(iov, &hdr, type, 0, parts, nparts);
+
+    if (n < 0)
+        return -1;
+    if (client->out_len == client->out_off) {
+        struct msghdr mh;
+        ssize_t sent;
+        memset(&mh, 0, sizeof(mh));
+        mh.msg_iov = iov;
+        mh.msg_iovlen = n;
+        do {
+            sent = sendmsg(client->fd, &mh, MSG_NOSIGNAL);
+        } while (sent < 0 && errno == EINTR);
+        if (sent < 0) {
+            if (errno != EAGAIN && errno != EWOULDBLOCK)
+                return -1;
+            sent = 0;
+        }
+        while (n > 0 && (size_t)sent >= p->iov_len) {
+            sent -= (ssize_t)p->iov_len;
+            p++;
+            n--;
+        }
+        if (n == 0)
+            return 0;
+        p->iov_base = (char *)p->iov_base + sent;
+        p->iov_len -= (size_t)sent;
+    }
+    return zenithos_ipc_server_queue(srv, client, p, n);
+}
+
+int zenithos_ipc_server_reply(struct zenithos_ipc_server *srv, struct zenithos_ipc_client *client, uint16_t type,
+                              const void *data, uint32_t size) {
+    struct iovec part;
+    part.iov_base = (void *)data;
+    part.iov_len = size;
+    return zenithos_ipc_server_replyv(srv, client, type, &part, 1);
+}
+
+// hand every complete frame in the input buffer to the callback
+int zenithos_ipc_server_dispatch(struct zenithos_ipc_server *srv, struct zenithos_ipc_client *client) {
+    size_t off = 0;
+    int result = 0;
+
+    while (client->in_len - off >= sizeof(struct zenithos_ipc_header)) {
+        struct zenithos_ipc_header hdr;
+        struct zenithos_ipc_msg msg;
+        const unsigned char *payload;
+        const void *data;
+        uint32_t size;
+
+        memcpy(&hdr, client->in + off, sizeof(hdr));
+        if (hdr.length > ZENITHOS_IPC_MAX_MSG) {
+            result = -1;
+            break;
+        }
+        if (client->in_len - off - sizeof(hdr) < hdr.length)
+            break;
+        payload = client->in + off + sizeof(hdr);
+        off += sizeof(hdr) + hdr.length;
+
+        memset(&msg, 0, sizeof(msg));
+        msg.length = hdr.length;
+        msg.type = hdr.type;
+        msg.flags = hdr.flags;
+        if (hdr.flags & ZENITHOS_IPC_F_FDS) {
+            memcpy(msg.fds, client->fds, sizeof(int) * client->nfds);
+            msg.nfds = client->nfds;
+            client->nfds = 0;
+        }
+        if (hdr.type == ZENITHOS_IPC_T_RING) {
+            zenithos_ipc_ring_close(&client->ring);
+            if (msg.nfds != 1) {
+                int i;
+                for (i = 0; i < msg.nfds; i++)
+                    close(msg.fds[i]);
+                result = -1;
+                break;
+            }
+            if (zenithos_ipc_ring_attach(&client->ring, msg.fds[0]) == -1) {
+                result = -1;
+                break;
+            }
+            continue;
+        }
+        data = zenithos_ipc_msg_data(&client->ring, &msg, payload, &size);
+        if (data == NULL) {
+            result = -1;
+            break;
+        }
+        msg.length = size;
+        if (srv->on_message != NULL && srv->on_message(srv, client, &msg, data) < 0)
+            result = -1;
+        if (hdr.flags & ZENITHOS_IPC_F_RING)
+            zenithos_ipc_ring_release(&client->ring, (const struct zenithos_ipc_ring_ref *)payload);
+        if (result < 0)
+            break;
+    }
+    if (off > 0) {
+        memmove(client->in, client->in + off, client->in_len - off);
+        client->in_len -= off;
+    }
+    return result;
+}
+
+// read everything the socket has; -1 when the client is gone
+int zenithos_ipc_server_read(struct zenithos_ipc_server *srv, struct zenithos_ipc_client *client) {
+    for (;;) {
+        struct msghdr mh;
+        struct iovec iov;
+        zenithos_ipc_cmsg_buf ctl;
+        size_t want = ZENITHOS_IPC_READ_CHUNK;
+        ssize_t n;
+
+        // room for the whole frame being received, so big payloads land in one buffer
+        if (client->in_len >= sizeof(struct zenithos_ipc_header)) {
+            struct zenithos_ipc_header hdr;
+            memcpy(&hdr, client->in, sizeof(hdr));
+            if (hdr.length <= ZENITHOS_IPC_MAX_MSG && sizeof(hdr) + hdr.length > client->in_len + want)
+                want = sizeof(hdr) + hdr.length - client->in_len;
+        }
+        if (client->in_cap - client->in_len < want) {
+            size_t cap = client->in_cap ? client->in_cap : ZENITHOS_IPC_READ_CHUNK;
+            unsigned char *grown;
+            while (cap - client->in_len < want)
+                cap *= 2;
+            grown = (unsigned char *)realloc(client->in, cap);
+            if (grown == NULL)
+                return -1;
+            client->in = grown;
+            client->in_cap = cap;
+        }
+        memset(&mh, 0, sizeof(mh));
+        iov.iov_base = client->in + client->in_len;
+        iov.iov_len = client->in_cap - client->in_len;
+        mh.msg_iov = &iov;
+        mh.msg_iovlen = 1;
+        mh.msg_control = ctl.buf;
+        mh.msg_controllen = sizeof(ctl.buf);
+        n = recvmsg(client->fd, &mh, ZENITHOS_IPC_RECV_FLAGS);
+        if (n < 0) {
+            if (errno == EINTR)
+                continue;
+            if (errno == EAGAIN || errno == EWOULDBLOCK)
+                return 0;
+            return -1;
+        }
+        zenithos_ipc_take_fds(&mh, client->fds, &client->nfds);
+        if (n == 0)
+            return -1;
+        client->in_len += (size_t)n;
+        if (zenithos_ipc_server_dispatch(srv, client) < 0)
+            return -1;
+    }
+}
+
+// one round of the event loop; number of events handled, -1 on error
+int zenithos_ipc_server_poll(struct zenithos_ipc_server *srv, int timeout_ms) {
+    struct epoll_event events[ZENITHOS_IPC_MAX_EVENTS];
+    int i, n = epoll_wait(srv->epoll_fd, events, ZENITHOS_IPC_MAX_EVENTS, timeout_ms);
+
+    if (n < 0) {
+        if (errno == EINTR)
+            return 0;
+        perror("epoll_wait");
+        return -1;
+    }
+    for (i = 0; i < n; i++) {
+        int fd = events[i].data.fd;
+        struct zenithos_ipc_client *client;
+        if (fd == srv->listen_fd) {
+            zenithos_ipc_server_accept(srv);
+            continue;
+        }
+        client = fd < srv->clients_cap ? srv->clients[fd] : NULL;
+        if (client == NULL)
+            continue;
+        if ((events[i].events & EPOLLOUT) && zenithos_ipc_server_flush(srv, client) < 0) {
+            zenithos_ipc_server_drop(srv, client);
+            continue;
+        }
+        if (events[i].events & (EPOLLIN | EPOLLRDHUP | EPOLLHUP | EPOLLERR)) {
+            int r = zenithos_ipc_server_read(srv, client);
+            if (r < 0)
+                zenithos_ipc_server_drop(srv, client);
+        }
+    }
+    return n;
+}
+
+int zenithos_ipc_server_run(struct zenithos_ipc_server *srv) {
+    srv->running = 1;
+    while (srv->running) {
+        if (zenithos_ipc_server_poll(srv, -1) < 0)
+            return -1;
+    }
+    return 0;
+}
+
+// callable from a handler; the loop returns after the current round
+void zenithos_ipc_server_stop(struct zenithos_ipc_server *srv) {
+    srv->running = 0;
+}
+
+void zenithos_ipc_server_close(struct zenithos_ipc_server *srv) {
+    int fd;
+    for (fd = 0; fd < srv->clients_cap; fd++) {
+        if (srv->clients[fd] != NULL)
+            zenithos_ipc_server_drop(srv, srv->clients[fd]);
+    }
+    free(srv->clients);
+    srv->clients = NULL;
+    srv->clients_cap = 0;
+    if (srv->epoll_fd != -1)
+        close(srv->epoll_fd);
+    if (srv->listen_fd != -1)
+        close(srv->listen_fd);
+    srv->epoll_fd = srv->listen_fd = -1;
+}
+
 #endif /* _ZENITHOS_IPC_H */
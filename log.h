@@ -14,25 +14,539 @@
 
 #include <stdio.h>
 #include <stdarg.h>
+#include <stdint.h>
+#include <stdlib.h>
+#include <string.h>
+#include <errno.h>
+#include <fcntl.h>
+#include <pthread.h>
+#include <sched.h>
+#include <time.h>
+#include <unistd.h>
+#include <sys/time.h>
+#include <sys/uio.h>
 
 #define LOG_INFO    0
 #define LOG_WARNING 1
 #define LOG_ERROR   2
 #define LOG_FATAL   3
 
+// compile-time floor; anything below it is compiled out.
+// prlog_set_level() moves the runtime level on top of it
+#ifndef LOG_LEVEL
 #define LOG_LEVEL LOG_INFO
+#endif
+
+/*
+ * prlog() formats on the calling thread into that thread's ring and returns;
+ * a writer thread batches the records to stdout (or prlog_open()'s file) with
+ * writev. Lines from one thread stay in order, lines from different threads
+ * may interleave differently than they were logged. Output goes to the fd,
+ * not through stdio, so it isn't ordered against printf(). Everything is
+ * written out on exit() and before prlog_fe() returns. Define PRLOG_SYNC to
+ * write each line directly instead.
+ *
+ * The state below is shared by every file that includes log.h, so the ring
+ * settings must be the same in all of them. Build with -pthread.
+ */
+#ifndef PRLOG_RECORD_SIZE
+#define PRLOG_RECORD_SIZE 256   // longer lines are cut short
+#endif
+#ifndef PRLOG_RING_SLOTS
+#define PRLOG_RING_SLOTS  1024  // per thread, power of two
+#endif
+#define PRLOG_MAX_FILTERS 32
+#define PRLOG_IDLE_MS     50
+#define PRLOG_IOV_BATCH   1024  // Linux's IOV_MAX
+
+// name a file's module explicitly; otherwise it's the file name minus extension
+#ifndef PRLOG_MODULE
+#define PRLOG_MODULE __FILE__
+#endif
+
+struct prlog_record {
+    uint16_t len;
+    char text[PRLOG_RECORD_SIZE - sizeof(uint16_t)];
+};
+
+struct prlog_ring {
+    uint32_t head;              // written by the owning thread
+    char pad1[60];
+    uint32_t tail;              // written by the writer thread
+    char pad2[60];
+    int closed;                 // owning thread has exited
+    struct prlog_ring *next;
+    struct prlog_record slots[PRLOG_RING_SLOTS];
+};
+
+// per call site: the level that applied at filter generation gen
+struct prlog_site {
+    const char *module;
+    uint64_t cache;             // (gen + 1) << 32 | level
+};
+
+struct prlog_filter {
+    char module[64];
+    int level;
+};
+
+struct prlog_state {
+    pthread_once_t once;
+    pthread_mutex_t lock;       // rings, filters, wakeups
+    pthread_mutex_t io_lock;    // fd
+    pthread_cond_t wake;
+    pthread_cond_t drained;
+    pthread_key_t key;
+    pthread_t writer;
+    int running;
+    int stopping;
+    int sleeping;
+    int flushing;               // prlog_flush() callers waiting
+    int restart;                // forked child: start a writer on next use
+    int fd;
+    int owns_fd;
+    int level;
+    uint32_t gen;
+    uint64_t passes;            // writer sweeps over all rings
+    uint64_t written;
+    struct prlog_ring *rings;
+    int filter_count;
+    struct prlog_filter filters[PRLOG_MAX_FILTERS];
+};
+
+struct prlog_state prlog_state __attribute__((weak)) = {
+    .once = PTHREAD_ONCE_INIT,
+    .lock = PTHREAD_MUTEX_INITIALIZER,
+    .io_lock = PTHREAD_MUTEX_INITIALIZER,
+    .wake = PTHREAD_COND_INITIALIZER,
+    .drained = PTHREAD_COND_INITIALIZER,
+    .fd = STDOUT_FILENO,
+    .level = LOG_LEVEL,
+};
+__thread struct prlog_ring *prlog_thread_ring __attribute__((weak));
+
+static inline const char *prlog_level_name(int level) {
+    switch (level) {
+        case LOG_INFO:    return "INFO";
+        case LOG_WARNING: return "WARNING";
+        case LOG_ERROR:   return "ERROR";
+        case LOG_FATAL:   return "FATAL";
+    }
+    return "";
+}
+
+static inline int prlog_module_matches(const char *module, const char *name) {
+    const char *base = strrchr(module, '/');
+    size_t len = strlen(name);
+    if (strcmp(module, name) == 0)
+        return 1;
+    base = base != NULL ? base + 1 : module;
+    return strncmp(base, name, len) == 0 && (base[len] == '\0' || base[len] == '.');
+}
+
+static inline void prlog_bump_gen(void) {
+    __atomic_add_fetch(&prlog_state.gen, 1, __ATOMIC_RELEASE);
+}
+
+static inline void prlog_set_level(int level) {
+    pthread_mutex_lock(&prlog_state.lock);
+    prlog_state.level = level;
+    prlog_bump_gen();
+    pthread_mutex_unlock(&prlog_state.lock);
+}
+
+static inline int prlog_get_level(void) {
+    return __atomic_load_n(&prlog_state.level, __ATOMIC_RELAXED);
+}
+
+// module is a PRLOG_MODULE name or a file name without extension;
+// a negative level removes the filter
+static inline int prlog_set_module_level(const char *module, int level) {
+    int i, ret = 0;
+    pthread_mutex_lock(&prlog_state.lock);
+    for (i = 0; i < prlog_state.filter_count; i++) {
+        if (strcmp(prlog_state.filters[i].module, module) == 0)
+            break;
+    }
+    if (level < 0) {
+        if (i < prlog_state.filter_count)
+            prlog_state.filters[i] = prlog_state.filters[--prlog_state.filter_count];
+    } else if (i < prlog_state.filter_count) {
+        prlog_state.filters[i].level = level;
+    } else if (i < PRLOG_MAX_FILTERS) {
+        snprintf(prlog_state.filters[i].module, sizeof(prlog_state.filters[i].module), "%s", module);
+        prlog_state.filters[i].level = level;
+        prlog_state.filter_count++;
+    } else {
+        ret = -1;
+    }
+    prlog_bump_gen();
+    pthread_mutex_unlock(&prlog_state.lock);
+    return ret;
+}
+
+// the common case is one relaxed load and a compare; filters are only
+// looked at again after a level or filter change
+static inline int prlog_enabled(struct prlog_site *site, int level) {
+    uint64_t cache = __atomic_load_n(&site->cache, __ATOMIC_RELAXED);
+    uint32_t gen = __atomic_load_n(&prlog_state.gen, __ATOMIC_ACQUIRE) + 1;
+    if ((uint32_t)(cache >> 32) != gen) {
+        int i, min;
+        pthread_mutex_lock(&prlog_state.lock);
+        min = prlog_state.level;
+        for (i = 0; i < prlog_state.filter_count; i++) {
+            if (prlog_module_matches(site->module, prlog_state.filters[i].module)) {
+                min = prlog_state.filters[i].level;
+                break;
+            }
+        }
+        pthread_mutex_unlock(&prlog_state.lock);
+        cache = ((uint64_t)gen << 32) | (uint32_t)min;
+        __atomic_store_n(&site->cache, cache, __ATOMIC_RELAXED);
+    }
+    return level >= (int)(uint32_t)cache;
+}
+
+static inline void prlog_write_all(int fd, struct iovec *iov, int count) {
+    while (count > 0) {
+        ssize_t n = writev(fd, iov, count);
+        if (n < 0) {
+            if (errno == EINTR)
+                continue;
+            return;  // nowhere to put it; drop rather than stall every logger
+        }
+        while (count > 0 && (size_t)n >= iov->iov_len) {
+            n -= (ssize_t)iov->iov_len;
+            iov++;
+            count--;
+        }
+        if (count > 0) {
+            iov->iov_base = (char *)iov->iov_base + n;
+            iov->iov_len -= (size_t)n;
+        }
+    }
+}
+
+// write out everything one ring holds right now; returns records written
+static inline int prlog_drain_ring(struct prlog_ring *ring) {
+    struct iovec iov[PRLOG_IOV_BATCH];
+    int total = 0;
+
+    for (;;) {
+        uint32_t tail = ring->tail;
+        uint32_t head = __atomic_load_n(&ring->head, __ATOMIC_ACQUIRE);
+        int count = 0;
+        if (head == tail)
+            break;
+        while (tail + (uint32_t)count != head && count < (int)(sizeof(iov) / sizeof(iov[0]))) {
+            struct prlog_record *rec = &ring->slots[(tail + (uint32_t)count) & (PRLOG_RING_SLOTS - 1)];
+            iov[count].iov_base = rec->text;
+            iov[count].iov_len = rec->len;
+            count++;
+        }
+        pthread_mutex_lock(&prlog_state.io_lock);
+        prlog_write_all(prlog_state.fd, iov, count);
+        pthread_mutex_unlock(&prlog_state.io_lock);
+        __atomic_store_n(&ring->tail, tail + (uint32_t)count, __ATOMIC_RELEASE);
+        total += count;
+    }
+    return total;
+}
+
+// pthread_cond_timedwait() wants CLOCK_REALTIME, which strict -std=c99/c11
+// builds without _POSIX_C_SOURCE don't declare
+static inline void prlog_realtime(struct timespec *ts) {
+#ifdef CLOCK_REALTIME
+    clock_gettime(CLOCK_REALTIME, ts);
+#else
+    struct timeval tv;
+    gettimeofday(&tv, NULL);
+    ts->tv_sec = tv.tv_sec;
+    ts->tv_nsec = (long)tv.tv_usec * 1000;
+#endif
+}
+
+static inline void *prlog_writer(void *arg) {
+    (void)arg;
+    pthread_mutex_lock(&prlog_state.lock);
+    for (;;) {
+        struct prlog_ring **link = &prlog_state.rings;
+        int written = 0;
+
+        // rings are only unlinked here, so walking them unlocked is safe;
+        // new ones are pushed at the head and picked up next pass
+        pthread_mutex_unlock(&prlog_state.lock);
+        for (;;) {
+            struct prlog_ring *ring = __atomic_load_n(link, __ATOMIC_ACQUIRE);
+            int closed;
+            if (ring == NULL)
+                break;
+            closed = __atomic_load_n(&ring->closed, __ATOMIC_ACQUIRE);
+            written += prlog_drain_ring(ring);
+            if (closed && ring->head == ring->tail) {
+                struct prlog_ring **prev;
+                pthread_mutex_lock(&prlog_state.lock);
+                // the list head may have moved since we read it
+                for (prev = &prlog_state.rings; *prev != ring; prev = &(*prev)->next)
+                    ;
+                *prev = ring->next;
+                link = prev;
+                pthread_mutex_unlock(&prlog_state.lock);
+                free(ring);
+                continue;
+            }
+            link = &ring->next;
+        }
+
+        pthread_mutex_lock(&prlog_state.lock);
+        prlog_state.written += (uint64_t)written;
+        prlog_state.passes++;
+        pthread_cond_broadcast(&prlog_state.drained);
+        if (prlog_state.stopping) {
+            if (written == 0)
+                break;
+            continue;
+        }
+        // keep going while busy; otherwise nap so the next pass has a batch
+        if (written >= PRLOG_RING_SLOTS / 4 || prlog_state.flushing > 0)
+            continue;
+        __atomic_store_n(&prlog_state.sleeping, 1, __ATOMIC_RELEASE);
+        {
+            struct timespec deadline;
+            prlog_realtime(&deadline);
+            deadline.tv_nsec += PRLOG_IDLE_MS * 1000000L;
+            if (deadline.tv_nsec >= 1000000000L) {
+                deadline.tv_sec++;
+                deadline.tv_nsec -= 1000000000L;
+            }
+            pthread_cond_timedwait(&prlog_state.wake, &prlog_state.lock, &deadline);
+        }
+        __atomic_store_n(&prlog_state.sleeping, 0, __ATOMIC_RELEASE);
+    }
+    pthread_mutex_unlock(&prlog_state.lock);
+    return NULL;
+}
+
+static inline void prlog_wake(void) {
+    pthread_mutex_lock(&prlog_state.lock);
+    pthread_cond_signal(&prlog_state.wake);
+    pthread_mutex_unlock(&prlog_state.lock);
+}
+
+// returns once everything logged before the call has been written
+static inline void prlog_flush(void) {
+    uint64_t target;
+    pthread_mutex_lock(&prlog_state.lock);
+    if (!prlog_state.running) {
+        pthread_mutex_unlock(&prlog_state.lock);
+        return;
+    }
+    // the pass in progress may have gone past our ring already; wait for the next one
+    target = prlog_state.passes + 2;
+    prlog_state.flushing++;
+    pthread_cond_signal(&prlog_state.wake);
+    while (prlog_state.running && prlog_state.passes < target)
+        pthread_cond_wait(&prlog_state.drained, &prlog_state.lock);
+    prlog_state.flushing--;
+    pthread_mutex_unlock(&prlog_state.lock);
+}
+
+// stop the writer after writing everything out; later lines are written directly
+static inline void prlog_shutdown(void) {
+    struct prlog_ring *ring;
+    pthread_mutex_lock(&prlog_state.lock);
+    if (!prlog_state.running || prlog_state.stopping) {
+        pthread_mutex_unlock(&prlog_state.lock);
+        return;
+    }
+    prlog_state.stopping = 1;
+    pthread_cond_signal(&prlog_state.wake);
+    pthread_mutex_unlock(&prlog_state.lock);
+    pthread_join(prlog_state.writer, NULL);
+    pthread_mutex_lock(&prlog_state.lock);
+    // anything that slipped in while the writer was exiting
+    for (ring = prlog_state.rings; ring != NULL; ring = ring->next)
+        prlog_drain_ring(ring);
+    prlog_state.running = 0;
+    pthread_cond_broadcast(&prlog_state.drained);
+    pthread_mutex_unlock(&prlog_state.lock);
+}
+
+static inline void prlog_thread_exit(void *ring) {
+    prlog_thread_ring = NULL;  // logging from a later destructor gets a new ring
+    __atomic_store_n(&((struct prlog_ring *)ring)->closed, 1, __ATOMIC_RELEASE);
+}
+
+// called with prlog_state.lock held (or before anyone else can log)
+static inline void prlog_start_writer(void) {
+    prlog_state.stopping = 0;
+    prlog_state.sleeping = 0;
+    prlog_state.restart = 0;
+    if (pthread_create(&prlog_state.writer, NULL, prlog_writer, NULL) == 0)
+        __atomic_store_n(&prlog_state.running, 1, __ATOMIC_RELEASE);
+}
+
+// keep the locks consistent across fork(); the child gets neither the writer
+// nor the other threads, so it drops their rings (the parent writes them)
+// and starts its own writer the next time it logs
+static inline void prlog_atfork_prepare(void) {
+    pthread_mutex_lock(&prlog_state.lock);
+    pthread_mutex_lock(&prlog_state.io_lock);
+}
+
+static inline void prlog_atfork_parent(void) {
+    pthread_mutex_unlock(&prlog_state.io_lock);
+    pthread_mutex_unlock(&prlog_state.lock);
+}
+
+static inline void prlog_atfork_child(void) {
+    struct prlog_ring *ring = prlog_state.rings;
+    while (ring != NULL) {
+        struct prlog_ring *next = ring->next;
+        free(ring);
+        ring = next;
+    }
+    prlog_state.rings = NULL;
+    prlog_thread_ring = NULL;
+    pthread_setspecific(prlog_state.key, NULL);
+    prlog_state.restart = prlog_state.running && !prlog_state.stopping;
+    prlog_state.running = 0;
+    prlog_state.stopping = 0;
+    prlog_state.sleeping = 0;
+    prlog_state.flushing = 0;
+    pthread_mutex_init(&prlog_state.lock, NULL);
+    pthread_mutex_init(&prlog_state.io_lock, NULL);
+    pthread_cond_init(&prlog_state.wake, NULL);
+    pthread_cond_init(&prlog_state.drained, NULL);
+}
+
+static inline void prlog_init(void) {
+    if (pthread_key_create(&prlog_state.key, prlog_thread_exit) != 0)
+        return;
+    pthread_atfork(prlog_atfork_prepare, prlog_atfork_parent, prlog_atfork_child);
+    prlog_start_writer();
+    if (prlog_state.running)
+        atexit(prlog_shutdown);
+}
+
+static inline void prlog_swap_fd(int fd, int owns) {
+    int old = -1;
+    prlog_flush();
+    pthread_mutex_lock(&prlog_state.io_lock);
+    if (prlog_state.owns_fd)
+        old = prlog_state.fd;
+    prlog_state.fd = fd;
+    prlog_state.owns_fd = owns;
+    pthread_mutex_unlock(&prlog_state.io_lock);
+    if (old >= 0)
+        close(old);
+}
+
+// log to fd from now on (the caller keeps ownership)
+static inline void prlog_set_fd(int fd) {
+    prlog_swap_fd(fd, 0);
+}
+
+// append to path from now on
+static inline int prlog_open(const char *path) {
+    int fd = open(path, O_WRONLY | O_CREAT | O_APPEND, 0644);
+    if (fd < 0)
+        return -1;
+    fcntl(fd, F_SETFD, FD_CLOEXEC);
+    prlog_swap_fd(fd, 1);
+    return 0;
+}
+
+static inline struct prlog_ring *prlog_get_ring(void) {
+    struct prlog_ring *ring = prlog_thread_ring;
+    if (ring != NULL)
+        return ring;
+    pthread_once(&prlog_state.once, prlog_init);
+    if (!__atomic_load_n(&prlog_state.running, __ATOMIC_ACQUIRE)) {
+        pthread_mutex_lock(&prlog_state.lock);
+        if (!prlog_state.running && prlog_state.restart)
+            prlog_start_writer();
+        pthread_mutex_unlock(&prlog_state.lock);
+        if (!prlog_state.running)
+            return NULL;
+    }
+    ring = (struct prlog_ring *)calloc(1, sizeof(*ring));
+    if (ring == NULL)
+        return NULL;
+    pthread_setspecific(prlog_state.key, ring);
+    pthread_mutex_lock(&prlog_state.lock);
+    ring->next = prlog_state.rings;
+    __atomic_store_n(&prlog_state.rings, ring, __ATOMIC_RELEASE);
+    pthread_mutex_unlock(&prlog_state.lock);
+    prlog_thread_ring = ring;
+    return ring;
+}
+
+static inline int prlog_format(char *buf, size_t size, const char *fmt, va_list ap) {
+    int n = vsnprintf(buf, size, fmt, ap);
+    if (n < 0) {
+        n = 0;
+    } else if ((size_t)n >= size) {
+        n = (int)size - 1;
+        memcpy(buf + n - 4, "...\n", 4);
+    }
+    return n;
+}
+
+// fmt already carries the "[LEVEL] file:line: " prefix and the newline
+static inline void prlog_write(int level, const char *fmt, ...) __attribute__((format(printf, 2, 3)));
+
+static inline void prlog_write(int level, const char *fmt, ...) {
+    struct prlog_ring *ring = NULL;
+    va_list ap;
+
+#ifndef PRLOG_SYNC
+    ring = prlog_get_ring();
+#endif
+    if (ring != NULL) {
+        // full: let the writer catch up rather than lose lines
+        while (ring->head - __atomic_load_n(&ring->tail, __ATOMIC_ACQUIRE) >= PRLOG_RING_SLOTS) {
+            if (!__atomic_load_n(&prlog_state.running, __ATOMIC_RELAXED)) {
+                ring = NULL;  // no writer to wait for
+                break;
+            }
+            prlog_wake();
+            sched_yield();
+        }
+    }
+    va_start(ap, fmt);
+    if (ring == NULL || __atomic_load_n(&prlog_state.stopping, __ATOMIC_RELAXED)) {
+        char buf[PRLOG_RECORD_SIZE];
+        struct iovec iov;
+        iov.iov_base = buf;
+        iov.iov_len = (size_t)prlog_format(buf, sizeof(buf), fmt, ap);
+        pthread_mutex_lock(&prlog_state.io_lock);
+        prlog_write_all(prlog_state.fd, &iov, 1);
+        pthread_mutex_unlock(&prlog_state.io_lock);
+    } else {
+        uint32_t head = ring->head, tail = __atomic_load_n(&ring->tail, __ATOMIC_ACQUIRE);
+        struct prlog_record *rec = &ring->slots[head & (PRLOG_RING_SLOTS - 1)];
+        rec->len = (uint16_t)prlog_format(rec->text, sizeof(rec->text), fmt, ap);
+        __atomic_store_n(&ring->head, head + 1, __ATOMIC_RELEASE);
+        // the writer wakes up by itself every PRLOG_IDLE_MS; only hurry it
+        // along for errors or a filling ring, and only once per nap
+        if ((level >= LOG_ERROR || head + 1 - tail >= PRLOG_RING_SLOTS / 4)
+                && __atomic_load_n(&prlog_state.sleeping, __ATOMIC_RELAXED)
+                && __atomic_exchange_n(&prlog_state.sleeping, 0, __ATOMIC_ACQ_REL))
+            prlog_wake();
+    }
+    va_end(ap);
+    if (level >= LOG_FATAL)
+        prlog_flush();
+}
 
 #define prlog(level, fmt, ...) \
     do { \
         if (level >= LOG_LEVEL) { \
-            const char* level_str = ""; \
-            switch (level) { \
-                case LOG_INFO:    level_str = "INFO"; break; \
-                case LOG_WARNING: level_str = "WARNING"; break; \
-                case LOG_ERROR:   level_str = "ERROR"; break; \
-                case LOG_FATAL:   level_str = "FATAL"; break; \
-            } \
-            printf("[%s] %s:%d: " fmt "\n", level_str, __FILE__, __LINE__, ##__VA_ARGS__); \
+            static struct prlog_site prlog_site_ = {PRLOG_MODULE, 0}; \
+            if (prlog_enabled(&prlog_site_, level)) \
+                prlog_write(level, "[%s] %s:%d: " fmt "\n", prlog_level_name(level), __FILE__, __LINE__, \
+                            ##__VA_ARGS__); \
         } \
     } while (0)
 
@@ -42,4 +556,3 @@
 #define prlog_fe(fmt, ...) prlog(LOG_FATAL, fmt, ##__VA_ARGS__)
 
 #endif // LOG_H
-
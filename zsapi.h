@@ -22,6 +22,7 @@
 #include <openssl/evp.h>
 #include <openssl/bn.h>
 #include <unistd.h>
+#include <pthread.h>
 
 // === ZenithOS Secure API (SAPI) ===
 //  SDK 13.0 • OpenSSL-based certificate generator
@@ -35,15 +36,41 @@
 #define C_RED     "\033[1;31m"
 #define C_RESET   "\033[0m"
 
-static void sapi_log(const char* msg) {
-    FILE* log = fopen("cert.log", "a");
-    if (log) {
-        time_t t = time(NULL);
-        fprintf(log, "[%ld] %s\n", t, msg);
-        fclose(log);
+// cert.log is opened once and shared by every file that includes this header
+// (weak symbol); line buffered, so each record goes out in one write
+struct sapi_log_state {
+    pthread_once_t once;
+    FILE* file;
+};
+
+struct sapi_log_state sapi_log_state __attribute__((weak)) = {PTHREAD_ONCE_INIT, NULL};
+
+static void sapi_log_flush(void) {
+    if (sapi_log_state.file) fflush(sapi_log_state.file);
+}
+
+static void sapi_log_close(void) {
+    if (sapi_log_state.file) {
+        fclose(sapi_log_state.file);
+        sapi_log_state.file = NULL;
     }
 }
 
+static void sapi_log_open(void) {
+    sapi_log_state.file = fopen("cert.log", "a");
+    if (sapi_log_state.file) {
+        setvbuf(sapi_log_state.file, NULL, _IOLBF, BUFSIZ);
+        atexit(sapi_log_close);
+    }
+}
+
+static void sapi_log(const char* msg) {
+    pthread_once(&sapi_log_state.once, sapi_log_open);
+    if (!sapi_log_state.file) return;
+    time_t t = time(NULL);
+    fprintf(sapi_log_state.file, "[%ld] %s\n", t, msg);
+}
+
 static EVP_PKEY* sapi_gen_rsa_key() {
     EVP_PKEY* pkey = EVP_PKEY_new();
     RSA* rsa = RSA_new();